@@ -1,18 +1,37 @@
 import logging
-import gc
-from typing import Any, Dict, Optional, Literal
-
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import JSONResponse
-
+import threading
+import time
+from contextlib import AsyncExitStack
+from typing import Any, Dict, Optional, Literal, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import BRIEFING_CACHE, BRIEFING_FIRST_SECTION
+from app.db.session import get_db
 from app.models.user import User
 from app.schemas.user import User as UserSchema
 from app.security.jwt import get_current_user
-from app.services.langgraph.coordinator import LangGraphCoordinator, MemoryManager
+from app.services.admission import AdmissionRejectedError, get_briefing_admission
+from app.services.briefing_store import is_storable, load_briefing, local_date, save_briefing
+from app.services.langgraph.coordinator import LangGraphCoordinator
 from app.services.rag import rag_pipeline
-
-# Initialize coordinator as None, will be lazy loaded
-_langgraph_coordinator = None
+from app.services.singleflight import briefing_flights
+from app.utils.streaming import (
+    STREAM_HEADERS,
+    HeldStreamingResponse,
+    iterate_in_thread,
+    ndjson_event,
+    sse_event,
+)
+
+# Coordinators are lazy loaded and cached per model size; they are shared by
+# concurrent briefings, so they are no longer torn down after each request
+_langgraph_coordinators: Dict[str, LangGraphCoordinator] = {}
+_coordinator_lock = threading.Lock()
 
 def get_langgraph_coordinator(model_size: str = 'small'):
     """Lazy load the LangGraph coordinator with specified model size.
@@ -20,12 +39,14 @@ def get_langgraph_coordinator(model_size: str = 'small'):
     Args:
         model_size: One of 'small', 'medium', or 'large'
     """
-    global _langgraph_coordinator
-    if _langgraph_coordinator is None or _langgraph_coordinator.model_size != model_size:
-        if _langgraph_coordinator is not None:
-            _langgraph_coordinator.cleanup()
-        _langgraph_coordinator = LangGraphCoordinator(model_size=model_size)
-    return _langgraph_coordinator
+    coordinator = _langgraph_coordinators.get(model_size)
+    if coordinator is None:
+        with _coordinator_lock:
+            coordinator = _langgraph_coordinators.get(model_size)
+            if coordinator is None:
+                coordinator = LangGraphCoordinator(model_size=model_size)
+                _langgraph_coordinators[model_size] = coordinator
+    return coordinator
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -40,82 +61,182 @@ async def health_check() -> Dict[str, str]:
 @router.get("/briefing/daily")
 async def get_daily_briefing(
     model_size: Literal['small', 'medium', 'large'] = 'small',
+    refresh: bool = False,
     current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
 ) -> Dict[str, Any]:
-    """Get AI-powered daily briefing from multi-agent system with memory management
+    """Get AI-powered daily briefing from multi-agent system with admission control.
+
+    Today's briefing (in the user's timezone) is served from storage when it
+    was already computed, either by the morning precompute scheduler or by an
+    earlier request. Otherwise concurrent requests for the same user and
+    model size are coalesced into one workflow run whose result is stored.
     
     Args:
         model_size: Model size to use ('small', 'medium', or 'large')
+        refresh: Ignore the stored briefing and run the workflow again
         current_user: Authenticated user
         
     Returns:
         Dict containing the briefing and memory usage information
     """
-    coordinator = None
+    admission = get_briefing_admission()
     try:
-        # Check memory before proceeding
-        current_memory = MemoryManager.get_memory_usage()
-        if current_memory > 400:  # MB
-            logger.warning(f"Memory usage high before processing request: {current_memory:.2f}MB")
-            # If memory is very high, force small model
-            if current_memory > 450:
-                model_size = 'small'
-                logger.warning(f"Forcing small model due to high memory usage")
-            MemoryManager.free_memory()
-        
-        logger.info(f"Generating daily briefing for user {current_user.id} using {model_size} model")
-        
-        # Get coordinator instance with specified model size
+        today = local_date(current_user.timezone)
+        briefing = None if refresh else load_briefing(db, current_user.id, today, model_size)
+        cached = briefing is not None
+        BRIEFING_CACHE.labels("hit" if cached else "miss").inc()
+        if not cached:
+            # Identical concurrent requests (dashboard, mobile app, a retry)
+            # share one workflow run and one admission slot
+            briefing, model_size = await briefing_flights.do(
+                (current_user.id, model_size),
+                lambda: _run_daily_briefing(admission, db, current_user, model_size),
+            )
         coordinator = get_langgraph_coordinator(model_size=model_size)
-        
-        try:
-            # Generate briefing using LangGraph coordinator
-            briefing = coordinator.get_daily_briefing(current_user.id)
-            
-            response = {
-                "message": f"Daily briefing for {current_user.email} ({model_size} model)",
-                "user_id": current_user.id,
-                "briefing": briefing,
-                "status": "success",
-                "model_size": model_size,
-                "memory_usage_mb": round(MemoryManager.get_memory_usage(), 2),
-                "model_config": {
-                    "max_tokens": coordinator.MODEL_CONFIGS[model_size]['max_tokens'],
-                    "temperature": coordinator.MODEL_CONFIGS[model_size]['temperature']
-                }
+
+        return {
+            "message": f"Daily briefing for {current_user.email} ({model_size} model)",
+            "user_id": current_user.id,
+            "briefing": briefing,
+            "status": "success",
+            "model_size": model_size,
+            "cached": cached,
+            "memory_usage_mb": _sampled_memory_mb(admission),
+            "model_config": {
+                "max_tokens": coordinator.MODEL_CONFIGS[model_size]['max_tokens'],
+                "temperature": coordinator.MODEL_CONFIGS[model_size]['temperature']
             }
-            return response
-            
-        finally:
-            # Clean up resources after use
-            if coordinator:
-                coordinator.cleanup()
+        }
+
+    except AdmissionRejectedError as e:
+        logger.warning(f"Shedding daily briefing for user {current_user.id}: {e}")
+        return _capacity_exhausted(e)
 
     except Exception as e:
         error_msg = f"Failed to generate daily briefing for user {current_user.id}: {e}"
         logger.error(error_msg, exc_info=True)
         
-        # Clean up if coordinator was initialized
-        if coordinator:
-            try:
-                coordinator.cleanup()
-            except Exception as cleanup_error:
-                logger.error(f"Error during cleanup: {cleanup_error}")
-        
-        # Force garbage collection
-        MemoryManager.free_memory()
-        
         # Return error response with memory info
         return JSONResponse(
             status_code=500,
             content={
                 "detail": "Failed to generate daily briefing",
                 "error": str(e),
-                "memory_usage_mb": round(MemoryManager.get_memory_usage(), 2)
+                "memory_usage_mb": _sampled_memory_mb(admission)
             }
         )
 
 
+@router.get("/briefing/daily/stream")
+async def stream_daily_briefing(
+    model_size: Literal['small', 'medium', 'large'] = 'small',
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the daily briefing as Server-Sent Events.
+
+    Emits ``start``, then a ``section`` event per agent analysis as soon as its
+    node completes, ``token`` events while the priority agent writes the
+    final briefing, and finally ``done`` with the full briefing (or ``error``).
+    Admission control is the same as for ``/briefing/daily``; the slot is
+    held until the stream ends.
+    """
+    admission = get_briefing_admission()
+    slot = AsyncExitStack()
+    try:
+        await slot.enter_async_context(admission.slot())
+    except AdmissionRejectedError as e:
+        logger.warning(f"Shedding streamed briefing for user {current_user.id}: {e}")
+        return _capacity_exhausted(e)
+
+    try:
+        if admission.sampler is not None and admission.sampler.over_budget:
+            logger.warning("Worker over memory budget, forcing small model")
+            model_size = 'small'
+
+        user_id = current_user.id
+        coordinator = get_langgraph_coordinator(model_size=model_size)
+        logger.info(f"Streaming daily briefing for user {user_id} using {model_size} model")
+
+        async def events():
+            # Released here as soon as the stream ends, and again (a no-op)
+            # by the response, which also covers a stream that never starts
+            async with slot:
+                started = time.perf_counter()
+                first_section = True
+                yield sse_event("start", {"user_id": user_id, "model_size": model_size})
+                try:
+                    async for event, payload in iterate_in_thread(
+                        lambda: coordinator.stream_daily_briefing(user_id)
+                    ):
+                        if event == "section" and first_section:
+                            first_section = False
+                            BRIEFING_FIRST_SECTION.observe(time.perf_counter() - started)
+                        elif event == "done":
+                            coordinator.schedule_urgent_sms(user_id, payload)
+                        yield sse_event(event, payload)
+                except Exception as e:
+                    logger.error(
+                        f"Streamed briefing failed for user {user_id}: {e}", exc_info=True
+                    )
+                    yield sse_event("error", {"user_id": user_id, "error": str(e)})
+
+        return HeldStreamingResponse(
+            events(), slot, media_type="text/event-stream", headers=STREAM_HEADERS
+        )
+    except BaseException:
+        await slot.aclose()
+        raise
+
+
+async def _run_daily_briefing(
+    admission, db: Session, user: User, model_size: str
+) -> Tuple[Dict[str, Any], str]:
+    # Returns the briefing and the model size actually used
+    user_id = user.id
+    async with admission.slot():
+        # The background sampler flags memory pressure; no per-request psutil call
+        if admission.sampler is not None and admission.sampler.over_budget:
+            logger.warning("Worker over memory budget, forcing small model")
+            model_size = 'small'
+
+        logger.info(f"Generating daily briefing for user {user_id} using {model_size} model")
+
+        coordinator = get_langgraph_coordinator(model_size=model_size)
+
+        # The workflow is blocking (sync LLM calls), so keep it off the event loop
+        briefing = await run_in_threadpool(
+            coordinator.get_daily_briefing, user_id, notify_urgent=False
+        )
+        coordinator.schedule_urgent_sms(user_id, briefing)
+
+    if is_storable(briefing):
+        try:
+            save_briefing(
+                db, user_id, local_date(user.timezone), model_size, briefing, source="on_demand"
+            )
+        except Exception as e:
+            # Serving the briefing matters more than caching it
+            logger.warning(f"Failed to store daily briefing for user {user_id}: {e}")
+    return briefing, model_size
+
+
+def _capacity_exhausted(error: AdmissionRejectedError) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={
+            "detail": "Briefing capacity exhausted, please retry shortly",
+            "retry_after": error.retry_after,
+        },
+        headers={"Retry-After": str(error.retry_after)},
+    )
+
+
+def _sampled_memory_mb(admission) -> Optional[float]:
+    # Last RSS reading from the background sampler
+    return round(admission.sampler.latest_mb, 2) if admission.sampler else None
+
+
 @router.get("/users/me", response_model=UserSchema)
 async def get_current_user_info(
     current_user: User = Depends(get_current_user),
@@ -147,17 +268,26 @@ async def semantic_search(
     try:
         query = query_data.get("query", "")
         n_results = query_data.get("n_results", 5)
+        mode = query_data.get("mode", settings.RAG_SEARCH_MODE)
 
         if not query:
             raise HTTPException(status_code=400, detail="Query is required")
+        if mode not in ("vector", "hybrid"):
+            raise HTTPException(status_code=400, detail="mode must be 'vector' or 'hybrid'")
 
-        logger.info(f"Performing semantic search for user {current_user.id}: {query}")
+        logger.info(f"Performing {mode} search for user {current_user.id}: {query}")
 
-        results = rag_pipeline.query_texts(query, n_results=n_results)
+        results = rag_pipeline.query_texts(
+            query,
+            n_results=n_results,
+            filter_metadata={"user_id": current_user.id},
+            mode=mode,
+        )
 
         return {
             "user_id": current_user.id,
             "query": query,
+            "mode": mode,
             "results": results,
             "count": len(results),
             "status": "success",
@@ -186,7 +316,13 @@ async def analyze_document(
             f"Analyzing document for user {current_user.id}, type: {document_type}"
         )
 
-        analysis = get_langgraph_coordinator().analyze_document(content, document_type)
+        # LLM calls block, and may wait for a gateway slot; keep them off the event loop
+        analysis = await run_in_threadpool(
+            get_langgraph_coordinator().analyze_document,
+            content,
+            document_type,
+            user_id=current_user.id,
+        )
 
         return {
             "user_id": current_user.id,
@@ -222,16 +358,18 @@ async def chat_with_agent(
         # Route to appropriate agent based on type
         coordinator = get_langgraph_coordinator()
         if agent_type == "email":
-            response = coordinator.chat_with_email_agent(current_user.id, message)
+            chat = coordinator.chat_with_email_agent
         elif agent_type == "calendar":
-            response = coordinator.chat_with_calendar_agent(current_user.id, message)
+            chat = coordinator.chat_with_calendar_agent
         elif agent_type == "priority":
-            response = coordinator.chat_with_priority_agent(current_user.id, message)
+            chat = coordinator.chat_with_priority_agent
         elif agent_type == "social":
-            response = coordinator.chat_with_social_agent(current_user.id, message)
+            chat = coordinator.chat_with_social_agent
         else:
             # Default to general chat
-            response = coordinator.general_chat(current_user.id, message)
+            chat = coordinator.general_chat
+        # LLM calls block, and may wait for a gateway slot; keep them off the event loop
+        response = await run_in_threadpool(chat, current_user.id, message)
 
         return {
             "user_id": current_user.id,
@@ -248,3 +386,54 @@ async def chat_with_agent(
             status_code=500,
             detail=f"Agent chat failed: {str(e)}"
         )
+
+
+@router.post("/chat/stream")
+async def stream_chat_with_agent(
+    chat_data: Dict[str, Any],
+    stream_format: Literal['sse', 'ndjson'] = Query('sse', alias="format"),
+    current_user: User = Depends(get_current_user),
+):
+    """Stream an agent chat reply token by token.
+
+    Takes the same body as ``/chat``. Emits ``start``, ``token`` events with
+    cleaned text as the LLM produces it, then ``done`` with the full message
+    (or ``error``). ``format=sse`` (default) sends Server-Sent Events;
+    ``format=ndjson`` sends one JSON object per line with an ``event`` field.
+    """
+    agent_type = chat_data.get("agent_type", "email")
+    message = chat_data.get("message", "")
+
+    if not message:
+        raise HTTPException(status_code=400, detail="Message is required")
+
+    user_id = current_user.id
+    coordinator = get_langgraph_coordinator()
+    encode = sse_event if stream_format == 'sse' else ndjson_event
+    logger.info(f"Streaming chat for user {user_id}, agent: {agent_type}, message: {message[:50]}...")
+
+    async def events():
+        yield encode("start", {"user_id": user_id, "agent_type": agent_type})
+        parts = []
+        try:
+            async for text in iterate_in_thread(
+                lambda: coordinator.stream_chat(user_id, agent_type, message)
+            ):
+                parts.append(text)
+                yield encode("token", {"text": text})
+        except Exception as e:
+            logger.error(f"Streamed chat failed for user {user_id}: {e}", exc_info=True)
+            yield encode("error", {"user_id": user_id, "error": str(e)})
+            return
+        yield encode(
+            "done",
+            {
+                "user_id": user_id,
+                "agent_type": agent_type,
+                "message": "".join(parts),
+                "status": "success",
+            },
+        )
+
+    media_type = "text/event-stream" if stream_format == 'sse' else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers=STREAM_HEADERS)
@@ -14,7 +14,7 @@ from app.models.connected_service import ConnectedService
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserLogin
 from app.security.jwt import create_access_token, get_current_user
-from app.security.password import hash_password, verify_password
+from app.security.password import hash_password_async, verify_and_update_password_async
 
 router = APIRouter()
 
@@ -38,8 +38,8 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
             status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered"
         )
 
-    # Hash the password
-    hashed_password = hash_password(user.password)
+    # Hash the password on the dedicated worker pool
+    hashed_password = await hash_password_async(user.password)
 
     # Create new user
     db_user = User(
@@ -65,7 +65,18 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
     # Find user by email
     user = db.query(User).filter(User.email == user_credentials.email).first()
 
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
+    is_valid = False
+    if user and user.hashed_password:
+        is_valid, updated_hash = await verify_and_update_password_async(
+            user_credentials.password, user.hashed_password
+        )
+
+        # Upgrade hashes created with older Argon2 parameters
+        if is_valid and updated_hash:
+            user.hashed_password = updated_hash
+            db.commit()
+
+    if not is_valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -15,6 +15,7 @@ from app.schemas.message import (
     WhatsAppMessage,
 )
 from app.security.jwt import get_current_user
+from app.services.erasure import get_erasure_service
 from app.services.rag import rag_pipeline
 
 logger = logging.getLogger(__name__)
@@ -398,22 +399,26 @@ Message: {message_data.content}
         )
 
 
-@router.delete("/documents")
+@router.delete("/documents", status_code=202)
 async def delete_user_documents(
     filter_data: Dict[str, Any], current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """Delete documents matching filter criteria."""
+    """Queue deletion of documents matching filter criteria.
+
+    The documents, and the cached answers and briefings derived from them, are
+    erased in the background; poll ``/documents/erasures/{job_id}`` for progress.
+    """
     try:
         # Ensure user can only delete their own documents
         filter_data["user_id"] = current_user.id
 
-        deleted_count = rag_pipeline.delete_documents(filter_data)
+        job = get_erasure_service().submit(current_user.id, filter_data)
 
         return {
-            "message": f"Deleted {deleted_count} documents",
+            "message": "Document deletion queued",
             "user_id": current_user.id,
-            "deleted_count": deleted_count,
-            "status": "success",
+            "job": job,
+            "status": "accepted",
         }
 
     except Exception as e:
@@ -421,3 +426,14 @@ async def delete_user_documents(
         raise HTTPException(
             status_code=500, detail=f"Document deletion failed: {str(e)}"
         )
+
+
+@router.get("/documents/erasures/{job_id}")
+async def get_erasure_job(
+    job_id: str, current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Report the progress of a queued document deletion."""
+    job = get_erasure_service().get(job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Erasure job not found")
+    return job
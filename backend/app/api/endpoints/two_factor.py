@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import pyotp
-import qrcode
 import io
 import base64
 import json
 import secrets
 
+from app.core.lazy import lazy_import
 from app.db.session import get_db
 from app.models.user import User
 from app.schemas.two_factor import (
@@ -17,7 +17,10 @@ from app.schemas.two_factor import (
     TwoFactorStatusResponse
 )
 from app.security.jwt import get_current_user
-from app.security.password import verify_password
+from app.security.password import verify_password_async
+
+# QR rendering pulls in PIL and NumPy; only 2FA setup needs it
+qrcode = lazy_import("qrcode")
 
 router = APIRouter()
 
@@ -74,7 +77,7 @@ async def enable_2fa(
 ):
     """Enable 2FA for the current user."""
     # Verify password
-    if not current_user.hashed_password or not verify_password(
+    if not current_user.hashed_password or not await verify_password_async(
         request.password, current_user.hashed_password
     ):
         raise HTTPException(
@@ -143,7 +146,7 @@ async def disable_2fa(
 ):
     """Disable 2FA for the current user."""
     # Verify password
-    if not current_user.hashed_password or not verify_password(
+    if not current_user.hashed_password or not await verify_password_async(
         request.password, current_user.hashed_password
     ):
         raise HTTPException(
@@ -26,8 +26,16 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Password Hashing (Argon2) — changing these triggers rehash-on-login
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536             # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2              # Threads dedicated to hashing
+    PASSWORD_HASH_MAX_PENDING: int = 64         # Queued jobs before shedding with 503
+
     # Encryption Configuration
     ENCRYPTION_KEY: str
+    ENCRYPTION_KEY_PREVIOUS: Optional[str] = None  # Comma-separated retired hex keys (decrypt only)
 
     # Database Configuration
     DATABASE_URL: str
@@ -41,12 +49,122 @@ class Settings(BaseSettings):
     # ChromaDB Configuration
     CHROMA_DB_PATH: str
 
+    # Vector store backend: ChromaDB, or an in-process NumPy index per user
+    VECTOR_STORE_BACKEND: str = "chroma"        # chroma or numpy
+    NUMPY_INDEX_PATH: str = "./vector_index"    # NumPy backend: one directory per user
+    NUMPY_INDEX_DTYPE: str = "float32"          # NumPy backend: float32, or float16 for half the memory (slower queries)
+    NUMPY_INDEX_COMPRESSION: str = ""           # NumPy backend: "" (off), "pca" or "random" reduction + int8 codes in memory
+    NUMPY_INDEX_REDUCED_DIMENSIONS: int = 256   # Compressed code width (bytes per vector in memory)
+    NUMPY_INDEX_COMPRESS_AFTER: int = 1000      # A user's rows before compression is trained; smaller indexes stay exact
+    NUMPY_INDEX_RERANK_CANDIDATES: int = 100    # Compressed-search candidates reranked at full precision
+
+    # ChromaDB persistence outside development (the client there is in-memory)
+    CHROMA_SNAPSHOT_DIR: str = ""               # Snapshot + write-ahead log directory ("" = not persisted)
+    CHROMA_SNAPSHOT_WAL_ENTRIES: int = 1000     # Logged writes that trigger a new snapshot
+    CHROMA_WAL_FSYNC: bool = True               # fsync the write-ahead log before each write returns
+
+    # ChromaDB sharding: each user, or hash bucket of users, in its own collection
+    CHROMA_SHARDING: str = ""                   # "" (one shared collection), "user" or "bucket"
+    CHROMA_SHARD_BUCKETS: int = 64              # bucket mode: collections users are hashed into
+    CHROMA_MAX_OPEN_COLLECTIONS: int = 128      # LRU of open shard collections; idle ones past this are closed
+    CHROMA_SEGMENT_MEMORY_MB: int = 0           # Development client: loaded HNSW index memory, LRU-evicted (0 = no cap)
+
     # Ollama Configuration
     OLLAMA_BASE_URL: str = "http://localhost:11434"
 
+    # Embeddings (changing the backend means re-ingesting documents)
+    EMBEDDING_BACKEND: str = "ollama"           # ollama, onnx (in-process CPU model) or hashing (no model)
+    EMBEDDING_OLLAMA_MODEL: str = "llama3"      # ollama: model used for embeddings
+    EMBEDDING_ONNX_MODEL_PATH: str = ""         # onnx: directory with model.onnx and tokenizer.json
+    EMBEDDING_ONNX_BATCH_SIZE: int = 32         # onnx: texts per inference call
+    EMBEDDING_ONNX_THREADS: int = 0             # onnx: inference threads (0 = one per CPU core)
+    EMBEDDING_ONNX_MAX_TOKENS: int = 256        # onnx: longer texts are truncated
+    EMBEDDING_HASHING_DIMENSIONS: int = 384     # hashing: vector width
+
     # Environment
     ENVIRONMENT: str
 
+    # Briefing admission control (per worker)
+    WORKER_MEMORY_BUDGET_MB: int = 512          # RSS budget for one API worker
+    BRIEFING_MEMORY_MB: int = 64                # Estimated peak RSS of one in-flight briefing
+    BRIEFING_MAX_CONCURRENCY: int = 0           # Override the budget-derived limit (0 = derive)
+    BRIEFING_MAX_QUEUE: int = 16                # Waiting briefings before shedding with 503
+    BRIEFING_QUEUE_TIMEOUT_SECONDS: float = 15.0  # Max wait for a slot before shedding with 503
+    RSS_SAMPLE_INTERVAL_SECONDS: float = 5.0    # Background RSS sampling period
+
+    # Priority agent prompt assembly
+    PRIORITY_CONTEXT_TOKEN_BUDGET: int = 3000   # Estimated tokens for all briefing context sections
+    CONTEXT_MIN_SECTION_TOKENS: int = 120       # Tokens every non-empty section keeps when trimming
+
+    # Daily briefing precomputation (in-process scheduler)
+    BRIEFING_PRECOMPUTE_ENABLED: bool = False   # Precompute opted-in users' briefings; one process only
+    BRIEFING_MORNING_HOUR: int = 7              # Local hour briefings should be ready by
+    BRIEFING_PRECOMPUTE_WINDOW_MINUTES: int = 120  # Users are spread over this window before the morning hour
+    BRIEFING_PRECOMPUTE_WORKERS: int = 2        # Precompute workflows running at once
+    BRIEFING_PRECOMPUTE_PER_MINUTE: float = 6.0  # Workflows started per minute (each makes ~5 Groq calls)
+    BRIEFING_SCHEDULER_INTERVAL_SECONDS: float = 30.0  # Scheduler pass period
+
+    # Briefing workflow checkpoints: retries of unfinished runs resume from the last completed node
+    BRIEFING_CHECKPOINTS_ENABLED: bool = True   # Save each agent node's output to the app DB
+    BRIEFING_CHECKPOINT_MAX_AGE_SECONDS: float = 900.0  # How long a saved node output is reused
+
+    # Briefing retrieval prefetch: ground each source agent in the user's documents
+    BRIEFING_RETRIEVAL_ENABLED: bool = True     # One batched search for all source agents per briefing
+    BRIEFING_RETRIEVAL_RESULTS: int = 5         # Documents given to each source agent
+
+    # RAG search: BM25 lexical index alongside ChromaDB, fused with vector ranking
+    RAG_SEARCH_MODE: str = "hybrid"             # Default /agent/rag/search mode: hybrid or vector
+    RAG_HYBRID_CANDIDATES: int = 50             # Results taken from each ranking before fusion
+    RAG_RRF_K: int = 60                         # Reciprocal rank fusion constant
+    RAG_LEXICAL_MAX_USERS: int = 256            # Users' lexical index shards kept in memory
+
+    # Background erasure of user data (DELETE /ingest/documents)
+    ERASURE_JOB_LEASE_SECONDS: float = 300.0    # A running job not heard from this long is taken over
+
+    # LLM gateway: provider budgets per model, per API process (0 = unlimited)
+    GROQ_REQUESTS_PER_MINUTE: int = 30          # Groq RPM limit of each model
+    GROQ_TOKENS_PER_MINUTE: int = 6000          # Groq TPM limit of each model
+    GEMINI_REQUESTS_PER_MINUTE: int = 15        # Gemini RPM limit of each model
+    GEMINI_TOKENS_PER_MINUTE: int = 1000000     # Gemini TPM limit of each model
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0     # Max wait for rate budget before failing the call
+    LLM_INTERACTIVE_RESERVE: float = 0.2        # Share of each budget only interactive chat may use
+    LLM_COMPLETION_TOKEN_ESTIMATE: int = 512    # Completion tokens reserved per call until usage is known
+    LLM_RATE_LIMIT_RETRIES: int = 2             # Retries after a provider 429, through the queue
+
+    # LLM model routing: fast model for short prompts, fallback when slow or failing
+    LLM_ROUTING_ENABLED: bool = True            # Pick the Groq model per call (off = use the configured model)
+    LLM_FAST_MODEL: str = "llama-3.1-8b-instant"  # Tried first for short prompts
+    LLM_CAPABLE_MODEL: str = "llama-3.3-70b-versatile"  # Tried first for long prompts
+    LLM_SMALL_PROMPT_TOKENS: int = 1000         # Estimated prompt tokens that count as short
+    LLM_CHAT_LATENCY_BUDGET_SECONDS: float = 3.0  # Target latency of an agent chat reply
+    LLM_DOCUMENT_LATENCY_BUDGET_SECONDS: float = 10.0  # Target latency of a document analysis
+    LLM_BRIEFING_LATENCY_BUDGET_SECONDS: float = 20.0  # Target latency of one briefing agent call
+    LLM_ROUTE_COOLDOWN_SECONDS: float = 30.0    # How long a failed model is skipped
+
+    # LLM hedging: backup request to the other provider when the first token is late
+    LLM_HEDGING_ENABLED: bool = False           # Hedge briefing calls across Groq and Gemini
+    LLM_HEDGE_PERCENTILE: float = 95.0          # Recent first-token latency percentile that triggers the backup
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 0.5    # Never send a backup sooner than this
+    LLM_HEDGE_MAX_RATIO: float = 0.1            # Max backups sent for slowness, as a share of calls
+    LLM_HEDGE_GEMINI_MODEL: str = "gemini-1.5-flash"  # Backup model for Groq calls
+
+    # LLM response cache for document analysis and agent chat, per user
+    RESPONSE_CACHE_ENABLED: bool = True         # Serve repeated prompts from the cache
+    RESPONSE_CACHE_PATH: str = "./response_cache.db"  # SQLite file; survives restarts
+    RESPONSE_CACHE_MAX_ENTRIES: int = 5000      # Least recently used entries evicted beyond this
+    RESPONSE_CACHE_DOCUMENT_TTL_SECONDS: float = 86400.0  # Lifetime of a cached document analysis
+    RESPONSE_CACHE_CHAT_TTL_SECONDS: float = 3600.0  # Lifetime of a cached chat reply
+    RESPONSE_CACHE_SEMANTIC_THRESHOLD: float = 0.0  # Cosine similarity for near-duplicate chat hits (0 = exact only)
+
+    # LLM backend: live providers, or record/replay a cassette for offline benchmarks
+    LLM_BACKEND: str = "live"                   # live, record or replay
+    LLM_CASSETTE_PATH: str = "./llm_cassette.jsonl"  # Recorded calls (JSON lines)
+    LLM_REPLAY_LATENCY_SCALE: float = 1.0       # Replayed latency as a multiple of the recorded one (0 = instant)
+    LLM_REPLAY_EXTRA_LATENCY_SECONDS: float = 0.0  # Latency added to every replayed call
+
+    # Request tracing
+    TRACE_SAMPLE_RATE: float = 0.1              # Fraction of requests with a per-stage span breakdown
+
     # Google OAuth
     GOOGLE_CLIENT_ID: Optional[str] = None
     GOOGLE_CLIENT_SECRET: Optional[str] = None
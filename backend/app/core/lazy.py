@@ -0,0 +1,101 @@
+"""Deferred imports and deferred construction for heavy subsystems.
+
+Chroma, the LangChain provider packages and LangGraph each take around a
+second to import, and the RAG/agent singletons open databases or build LLM
+clients when constructed. Routes such as ``/health`` and ``/auth/login``
+need none of that, so modules bind these names to proxies that resolve on
+first use instead:
+
+* ``lazy_import("chromadb")`` stands in for a module,
+* ``lazy_import("langchain_groq", "ChatGroq")`` for an attribute of one,
+* ``LazyObject(VectorStore)`` for a module-level singleton instance.
+
+The proxies keep the module attribute names unchanged, so call sites and
+``unittest.mock.patch`` targets keep working.
+"""
+
+import importlib
+import threading
+from typing import Any, Callable, Optional
+
+_UNRESOLVED = object()
+
+
+class _LazyProxy:
+    __slots__ = ("_lazy_target", "_lazy_lock", "_lazy_label")
+
+    def __init__(self, label: str) -> None:
+        object.__setattr__(self, "_lazy_target", _UNRESOLVED)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+        object.__setattr__(self, "_lazy_label", label)
+
+    def _load(self) -> Any:
+        raise NotImplementedError
+
+    def _resolve(self) -> Any:
+        target = self._lazy_target
+        if target is _UNRESOLVED:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is _UNRESOLVED:
+                    target = self._load()
+                    object.__setattr__(self, "_lazy_target", target)
+        return target
+
+    @property
+    def is_resolved(self) -> bool:
+        return self._lazy_target is not _UNRESOLVED
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        if self.is_resolved:
+            return repr(self._lazy_target)
+        return f"<lazy {self._lazy_label} (not loaded)>"
+
+
+class _LazyImport(_LazyProxy):
+    __slots__ = ("_lazy_module", "_lazy_attribute")
+
+    def __init__(self, module: str, attribute: Optional[str]) -> None:
+        super().__init__(f"{module}.{attribute}" if attribute else module)
+        object.__setattr__(self, "_lazy_module", module)
+        object.__setattr__(self, "_lazy_attribute", attribute)
+
+    def _load(self) -> Any:
+        module = importlib.import_module(self._lazy_module)
+        if self._lazy_attribute is None:
+            return module
+        return getattr(module, self._lazy_attribute)
+
+
+class LazyObject(_LazyProxy):
+    """Module-level singleton built by *factory* on first attribute access."""
+
+    __slots__ = ("_lazy_factory",)
+
+    def __init__(self, factory: Callable[[], Any], label: Optional[str] = None) -> None:
+        super().__init__(label or getattr(factory, "__name__", "object"))
+        object.__setattr__(self, "_lazy_factory", factory)
+
+    def _load(self) -> Any:
+        return self._lazy_factory()
+
+
+def lazy_import(module: str, attribute: Optional[str] = None) -> Any:
+    # Proxy for a module (or one of its attributes) imported on first use
+    return _LazyImport(module, attribute)
+
+
+def resolve(value: Any) -> Any:
+    # Return the real object behind a lazy proxy (other values pass through)
+    if isinstance(value, _LazyProxy):
+        return value._resolve()
+    return value
@@ -0,0 +1,672 @@
+"""In-process metrics exposed in the Prometheus text format at ``/metrics``.
+
+Collectors follow the ``prometheus_client`` API shape (``labels(...)``,
+``inc``, ``observe``, ``time``) without adding the dependency. Writes go to a
+per-thread shard, so the hot path never takes a lock; the shards are only
+merged when ``/metrics`` is scraped. Under CPython a thread writing its own
+shard while the scraper copies it is safe because ``dict.copy`` and list
+slicing are atomic with respect to the GIL.
+"""
+
+import bisect
+import functools
+import inspect
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+# Latency buckets in seconds, from fast in-process work up to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _ShardedCollector:
+    """Base class holding one shard per writing thread."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            # Only taken once per thread, never on the hot path
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def _label_values(self, args: Tuple[str, ...], kwargs: Dict[str, str]) -> LabelValues:
+        if kwargs:
+            args = tuple(kwargs[name] for name in self.labelnames)
+        if len(args) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {args}")
+        return tuple(str(value) for value in args)
+
+    def labels(self, *args: str, **kwargs: str):
+        values = self._label_values(args, kwargs)
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._make_child(values))
+        return child
+
+    def _make_child(self, values: LabelValues):
+        raise NotImplementedError
+
+    def _snapshot(self) -> List[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._render_samples(),
+        ]
+
+    def _render_samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+
+class _CounterChild:
+    __slots__ = ("_counter", "_key")
+
+    def __init__(self, counter: "Counter", key: LabelValues) -> None:
+        self._counter = counter
+        self._key = key
+
+    def inc(self, amount: float = 1.0) -> None:
+        shard = self._counter._shard()
+        shard[self._key] = shard.get(self._key, 0.0) + amount
+
+
+class Counter(_ShardedCollector):
+    kind = "counter"
+
+    def _make_child(self, values: LabelValues) -> _CounterChild:
+        return _CounterChild(self, values)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def value(self, *args: str, **kwargs: str) -> float:
+        key = self._label_values(args, kwargs)
+        return sum(shard.get(key, 0.0) for shard in self._snapshot())
+
+    def _render_samples(self) -> Iterable[str]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for key, amount in shard.items():
+                totals[key] = totals.get(key, 0.0) + amount
+        for key in sorted(totals):
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_total{labels} {_format_value(totals[key])}"
+
+
+class _Timer:
+    __slots__ = ("_child", "_started")
+
+    def __init__(self, child: "_HistogramChild") -> None:
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._child.observe(time.perf_counter() - self._started)
+
+    def __call__(self, func: Callable) -> Callable:
+        child = self._child
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - started)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - started)
+
+        return wrapper
+
+
+class _HistogramChild:
+    __slots__ = ("_histogram", "_key")
+
+    def __init__(self, histogram: "Histogram", key: LabelValues) -> None:
+        self._histogram = histogram
+        self._key = key
+
+    def observe(self, value: float) -> None:
+        histogram = self._histogram
+        shard = histogram._shard()
+        state = shard.get(self._key)
+        if state is None:
+            # [per-bucket counts..., sum, count]
+            state = shard[self._key] = [0] * len(histogram.buckets) + [0.0, 0]
+        state[bisect.bisect_left(histogram.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class Histogram(_ShardedCollector):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _make_child(self, values: LabelValues) -> _HistogramChild:
+        return _HistogramChild(self, values)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _snapshot(self) -> List[dict]:
+        # Copy the per-key state lists as well; they are mutated in place
+        return [
+            {key: state[:] for key, state in shard.items()}
+            for shard in super()._snapshot()
+        ]
+
+    def merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for shard in self._snapshot():
+            for key, state in shard.items():
+                total = merged.get(key)
+                if total is None:
+                    merged[key] = state
+                else:
+                    merged[key] = [a + b for a, b in zip(total, state)]
+        return merged
+
+    def _render_samples(self) -> Iterable[str]:
+        merged = self.merged()
+        for key in sorted(merged):
+            state = merged[key]
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(state[-2])}"
+            yield f"{self.name}_count{labels} {state[-1]}"
+
+
+class Gauge:
+    """Point-in-time value read from a callback at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        function: Callable[[], Optional[float]],
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self._function = function
+
+    def render(self) -> List[str]:
+        try:
+            value = self._function()
+        except Exception:
+            value = None
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        if value is not None:
+            lines.append(f"{self.name} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._collectors: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, collector):
+        with self._lock:
+            if collector.name in self._collectors:
+                raise ValueError(f"Metric {collector.name} is already registered")
+            self._collectors[collector.name] = collector
+        return collector
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, function: Callable[[], Optional[float]]) -> Gauge:
+        return self.register(Gauge(name, documentation, function))
+
+    def render(self) -> str:
+        with self._lock:
+            collectors = list(self._collectors.values())
+        lines: List[str] = []
+        for collector in collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+# HTTP
+HTTP_REQUEST_DURATION = registry.histogram(
+    "londoolink_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+
+# LLM calls made by LangGraph nodes and agent chat
+LLM_CALLS = registry.counter(
+    "londoolink_llm_calls",
+    "LLM invocations by agent node.",
+    ("node", "status"),
+)
+LLM_CALL_DURATION = registry.histogram(
+    "londoolink_llm_call_duration_seconds",
+    "LLM invocation latency by agent node.",
+    ("node",),
+)
+LLM_TOKENS = registry.counter(
+    "londoolink_llm_tokens",
+    "Tokens consumed by agent node (kind is prompt or completion).",
+    ("node", "kind"),
+)
+LLM_FIRST_TOKEN = registry.histogram(
+    "londoolink_llm_first_token_seconds",
+    "Time to the first streamed LLM token by agent node.",
+    ("node",),
+)
+
+# LLM gateway (app.services.llm_gateway); priority is interactive, standard or background
+LLM_QUEUE_WAIT = registry.histogram(
+    "londoolink_llm_queue_wait_seconds",
+    "Time LLM calls waited for provider rate budget.",
+    ("provider", "priority"),
+)
+LLM_RATE_LIMITED = registry.counter(
+    "londoolink_llm_rate_limited",
+    "LLM calls rejected by the provider with HTTP 429.",
+    ("provider",),
+)
+LLM_ROUTE_DECISIONS = registry.counter(
+    "londoolink_llm_route_decisions",
+    "Model chosen per LLM call by route (reason is preferred, context, slow, cooling, over_budget or fallback).",
+    ("route", "model", "reason"),
+)
+LLM_HEDGES = registry.counter(
+    "londoolink_llm_hedges",
+    "Hedged LLM calls by outcome (primary, primary_won, backup_won, capped, fallback or failed).",
+    ("node", "outcome"),
+)
+
+# LLM response cache (app.services.response_cache); kind is document or chat
+RESPONSE_CACHE = registry.counter(
+    "londoolink_response_cache",
+    "LLM response cache lookups (result is hit, semantic_hit, miss or expired).",
+    ("kind", "result"),
+)
+RESPONSE_CACHE_SAVED_SECONDS = registry.counter(
+    "londoolink_response_cache_saved_seconds",
+    "LLM latency avoided by response cache hits, from the original calls.",
+    ("kind",),
+)
+
+# Streamed daily briefings
+BRIEFING_FIRST_SECTION = registry.histogram(
+    "londoolink_briefing_stream_first_section_seconds",
+    "Time from stream start to the first agent section of a streamed briefing.",
+)
+
+# Scheduled briefing precomputation (status is ok, error, skipped or deferred)
+BRIEFING_PRECOMPUTED = registry.counter(
+    "londoolink_briefing_precomputed",
+    "Daily briefings precomputed ahead of the user's morning.",
+    ("status",),
+)
+BRIEFING_CACHE = registry.counter(
+    "londoolink_briefing_cache",
+    "Daily briefing requests served from stored briefings (result is hit or miss).",
+    ("result",),
+)
+BRIEFING_RETRIEVAL_DURATION = registry.histogram(
+    "londoolink_briefing_retrieval_seconds",
+    "Time to prefetch every source agent's documents at the start of a briefing.",
+)
+BRIEFING_CHECKPOINTS = registry.counter(
+    "londoolink_briefing_checkpoints",
+    "Briefing workflow node outputs checkpointed (result is saved), reused on a retry, "
+    "or cleared when the briefing completed.",
+    ("node", "result"),
+)
+
+# Background erasure of user data (app.services.erasure)
+ERASURE_JOBS = registry.counter(
+    "londoolink_erasure_jobs",
+    "Erasure jobs finished (status is done or failed).",
+    ("status",),
+)
+ERASURE_DURATION = registry.histogram(
+    "londoolink_erasure_duration_seconds",
+    "Time to run an erasure job, from start to finish.",
+)
+ERASED_ITEMS = registry.counter(
+    "londoolink_erased_items",
+    "Items removed by erasure jobs, by step.",
+    ("step",),
+)
+
+# Request coalescing (app.services.singleflight)
+SINGLEFLIGHT_COALESCED = registry.counter(
+    "londoolink_singleflight_coalesced",
+    "Calls served by joining an identical in-flight computation.",
+    ("flight",),
+)
+
+# Prompt assembly
+PROMPT_CONTEXT_TOKENS = registry.histogram(
+    "londoolink_prompt_context_tokens",
+    "Estimated prompt context tokens by node (stage is raw or assembled).",
+    ("node", "stage"),
+    buckets=TOKEN_BUCKETS,
+)
+CONTEXT_ITEMS_DROPPED = registry.counter(
+    "londoolink_context_items_dropped",
+    "Context items removed during prompt assembly (reason is duplicate or truncated).",
+    ("node", "section", "reason"),
+)
+
+# Embeddings and vector store
+EMBEDDING_BATCH_SIZE = registry.histogram(
+    "londoolink_embedding_batch_size",
+    "Number of texts per embedding call.",
+    ("operation",),
+    buckets=SIZE_BUCKETS,
+)
+EMBEDDING_DURATION = registry.histogram(
+    "londoolink_embedding_duration_seconds",
+    "Embedding call latency.",
+    ("operation",),
+)
+CHROMA_DURATION = registry.histogram(
+    "londoolink_chroma_duration_seconds",
+    "Chroma collection operation latency.",
+    ("operation",),
+)
+NUMPY_INDEX_DURATION = registry.histogram(
+    "londoolink_numpy_index_duration_seconds",
+    "NumPy vector index operation latency (VECTOR_STORE_BACKEND=numpy).",
+    ("operation",),
+)
+CHROMA_SHARD_EVENTS = registry.counter(
+    "londoolink_chroma_shards",
+    "Chroma shard collections opened, restored from their journal, evicted from the LRU or dropped (event).",
+    ("event",),
+)
+VECTOR_SNAPSHOT_DURATION = registry.histogram(
+    "londoolink_vector_snapshot_seconds",
+    "Time to write a vector store snapshot or restore the store from one (operation).",
+    ("operation",),
+)
+
+# Backboard
+BACKBOARD_CALLS = registry.counter(
+    "londoolink_backboard_calls",
+    "Backboard API operations by outcome.",
+    ("status",),
+)
+BACKBOARD_RETRIES = registry.counter(
+    "londoolink_backboard_retries",
+    "Transient Backboard failures (network, 429, 503) that trigger a retry.",
+    ("reason",),
+)
+BACKBOARD_RATE_LIMITED = registry.counter(
+    "londoolink_backboard_rate_limited",
+    "Backboard responses rejected with HTTP 429.",
+)
+
+# Token Vault
+VAULT_CALLS = registry.counter(
+    "londoolink_vault_calls",
+    "Token Vault requests by operation and outcome.",
+    ("operation", "status"),
+)
+VAULT_DURATION = registry.histogram(
+    "londoolink_vault_duration_seconds",
+    "Token Vault request latency.",
+    ("operation",),
+)
+
+# Ingestion; docs/sec is rate(londoolink_ingest_documents_total[1m])
+INGEST_DOCUMENTS = registry.counter(
+    "londoolink_ingest_documents",
+    "Documents ingested into the RAG store.",
+)
+INGEST_CHUNKS = registry.counter(
+    "londoolink_ingest_chunks",
+    "Chunks written to the RAG store.",
+)
+
+
+def _process_rss_bytes() -> Optional[float]:
+    import psutil
+
+    return float(psutil.Process(os.getpid()).memory_info().rss)
+
+
+def _password_pool_stat(name: str) -> Callable[[], Optional[float]]:
+    def read() -> Optional[float]:
+        from app.security.password import get_password_pool_stats
+
+        return float(get_password_pool_stats()[name])
+
+    return read
+
+
+registry.gauge(
+    "londoolink_process_resident_memory_bytes",
+    "Resident set size of the API process.",
+    _process_rss_bytes,
+)
+registry.gauge(
+    "londoolink_password_hash_queued",
+    "Password hashing jobs waiting for a worker.",
+    _password_pool_stat("queued"),
+)
+registry.gauge(
+    "londoolink_password_hash_in_flight",
+    "Password hashing jobs currently running.",
+    _password_pool_stat("in_flight"),
+)
+registry.gauge(
+    "londoolink_password_hash_rejected",
+    "Password hashing jobs shed since start because the queue was full.",
+    _password_pool_stat("rejected"),
+)
+
+
+def _briefing_admission_stat(name: str) -> Callable[[], Optional[float]]:
+    def read() -> Optional[float]:
+        from app.services.admission import get_admission_stats
+
+        return float(get_admission_stats()[name])
+
+    return read
+
+
+registry.gauge(
+    "londoolink_briefing_in_flight",
+    "Daily briefings currently running in this worker.",
+    _briefing_admission_stat("in_flight"),
+)
+registry.gauge(
+    "londoolink_briefing_queued",
+    "Daily briefings waiting for an admission slot.",
+    _briefing_admission_stat("queued"),
+)
+registry.gauge(
+    "londoolink_briefing_rejected",
+    "Daily briefings shed with 503 since start.",
+    _briefing_admission_stat("rejected"),
+)
+
+
+def _briefing_scheduler_stat(name: str) -> Callable[[], Optional[float]]:
+    def read() -> Optional[float]:
+        from app.services.briefing_scheduler import get_scheduler_stats
+
+        return float(get_scheduler_stats()[name])
+
+    return read
+
+
+registry.gauge(
+    "londoolink_briefing_precompute_queued",
+    "Opted-in users whose briefing slot has come, waiting for the rate limiter.",
+    _briefing_scheduler_stat("queued"),
+)
+
+
+def _llm_gateway_queued() -> Optional[float]:
+    from app.services.llm_gateway import get_gateway_stats
+
+    return float(get_gateway_stats()["queued"])
+
+
+registry.gauge(
+    "londoolink_llm_queued",
+    "LLM calls waiting for provider rate budget.",
+    _llm_gateway_queued,
+)
+
+
+def record_llm_response(node: str, response, started: float) -> None:
+    # Record latency and token usage of a successful LLM call
+    LLM_CALL_DURATION.labels(node).observe(time.perf_counter() - started)
+    LLM_CALLS.labels(node, "ok").inc()
+    usage = getattr(response, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        usage = {}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.labels(node, "prompt").inc(usage["input_tokens"])
+    if usage.get("output_tokens"):
+        LLM_TOKENS.labels(node, "completion").inc(usage["output_tokens"])
+
+
+def track_calls(duration: Histogram, calls: Counter, operation: str) -> Callable:
+    """Decorator recording latency and an ok/error count for *operation*."""
+
+    def decorator(func: Callable) -> Callable:
+        timer = duration.labels(operation)
+        ok = calls.labels(operation, "ok")
+        error = calls.labels(operation, "error")
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                except BaseException:
+                    error.inc()
+                    raise
+                finally:
+                    timer.observe(time.perf_counter() - started)
+                ok.inc()
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                error.inc()
+                raise
+            finally:
+                timer.observe(time.perf_counter() - started)
+            ok.inc()
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    return registry.render()
@@ -0,0 +1,220 @@
+"""Lightweight per-request tracing with context-local spans.
+
+A trace is started by the HTTP middleware for a sampled fraction of requests
+(``TRACE_SAMPLE_RATE``). Code on the request path wraps interesting stages in
+``span("stage.operation")`` or decorates functions with ``@traced(...)``;
+when no sampled trace is active both are a single ContextVar lookup, which
+keeps the unsampled overhead negligible.
+
+Span names use a ``<stage>.<operation>`` convention (``db.query``,
+``embedding.embed_documents``, ``chroma.query``, ``backboard.call``,
+``llm.email_agent``, ``vault.retrieve_token`` ...). The stage prefix is what
+the ``Server-Timing`` header and the structured log aggregate on.
+"""
+
+import functools
+import inspect
+import json
+import logging
+import random
+import time
+import uuid
+from contextvars import ContextVar, Token
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger("app.tracing")
+
+
+class Span:
+    __slots__ = ("name", "parent", "start", "duration", "attributes")
+
+    def __init__(self, name: str, parent: Optional[str], start: float) -> None:
+        self.name = name
+        self.parent = parent
+        self.start = start
+        self.duration = 0.0
+        self.attributes: Dict[str, Any] = {}
+
+    @property
+    def stage(self) -> str:
+        return self.name.split(".", 1)[0]
+
+
+class Trace:
+    """Spans recorded for a single request (or background unit of work)."""
+
+    def __init__(self, sampled: bool, trace_id: Optional[str] = None) -> None:
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.sampled = sampled
+        self.started_at = time.perf_counter()
+        self.duration = 0.0
+        # list.append is atomic, so spans from worker threads need no lock
+        self.spans: List[Span] = []
+
+    def finish(self) -> float:
+        self.duration = time.perf_counter() - self.started_at
+        return self.duration
+
+    def stage_totals(self) -> Dict[str, Tuple[int, float]]:
+        # (count, total seconds) per stage, counting only top-most spans of a
+        # stage so nested spans of the same stage are not double-counted
+        totals: Dict[str, Tuple[int, float]] = {}
+        for recorded in self.spans:
+            if recorded.parent and recorded.parent.split(".", 1)[0] == recorded.stage:
+                continue
+            count, total = totals.get(recorded.stage, (0, 0.0))
+            totals[recorded.stage] = (count + 1, total + recorded.duration)
+        return totals
+
+    def server_timing_header(self) -> str:
+        entries = [
+            f'{stage};dur={total * 1000:.1f};desc="{count}x"'
+            for stage, (count, total) in self.stage_totals().items()
+        ]
+        entries.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(entries)
+
+    def to_log_record(self, **fields: Any) -> Dict[str, Any]:
+        record: Dict[str, Any] = {
+            "trace_id": self.trace_id,
+            "duration_ms": round(self.duration * 1000, 2),
+            **fields,
+        }
+        if self.sampled:
+            record["stages"] = {
+                stage: {"count": count, "duration_ms": round(total * 1000, 2)}
+                for stage, (count, total) in self.stage_totals().items()
+            }
+            record["spans"] = [
+                {
+                    "name": s.name,
+                    "parent": s.parent,
+                    "offset_ms": round((s.start - self.started_at) * 1000, 2),
+                    "duration_ms": round(s.duration * 1000, 2),
+                    **s.attributes,
+                }
+                for s in self.spans
+            ]
+        return record
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def should_sample() -> bool:
+    rate = settings.TRACE_SAMPLE_RATE
+    return rate >= 1.0 or (rate > 0.0 and random.random() < rate)
+
+
+def start_trace(sampled: Optional[bool] = None) -> Tuple[Trace, Token]:
+    # Start a trace in the current context; spans are only recorded if sampled
+    trace = Trace(sampled=should_sample() if sampled is None else sampled)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token: Token) -> None:
+    _current_trace.reset(token)
+
+
+def get_current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+class span:
+    """Context manager recording a timed span on the active sampled trace.
+
+    Yields the :class:`Span` (or ``None`` when nothing is being recorded) so
+    callers can attach attributes. Implemented as a class rather than a
+    generator because it sits on every instrumented call.
+    """
+
+    __slots__ = ("_name", "_attributes", "_trace", "_span", "_parent_token")
+
+    def __init__(self, name: str, **attributes: Any) -> None:
+        self._name = name
+        self._attributes = attributes
+        self._trace: Optional[Trace] = None
+        self._span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        trace = _current_trace.get()
+        if trace is None or not trace.sampled:
+            return None
+        self._trace = trace
+        current = Span(self._name, _current_span.get(), time.perf_counter())
+        if self._attributes:
+            current.attributes.update(self._attributes)
+        self._span = current
+        self._parent_token = _current_span.set(self._name)
+        return current
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        current = self._span
+        if current is None:
+            return
+        current.duration = time.perf_counter() - current.start
+        if exc_type is not None:
+            current.attributes["error"] = exc_type.__name__
+        _current_span.reset(self._parent_token)
+        self._trace.spans.append(current)
+
+
+def traced(name: str) -> Callable:
+    """Decorator that wraps a sync or async function in ``span(name)``."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                trace = _current_trace.get()
+                if trace is None or not trace.sampled:
+                    return await func(*args, **kwargs)
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+            trace = _current_trace.get()
+            if trace is None or not trace.sampled:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+
+        return sync_wrapper
+
+    return decorator
+
+
+def log_trace(trace: Trace, **fields: Any) -> None:
+    # Emit one structured JSON log line for a finished trace
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps(trace.to_log_record(**fields), default=str))
+
+
+def instrument_engine(engine: Any) -> None:
+    """Record every SQL statement executed on *engine* as a ``db.query`` span."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        if trace is not None and trace.sampled:
+            conn.info.setdefault("_trace_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        trace = _current_trace.get()
+        starts = conn.info.get("_trace_query_start")
+        if trace is None or not trace.sampled or not starts:
+            return
+        started = starts.pop()
+        db_span = Span("db.query", _current_span.get(), started)
+        db_span.duration = time.perf_counter() - started
+        db_span.attributes["statement"] = statement.split(None, 1)[0].upper()
+        trace.spans.append(db_span)
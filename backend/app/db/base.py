@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from app.core.config import settings
+from app.core.tracing import instrument_engine
 
 # PostgreSQL needs pool_pre_ping to handle connection drops between deploys
 _is_postgres = settings.DATABASE_URL.startswith("postgresql")
@@ -11,6 +12,9 @@ engine = create_engine(
     pool_recycle=300 if _is_postgres else -1,
 )
 
+# Record SQL statements as db.query spans on sampled request traces
+instrument_engine(engine)
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
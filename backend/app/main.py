@@ -1,4 +1,7 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.api import api_router
@@ -10,11 +13,31 @@ validate_auth0_config()
 # Validate Backboard config at startup (raises RuntimeError if USE_BACKBOARD=true but config is invalid)
 validate_backboard_config()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background jobs: morning precomputation of daily briefings, and restoring
+    # the in-memory vector store from its snapshot (when CHROMA_SNAPSHOT_DIR is set),
+    # and finishing the erasure jobs a previous process left unfinished
+    from app.services.briefing_scheduler import start_briefing_scheduler, stop_briefing_scheduler
+    from app.services.erasure import start_erasure_service, stop_erasure_service
+    from app.services.rag.snapshots import start_snapshot_restore, write_shutdown_snapshot
+
+    start_snapshot_restore()
+    start_briefing_scheduler()
+    start_erasure_service()
+    yield
+    stop_erasure_service()
+    stop_briefing_scheduler()
+    write_shutdown_snapshot()
+
+
 app = FastAPI(
     title="Londoolink AI Backend",
     description="An intelligent agent that securely tracks and links your digital life, ensuring you never miss what truly matters.",
     version="0.1.0",
     openapi_url="/api/v1/openapi.json",
+    lifespan=lifespan,
 )
 
 # Set up CORS middleware for frontend connection
@@ -46,32 +69,66 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware for debugging
+# Request logging middleware: one structured JSON line per request plus a
+# Server-Timing header; sampled requests carry a per-stage span breakdown
 from fastapi import Request
-import time
 import logging
 
+from app.core.metrics import CONTENT_TYPE, HTTP_REQUEST_DURATION, render_metrics
+from app.core.tracing import end_trace, log_trace, start_trace
+
 logger = logging.getLogger("app")
 logging.basicConfig(level=logging.INFO)
 
+
+def _route_template(request: Request) -> str:
+    # Label metrics by route template, not raw path, to bound cardinality
+    route = request.scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start_time = time.time()
+    trace, token = start_trace()
     origin = request.headers.get("origin")
     path = request.url.path
     method = request.method
-    
-    logger.info(f"Incoming {method} {path} from origin: {origin}")
-    
+
     try:
         response = await call_next(request)
-        process_time = (time.time() - start_time) * 1000
-        logger.info(f"Completed {method} {path} - Status: {response.status_code} - {process_time:.2f}ms")
-        return response
     except Exception as e:
-        process_time = (time.time() - start_time) * 1000
-        logger.error(f"Failed {method} {path} - Error: {str(e)} - {process_time:.2f}ms")
+        trace.finish()
+        HTTP_REQUEST_DURATION.labels(method, _route_template(request), "500").observe(trace.duration)
+        log_trace(trace, method=method, path=path, origin=origin, status=500, error=str(e))
         raise e
+    finally:
+        end_trace(token)
+
+    trace.finish()
+    HTTP_REQUEST_DURATION.labels(
+        method, _route_template(request), str(response.status_code)
+    ).observe(trace.duration)
+    response.headers["Server-Timing"] = trace.server_timing_header()
+    log_trace(trace, method=method, path=path, origin=origin, status=response.status_code)
+    return response
+
+
+# A full Argon2 queue (app.security.password) is load shedding, not a server
+# error: every endpoint that hashes or verifies a password answers 503
+from fastapi.responses import JSONResponse
+
+from app.security.password import PasswordHashBusyError
+
+_PASSWORD_BUSY_RETRY_AFTER = "1"  # seconds
+
+
+@app.exception_handler(PasswordHashBusyError)
+async def password_hash_busy(request: Request, exc: PasswordHashBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": _PASSWORD_BUSY_RETRY_AFTER},
+    )
 
 from fastapi.staticfiles import StaticFiles
 
@@ -117,5 +174,10 @@ async def health_check():
             "version": "0.1.0"
         }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint for in-process latency and usage metrics."""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
 # Vercel handler
 handler = app
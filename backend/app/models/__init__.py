@@ -1,15 +1,21 @@
 from app.models.audit_log import AuditLog
 from app.models.backboard_assistant import BackboardAssistant
 from app.models.backboard_thread import BackboardThread
+from app.models.briefing_checkpoint import BriefingCheckpoint
 from app.models.connected_service import ConnectedService
 from app.models.consent import UserConsent
+from app.models.daily_briefing import DailyBriefing
+from app.models.erasure_job import ErasureJob
 from app.models.user import User
 
 __all__ = [
     "AuditLog",
     "BackboardAssistant",
     "BackboardThread",
+    "BriefingCheckpoint",
     "ConnectedService",
     "UserConsent",
+    "DailyBriefing",
+    "ErasureJob",
     "User",
 ]
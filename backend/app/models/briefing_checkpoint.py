@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class BriefingCheckpoint(Base):
+    """Last completed output of one briefing workflow node, per user."""
+    __tablename__ = "briefing_checkpoints"
+    __table_args__ = (
+        UniqueConstraint("user_id", "node", name="uq_briefing_checkpoints_user_node"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    node = Column(String(40), nullable=False)  # email_agent, ..., priority_agent
+    inputs_hash = Column(String(64), nullable=False)  # hash of the state the node read
+    state = Column(Text, nullable=False)  # JSON of the state keys the node wrote
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<BriefingCheckpoint(user_id={self.user_id}, node={self.node})>"
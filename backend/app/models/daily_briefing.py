@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class DailyBriefing(Base):
+    """Stored daily briefing, one per user, local date and model size."""
+    __tablename__ = "daily_briefings"
+    __table_args__ = (
+        UniqueConstraint("user_id", "briefing_date", "model_size", name="uq_daily_briefings_user_date_model"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    briefing_date = Column(Date, nullable=False)  # in the user's timezone
+    model_size = Column(String(10), nullable=False)  # small, medium, large
+    content = Column(Text, nullable=False)  # briefing JSON
+    source = Column(String(20), nullable=False)  # scheduled, on_demand
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    def __repr__(self):
+        return f"<DailyBriefing(user_id={self.user_id}, date={self.briefing_date}, model_size={self.model_size})>"
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.sql import func
+
+from app.db.base import Base
+
+
+class ErasureJob(Base):
+    """Background erasure of a user's documents and the data derived from them."""
+    __tablename__ = "erasure_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned to the client
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filter_metadata = Column(Text, nullable=False)  # JSON of the document filter
+    status = Column(String(10), nullable=False, index=True)  # queued, running, done, failed
+    step = Column(String(40), nullable=True)  # the step running, or the one that failed
+    progress = Column(Text, nullable=False, default="{}")  # JSON: items removed per step
+    error = Column(Text, nullable=True)
+    worker = Column(String(32), nullable=True)  # the process that claimed it
+    claimed_at = Column(DateTime(timezone=True), nullable=True)  # the worker's last heartbeat
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ErasureJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
@@ -1,12 +1,24 @@
 from .encryption import (
     decrypt,
+    decrypt_many,
     decrypt_with_ttl,
     encrypt,
+    encrypt_many,
     encrypt_with_ttl,
     generate_encryption_key,
+    rotate_many,
 )
 from .jwt import create_access_token, get_current_user, verify_token
-from .password import get_password_hash, hash_password, verify_password
+from .password import (
+    get_password_hash,
+    get_password_pool_stats,
+    hash_password,
+    hash_password_async,
+    verify_and_update_password,
+    verify_and_update_password_async,
+    verify_password,
+    verify_password_async,
+)
 from .utils import (
     constant_time_compare,
     generate_api_key,
@@ -28,11 +40,19 @@ __all__ = [
     "hash_password",
     "verify_password",
     "get_password_hash",
+    "verify_and_update_password",
+    "hash_password_async",
+    "verify_password_async",
+    "verify_and_update_password_async",
+    "get_password_pool_stats",
     # Encryption
     "encrypt",
     "decrypt",
     "encrypt_with_ttl",
     "decrypt_with_ttl",
+    "encrypt_many",
+    "decrypt_many",
+    "rotate_many",
     "generate_encryption_key",
     # Utils
     "generate_secret_key",
@@ -1,8 +1,12 @@
 import base64
+import binascii
 import logging
 import os
+import time
+from functools import lru_cache
+from typing import Iterable, List, Tuple
 
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
@@ -10,23 +14,47 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Every Fernet token starts with the 0x80 version byte, which is "gA" once
+# urlsafe-base64 encoded. Legacy values wrapped the token in a second layer of
+# standard base64 and therefore start with "Z0FB" instead.
+_COMPACT_TOKEN_PREFIX = "gA"
 
-def get_fernet_key() -> Fernet:
-    # Get Fernet encryption instance using the encryption key from settings
-    try:
-        # Convert hex string to bytes
-        key_bytes = bytes.fromhex(settings.ENCRYPTION_KEY)
 
-        # Ensure we have exactly 32 bytes for Fernet
-        if len(key_bytes) < 32:
-            raise ValueError(
-                "Encryption key must be at least 32 bytes (64 hex characters)"
-            )
+def _fernet_from_hex(hex_key: str) -> Fernet:
+    # Build a Fernet instance from a hex encoded key (first 32 bytes are used)
+    key_bytes = bytes.fromhex(hex_key.strip())
+
+    # Ensure we have exactly 32 bytes for Fernet
+    if len(key_bytes) < 32:
+        raise ValueError(
+            "Encryption key must be at least 32 bytes (64 hex characters)"
+        )
+
+    # Use the first 32 bytes and encode for Fernet
+    return Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
+
+
+@lru_cache(maxsize=8)
+def _build_key_ring(primary_key: str, previous_keys: str) -> Tuple[Fernet, MultiFernet]:
+    # Parse the configured keys once; the cache is keyed on the raw key strings
+    # so a changed configuration transparently produces a new key ring
+    primary = _fernet_from_hex(primary_key)
+    retired = [
+        _fernet_from_hex(key) for key in previous_keys.split(",") if key.strip()
+    ]
+    return primary, MultiFernet([primary, *retired])
+
 
-        # Use the first 32 bytes and encode for Fernet
-        fernet_key = base64.urlsafe_b64encode(key_bytes[:32])
-        return Fernet(fernet_key)
+def _configured_keys() -> Tuple[str, str]:
+    previous = settings.ENCRYPTION_KEY_PREVIOUS
+    return settings.ENCRYPTION_KEY, previous if isinstance(previous, str) else ""
 
+
+def get_key_ring() -> MultiFernet:
+    # Get the cached key ring: encrypts with the primary key and decrypts with
+    # the primary key or any retired key listed in ENCRYPTION_KEY_PREVIOUS
+    try:
+        return _build_key_ring(*_configured_keys())[1]
     except ValueError as e:
         logger.error(f"Invalid encryption key format: {e}")
         raise
@@ -35,16 +63,36 @@ def get_fernet_key() -> Fernet:
         raise ValueError(f"Encryption initialization failed: {str(e)}")
 
 
+def get_fernet_key() -> Fernet:
+    # Get the cached Fernet instance for the primary encryption key
+    try:
+        return _build_key_ring(*_configured_keys())[0]
+    except ValueError as e:
+        logger.error(f"Invalid encryption key format: {e}")
+        raise
+    except Exception as e:
+        logger.error(f"Failed to initialize Fernet encryption: {e}")
+        raise ValueError(f"Encryption initialization failed: {str(e)}")
+
+
+def _to_token(encrypted_data: str) -> bytes:
+    # Accept both the compact format and the legacy double-base64 format
+    if encrypted_data.startswith(_COMPACT_TOKEN_PREFIX):
+        return encrypted_data.encode("ascii")
+    try:
+        return base64.b64decode(encrypted_data.encode("utf-8"), validate=True)
+    except (binascii.Error, ValueError):
+        raise InvalidToken
+
+
 def encrypt(data: str) -> str:
     # Encrypt a string using Fernet (AES 128 in CBC mode with HMAC)
     if not data:
         return ""
 
     try:
-        fernet = get_fernet_key()
-        # Fernet handles the base64 encoding internally
-        encrypted_data = fernet.encrypt(data.encode("utf-8"))
-        return base64.b64encode(encrypted_data).decode("utf-8")
+        # The Fernet token is already urlsafe base64, so it is stored as-is
+        return get_key_ring().encrypt(data.encode("utf-8")).decode("ascii")
     except Exception as e:
         logger.error(f"Encryption failed: {e}")
         raise ValueError(f"Failed to encrypt data: {str(e)}")
@@ -56,9 +104,7 @@ def decrypt(encrypted_data: str) -> str:
         return ""
 
     try:
-        fernet = get_fernet_key()
-        decoded_data = base64.b64decode(encrypted_data.encode("utf-8"))
-        decrypted_data = fernet.decrypt(decoded_data)
+        decrypted_data = get_key_ring().decrypt(_to_token(encrypted_data))
         return decrypted_data.decode("utf-8")
     except InvalidToken:
         logger.error("Invalid token provided for decryption")
@@ -68,6 +114,59 @@ def decrypt(encrypted_data: str) -> str:
         raise ValueError(f"Failed to decrypt data: {str(e)}")
 
 
+def encrypt_many(values: Iterable[str]) -> List[str]:
+    # Encrypt a batch of strings with a single key ring lookup
+    key_ring = get_key_ring()
+    results = []
+    for index, value in enumerate(values):
+        if not value:
+            results.append("")
+            continue
+        try:
+            results.append(key_ring.encrypt(value.encode("utf-8")).decode("ascii"))
+        except Exception as e:
+            logger.error(f"Bulk encryption failed at index {index}: {e}")
+            raise ValueError(f"Failed to encrypt item {index}: {str(e)}")
+    return results
+
+
+def decrypt_many(values: Iterable[str]) -> List[str]:
+    # Decrypt a batch of strings (compact or legacy format) in one pass
+    key_ring = get_key_ring()
+    results = []
+    for index, value in enumerate(values):
+        if not value:
+            results.append("")
+            continue
+        try:
+            results.append(key_ring.decrypt(_to_token(value)).decode("utf-8"))
+        except InvalidToken:
+            logger.error(f"Invalid token at index {index} during bulk decryption")
+            raise ValueError(f"Invalid encrypted data or corrupted token at item {index}")
+        except Exception as e:
+            logger.error(f"Bulk decryption failed at index {index}: {e}")
+            raise ValueError(f"Failed to decrypt item {index}: {str(e)}")
+    return results
+
+
+def rotate_many(values: Iterable[str]) -> List[str]:
+    # Re-encrypt stored values under the primary key in the compact format.
+    # Accepts tokens from retired keys and the legacy format; the original
+    # token timestamps are preserved so TTL checks keep working.
+    key_ring = get_key_ring()
+    results = []
+    for index, value in enumerate(values):
+        if not value:
+            results.append("")
+            continue
+        try:
+            results.append(key_ring.rotate(_to_token(value)).decode("ascii"))
+        except InvalidToken:
+            logger.error(f"Invalid token at index {index} during key rotation")
+            raise ValueError(f"Invalid encrypted data or corrupted token at item {index}")
+    return results
+
+
 def generate_encryption_key() -> str:
     # Generate a new secure encryption key for Fernet
     key = Fernet.generate_key()
@@ -82,12 +181,11 @@ def encrypt_with_ttl(data: str, ttl_seconds: int) -> str:
         return ""
 
     try:
-        import time
-
-        fernet = get_fernet_key()
         current_time = int(time.time())
-        encrypted_data = fernet.encrypt_at_time(data.encode("utf-8"), current_time)
-        return base64.b64encode(encrypted_data).decode("utf-8")
+        encrypted_data = get_fernet_key().encrypt_at_time(
+            data.encode("utf-8"), current_time
+        )
+        return encrypted_data.decode("ascii")
     except Exception as e:
         logger.error(f"TTL encryption failed: {e}")
         raise ValueError(f"Failed to encrypt data with TTL: {str(e)}")
@@ -99,9 +197,9 @@ def decrypt_with_ttl(encrypted_data: str, ttl_seconds: int) -> str:
         return ""
 
     try:
-        fernet = get_fernet_key()
-        decoded_data = base64.b64decode(encrypted_data.encode("utf-8"))
-        decrypted_data = fernet.decrypt(decoded_data, ttl=ttl_seconds)
+        decrypted_data = get_key_ring().decrypt(
+            _to_token(encrypted_data), ttl=ttl_seconds
+        )
         return decrypted_data.decode("utf-8")
     except InvalidToken:
         logger.error("Token expired or invalid for TTL decryption")
@@ -1,13 +1,36 @@
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from pwdlib import PasswordHash
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
-# Create password hash instance with recommended Argon2 settings
+
+def _build_password_hash() -> PasswordHash:
+    # Build the Argon2 hasher from the per-deployment cost parameters
+    from pwdlib.hashers.argon2 import Argon2Hasher
+
+    return PasswordHash(
+        (
+            Argon2Hasher(
+                time_cost=settings.ARGON2_TIME_COST,
+                memory_cost=settings.ARGON2_MEMORY_COST,
+                parallelism=settings.ARGON2_PARALLELISM,
+            ),
+        )
+    )
+
+
+# Create password hash instance with the configured Argon2 settings
 # Falls back to bcrypt if Argon2 is not available
 try:
-    password_hash = PasswordHash.recommended()
+    password_hash = _build_password_hash()
     logger.info("Password hashing initialized with Argon2")
 except Exception as e:
     logger.warning(f"Argon2 not available, falling back to bcrypt: {e}")
@@ -35,6 +58,144 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    # Verify a password and return a fresh hash when the stored one was
+    # produced with different Argon2 parameters (or by a legacy scheme)
+    if password_hash:
+        return password_hash.verify_and_update(plain_password, hashed_password)
+    else:
+        # Fallback to bcrypt
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     # Alias for hash_password for compatibility with FastAPI examples
     return hash_password(password)
+
+
+# ---------------------------------------------------------------------------
+# Bounded worker pool for async callers
+# ---------------------------------------------------------------------------
+
+
+class PasswordHashBusyError(Exception):
+    """Raised when too many password operations are already waiting for a worker."""
+
+
+class PasswordHashPool:
+    """Size-limited thread pool that keeps Argon2 work off the event loop.
+
+    argon2-cffi releases the GIL while hashing, so a small thread pool gives
+    real parallelism without the pickling overhead of a process pool. Jobs
+    beyond ``max_pending`` waiting for a worker are rejected with
+    ``PasswordHashBusyError`` instead of growing an unbounded queue.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hash"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queued_seen = 0
+        self._total_wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Run func(*args) on a worker thread and await its result
+        with self._lock:
+            if self._queued >= self.max_pending:
+                self._rejected += 1
+                raise PasswordHashBusyError(
+                    f"Password hashing queue is full ({self._queued} pending)"
+                )
+            self._queued += 1
+            self._max_queued_seen = max(self._max_queued_seen, self._queued)
+
+        submitted_at = time.perf_counter()
+
+        def _job() -> Any:
+            with self._lock:
+                self._queued -= 1
+                self._in_flight += 1
+                self._total_wait_seconds += time.perf_counter() - submitted_at
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    self._completed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _job)
+
+    def stats(self) -> Dict[str, Any]:
+        # Snapshot of queue depth and throughput counters
+        with self._lock:
+            started = self._completed + self._in_flight
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "max_queued_seen": self._max_queued_seen,
+                "avg_wait_ms": (
+                    round(self._total_wait_seconds / started * 1000, 3)
+                    if started
+                    else 0.0
+                ),
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_password_hash_pool: Optional[PasswordHashPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_password_hash_pool() -> PasswordHashPool:
+    # Lazily create the process-wide password hashing pool
+    global _password_hash_pool
+    if _password_hash_pool is None:
+        with _pool_lock:
+            if _password_hash_pool is None:
+                _password_hash_pool = PasswordHashPool(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+                )
+    return _password_hash_pool
+
+
+def get_password_pool_stats() -> Dict[str, Any]:
+    # Queue-depth metrics for the password hashing pool
+    return get_password_hash_pool().stats()
+
+
+async def hash_password_async(password: str) -> str:
+    # Hash a password without blocking the event loop
+    return await get_password_hash_pool().run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    # Verify a password without blocking the event loop
+    return await get_password_hash_pool().run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    # Verify a password (and compute a rehash if needed) off the event loop
+    return await get_password_hash_pool().run(
+        verify_and_update_password, plain_password, hashed_password
+    )
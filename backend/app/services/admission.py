@@ -0,0 +1,308 @@
+"""Admission control for memory-heavy agent workloads.
+
+A daily briefing runs the whole multi-agent LangGraph workflow and holds
+several LLM responses and retrieved documents in memory at once. Instead of
+polling RSS on every request, each worker admits a bounded number of
+briefings at a time. The limit is derived from the configured memory budget,
+excess requests wait in a short FIFO queue, and anything beyond the queue
+(or waiting longer than the queue timeout) is shed with a 503 and a
+``Retry-After`` hint.
+
+RSS is sampled by a background thread (:class:`RSSSampler`). When the worker
+goes over budget the controller drops to a single in-flight briefing until
+memory recovers.
+"""
+
+import asyncio
+import gc
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a request cannot be admitted; carries a Retry-After hint."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RSSSampler:
+    """Samples process RSS on a background thread at a fixed interval."""
+
+    def __init__(self, interval_seconds: float, budget_mb: float) -> None:
+        self.interval_seconds = interval_seconds
+        self.budget_mb = budget_mb
+        self.latest_mb = 0.0
+        self.peak_mb = 0.0
+        self.over_budget = False
+        self._listeners: List[Callable[[], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._process = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self.sample()
+        self._thread = threading.Thread(
+            target=self._run, name="rss-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 1)
+            self._thread = None
+
+    def add_listener(self, listener: Callable[[], None]) -> None:
+        # Called after every sample, e.g. to re-dispatch queued requests
+        self._listeners.append(listener)
+
+    def sample(self) -> float:
+        if self._process is None:
+            import psutil
+
+            self._process = psutil.Process(os.getpid())
+        rss_mb = self._process.memory_info().rss / (1024 * 1024)
+        was_over = self.over_budget
+        self.latest_mb = rss_mb
+        self.peak_mb = max(self.peak_mb, rss_mb)
+        self.over_budget = rss_mb > self.budget_mb
+
+        if self.over_budget and not was_over:
+            # Collect once when crossing the budget rather than on every request
+            logger.warning(
+                f"Worker RSS {rss_mb:.0f}MB exceeds budget {self.budget_mb:.0f}MB; "
+                "throttling briefings"
+            )
+            gc.collect()
+        elif was_over and not self.over_budget:
+            logger.info(f"Worker RSS back under budget: {rss_mb:.0f}MB")
+
+        for listener in self._listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"RSS sampler listener failed: {e}")
+        return rss_mb
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"RSS sampling failed: {e}")
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """Loop-agnostic counting semaphore with a bounded FIFO wait queue."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        sampler: Optional[RSSSampler] = None,
+    ) -> None:
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.sampler = sampler
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._max_queued_seen = 0
+        # Exponentially weighted average of how long a slot is held
+        self._avg_hold_seconds: Optional[float] = None
+        if sampler is not None:
+            sampler.add_listener(self.dispatch)
+
+    @property
+    def limit(self) -> int:
+        if self.sampler is not None and self.sampler.over_budget:
+            return 1
+        return self.max_concurrent
+
+    def retry_after(self) -> int:
+        # Estimated seconds until a slot frees up for a new request
+        hold = self._avg_hold_seconds or self.queue_timeout
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(hold * backlog / self.limit))
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if not self._waiters and self._in_flight < self.limit:
+                self._in_flight += 1
+                self._admitted += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._rejected += 1
+                raise AdmissionRejectedError(
+                    f"{self.name} is at capacity", self.retry_after()
+                )
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+            self._max_queued_seen = max(self._max_queued_seen, len(self._waiters))
+
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    handed_over = False
+                except ValueError:
+                    # release() already transferred a slot to us
+                    handed_over = True
+            if handed_over:
+                self.release()
+            if isinstance(exc, asyncio.TimeoutError):
+                with self._lock:
+                    self._timed_out += 1
+                raise AdmissionRejectedError(
+                    f"Timed out waiting for {self.name} capacity", self.retry_after()
+                )
+            raise
+
+        with self._lock:
+            self._admitted += 1
+
+    def try_acquire(self) -> bool:
+        # Take a free slot without waiting, for background work that defers
+        # instead of queueing; never ahead of a waiting request
+        with self._lock:
+            if self._waiters or self._in_flight >= self.limit:
+                return False
+            self._in_flight += 1
+            self._admitted += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._dispatch_locked()
+
+    def dispatch(self) -> None:
+        # Hand free slots to queued waiters (e.g. after memory recovered)
+        with self._lock:
+            self._dispatch_locked()
+
+    def _dispatch_locked(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            loop, future = self._waiters.popleft()
+            self._in_flight += 1
+            try:
+                loop.call_soon_threadsafe(_wake, future)
+            except RuntimeError:
+                # The waiter's event loop is gone; reclaim the slot
+                self._in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            held = time.monotonic() - started
+            with self._lock:
+                previous = self._avg_hold_seconds
+                self._avg_hold_seconds = (
+                    held if previous is None else 0.8 * previous + 0.2 * held
+                )
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "limit": self.limit,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": len(self._waiters),
+                "admitted": self._admitted,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+                "max_queued_seen": self._max_queued_seen,
+                "avg_hold_ms": round((self._avg_hold_seconds or 0.0) * 1000, 1),
+                "rss_mb": round(self.sampler.latest_mb, 1) if self.sampler else None,
+            }
+
+
+def briefing_concurrency_limit(baseline_mb: float) -> int:
+    # Slots that fit in the memory left over after the worker's baseline RSS
+    if settings.BRIEFING_MAX_CONCURRENCY > 0:
+        return settings.BRIEFING_MAX_CONCURRENCY
+    headroom = settings.WORKER_MEMORY_BUDGET_MB - baseline_mb
+    return max(1, int(headroom // max(1, settings.BRIEFING_MEMORY_MB)))
+
+
+_sampler: Optional[RSSSampler] = None
+_briefing_admission: Optional[AdmissionController] = None
+_admission_lock = threading.Lock()
+
+
+def get_rss_sampler() -> RSSSampler:
+    # Lazily start the shared background RSS sampler
+    global _sampler
+    if _sampler is None:
+        with _admission_lock:
+            if _sampler is None:
+                sampler = RSSSampler(
+                    settings.RSS_SAMPLE_INTERVAL_SECONDS,
+                    settings.WORKER_MEMORY_BUDGET_MB,
+                )
+                sampler.start()
+                _sampler = sampler
+    return _sampler
+
+
+def get_briefing_admission() -> AdmissionController:
+    # Lazily size the briefing controller from the memory budget
+    global _briefing_admission
+    if _briefing_admission is None:
+        sampler = get_rss_sampler()
+        with _admission_lock:
+            if _briefing_admission is None:
+                limit = briefing_concurrency_limit(sampler.latest_mb)
+                _briefing_admission = AdmissionController(
+                    "daily briefing",
+                    max_concurrent=limit,
+                    max_queue=settings.BRIEFING_MAX_QUEUE,
+                    queue_timeout=settings.BRIEFING_QUEUE_TIMEOUT_SECONDS,
+                    sampler=sampler,
+                )
+                logger.info(
+                    f"Briefing admission: {limit} concurrent, "
+                    f"queue {settings.BRIEFING_MAX_QUEUE}, "
+                    f"baseline RSS {sampler.latest_mb:.0f}MB of "
+                    f"{settings.WORKER_MEMORY_BUDGET_MB}MB budget"
+                )
+    return _briefing_admission
+
+
+def get_admission_stats() -> Dict[str, Any]:
+    return get_briefing_admission().stats()
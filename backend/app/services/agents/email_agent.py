@@ -2,9 +2,9 @@ import logging
 from typing import Any, Dict, List, Optional
 
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from app.core.config import settings
+from app.services.llm_factory import create_chat_model
+from app.services.llm_hedge import hedged_invoke
 from app.services.step_up import requires_step_up
 from app.services.token_vault import TokenVaultClient, get_token_vault_client
 
@@ -45,11 +45,7 @@ class EmailAgent:
     def _create_agent(self):
         """Create the email triage agent."""
         try:
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                temperature=0.1,
-                google_api_key=settings.GEMINI_API_KEY,
-            )
+            llm = create_chat_model("gemini", "gemini-1.5-flash", 0.1)
             logger.info("Email agent created successfully")
             return llm
         except Exception as e:
@@ -63,7 +59,7 @@ class EmailAgent:
     def analyze(self, prompt: str, auth0_sub: str = "") -> Dict[str, Any]:
         """Analyze emails based on *prompt* for the user identified by *auth0_sub*."""
         try:
-            result = self.agent.invoke(prompt)
+            result = hedged_invoke(self.agent, prompt, "email_analysis")
             return {
                 "analysis": result.content if hasattr(result, "content") else str(result),
                 "status": "completed",
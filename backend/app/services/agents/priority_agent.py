@@ -2,13 +2,15 @@ import logging
 from typing import Any, Dict, List, Optional
 
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 
 from app.core.config import settings
 from app.services.backboard.backboard_service import (
     BackboardService,
     BackboardServiceError,
 )
+from app.services.context_budget import assemble_briefing_context
+from app.services.llm_factory import create_chat_model
+from app.services.llm_hedge import hedged_invoke
 
 logger = logging.getLogger(__name__)
 
@@ -35,20 +37,16 @@ class PriorityAgent:
 
     def _create_agent(self):
         try:
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                temperature=0.1,
-                google_api_key=settings.GEMINI_API_KEY,
-            )
+            llm = create_chat_model("gemini", "gemini-1.5-flash", 0.1)
             logger.info("Priority agent created successfully")
             return llm
         except Exception as e:
             logger.error(f"Failed to create priority agent: {e}")
             raise
 
-    def analyze(self, prompt: str) -> Dict[str, Any]:
+    def analyze(self, prompt: str, node: str = "priority_analysis") -> Dict[str, Any]:
         try:
-            result = self.agent.invoke(prompt)
+            result = hedged_invoke(self.agent, prompt, node)
             return {
                 "analysis": result.content if hasattr(result, "content") else str(result),
                 "status": "completed",
@@ -98,20 +96,19 @@ class PriorityAgent:
                 logger.error(f"Failed to query user memory: {e}")
                 # Continue without preferences
         
-        # Build context with all analyses
-        context = f"""
-        Email Analysis: {email_analysis}
-        Calendar Analysis: {calendar_analysis}
-        Social Messaging Analysis: {social_analysis}
-        """
-        
-        if notion_analysis:
-            context += f"\nNotion Analysis: {notion_analysis}"
+        # Build context with all analyses, deduped and trimmed to the token budget
+        context = assemble_briefing_context(
+            {
+                "email": email_analysis,
+                "calendar": calendar_analysis,
+                "social": social_analysis,
+                "notion": notion_analysis,
+            },
+            preferences=user_preferences,
+            node="priority_briefing",
+        ).render()
         
-        # Add user preferences to context if available
         if user_preferences:
-            preferences_text = "\n".join(f"- {pref}" for pref in user_preferences)
-            context += f"\n\nUser Preferences:\n{preferences_text}"
             prompt = f"""Based on the following analysis and user preferences, create a prioritized daily briefing with actionable recommendations.
             
 Pay special attention to the user's stated preferences when prioritizing items.
@@ -121,7 +118,7 @@ Pay special attention to the user's stated preferences when prioritizing items.
             prompt = f"Based on the following analysis, create a prioritized daily briefing with actionable recommendations:\n{context}"
         
         # Generate briefing
-        briefing_result = self.analyze(prompt)
+        briefing_result = self.analyze(prompt, node="priority_briefing")
         briefing_content = briefing_result.get("analysis", "")
         
         # Create thread for follow-up questions
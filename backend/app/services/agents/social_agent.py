@@ -2,9 +2,9 @@ import logging
 from typing import Any, Dict, List
 
 
-from langchain_google_genai import ChatGoogleGenerativeAI
 
-from app.core.config import settings
+from app.services.llm_factory import create_chat_model
+from app.services.llm_hedge import hedged_invoke
 
 logger = logging.getLogger(__name__)
 
@@ -18,11 +18,7 @@ class SocialAgent:
 
     def _create_agent(self):
         try:
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-1.5-flash",
-                temperature=0.1,
-                google_api_key=settings.GEMINI_API_KEY,
-            )
+            llm = create_chat_model("gemini", "gemini-1.5-flash", 0.1)
             logger.info("Social agent created successfully")
             return llm
         except Exception as e:
@@ -31,7 +27,7 @@ class SocialAgent:
 
     def analyze(self, prompt: str) -> Dict[str, Any]:
         try:
-            result = self.agent.invoke(prompt)
+            result = hedged_invoke(self.agent, prompt, "social_analysis")
             return {
                 "analysis": result.content if hasattr(result, "content") else str(result),
                 "status": "completed",
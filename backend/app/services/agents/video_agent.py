@@ -3,12 +3,15 @@ import base64
 import requests
 from typing import Any, Dict, List
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
 from app.core.config import settings
+from app.core.lazy import lazy_import
+from app.services.llm_factory import create_chat_model
+from app.services.llm_gateway import invoke_llm
 
 logger = logging.getLogger(__name__)
 
+HumanMessage = lazy_import("langchain_core.messages", "HumanMessage")
+
 class VideoIntelligenceAgent:
     """
     Video Intelligence Agent for analyzing spatial-temporal data (videos)
@@ -22,12 +25,7 @@ class VideoIntelligenceAgent:
     def _create_llm(self):
         try:
             # Gemini 1.5 Pro is optimized for multimodal input
-            return ChatGoogleGenerativeAI(
-                model="gemini-1.5-pro",
-                temperature=0.2,
-                google_api_key=settings.GEMINI_API_KEY,
-                max_output_tokens=4096,
-            )
+            return create_chat_model("gemini", "gemini-1.5-pro", 0.2, max_tokens=4096)
         except Exception as e:
             logger.error(f"Failed to initialize Video Intelligence Agent: {e}")
             # Fallback to avoid breaking app if key is missing/invalid during init
@@ -80,7 +78,7 @@ class VideoIntelligenceAgent:
             message = HumanMessage(content=prompt)
             # In a full valid implementation, we'd attach the video blob here.
             
-            response = self.llm.invoke([message])
+            response = invoke_llm(self.llm, [message], "video_analysis")
             
             return {
                 "analysis": response.content,
@@ -5,6 +5,9 @@ import time
 import requests
 from typing import Any, Callable, Dict, List, Optional, Tuple
 
+from app.core.metrics import BACKBOARD_CALLS, BACKBOARD_RATE_LIMITED, BACKBOARD_RETRIES
+from app.core.tracing import span
+
 logger = logging.getLogger(__name__)
 
 
@@ -103,35 +106,48 @@ class BackboardService:
         - Authentication errors (401, 403)
         - Client errors (400, 404)
         """
-        last_exception = None
-        backoff = self.INITIAL_BACKOFF
-        
-        for attempt in range(self.MAX_RETRIES):
-            try:
-                return operation(*args, **kwargs)
-            except (ConnectionError, requests.exceptions.Timeout) as e:
-                last_exception = e
-                logger.warning(
-                    f"Network error on attempt {attempt + 1}/{self.MAX_RETRIES}: {e}"
-                )
-            except BackboardAPIError as e:
-                if e.status_code in (429, 503):
+        with span(
+            "backboard.call", operation=getattr(operation, "__name__", "operation")
+        ) as current:
+            last_exception = None
+            backoff = self.INITIAL_BACKOFF
+        
+            for attempt in range(self.MAX_RETRIES):
+                if current is not None:
+                    current.attributes["attempts"] = attempt + 1
+                try:
+                    result = operation(*args, **kwargs)
+                    BACKBOARD_CALLS.labels("ok").inc()
+                    return result
+                except (ConnectionError, requests.exceptions.Timeout) as e:
                     last_exception = e
+                    BACKBOARD_RETRIES.labels("network").inc()
                     logger.warning(
-                        f"Transient API error on attempt {attempt + 1}/{self.MAX_RETRIES}: {e}"
+                        f"Network error on attempt {attempt + 1}/{self.MAX_RETRIES}: {e}"
                     )
-                else:
-                    # Don't retry client errors or auth errors
-                    raise
-            
-            if attempt < self.MAX_RETRIES - 1:
-                time.sleep(backoff)
-                backoff = min(backoff * 2, self.MAX_BACKOFF)
-        
-        # All retries exhausted
-        raise BackboardServiceError(
-            f"Operation failed after {self.MAX_RETRIES} attempts"
-        ) from last_exception
+                except BackboardAPIError as e:
+                    if e.status_code in (429, 503):
+                        last_exception = e
+                        BACKBOARD_RETRIES.labels(
+                            "rate_limited" if e.status_code == 429 else "unavailable"
+                        ).inc()
+                        logger.warning(
+                            f"Transient API error on attempt {attempt + 1}/{self.MAX_RETRIES}: {e}"
+                        )
+                    else:
+                        # Don't retry client errors or auth errors
+                        BACKBOARD_CALLS.labels("error").inc()
+                        raise
+            
+                if attempt < self.MAX_RETRIES - 1:
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, self.MAX_BACKOFF)
+        
+            # All retries exhausted
+            BACKBOARD_CALLS.labels("exhausted").inc()
+            raise BackboardServiceError(
+                f"Operation failed after {self.MAX_RETRIES} attempts"
+            ) from last_exception
     
     def _handle_response(self, response: requests.Response) -> Dict[str, Any]:
         """Handle API response and raise appropriate exceptions."""
@@ -139,6 +155,9 @@ class BackboardService:
         if response.status_code in (200, 201):
             return response.json()
         
+        elif response.status_code == 204:
+            return {}
+        
         elif response.status_code == 400:
             raise BackboardAPIError(
                 f"Bad request: {response.text}",
@@ -165,6 +184,7 @@ class BackboardService:
         
         elif response.status_code == 429:
             retry_after = response.headers.get("Retry-After", "60")
+            BACKBOARD_RATE_LIMITED.inc()
             raise BackboardRateLimitError(
                 f"Rate limit exceeded. Retry after {retry_after} seconds",
                 status_code=429,
@@ -682,3 +702,23 @@ class BackboardService:
         threads = self._call_with_retry(_list)
         logger.info(f"Listed threads for user {user_id}: found {len(threads)} threads")
         return threads
+    
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete a conversation thread and its messages.
+        
+        Args:
+            thread_id: Thread identifier
+            
+        Raises:
+            BackboardAPIError: If API call fails
+        """
+        def _delete():
+            response = requests.delete(
+                f"{self.base_url}/threads/{thread_id}",
+                headers=self.headers,
+                timeout=30
+            )
+            self._handle_response(response)
+        
+        self._call_with_retry(_delete)
+        logger.info(f"Deleted thread {thread_id}")
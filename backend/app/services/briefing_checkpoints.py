@@ -0,0 +1,195 @@
+"""Node-level checkpoints for the daily briefing workflow.
+
+After each agent node of :class:`~app.services.langgraph.workflow.WorkflowBuilder`
+completes, the state it wrote is saved to the app database with a hash of
+the state it read. A later run for the same user within
+``BRIEFING_CHECKPOINT_MAX_AGE_SECONDS`` reuses that output instead of calling
+the LLM again, so a briefing whose priority agent failed or timed out is
+retried from the last completed node rather than from scratch.
+
+Only completed outputs are saved; a node that reported an error runs again.
+A node whose inputs changed (a source agent with newly retrieved documents)
+does not match its checkpoint and runs again too. Checkpoints only outlive
+unfinished runs: once the priority agent, the last node, completes, the
+user's checkpoints are deleted, so the next run (e.g. ``refresh=true``)
+calls every agent again.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+
+from app.core.config import settings
+from app.core.metrics import BRIEFING_CHECKPOINTS
+from app.models.briefing_checkpoint import BriefingCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# Checkpointed nodes: (state keys the node reads, state keys it writes). A
+# dotted read key is a key inside a dict. The first written key holds the
+# node's analysis and its status.
+CHECKPOINTED_NODES: Dict[str, Tuple[Tuple[str, ...], Tuple[str, ...]]] = {
+    "email_agent": (("retrieved_context.email",), ("email_analysis",)),
+    "calendar_agent": (("retrieved_context.calendar",), ("calendar_analysis",)),
+    "social_agent": (("retrieved_context.social",), ("social_analysis",)),
+    "notion_agent": (("retrieved_context.notion",), ("notion_analysis",)),
+    "priority_agent": (
+        ("email_analysis", "calendar_analysis", "social_analysis", "notion_analysis"),
+        ("priority_recommendations", "final_briefing"),
+    ),
+}
+
+# The last node: when it completes the briefing is done, nothing is left to resume
+FINAL_NODE = "priority_agent"
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _read(state: Dict[str, Any], key: str) -> Any:
+    value: Any = state
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def inputs_hash(node: str, state: Dict[str, Any]) -> str:
+    reads = CHECKPOINTED_NODES[node][0]
+    payload = json.dumps(
+        [node, [_read(state, key) for key in reads]], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BriefingCheckpointer:
+    """Saves and reuses completed briefing node outputs, per user."""
+
+    def __init__(
+        self,
+        session_factory: Optional[Callable[[], Any]] = None,
+        max_age_seconds: float = 900.0,
+        clock: Callable[[], datetime] = _utc_now,
+    ) -> None:
+        if session_factory is None:
+            from app.db.base import SessionLocal
+
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_age = timedelta(seconds=max_age_seconds)
+        self.clock = clock
+
+    def load(self, user_id: int, node: str, key: str) -> Optional[Dict[str, Any]]:
+        """The state *node* wrote for these inputs, if saved within the max age."""
+        db = self.session_factory()
+        try:
+            row = (
+                db.query(BriefingCheckpoint)
+                .filter(BriefingCheckpoint.user_id == user_id, BriefingCheckpoint.node == node)
+                .first()
+            )
+            if row is None or row.inputs_hash != key:
+                return None
+            created_at = row.created_at
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)  # SQLite drops the zone
+            if self.clock() - created_at > self.max_age:
+                return None
+            return json.loads(row.state)
+        finally:
+            db.close()
+
+    def save(self, user_id: int, node: str, key: str, update: Dict[str, Any]) -> None:
+        db = self.session_factory()
+        try:
+            row = (
+                db.query(BriefingCheckpoint)
+                .filter(BriefingCheckpoint.user_id == user_id, BriefingCheckpoint.node == node)
+                .first()
+            )
+            if row is None:
+                row = BriefingCheckpoint(user_id=user_id, node=node)
+                db.add(row)
+            row.inputs_hash = key
+            row.state = json.dumps(update, default=str)
+            row.created_at = self.clock()
+            try:
+                db.commit()
+            except IntegrityError:
+                # A concurrent run saved the same node first; its output is as good
+                db.rollback()
+        finally:
+            db.close()
+
+    def clear(self, user_id: int) -> int:
+        """Drop *user_id*'s checkpoints. Returns the number removed."""
+        db = self.session_factory()
+        try:
+            removed = (
+                db.query(BriefingCheckpoint)
+                .filter(BriefingCheckpoint.user_id == user_id)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return removed
+        finally:
+            db.close()
+
+    def wrap(self, node: str, run: Callable[[Dict[str, Any]], Dict[str, Any]]):
+        """Workflow node that reuses *run*'s fresh checkpoint or runs and saves it."""
+        writes = CHECKPOINTED_NODES[node][1] + ("current_step",)
+
+        def checkpointed(state):
+            user_id = state.get("user_id")
+            key = inputs_hash(node, state)
+            update = None
+            if node != FINAL_NODE:
+                try:
+                    update = self.load(user_id, node, key)
+                except SQLAlchemyError as e:
+                    logger.warning(f"Briefing checkpoint lookup for {node} failed: {e}")
+            if update is not None:
+                logger.info(f"Resuming briefing for user {user_id}: reusing {node} output")
+                BRIEFING_CHECKPOINTS.labels(node, "reused").inc()
+                state.update(update)
+                return state
+
+            state = run(state)
+            if state.get(writes[0], {}).get("status") != "completed":
+                return state
+            try:
+                if node == FINAL_NODE:
+                    self.clear(user_id)
+                    BRIEFING_CHECKPOINTS.labels(node, "cleared").inc()
+                else:
+                    self.save(user_id, node, key, {name: state.get(name) for name in writes})
+                    BRIEFING_CHECKPOINTS.labels(node, "saved").inc()
+            except SQLAlchemyError as e:
+                logger.warning(f"Updating briefing checkpoints after {node} failed: {e}")
+            return state
+
+        checkpointed.__name__ = getattr(run, "__name__", node)
+        return checkpointed
+
+
+_checkpointer: Optional[BriefingCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_briefing_checkpointer() -> Optional[BriefingCheckpointer]:
+    """The process-wide checkpointer, or None when ``BRIEFING_CHECKPOINTS_ENABLED`` is off."""
+    global _checkpointer
+    if not settings.BRIEFING_CHECKPOINTS_ENABLED:
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                _checkpointer = BriefingCheckpointer(
+                    max_age_seconds=settings.BRIEFING_CHECKPOINT_MAX_AGE_SECONDS
+                )
+    return _checkpointer
@@ -0,0 +1,89 @@
+"""Retrieval prefetch for the daily briefing workflow.
+
+Each source agent (email, calendar, social, notion) is grounded in the
+user's own ingested documents. Rather than one vector query per agent node,
+the workflow's first node issues every source query together: the query
+texts are embedded in one batched call and searched in one multi-query
+vector search filtered by ``user_id``. The query texts are fixed, so after
+the first briefing in a process their embeddings come from the vector
+store's memo and the prefetch costs one vector search.
+
+Results for each query are kept when their ``source`` metadata belongs to
+that agent (social covers every messaging platform) and go into
+``AgentState["retrieved_context"]`` keyed by source.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List
+
+from app.core.config import settings
+from app.core.metrics import BRIEFING_RETRIEVAL_DURATION
+from app.services.rag import rag_pipeline
+
+logger = logging.getLogger(__name__)
+
+# One query per source agent, in workflow order
+SOURCE_QUERIES: Dict[str, str] = {
+    "email": "urgent emails, action items, deadlines and replies needed",
+    "calendar": "meetings, appointments, deadlines and events coming up",
+    "social": "messages from important contacts that need a reply",
+    "notion": "tasks, project notes, meeting notes and follow-ups",
+}
+
+# Results fetched per query for each one kept, since a query can also match
+# another source's documents
+OVERSAMPLE = 3
+
+# Characters of each retrieved document shown to the agent
+PREVIEW_CHARS = 400
+
+
+def source_group(source: Any) -> str:
+    # Metadata source -> source agent; messaging platforms are all "social"
+    if source in ("email", "calendar", "notion"):
+        return source
+    return "social"
+
+
+def prefetch_briefing_context(user_id: int) -> Dict[str, List[Dict[str, Any]]]:
+    """Documents for every source agent, from one batched multi-query search."""
+    if not settings.BRIEFING_RETRIEVAL_ENABLED:
+        return {}
+    n_results = settings.BRIEFING_RETRIEVAL_RESULTS
+    started = time.perf_counter()
+    results = rag_pipeline.query_many(
+        list(SOURCE_QUERIES.values()), n_results * OVERSAMPLE, {"user_id": user_id}
+    )
+    context = {}
+    for source, documents in zip(SOURCE_QUERIES, results):
+        matching = [
+            document
+            for document in documents
+            if source_group(document.get("metadata", {}).get("source")) == source
+        ]
+        context[source] = matching[:n_results]
+    BRIEFING_RETRIEVAL_DURATION.observe(time.perf_counter() - started)
+    logger.info(
+        f"Prefetched briefing context for user {user_id}: "
+        + ", ".join(f"{source} {len(documents)}" for source, documents in context.items())
+    )
+    return context
+
+
+def with_retrieved_documents(prompt: str, state: Dict[str, Any], source: str) -> str:
+    """*prompt* followed by the documents prefetched for *source*, if any."""
+    documents = (state.get("retrieved_context") or {}).get(source) or []
+    if not documents:
+        return prompt
+    lines = []
+    for document in documents:
+        metadata = document.get("metadata", {})
+        content = document.get("content", "")
+        if len(content) > PREVIEW_CHARS:
+            content = content[:PREVIEW_CHARS] + "..."
+        lines.append(
+            f"Source: {metadata.get('source', source)} | "
+            f"Time: {metadata.get('timestamp', 'unknown')}\nContent: {content}"
+        )
+    return f"{prompt}\n\nThe user's relevant {source} items:\n\n" + "\n\n".join(lines)
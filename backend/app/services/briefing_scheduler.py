@@ -0,0 +1,353 @@
+"""Background precomputation of daily briefings.
+
+Users who opted in to the daily briefing (``dailyBriefing`` in their
+notification preferences) get it computed shortly before their local
+morning and stored (:mod:`app.services.briefing_store`), so
+``GET /agent/briefing/daily`` is a database read for them.
+
+Load is spread out rather than bursty:
+
+* every user has a stable slot inside the window before
+  ``BRIEFING_MORNING_HOUR`` in their own timezone, derived from the user id,
+* a token bucket caps how many workflows start per minute (each one makes
+  several Groq calls, queued behind interactive calls by
+  :mod:`app.services.llm_gateway`),
+* a small thread pool bounds how many run at once; users whose slot has
+  passed wait in a FIFO queue and are caught up at the same rate,
+* each workflow takes a slot of the briefing admission controller
+  (:mod:`app.services.admission`) like on-demand briefings, within the
+  worker's memory budget; when none is free the user goes back to the front
+  of the queue for the next pass.
+
+Every process running the scheduler precomputes for every opted-in user, so
+``BRIEFING_PRECOMPUTE_ENABLED`` (off by default) should be set for one
+process only.
+
+The clock and the briefing generator are injectable and :meth:`tick` runs
+one scheduling pass for a given time, so tests drive the scheduler with a
+fake clock and a fake LLM.
+"""
+
+import json
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.metrics import BRIEFING_PRECOMPUTED
+from app.models.daily_briefing import DailyBriefing
+from app.models.user import User
+from app.services.admission import AdmissionController, get_briefing_admission
+from app.services.briefing_store import is_storable, load_briefing, save_briefing, user_zone
+from app.services.llm_gateway import BACKGROUND, llm_context
+
+logger = logging.getLogger(__name__)
+
+# How often the opted-in user list is re-read from the database
+USER_REFRESH_SECONDS = 600
+
+
+def wants_daily_briefing(preferences: Optional[str]) -> bool:
+    # notification_preferences is JSON stored as text
+    if not preferences:
+        return False
+    try:
+        parsed = json.loads(preferences)
+    except (TypeError, ValueError):
+        return False
+    return isinstance(parsed, dict) and bool(parsed.get("dailyBriefing"))
+
+
+def due_at(user_id: int, zone: ZoneInfo, day: date, morning_hour: int, window: timedelta) -> datetime:
+    # Stable pseudo-random slot in the window before the user's local morning
+    fraction = (user_id * 2654435761 % 2**32) / 2**32
+    morning = datetime(day.year, day.month, day.day, morning_hour, tzinfo=zone)
+    return morning - window + window * fraction
+
+
+class TokenBucket:
+    """Token bucket rate limiter driven by explicit timestamps (seconds)."""
+
+    def __init__(self, rate_per_minute: float, burst: float) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._updated: Optional[float] = None
+
+    def take(self, now: float) -> bool:
+        if self._updated is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+def _generate_briefing(user_id: int) -> Dict[str, Any]:
+    from app.services.langgraph.coordinator import langgraph_coordinator
+
+    # Interactive chat and on-demand briefings go ahead of precomputation
+    with llm_context(priority=BACKGROUND):
+        briefing = langgraph_coordinator.get_daily_briefing(user_id, notify_urgent=False)
+    if is_storable(briefing):
+        langgraph_coordinator.send_urgent_sms(user_id, briefing)
+    return briefing
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class BriefingScheduler:
+    """Precomputes opted-in users' briefings ahead of their local morning."""
+
+    def __init__(
+        self,
+        generate: Callable[[int], Dict[str, Any]] = _generate_briefing,
+        session_factory: Optional[Callable[[], Any]] = None,
+        clock: Callable[[], datetime] = _utc_now,
+        workers: Optional[int] = None,
+        rate_per_minute: Optional[float] = None,
+        morning_hour: Optional[int] = None,
+        window_minutes: Optional[int] = None,
+        interval_seconds: Optional[float] = None,
+        model_size: str = "small",
+        admission: Optional[AdmissionController] = None,
+    ) -> None:
+        if session_factory is None:
+            from app.db.base import SessionLocal
+
+            session_factory = SessionLocal
+        self.generate = generate
+        self.session_factory = session_factory
+        self.clock = clock
+        self.workers = max(1, workers or settings.BRIEFING_PRECOMPUTE_WORKERS)
+        self.morning_hour = settings.BRIEFING_MORNING_HOUR if morning_hour is None else morning_hour
+        self.window = timedelta(
+            minutes=window_minutes or settings.BRIEFING_PRECOMPUTE_WINDOW_MINUTES
+        )
+        self.interval_seconds = interval_seconds or settings.BRIEFING_SCHEDULER_INTERVAL_SECONDS
+        self.model_size = model_size
+        self._admission = admission
+        rate_per_minute = rate_per_minute or settings.BRIEFING_PRECOMPUTE_PER_MINUTE
+        # A pass may start up to one interval's worth of workflows
+        self._bucket = TokenBucket(
+            rate_per_minute,
+            burst=max(self.workers, rate_per_minute * self.interval_seconds / 60),
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="briefing-precompute"
+        )
+        self._subscribers: List[Tuple[int, ZoneInfo]] = []
+        self._refreshed_at: Optional[datetime] = None
+        # Last local date each user's briefing was stored or attempted
+        self._done: Dict[int, date] = {}
+        self._queue: Deque[Tuple[int, date]] = deque()
+        self._queued: Set[int] = set()
+        self._running: Set[Future] = set()
+        self._last_tick: Optional[datetime] = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="briefing-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds + 1)
+            self._thread = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def tick(self, now: Optional[datetime] = None) -> int:
+        """Run one scheduling pass; returns how many precomputations started."""
+        now = now or self.clock()
+        if (
+            self._refreshed_at is None
+            or now - self._refreshed_at >= timedelta(seconds=USER_REFRESH_SECONDS)
+        ):
+            self.refresh(now)
+
+        with self._lock:
+            self._last_tick = now
+            for user_id, zone in self._subscribers:
+                day = now.astimezone(zone).date()
+                if self._done.get(user_id) == day or user_id in self._queued:
+                    continue
+                if now >= due_at(user_id, zone, day, self.morning_hour, self.window):
+                    self._queue.append((user_id, day))
+                    self._queued.add(user_id)
+        return self._dispatch(now)
+
+    def refresh(self, now: datetime) -> None:
+        # Reload opted-in users and the briefings already stored for them
+        db = self.session_factory()
+        try:
+            users = (
+                db.query(User.id, User.timezone, User.notification_preferences)
+                .filter(User.is_active.is_(True), User.notification_preferences.isnot(None))
+                .all()
+            )
+            stored = (
+                db.query(DailyBriefing.user_id, func.max(DailyBriefing.briefing_date))
+                .filter(
+                    DailyBriefing.model_size == self.model_size,
+                    DailyBriefing.briefing_date >= (now - timedelta(days=1)).date(),
+                )
+                .group_by(DailyBriefing.user_id)
+                .all()
+            )
+        finally:
+            db.close()
+
+        self._subscribers = [
+            (user_id, user_zone(tz)) for user_id, tz, prefs in users if wants_daily_briefing(prefs)
+        ]
+        for user_id, day in stored:
+            if self._done.get(user_id) is None or self._done[user_id] < day:
+                self._done[user_id] = day
+        self._refreshed_at = now
+        logger.info(f"Briefing scheduler tracking {len(self._subscribers)} opted-in users")
+
+    def wait_idle(self, timeout: Optional[float] = None) -> None:
+        # Block until the precomputations started so far have finished
+        with self._lock:
+            running = list(self._running)
+        wait(running, timeout=timeout)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = sum(1 for future in self._running if not future.done())
+        return {
+            "subscribers": len(self._subscribers),
+            "queued": len(self._queue),
+            "running": running,
+        }
+
+    def _dispatch(self, now: datetime) -> int:
+        dispatched = 0
+        with self._lock:
+            self._running = {future for future in self._running if not future.done()}
+            while len(self._running) < self.workers:
+                job = self._take_job(now)
+                if job is None:
+                    break
+                self._running.add(self._executor.submit(self._work, *job))
+                dispatched += 1
+        return dispatched
+
+    def _take_job(self, now: datetime) -> Optional[Tuple[int, date]]:
+        # Next queued user, if the rate limit allows starting it
+        with self._lock:
+            if not self._queue or self._stop.is_set() or not self._bucket.take(now.timestamp()):
+                return None
+            user_id, day = self._queue.popleft()
+            self._queued.discard(user_id)
+            # Marked before running so a failure is not retried until tomorrow
+            self._done[user_id] = day
+            return user_id, day
+
+    def _work(self, user_id: int, day: date) -> None:
+        # A worker keeps draining the queue while the rate budget of the last
+        # pass allows, instead of idling until the next pass
+        job: Optional[Tuple[int, date]] = (user_id, day)
+        while job is not None:
+            if not self._precompute(*job):
+                self._defer(*job)
+                return
+            job = self._take_job(self._last_tick)
+
+    def _defer(self, user_id: int, day: date) -> None:
+        # No admission slot: first in line at the next pass
+        with self._lock:
+            self._queue.appendleft((user_id, day))
+            self._queued.add(user_id)
+        BRIEFING_PRECOMPUTED.labels("deferred").inc()
+
+    @property
+    def admission(self) -> AdmissionController:
+        if self._admission is None:
+            self._admission = get_briefing_admission()
+        return self._admission
+
+    def _precompute(self, user_id: int, day: date) -> bool:
+        # False when it has to wait for a briefing admission slot
+        try:
+            # The session is not held open while the workflow runs
+            db = self.session_factory()
+            try:
+                if load_briefing(db, user_id, day, self.model_size) is not None:
+                    BRIEFING_PRECOMPUTED.labels("skipped").inc()
+                    return True
+            finally:
+                db.close()
+
+            if not self.admission.try_acquire():
+                return False
+            try:
+                briefing = self.generate(user_id)
+            finally:
+                self.admission.release()
+            if not is_storable(briefing):
+                logger.warning(f"Precomputed briefing for user {user_id} failed: {briefing.get('error')}")
+                BRIEFING_PRECOMPUTED.labels("error").inc()
+                return True
+
+            db = self.session_factory()
+            try:
+                save_briefing(db, user_id, day, self.model_size, briefing, source="scheduled")
+            finally:
+                db.close()
+            BRIEFING_PRECOMPUTED.labels("ok").inc()
+        except Exception as e:
+            logger.error(f"Briefing precomputation failed for user {user_id}: {e}", exc_info=True)
+            BRIEFING_PRECOMPUTED.labels("error").inc()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Briefing scheduler tick failed: {e}", exc_info=True)
+            if self._stop.wait(self.interval_seconds):
+                return
+
+
+_scheduler: Optional[BriefingScheduler] = None
+
+
+def start_briefing_scheduler() -> Optional[BriefingScheduler]:
+    global _scheduler
+    if not settings.BRIEFING_PRECOMPUTE_ENABLED or _scheduler is not None:
+        return _scheduler
+    _scheduler = BriefingScheduler()
+    _scheduler.start()
+    logger.info("Briefing precompute scheduler started")
+    return _scheduler
+
+
+def stop_briefing_scheduler() -> None:
+    global _scheduler
+    if _scheduler is not None:
+        _scheduler.stop()
+        _scheduler = None
+
+
+def get_scheduler_stats() -> Dict[str, int]:
+    if _scheduler is None:
+        return {"subscribers": 0, "queued": 0, "running": 0}
+    return _scheduler.stats()
@@ -0,0 +1,83 @@
+"""Stored daily briefings.
+
+Briefings are keyed by the user's *local* date, so a briefing computed before
+a user's morning (by :mod:`app.services.briefing_scheduler`) or on their first
+request of the day is served from the database for the rest of that day.
+"""
+
+import json
+import logging
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.daily_briefing import DailyBriefing
+
+logger = logging.getLogger(__name__)
+
+
+def user_zone(timezone_name: Optional[str]) -> ZoneInfo:
+    # Unknown or missing timezones fall back to UTC
+    try:
+        return ZoneInfo(timezone_name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown timezone {timezone_name!r}; using UTC")
+        return ZoneInfo("UTC")
+
+
+def local_date(timezone_name: Optional[str], now: Optional[datetime] = None) -> date:
+    now = now or datetime.now(timezone.utc)
+    return now.astimezone(user_zone(timezone_name)).date()
+
+
+def is_storable(briefing: Dict[str, Any]) -> bool:
+    # Failed workflows are returned to the caller but never cached
+    return briefing.get("workflow_status") != "error"
+
+
+def _find(
+    db: Session, user_id: int, briefing_date: date, model_size: str
+) -> Optional[DailyBriefing]:
+    return (
+        db.query(DailyBriefing)
+        .filter(
+            DailyBriefing.user_id == user_id,
+            DailyBriefing.briefing_date == briefing_date,
+            DailyBriefing.model_size == model_size,
+        )
+        .first()
+    )
+
+
+def load_briefing(
+    db: Session, user_id: int, briefing_date: date, model_size: str
+) -> Optional[Dict[str, Any]]:
+    row = _find(db, user_id, briefing_date, model_size)
+    return json.loads(row.content) if row else None
+
+
+def save_briefing(
+    db: Session,
+    user_id: int,
+    briefing_date: date,
+    model_size: str,
+    briefing: Dict[str, Any],
+    source: str,
+) -> None:
+    content = json.dumps(briefing, default=str)
+    row = _find(db, user_id, briefing_date, model_size)
+    if row is None:
+        row = DailyBriefing(
+            user_id=user_id, briefing_date=briefing_date, model_size=model_size
+        )
+        db.add(row)
+    row.content = content
+    row.source = source
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker stored the same briefing first; keep theirs
+        db.rollback()
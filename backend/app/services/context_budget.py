@@ -0,0 +1,284 @@
+"""Token-budgeted context assembly for the priority agent prompt.
+
+The daily briefing prompt is built from every upstream agent analysis plus
+the user's Backboard preferences. Those inputs grow without bound, so the
+prompt is assembled against a token budget instead of concatenated:
+
+1. Each section is split into items (lines, or list entries for
+   preferences). Repeated items are dropped, both within a section and
+   when a higher-priority section already said the same thing.
+2. If the sections still exceed the budget, every non-empty section keeps a
+   small floor and the rest of the budget goes to sections in priority
+   order, so lower-priority sections are trimmed first.
+3. Sections over their allocation keep their leading items and end with
+   a marker that says how many items were omitted.
+
+Tokens are estimated at roughly four characters per token. That ratio is
+close enough for English text with the Llama and Gemini tokenizers, and it
+avoids loading a tokenizer on the request path.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from app.core.config import settings
+from app.core.metrics import CONTEXT_ITEMS_DROPPED, PROMPT_CONTEXT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+CHARS_PER_TOKEN = 4
+
+# Items shorter than this (headings such as "Action items:") are never deduped
+_MIN_DEDUPE_CHARS = 20
+_BULLETS = ("-", "*", "•")
+
+# (key, title) in priority order, highest first
+BRIEFING_SECTIONS: Tuple[Tuple[str, str], ...] = (
+    ("email", "Email Analysis"),
+    ("calendar", "Calendar Analysis"),
+    ("preferences", "User Preferences"),
+    ("notion", "Notion Analysis"),
+    ("social", "Social Messaging Analysis"),
+)
+
+
+def estimate_tokens(text: str) -> int:
+    # Cheap token estimate; see the module docstring
+    if not text:
+        return 0
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def _normalize(item: str) -> str:
+    # Dedupe key: lowercase, without list markers, emphasis or end punctuation
+    # (string methods only; this runs once per item on the request path)
+    key = item.lower()
+    marker, _, rest = key.partition(" ")
+    if rest and (marker in _BULLETS or (marker[:-1].isdigit() and marker[-1:] in ".)")):
+        key = rest
+    return key.replace("*", "").replace("_", "").strip().rstrip(".!?:;,")
+
+
+def _split_items(content: Union[str, Sequence[str]]) -> List[str]:
+    # Lines for free text, entries for lists; whitespace is collapsed
+    raw = content.splitlines() if isinstance(content, str) else content
+    items = []
+    for item in raw:
+        item = " ".join(str(item).split())
+        if item:
+            items.append(item)
+    return items
+
+
+def _truncate_item(item: str, tokens: int) -> str:
+    # Cut a single oversized item at a word boundary
+    limit = tokens * CHARS_PER_TOKEN
+    if len(item) <= limit:
+        return item
+    cut = item[: max(0, limit - 1)].rsplit(" ", 1)[0]
+    return f"{cut}…"
+
+
+def _omitted_marker(count: int) -> str:
+    return f"[… {count} more items omitted]"
+
+
+class ContextSection:
+    """One titled section of prompt context with its assembly outcome."""
+
+    def __init__(
+        self,
+        key: str,
+        title: str,
+        content: Union[str, Sequence[str]],
+        priority: int,
+        bullets: bool = False,
+    ) -> None:
+        self.key = key
+        self.title = title
+        self.priority = priority
+        self.bullets = bullets
+        self.items = _split_items(content)
+        self.raw_tokens = estimate_tokens(self._join(self.items))
+        self.allocated = 0
+        self.duplicates = 0
+        self.truncated = 0
+        self.text = ""
+
+    def _join(self, items: Iterable[str]) -> str:
+        if self.bullets:
+            return "\n".join(f"- {item}" for item in items)
+        return "\n".join(items)
+
+    @property
+    def needed(self) -> int:
+        return estimate_tokens(self._join(self.items))
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+    def fit(self, budget: int) -> None:
+        # Keep leading items within *budget* tokens and note what was cut
+        self.allocated = budget
+        if self.needed <= budget:
+            self.text = self._join(self.items)
+            return
+
+        # Track the joined length incrementally instead of re-joining
+        prefix = 2 if self.bullets else 0
+        limit = budget * CHARS_PER_TOKEN
+        kept: List[str] = []
+        length = -1
+        for item in self.items:
+            omitted = len(self.items) - len(kept) - 1
+            marker = len(_omitted_marker(omitted)) + prefix + 1 if omitted else 0
+            if length + 1 + prefix + len(item) + marker > limit:
+                break
+            kept.append(item)
+            length += 1 + prefix + len(item)
+
+        if not kept and budget > 0:
+            # Nothing fits whole; keep the start of the first item
+            marker = _omitted_marker(len(self.items) - 1) if len(self.items) > 1 else ""
+            room = budget - estimate_tokens(marker) - 1
+            if room > 0:
+                kept.append(_truncate_item(self.items[0], room))
+
+        self.truncated = len(self.items) - len(kept)
+        if self.truncated:
+            kept.append(_omitted_marker(self.truncated))
+        self.text = self._join(kept)
+
+
+class AssembledContext:
+    """Result of :func:`assemble_context`: the sections and their token counts."""
+
+    def __init__(self, sections: List[ContextSection], budget: int) -> None:
+        self.sections = sections
+        self.budget = budget
+
+    @property
+    def raw_tokens(self) -> int:
+        return sum(section.raw_tokens for section in self.sections)
+
+    @property
+    def tokens(self) -> int:
+        return sum(section.tokens for section in self.sections)
+
+    def includes(self, key: str) -> bool:
+        return any(section.key == key and section.text for section in self.sections)
+
+    def render(self) -> str:
+        # Sections in their original order as "Title:\n..." blocks
+        return "\n\n".join(
+            f"{section.title}:\n{section.text}" for section in self.sections if section.text
+        )
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            section.key: {
+                "raw_tokens": section.raw_tokens,
+                "tokens": section.tokens,
+                "allocated": section.allocated,
+                "duplicates": section.duplicates,
+                "truncated": section.truncated,
+            }
+            for section in self.sections
+        }
+
+
+def _dedupe(sections: List[ContextSection]) -> None:
+    # Drop items already seen in this or a higher-priority section
+    seen = set()
+    for section in sorted(sections, key=lambda s: s.priority):
+        unique = []
+        for item in section.items:
+            key = _normalize(item)
+            if len(key) >= _MIN_DEDUPE_CHARS:
+                if key in seen:
+                    section.duplicates += 1
+                    continue
+                seen.add(key)
+            unique.append(item)
+        section.items = unique
+
+
+def _allocate(sections: List[ContextSection], budget: int, floor: int) -> Dict[str, int]:
+    needed = {section.key: section.needed for section in sections}
+    if sum(needed.values()) <= budget:
+        return needed
+
+    ordered = sorted(sections, key=lambda s: s.priority)
+    allocation = {}
+    remaining = budget
+    # Every non-empty section keeps a floor, highest priority first
+    for section in ordered:
+        share = min(needed[section.key], floor, remaining)
+        allocation[section.key] = share
+        remaining -= share
+    # The rest goes to sections in priority order
+    for section in ordered:
+        extra = min(needed[section.key] - allocation[section.key], remaining)
+        allocation[section.key] += extra
+        remaining -= extra
+    return allocation
+
+
+def assemble_context(
+    sections: List[ContextSection],
+    budget: int,
+    min_section_tokens: int,
+) -> AssembledContext:
+    """Dedupe *sections* and trim them to fit *budget* estimated tokens."""
+    _dedupe(sections)
+    allocation = _allocate(sections, budget, min_section_tokens)
+    for section in sections:
+        section.fit(allocation[section.key])
+    return AssembledContext(sections, budget)
+
+
+def assemble_briefing_context(
+    analyses: Dict[str, str],
+    preferences: Optional[Sequence[str]] = None,
+    node: str = "priority_agent",
+    budget: Optional[int] = None,
+) -> AssembledContext:
+    """Build the priority agent's context from agent analyses and preferences.
+
+    Args:
+        analyses: Analysis text keyed by section (email, calendar, social, notion)
+        preferences: User preferences retrieved from Backboard memory
+        node: Metrics label for the calling node
+        budget: Token budget override (defaults to PRIORITY_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        AssembledContext whose ``render()`` output goes into the prompt
+    """
+    budget = budget or settings.PRIORITY_CONTEXT_TOKEN_BUDGET
+    sections = []
+    for priority, (key, title) in enumerate(BRIEFING_SECTIONS):
+        if key == "preferences":
+            content = preferences or []
+        else:
+            content = analyses.get(key) or ""
+        sections.append(
+            ContextSection(key, title, content, priority, bullets=key == "preferences")
+        )
+
+    assembled = assemble_context(sections, budget, settings.CONTEXT_MIN_SECTION_TOKENS)
+
+    PROMPT_CONTEXT_TOKENS.labels(node, "raw").observe(assembled.raw_tokens)
+    PROMPT_CONTEXT_TOKENS.labels(node, "assembled").observe(assembled.tokens)
+    for section in sections:
+        if section.duplicates:
+            CONTEXT_ITEMS_DROPPED.labels(node, section.key, "duplicate").inc(section.duplicates)
+        if section.truncated:
+            CONTEXT_ITEMS_DROPPED.labels(node, section.key, "truncated").inc(section.truncated)
+
+    if assembled.tokens < assembled.raw_tokens:
+        logger.info(
+            f"Assembled {node} context: {assembled.raw_tokens} -> {assembled.tokens} "
+            f"estimated tokens (budget {budget})"
+        )
+    return assembled
@@ -2,6 +2,7 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict
 
+from app.core.lazy import LazyObject
 from app.services.agents import CalendarAgent, EmailAgent, PriorityAgent, SocialAgent, VideoIntelligenceAgent
 from app.services.tools import get_all_tools
 from app.services.google_tools import get_google_tools_for_user
@@ -128,5 +129,5 @@ class AICoordinator:
             }
 
 
-# Global coordinator instance
-ai_coordinator = AICoordinator()
+# Global coordinator instance; agents and their LLM clients are built on first use
+ai_coordinator = LazyObject(AICoordinator)
@@ -0,0 +1,419 @@
+"""Background erasure of a user's documents and the data derived from them.
+
+``DELETE /ingest/documents`` queues an erasure job and returns at once;
+``GET /ingest/documents/erasures/{job_id}`` reports its progress. Jobs run
+one at a time on a worker thread, each through these steps in order:
+
+* ``documents`` - the matching documents, deleted in pages of ids by the
+  vector store (only ids are read, never contents) or by one server-side
+  delete-by-filter in Backboard;
+* ``threads`` - only when every document of the user is erased: their
+  Backboard conversation threads and ``backboard_threads`` rows;
+* ``response_cache``, ``briefing_checkpoints``, ``daily_briefings`` - cached
+  LLM answers, workflow node outputs and stored briefings, which may quote
+  the deleted documents.
+
+Jobs are rows of ``erasure_jobs``, their step and counts saved as they go,
+so a restart or deploy does not lose one. The process running a job holds a
+lease on it: ``claimed_at`` is refreshed after every page, and only a job
+with no worker or a lease older than ``ERASURE_JOB_LEASE_SECONDS`` can be
+claimed, so each job runs in one process at a time. Every process sweeps the
+table at startup and once per lease period for such jobs, which picks up the
+work of a process that died. Shutting down stops the running job after its
+current page and puts it back in the queue. A failing step stops the job
+with status ``failed``; every step is idempotent, so submitting the erasure
+again picks up where it stopped.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import func, or_
+
+from app.core.config import settings
+from app.core.metrics import ERASED_ITEMS, ERASURE_DURATION, ERASURE_JOBS
+from app.models.backboard_thread import BackboardThread
+from app.models.daily_briefing import DailyBriefing
+from app.models.erasure_job import ErasureJob
+from app.services.briefing_checkpoints import get_briefing_checkpointer
+from app.services.response_cache import get_response_cache
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+UNFINISHED = (QUEUED, RUNNING)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def job_to_dict(job: ErasureJob) -> Dict[str, Any]:
+    """The status of *job* as reported to its owner."""
+    return {
+        "job_id": job.id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "step": job.step,
+        "progress": json.loads(job.progress or "{}"),
+        "filter": json.loads(job.filter_metadata),
+        "error": job.error,
+        "created_at": _isoformat(job.created_at),
+        "started_at": _isoformat(job.started_at),
+        "finished_at": _isoformat(job.finished_at),
+    }
+
+
+class ErasureService:
+    """Runs the persisted erasure jobs in order on a background thread."""
+
+    def __init__(
+        self,
+        pipeline: Any = None,
+        session_factory: Optional[Callable[[], Any]] = None,
+        backboard_factory: Optional[Callable[[], Any]] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> None:
+        if session_factory is None:
+            from app.db.base import SessionLocal
+
+            session_factory = SessionLocal
+        self._pipeline = pipeline
+        self.session_factory = session_factory
+        self.backboard_factory = backboard_factory or _backboard
+        self.lease = timedelta(seconds=lease_seconds or settings.ERASURE_JOB_LEASE_SECONDS)
+        # Marks the jobs this process claimed
+        self.worker_id = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        # Jobs waiting in or running on this process's executor
+        self._queued: Set[str] = set()
+        self._stopping = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="erasure")
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pipeline(self):
+        if self._pipeline is None:
+            from app.services.rag import rag_pipeline
+
+            self._pipeline = rag_pipeline
+        return self._pipeline
+
+    def start(self) -> None:
+        # Resume unfinished jobs now, then look for abandoned ones every lease period
+        if self._thread is not None:
+            return
+        self._sweep()
+        self._thread = threading.Thread(target=self._run, name="erasure-sweeper", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(self.lease.total_seconds()):
+            self._sweep()
+
+    def _sweep(self) -> None:
+        try:
+            self.resume()
+        except Exception as e:
+            # Tried again at the next sweep; new jobs are still accepted
+            logger.error(f"Failed to resume unfinished erasure jobs: {e}", exc_info=True)
+
+    def submit(
+        self, user_id: int, filter_metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Queue erasure of *user_id*'s documents matching *filter_metadata*.
+
+        The filter is always scoped to the user; without one, everything of
+        theirs is erased. An identical job still waiting or running is
+        returned instead of queueing another.
+        """
+        filter_metadata = {**(filter_metadata or {}), "user_id": user_id}
+        encoded = json.dumps(filter_metadata, sort_keys=True, default=str)
+        with self._lock:
+            db = self.session_factory()
+            try:
+                job = (
+                    db.query(ErasureJob)
+                    .filter(
+                        ErasureJob.user_id == user_id,
+                        ErasureJob.filter_metadata == encoded,
+                        ErasureJob.status.in_(UNFINISHED),
+                    )
+                    .first()
+                )
+                if job is not None:
+                    return job_to_dict(job)
+                job = ErasureJob(
+                    id=uuid.uuid4().hex,
+                    user_id=user_id,
+                    filter_metadata=encoded,
+                    status=QUEUED,
+                    progress="{}",
+                    created_at=_utcnow(),
+                )
+                db.add(job)
+                db.commit()
+                queued = job_to_dict(job)
+            finally:
+                db.close()
+        self._enqueue(queued["job_id"])
+        logger.info(f"Queued erasure job {queued['job_id']} for user {user_id}: {filter_metadata}")
+        return queued
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            job = db.get(ErasureJob, job_id)
+            return job_to_dict(job) if job is not None else None
+        finally:
+            db.close()
+
+    def resume(self) -> List[str]:
+        """Queue the unfinished jobs no live process holds, oldest first."""
+        db = self.session_factory()
+        try:
+            job_ids = [
+                job_id
+                for (job_id,) in db.query(ErasureJob.id)
+                .filter(ErasureJob.status.in_(UNFINISHED), self._claimable())
+                .order_by(ErasureJob.created_at)
+            ]
+        finally:
+            db.close()
+        resumed = [job_id for job_id in job_ids if self._enqueue(job_id)]
+        if resumed:
+            logger.info(f"Resuming {len(resumed)} unfinished erasure job(s)")
+        return resumed
+
+    def _enqueue(self, job_id: str) -> bool:
+        with self._lock:
+            if job_id in self._queued:
+                return False
+            self._queued.add(job_id)
+        self._executor.submit(self.run, job_id)
+        return True
+
+    def _claimable(self):
+        # No worker, or one whose lease ran out
+        return or_(
+            ErasureJob.worker.is_(None),
+            ErasureJob.claimed_at.is_(None),
+            ErasureJob.claimed_at < _utcnow() - self.lease,
+        )
+
+    def _claim(self, job_id: str) -> Optional[ErasureJob]:
+        # Take the lease on the job in one conditional update; None if it is
+        # finished or another process holds a live lease
+        db = self.session_factory()
+        try:
+            now = _utcnow()
+            claimed = (
+                db.query(ErasureJob)
+                .filter(
+                    ErasureJob.id == job_id,
+                    ErasureJob.status.in_(UNFINISHED),
+                    self._claimable(),
+                )
+                .update(
+                    {
+                        "status": RUNNING,
+                        "worker": self.worker_id,
+                        "claimed_at": now,
+                        "started_at": func.coalesce(ErasureJob.started_at, now),
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(ErasureJob, job_id)
+            db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def _save(self, job_id: str, **fields: Any) -> bool:
+        # Update the job and renew the lease; False if another process took it over
+        if "progress" in fields:
+            fields["progress"] = json.dumps(fields["progress"])
+        fields.setdefault("claimed_at", _utcnow())
+        db = self.session_factory()
+        try:
+            saved = (
+                db.query(ErasureJob)
+                .filter(ErasureJob.id == job_id, ErasureJob.worker == self.worker_id)
+                .update(fields, synchronize_session=False)
+            )
+            db.commit()
+            return bool(saved)
+        finally:
+            db.close()
+
+    def run(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Run every step of the job in this thread.
+
+        Returns the finished job, or None when another process holds it, it
+        was finished already, or :meth:`shutdown` stopped it midway.
+        """
+        try:
+            job = self._claim(job_id)
+            if job is None:
+                return None
+            return self._run_steps(job)
+        finally:
+            with self._lock:
+                self._queued.discard(job_id)
+
+    def _run_steps(self, job: ErasureJob) -> Optional[Dict[str, Any]]:
+        filter_metadata = json.loads(job.filter_metadata)
+        # A resumed job keeps the counts of its earlier runs
+        progress: Dict[str, int] = json.loads(job.progress or "{}")
+        whole_user = set(filter_metadata) == {"user_id"}
+        steps = [
+            ("documents", self._erase_documents),
+            ("threads", self._erase_threads),
+            ("response_cache", self._erase_response_cache),
+            ("briefing_checkpoints", self._erase_briefing_checkpoints),
+            ("daily_briefings", self._erase_daily_briefings),
+        ]
+        started = time.perf_counter()
+        name = None
+        try:
+            for name, step in steps:
+                if name == "threads" and not whole_user:
+                    continue
+                progress.setdefault(name, 0)
+                if not self._save(job.id, step=name, progress=progress):
+                    return self._lost(job.id)
+                for count in step(job.user_id, filter_metadata):
+                    progress[name] += count
+                    ERASED_ITEMS.labels(name).inc(count)
+                    if not self._save(job.id, progress=progress):
+                        return self._lost(job.id)
+                    if self._stopping.is_set():
+                        # Back in the queue for whichever process looks next
+                        self._save(job.id, status=QUEUED, worker=None, claimed_at=None)
+                        logger.info(f"Erasure job {job.id} stopped at {name}; queued again")
+                        return None
+            name, status, error = None, DONE, None
+        except Exception as e:
+            logger.error(f"Erasure job {job.id} failed at {name}: {e}", exc_info=True)
+            status, error = FAILED, str(e)
+        if not self._save(job.id, status=status, step=name, error=error, finished_at=_utcnow()):
+            return self._lost(job.id)
+        ERASURE_JOBS.labels(status).inc()
+        ERASURE_DURATION.observe(time.perf_counter() - started)
+        logger.info(f"Erasure job {job.id} for user {job.user_id} {status}: {progress}")
+        return self.get(job.id)
+
+    def _lost(self, job_id: str) -> Optional[Dict[str, Any]]:
+        logger.warning(f"Erasure job {job_id} was taken over by another process; stopping")
+        return None
+
+    # Steps: each yields how many items it removed as it goes
+
+    def _erase_documents(self, user_id: int, filter_metadata: Dict[str, Any]) -> Iterator[int]:
+        yield from self.pipeline.delete_document_pages(filter_metadata)
+
+    def _erase_threads(self, user_id: int, filter_metadata: Dict[str, Any]) -> Iterator[int]:
+        if settings.USE_BACKBOARD:
+            backboard = self.backboard_factory()
+            for thread in backboard.list_threads(user_id=user_id):
+                backboard.delete_thread(thread["thread_id"])
+                yield 1
+        db = self.session_factory()
+        try:
+            db.query(BackboardThread).filter(BackboardThread.user_id == user_id).delete(
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _erase_response_cache(
+        self, user_id: int, filter_metadata: Dict[str, Any]
+    ) -> Iterator[int]:
+        cache = get_response_cache()
+        if cache is not None:
+            yield cache.clear(user_id)
+
+    def _erase_briefing_checkpoints(
+        self, user_id: int, filter_metadata: Dict[str, Any]
+    ) -> Iterator[int]:
+        checkpointer = get_briefing_checkpointer()
+        if checkpointer is not None:
+            yield checkpointer.clear(user_id)
+
+    def _erase_daily_briefings(
+        self, user_id: int, filter_metadata: Dict[str, Any]
+    ) -> Iterator[int]:
+        db = self.session_factory()
+        try:
+            removed = (
+                db.query(DailyBriefing)
+                .filter(DailyBriefing.user_id == user_id)
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        yield removed
+
+    def shutdown(self) -> None:
+        # Stop the running job after its current page and drop the queued
+        # ones; they stay unfinished in the table for the next sweep
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _backboard():
+    from app.services.backboard.backboard_service import BackboardService
+
+    return BackboardService(
+        api_key=settings.BACKBOARD_API_KEY, base_url=settings.BACKBOARD_BASE_URL
+    )
+
+
+_service: Optional[ErasureService] = None
+_service_lock = threading.Lock()
+
+
+def get_erasure_service() -> ErasureService:
+    """The process-wide erasure service, created on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ErasureService()
+    return _service
+
+
+def start_erasure_service() -> None:
+    """Resume the erasure jobs left unfinished, and keep sweeping for abandoned ones."""
+    get_erasure_service().start()
+
+
+def stop_erasure_service() -> None:
+    global _service
+    with _service_lock:
+        service, _service = _service, None
+    if service is not None:
+        service.shutdown()
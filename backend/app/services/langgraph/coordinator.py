@@ -1,21 +1,65 @@
+import asyncio
 import logging
 import gc
 import os
-import psutil
+import time
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
 
-from langchain_core.messages import HumanMessage
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
+from app.core.lazy import lazy_import
+from app.services.llm_gateway import INTERACTIVE
+from app.services.llm_router import route_invoke, route_stream
+from app.services.response_cache import cached_response, get_response_cache
+from app.utils.text_formatter import StreamingResponseCleaner, clean_ai_response
 
-from app.core.config import settings
-from app.utils.text_formatter import clean_ai_response
+logger = logging.getLogger(__name__)
 
-from .state import AgentState, create_initial_state
-from .workflow import WorkflowBuilder
+# LangChain, LangGraph and the Groq client are imported on first use so that
+# importing the API router does not pay for them on cold start
+HumanMessage = lazy_import("langchain_core.messages", "HumanMessage")
+create_chat_model = lazy_import("app.services.llm_factory", "create_chat_model")
+
+# Agent analyses streamed as "section" events, in workflow order
+STREAMED_SECTIONS = ("email_analysis", "calendar_analysis", "social_analysis", "notion_analysis")
+
+# Chat agents by agent_type: (metrics node, log label, role instructions).
+# Unknown agent types fall back to "general".
+CHAT_AGENTS = {
+    "email": (
+        "chat_email",
+        "Email agent",
+        "You are an Email Management Agent. Help the user with email-related tasks.",
+    ),
+    "calendar": (
+        "chat_calendar",
+        "Calendar agent",
+        "You are a Calendar Management Agent. Help the user with scheduling and time management.",
+    ),
+    "priority": (
+        "chat_priority",
+        "Priority agent",
+        "You are a Priority Management Agent. Help the user prioritize tasks and manage their workload.",
+    ),
+    "social": (
+        "chat_social",
+        "Social agent",
+        "You are a Social Media Management Agent. Help the user with social media and messaging platforms.",
+    ),
+    "general": (
+        "chat_general",
+        "General",
+        "You are Londoolink AI, an intelligent personal assistant. Help the user with their request.",
+    ),
+}
+
+CHAT_PROMPT = """{role}
+            
+            User message: {message}
+            
+            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
 
-logger = logging.getLogger(__name__)
+# Strong references to fire-and-forget SMS tasks so they are not collected
+_background_tasks: Set[asyncio.Task] = set()
 
 # Memory threshold in MB
 MEMORY_THRESHOLD = 300  # MB
@@ -24,6 +68,8 @@ class MemoryManager:
     @staticmethod
     def get_memory_usage() -> float:
         """Get current process memory usage in MB"""
+        import psutil
+
         process = psutil.Process(os.getpid())
         return process.memory_info().rss / (1024 * 1024)  # Convert to MB
 
@@ -93,10 +139,10 @@ class LangGraphCoordinator:
         config = self.MODEL_CONFIGS[self.model_size]
         logger.info(f"Loading {self.model_size} model with config: {config}")
         
-        return ChatGroq(
-            model=config['model_name'],
-            temperature=config['temperature'],
-            groq_api_key=settings.GROQ_API_KEY,
+        return create_chat_model(
+            "groq",
+            config['model_name'],
+            config['temperature'],
             max_tokens=config['max_tokens'],
             timeout=config['timeout'],
         )
@@ -112,40 +158,51 @@ class LangGraphCoordinator:
         if self.workflow_builder is not None:
             del self.workflow_builder
             self.workflow_builder = None
-        MemoryManager.free_memory()
 
-    def get_daily_briefing(self, user_id: int) -> Dict[str, Any]:
-        # Generate daily briefing using LangGraph multi-agent workflow
+    def _get_graph(self):
+        # Build graph lazily if not yet initialized
+        if self.graph is None:
+            from app.services.langgraph.workflow import WorkflowBuilder
+            self.workflow_builder = WorkflowBuilder()
+            self.graph = self.workflow_builder.build_workflow()
+        return self.graph
+
+    @staticmethod
+    def _build_briefing(user_id: int, result: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "generated_at": datetime.utcnow().isoformat(),
+            "email_insights": result.get("email_analysis", {}),
+            "calendar_insights": result.get("calendar_analysis", {}),
+            "social_insights": result.get("social_analysis", {}),
+            "priority_recommendations": result.get("priority_recommendations", {}),
+            "summary": result.get("final_briefing", "No briefing generated"),
+            "workflow_status": "completed",
+            "agent_framework": "langgraph",
+        }
+
+    def get_daily_briefing(self, user_id: int, notify_urgent: bool = True) -> Dict[str, Any]:
+        # Generate daily briefing using LangGraph multi-agent workflow.
+        # Callers running this in a worker thread pass notify_urgent=False and
+        # call schedule_urgent_sms() from the event loop afterwards.
         try:
             logger.info(f"Starting LangGraph daily briefing for user {user_id}")
 
-            # Build graph lazily if not yet initialized
-            if self.graph is None:
-                from app.services.langgraph.workflow import WorkflowBuilder
-                self.workflow_builder = WorkflowBuilder()
-                self.graph = self.workflow_builder.build_workflow()
+            graph = self._get_graph()
+
+            from .state import create_initial_state
 
             # Initialize state
             initial_state = create_initial_state(user_id)
 
             # Run the workflow
-            result = self.graph.invoke(initial_state)
+            result = graph.invoke(initial_state)
 
-            briefing = {
-                "user_id": user_id,
-                "generated_at": datetime.utcnow().isoformat(),
-                "email_insights": result.get("email_analysis", {}),
-                "calendar_insights": result.get("calendar_analysis", {}),
-                "social_insights": result.get("social_analysis", {}),
-                "priority_recommendations": result.get("priority_recommendations", {}),
-                "summary": result.get("final_briefing", "No briefing generated"),
-                "workflow_status": "completed",
-                "agent_framework": "langgraph",
-            }
+            briefing = self._build_briefing(user_id, result)
 
             # Send SMS for urgent items
-            import asyncio
-            asyncio.create_task(self._send_urgent_sms(user_id, briefing))
+            if notify_urgent:
+                self.schedule_urgent_sms(user_id, briefing)
 
             return briefing
 
@@ -160,6 +217,77 @@ class LangGraphCoordinator:
                 "agent_framework": "langgraph",
             }
 
+    def stream_daily_briefing(self, user_id: int) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Run the briefing workflow, yielding ``(event, payload)`` as it progresses.
+
+        Events, in order:
+            section: an agent analysis (``email_analysis``, ...) once its node completes
+            token: a chunk of the priority agent's ``final_briefing`` as the LLM streams it
+            done: the full briefing, same shape as :meth:`get_daily_briefing`
+            error: the workflow failed; nothing follows
+
+        Blocking; run it on a worker thread. Urgent SMS is left to the caller.
+        """
+        try:
+            logger.info(f"Streaming LangGraph daily briefing for user {user_id}")
+            graph = self._get_graph()
+
+            from langchain_core.messages import AIMessageChunk
+
+            from .state import create_initial_state
+
+            result: Dict[str, Any] = dict(create_initial_state(user_id))
+            emitted: Set[str] = set()
+
+            # "updates" yields each node's state when it completes; "messages"
+            # yields LLM tokens, which ChatGroq streams once a handler is attached
+            for mode, chunk in graph.stream(result, stream_mode=["updates", "messages"]):
+                if mode == "messages":
+                    message, metadata = chunk
+                    if (
+                        metadata.get("langgraph_node") == "priority_agent"
+                        and isinstance(message, AIMessageChunk)
+                        and message.content
+                    ):
+                        yield "token", {"section": "final_briefing", "text": message.content}
+                    continue
+
+                for update in chunk.values():
+                    if not update:
+                        continue
+                    result.update(update)
+                    for section in STREAMED_SECTIONS:
+                        if section not in emitted and result.get(section):
+                            emitted.add(section)
+                            yield "section", {"section": section, **result[section]}
+
+            yield "done", self._build_briefing(user_id, result)
+
+        except Exception as e:
+            logger.error(f"LangGraph streaming workflow failed: {e}")
+            yield "error", {
+                "user_id": user_id,
+                "error": str(e),
+                "summary": "Failed to generate daily briefing due to workflow error",
+                "workflow_status": "error",
+            }
+
+    def schedule_urgent_sms(self, user_id: int, briefing: Dict[str, Any]) -> None:
+        """Send urgent-item SMS in the background on the running event loop."""
+        try:
+            task = asyncio.get_running_loop().create_task(
+                self._send_urgent_sms(user_id, briefing)
+            )
+        except RuntimeError:
+            logger.warning("No running event loop; skipping urgent SMS check")
+            return
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    def send_urgent_sms(self, user_id: int, briefing: Dict[str, Any]) -> None:
+        """Blocking urgent-item SMS check, for worker threads without an event loop."""
+        asyncio.run(self._send_urgent_sms(user_id, briefing))
+
     async def _send_urgent_sms(self, user_id: int, briefing: Dict[str, Any]) -> None:
         """Send SMS alerts for urgent priority items."""
         try:
@@ -191,8 +319,11 @@ class LangGraphCoordinator:
         except Exception as e:
             logger.error(f"Failed to send urgent SMS: {e}")
 
-    def analyze_document(self, content: str, document_type: str) -> Dict[str, Any]:
-        # Analyze a document using appropriate agent logic
+    def analyze_document(
+        self, content: str, document_type: str, user_id: Optional[int] = None
+    ) -> Dict[str, Any]:
+        # Analyze a document using appropriate agent logic; repeated analyses of
+        # the same content for the same user are served from the response cache
         try:
             logger.info(f"Analyzing {document_type} document with LangGraph")
 
@@ -225,10 +356,19 @@ class LangGraphCoordinator:
                agent_type = "video"
                prompt = f"Analyze this video context:\n\n{content}"  
             messages = [HumanMessage(content=prompt)]
-            response = self.llm.invoke(messages)
+            analysis = cached_response(
+                "document",
+                "document_analysis",
+                user_id,
+                self.llm,
+                prompt,
+                lambda: clean_ai_response(
+                    route_invoke("document", self.llm, messages, "document_analysis").content
+                ),
+            )
 
             return {
-                "analysis": clean_ai_response(response.content),
+                "analysis": analysis,
                 "status": "completed",
                 "agent_type": agent_type,
                 "document_type": document_type,
@@ -246,95 +386,100 @@ class LangGraphCoordinator:
                 "framework": "langgraph",
             }
 
-    def chat_with_email_agent(self, user_id: int, message: str) -> str:
-        """Chat with the email agent"""
+    def _chat_prompt(self, agent_type: str, user_id: int, message: str) -> Tuple[str, str]:
+        # Returns (metrics node, prompt) for an agent chat
+        node, label, role = CHAT_AGENTS.get(agent_type, CHAT_AGENTS["general"])
+        logger.info(f"{label} chat for user {user_id}: {message[:50]}...")
+        return node, CHAT_PROMPT.format(role=role, message=message)
+
+    def _chat(self, agent_type: str, user_id: int, message: str) -> str:
         try:
-            logger.info(f"Email agent chat for user {user_id}: {message[:50]}...")
-            
-            prompt = f"""You are an Email Management Agent. Help the user with email-related tasks.
-            
-            User message: {message}
-            
-            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
-            
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return clean_ai_response(response.content)
-            
+            node, prompt = self._chat_prompt(agent_type, user_id, message)
+
+            def call() -> str:
+                response = route_invoke(
+                    "chat",
+                    self.llm,
+                    [HumanMessage(content=prompt)],
+                    node,
+                    user_id=user_id,
+                    priority=INTERACTIVE,
+                )
+                return clean_ai_response(response.content)
+
+            return cached_response(
+                "chat", node, user_id, self.llm, prompt, call, semantic_text=message
+            )
+
         except Exception as e:
-            logger.error(f"Email agent chat failed: {e}")
+            label = CHAT_AGENTS.get(agent_type, CHAT_AGENTS["general"])[1]
+            logger.error(f"{label} chat failed: {e}")
             return f"I'm having trouble processing your request right now. Error: {str(e)}"
 
+    def chat_with_email_agent(self, user_id: int, message: str) -> str:
+        """Chat with the email agent"""
+        return self._chat("email", user_id, message)
+
     def chat_with_calendar_agent(self, user_id: int, message: str) -> str:
         """Chat with the calendar agent"""
-        try:
-            logger.info(f"Calendar agent chat for user {user_id}: {message[:50]}...")
-            
-            prompt = f"""You are a Calendar Management Agent. Help the user with scheduling and time management.
-            
-            User message: {message}
-            
-            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
-            
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return clean_ai_response(response.content)
-            
-        except Exception as e:
-            logger.error(f"Calendar agent chat failed: {e}")
-            return f"I'm having trouble processing your request right now. Error: {str(e)}"
+        return self._chat("calendar", user_id, message)
 
     def chat_with_priority_agent(self, user_id: int, message: str) -> str:
         """Chat with the priority agent"""
-        try:
-            logger.info(f"Priority agent chat for user {user_id}: {message[:50]}...")
-            
-            prompt = f"""You are a Priority Management Agent. Help the user prioritize tasks and manage their workload.
-            
-            User message: {message}
-            
-            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
-            
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return clean_ai_response(response.content)
-            
-        except Exception as e:
-            logger.error(f"Priority agent chat failed: {e}")
-            return f"I'm having trouble processing your request right now. Error: {str(e)}"
+        return self._chat("priority", user_id, message)
 
     def chat_with_social_agent(self, user_id: int, message: str) -> str:
         """Chat with the social agent"""
-        try:
-            logger.info(f"Social agent chat for user {user_id}: {message[:50]}...")
-            
-            prompt = f"""You are a Social Media Management Agent. Help the user with social media and messaging platforms.
-            
-            User message: {message}
-            
-            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
-            
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return clean_ai_response(response.content)
-            
-        except Exception as e:
-            logger.error(f"Social agent chat failed: {e}")
-            return f"I'm having trouble processing your request right now. Error: {str(e)}"
+        return self._chat("social", user_id, message)
 
     def general_chat(self, user_id: int, message: str) -> str:
         """General chat functionality"""
-        try:
-            logger.info(f"General chat for user {user_id}: {message[:50]}...")
-            
-            prompt = f"""You are Londoolink AI, an intelligent personal assistant. Help the user with their request.
-            
-            User message: {message}
-            
-            Keep your response brief and friendly (2-3 sentences max). Be casual and helpful."""
-            
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            return clean_ai_response(response.content)
-            
-        except Exception as e:
-            logger.error(f"General chat failed: {e}")
-            return f"I'm having trouble processing your request right now. Error: {str(e)}"
+        return self._chat("general", user_id, message)
+
+    def stream_chat(self, user_id: int, agent_type: str, message: str) -> Iterator[str]:
+        """Stream an agent chat reply as cleaned text chunks while the LLM writes it.
+
+        Joined, the chunks match what the corresponding ``chat_with_*``
+        method returns. Markdown is cleaned incrementally, so a chunk may be
+        held back briefly until its formatting is unambiguous. Blocking; run
+        it on a worker thread. LLM errors propagate to the caller. A cached
+        reply (see :meth:`_chat`) is sent as a single chunk.
+        """
+        node, prompt = self._chat_prompt(agent_type, user_id, message)
+        cache = get_response_cache()
+        if cache is not None:
+            cached = cache.get("chat", node, user_id, self.llm, prompt, message)
+            if cached is not None:
+                yield cached
+                return
+
+        started = time.perf_counter()
+        cleaner = StreamingResponseCleaner()
+        messages = [HumanMessage(content=prompt)]
+        tokens = route_stream(
+            "chat", self.llm, messages, node, user_id=user_id, priority=INTERACTIVE
+        )
+        parts = []
+        for token in tokens:
+            text = cleaner.feed(token)
+            if text:
+                parts.append(text)
+                yield text
+        text = cleaner.finish()
+        if text:
+            parts.append(text)
+            yield text
+        if cache is not None:
+            cache.put(
+                "chat",
+                node,
+                user_id,
+                self.llm,
+                prompt,
+                "".join(parts),
+                time.perf_counter() - started,
+                message,
+            )
 
 
 # Global LangGraph coordinator instance
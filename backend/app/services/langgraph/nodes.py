@@ -2,9 +2,12 @@ import logging
 from datetime import datetime
 
 from langchain_core.messages import HumanMessage
-from langchain_groq import ChatGroq
 
-from app.core.config import settings
+from app.core.tracing import traced
+from app.services.briefing_retrieval import prefetch_briefing_context, with_retrieved_documents
+from app.services.context_budget import assemble_briefing_context
+from app.services.llm_factory import create_chat_model
+from app.services.llm_hedge import hedged_invoke
 from app.utils.text_formatter import clean_ai_response
 
 from .state import AgentState
@@ -16,13 +19,21 @@ class AgentNodes:
     # Collection of agent nodes for LangGraph workflow
 
     def __init__(self):
-        self.llm = ChatGroq(
-            model="llama-3.1-8b-instant",
-            temperature=0.1,
-            api_key=settings.GROQ_API_KEY,
-            max_tokens=4096,
-        )
+        self.llm = create_chat_model("groq", "llama-3.1-8b-instant", 0.1, max_tokens=4096)
+
+    @traced("workflow.retrieval")
+    def retrieval_node(self, state: AgentState) -> AgentState:
+        # Fetch every source agent's documents up front in one batched search
+        try:
+            state["retrieved_context"] = prefetch_briefing_context(state["user_id"])
+        except Exception as e:
+            # Agents still run on their generic prompts without user data
+            logger.error(f"Briefing retrieval prefetch failed: {e}")
+            state["retrieved_context"] = {}
+
+        return state
 
+    @traced("workflow.coordinator")
     def coordinator_node(self, state: AgentState) -> AgentState:
         # Main coordinator node that orchestrates the multi-agent workflow
         logger.info(
@@ -51,6 +62,7 @@ class AgentNodes:
 
         return state
 
+    @traced("llm.email_agent")
     def email_agent_node(self, state: AgentState) -> AgentState:
         # Email analysis agent node
         logger.info("Running email agent analysis")
@@ -66,8 +78,16 @@ class AgentNodes:
             Use the available tools to search through emails and provide insights.
             Focus on actionable items and time-sensitive communications."""
 
-            messages = [HumanMessage(content=email_prompt)]
-            response = self.llm.invoke(messages)
+            messages = [
+                HumanMessage(content=with_retrieved_documents(email_prompt, state, "email"))
+            ]
+            response = hedged_invoke(
+                self.llm,
+                messages,
+                "email_agent",
+                route="briefing",
+                user_id=state.get("user_id"),
+            )
 
             state["email_analysis"] = {
                 "analysis": clean_ai_response(response.content),
@@ -88,6 +108,7 @@ class AgentNodes:
 
         return state
 
+    @traced("llm.calendar_agent")
     def calendar_agent_node(self, state: AgentState) -> AgentState:
         # Calendar analysis agent node
         logger.info("Running calendar agent analysis")
@@ -104,8 +125,16 @@ class AgentNodes:
             Use available tools to search calendar events and provide insights.
             Focus on time management and preparation needs."""
 
-            messages = [HumanMessage(content=calendar_prompt)]
-            response = self.llm.invoke(messages)
+            messages = [
+                HumanMessage(content=with_retrieved_documents(calendar_prompt, state, "calendar"))
+            ]
+            response = hedged_invoke(
+                self.llm,
+                messages,
+                "calendar_agent",
+                route="briefing",
+                user_id=state.get("user_id"),
+            )
 
             state["calendar_analysis"] = {
                 "analysis": clean_ai_response(response.content),
@@ -126,6 +155,7 @@ class AgentNodes:
 
         return state
 
+    @traced("llm.social_agent")
     def social_agent_node(self, state: AgentState) -> AgentState:
         # Social media analysis agent node
         logger.info("Running social agent analysis")
@@ -142,8 +172,16 @@ class AgentNodes:
             Use available tools to search through social messages and provide insights.
             Focus on relationship management and urgent communications."""
 
-            messages = [HumanMessage(content=social_prompt)]
-            response = self.llm.invoke(messages)
+            messages = [
+                HumanMessage(content=with_retrieved_documents(social_prompt, state, "social"))
+            ]
+            response = hedged_invoke(
+                self.llm,
+                messages,
+                "social_agent",
+                route="briefing",
+                user_id=state.get("user_id"),
+            )
 
             state["social_analysis"] = {
                 "analysis": clean_ai_response(response.content),
@@ -164,6 +202,7 @@ class AgentNodes:
 
         return state
 
+    @traced("llm.notion_agent")
     def notion_agent_node(self, state: AgentState) -> AgentState:
         # Notion analysis agent node
         logger.info("Running notion agent analysis")
@@ -180,8 +219,16 @@ class AgentNodes:
             Use available tools to search Notion content and provide insights.
             Focus on actionable items and relevant knowledge."""
 
-            messages = [HumanMessage(content=notion_prompt)]
-            response = self.llm.invoke(messages)
+            messages = [
+                HumanMessage(content=with_retrieved_documents(notion_prompt, state, "notion"))
+            ]
+            response = hedged_invoke(
+                self.llm,
+                messages,
+                "notion_agent",
+                route="briefing",
+                user_id=state.get("user_id"),
+            )
 
             state["notion_analysis"] = {
                 "analysis": clean_ai_response(response.content),
@@ -202,6 +249,7 @@ class AgentNodes:
 
         return state
 
+    @traced("llm.priority_agent")
     def priority_agent_node(self, state: AgentState) -> AgentState:
         # Priority synthesis and briefing agent node
         logger.info("Running priority agent synthesis")
@@ -221,21 +269,22 @@ class AgentNodes:
                 "analysis", "No notion analysis"
             )
 
+            # Dedupe and trim them to the prompt token budget
+            context = assemble_briefing_context(
+                {
+                    "email": email_analysis,
+                    "calendar": calendar_analysis,
+                    "social": social_analysis,
+                    "notion": notion_analysis,
+                },
+                node="priority_agent",
+            )
+
             priority_prompt = f"""You are the Master Prioritization Agent for Londoolink AI.
             
             Based on the following analyses from specialized agents, create a comprehensive daily briefing:
             
-            EMAIL ANALYSIS:
-            {email_analysis}
-            
-            CALENDAR ANALYSIS:
-            {calendar_analysis}
-            
-            SOCIAL ANALYSIS:
-            {social_analysis}
-            
-            NOTION ANALYSIS:
-            {notion_analysis}
+{context.render()}
             
             Create a prioritized daily briefing that includes:
             1. TOP PRIORITIES: Most urgent items requiring immediate attention
@@ -248,7 +297,13 @@ class AgentNodes:
             Be concise but comprehensive. Focus on actionable items."""
 
             messages = [HumanMessage(content=priority_prompt)]
-            response = self.llm.invoke(messages)
+            response = hedged_invoke(
+                self.llm,
+                messages,
+                "priority_agent",
+                route="briefing",
+                user_id=state.get("user_id"),
+            )
 
             state["priority_recommendations"] = {
                 "analysis": clean_ai_response(response.content),
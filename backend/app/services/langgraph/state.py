@@ -8,6 +8,7 @@ class AgentState(TypedDict):
     messages: Annotated[List[BaseMessage], "The conversation messages"]
     user_id: int
     user_query: str
+    retrieved_context: Dict[str, List[Dict[str, Any]]]
     email_analysis: Dict[str, Any]
     calendar_analysis: Dict[str, Any]
     social_analysis: Dict[str, Any]
@@ -28,6 +29,7 @@ def create_initial_state(
         messages=[],
         user_id=user_id,
         user_query=user_query,
+        retrieved_context={},
         email_analysis={},
         calendar_analysis={},
         social_analysis={},
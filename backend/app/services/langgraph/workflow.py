@@ -1,6 +1,7 @@
 from langgraph.graph import END, StateGraph
 from langgraph.prebuilt import ToolNode
 
+from app.services.briefing_checkpoints import CHECKPOINTED_NODES, get_briefing_checkpointer
 from app.services.tools import get_all_tools
 
 from .nodes import AgentNodes
@@ -15,17 +16,35 @@ class WorkflowBuilder:
         self.tools = get_all_tools()
         self.agent_nodes = AgentNodes()
         self.routing = WorkflowRouting()
+        self.checkpointer = get_briefing_checkpointer()
+
+    def _node(self, name, node):
+        # Agent nodes reuse their checkpointed output when a retry finds one
+        if self.checkpointer is None or name not in CHECKPOINTED_NODES:
+            return node
+        return self.checkpointer.wrap(name, node)
 
     def build_workflow(self) -> StateGraph:
         # Create the LangGraph workflow for multi-agent coordination
         workflow = StateGraph(AgentState)
 
         # Add nodes for each agent
-        workflow.add_node("email_agent", self.agent_nodes.email_agent_node)
-        workflow.add_node("calendar_agent", self.agent_nodes.calendar_agent_node)
-        workflow.add_node("social_agent", self.agent_nodes.social_agent_node)
-        workflow.add_node("notion_agent", self.agent_nodes.notion_agent_node)
-        workflow.add_node("priority_agent", self.agent_nodes.priority_agent_node)
+        workflow.add_node(
+            "email_agent", self._node("email_agent", self.agent_nodes.email_agent_node)
+        )
+        workflow.add_node(
+            "calendar_agent", self._node("calendar_agent", self.agent_nodes.calendar_agent_node)
+        )
+        workflow.add_node(
+            "social_agent", self._node("social_agent", self.agent_nodes.social_agent_node)
+        )
+        workflow.add_node(
+            "notion_agent", self._node("notion_agent", self.agent_nodes.notion_agent_node)
+        )
+        workflow.add_node(
+            "priority_agent", self._node("priority_agent", self.agent_nodes.priority_agent_node)
+        )
+        workflow.add_node("retrieval", self.agent_nodes.retrieval_node)
         workflow.add_node("coordinator", self.agent_nodes.coordinator_node)
 
         # Add tool node for RAG operations
@@ -33,7 +52,8 @@ class WorkflowBuilder:
         workflow.add_node("tools", tool_node)
 
         # Define the workflow edges
-        workflow.set_entry_point("coordinator")
+        workflow.set_entry_point("retrieval")
+        workflow.add_edge("retrieval", "coordinator")
 
         # Coordinator decides which agents to run
         workflow.add_conditional_edges(
@@ -0,0 +1,251 @@
+"""Record/replay chat models for offline runs (see :mod:`app.services.llm_factory`).
+
+The cassette is a JSON-lines file of calls: provider, model, prompt,
+response, token usage, total latency and, for streamed calls, the time to
+the first token and the chunks. Replay matches on provider and prompt.
+Repeated prompts are answered in recorded order, preferring recordings from
+the requested model, so a run over the same inputs is deterministic. A
+prompt that was never recorded raises :class:`CassetteMissError`.
+
+Both models report the provider and model they stand in for, so the gateway
+budgets, model routing and metrics treat them like the real client.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import Field
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Field holding the model name on each provider's client
+MODEL_FIELDS = {"groq": "model_name", "gemini": "model"}
+
+
+class CassetteMissError(LookupError):
+    """A replayed prompt has no recording in the cassette."""
+
+
+def prompt_key(provider: str, messages: List[BaseMessage]) -> str:
+    payload = [provider, [[message.type, message.content] for message in messages]]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class Cassette:
+    """Recorded LLM calls in a JSON-lines file, replayed in recorded order per prompt."""
+
+    def __init__(
+        self,
+        path: str,
+        latency_scale: float = 1.0,
+        extra_latency: float = 0.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.path = path
+        self.latency_scale = latency_scale
+        self.extra_latency = extra_latency
+        self.sleep = sleep
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._next: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._entries.values())
+
+    def delay(self, recorded: float) -> float:
+        # Injected latency for a recorded duration
+        return max(0.0, recorded * self.latency_scale + self.extra_latency)
+
+    def record(
+        self,
+        provider: str,
+        model: str,
+        messages: List[BaseMessage],
+        response: AIMessage,
+        latency: float,
+        first_token: Optional[float] = None,
+        chunks: Optional[List[str]] = None,
+    ) -> None:
+        entry = {
+            "key": prompt_key(provider, messages),
+            "provider": provider,
+            "model": model,
+            "prompt": [[message.type, message.content] for message in messages],
+            "response": response.content,
+            "usage": response.usage_metadata,
+            "latency": round(latency, 4),
+            "first_token": None if first_token is None else round(first_token, 4),
+            "chunks": chunks,
+        }
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._entries.setdefault(entry["key"], []).append(entry)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def replay(self, provider: str, model: str, messages: List[BaseMessage]) -> Dict[str, Any]:
+        key = prompt_key(provider, messages)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                raise CassetteMissError(
+                    f"No recorded {provider}/{model} response for prompt {key[:12]} in "
+                    f"{self.path}; record it with LLM_BACKEND=record"
+                )
+            start = self._next.get(key, 0)
+            order = [(start + offset) % len(entries) for offset in range(len(entries))]
+            index = next((i for i in order if entries[i]["model"] == model), order[0])
+            self._next[key] = (index + 1) % len(entries)
+            return entries[index]
+
+
+class RecordingChatModel(BaseChatModel):
+    """Live chat model whose calls are appended to a cassette."""
+
+    inner: Any
+    provider: str
+    model_name: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    cassette: Any = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.provider}-recording"
+
+    def _cassette(self) -> Cassette:
+        return self.cassette if self.cassette is not None else get_cassette()
+
+    def model_copy(self, *, update=None, deep: bool = False):
+        # The router swaps models by name; the live client has to follow
+        copy = super().model_copy(update=update, deep=deep)
+        if update and "model_name" in update:
+            field = MODEL_FIELDS.get(self.provider, "model_name")
+            copy.inner = self.inner.model_copy(update={field: update["model_name"]})
+        return copy
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        started = time.perf_counter()
+        response = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._cassette().record(
+            self.provider, self.model_name, messages, response, time.perf_counter() - started
+        )
+        return ChatResult(generations=[ChatGeneration(message=response)])
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        started = time.perf_counter()
+        first_token = None
+        aggregate = None
+        chunks: List[str] = []
+        for chunk in self.inner.stream(messages, stop=stop, **kwargs):
+            if first_token is None:
+                first_token = time.perf_counter() - started
+            aggregate = chunk if aggregate is None else aggregate + chunk
+            if chunk.content:
+                chunks.append(chunk.content)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(generation.text, chunk=generation)
+            yield generation
+        response = AIMessage(
+            content="".join(chunks),
+            usage_metadata=getattr(aggregate, "usage_metadata", None),
+        )
+        self._cassette().record(
+            self.provider,
+            self.model_name,
+            messages,
+            response,
+            time.perf_counter() - started,
+            first_token,
+            chunks,
+        )
+
+
+class ReplayChatModel(BaseChatModel):
+    """Chat model that answers from a cassette with injected latency."""
+
+    provider: str
+    model_name: str
+    temperature: Optional[float] = None
+    max_tokens: Optional[int] = None
+    cassette: Any = Field(default=None, exclude=True)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"{self.provider}-replay"
+
+    def _cassette(self) -> Cassette:
+        return self.cassette if self.cassette is not None else get_cassette()
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        cassette = self._cassette()
+        entry = cassette.replay(self.provider, self.model_name, messages)
+        cassette.sleep(cassette.delay(entry["latency"]))
+        message = AIMessage(content=entry["response"], usage_metadata=entry.get("usage"))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(
+        self, messages, stop=None, run_manager=None, **kwargs
+    ) -> Iterator[ChatGenerationChunk]:
+        cassette = self._cassette()
+        entry = cassette.replay(self.provider, self.model_name, messages)
+        chunks = entry.get("chunks") or [entry["response"]]
+        latency = entry["latency"]
+        first_token = entry.get("first_token")
+        first_token = latency if first_token is None else first_token
+        # First token after its recorded delay, the rest spread over the remainder
+        gap = (latency - first_token) / max(1, len(chunks) - 1) * cassette.latency_scale
+        for index, text in enumerate(chunks):
+            cassette.sleep(cassette.delay(first_token) if index == 0 else max(0.0, gap))
+            last = index == len(chunks) - 1
+            chunk = AIMessageChunk(
+                content=text, usage_metadata=entry.get("usage") if last else None
+            )
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=generation)
+            yield generation
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(
+                    settings.LLM_CASSETTE_PATH,
+                    latency_scale=settings.LLM_REPLAY_LATENCY_SCALE,
+                    extra_latency=settings.LLM_REPLAY_EXTRA_LATENCY_SECONDS,
+                )
+                logger.info(
+                    f"LLM {settings.LLM_BACKEND} cassette {settings.LLM_CASSETTE_PATH}: "
+                    f"{len(_cassette)} recorded calls"
+                )
+    return _cassette
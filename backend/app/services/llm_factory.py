@@ -0,0 +1,86 @@
+"""Chat model construction, with record/replay backends for offline runs.
+
+Every Groq and Gemini chat model in the app is built by
+:func:`create_chat_model`. ``LLM_BACKEND`` selects what it returns:
+
+* ``live`` (default): the provider's LangChain client,
+* ``record``: the live client wrapped so each call's prompt, response,
+  token usage and timing (total and first token) are appended to the
+  cassette at ``LLM_CASSETTE_PATH``,
+* ``replay``: no provider at all; responses come from the cassette, after
+  the recorded latency times ``LLM_REPLAY_LATENCY_SCALE`` plus
+  ``LLM_REPLAY_EXTRA_LATENCY_SECONDS``.
+
+See :mod:`app.services.llm_cassette` for the recording format and matching.
+"""
+
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.core.lazy import lazy_import
+
+# Provider clients and the cassette models (LangChain core) load on first use
+ChatGroq = lazy_import("langchain_groq", "ChatGroq")
+ChatGoogleGenerativeAI = lazy_import("langchain_google_genai", "ChatGoogleGenerativeAI")
+RecordingChatModel = lazy_import("app.services.llm_cassette", "RecordingChatModel")
+ReplayChatModel = lazy_import("app.services.llm_cassette", "ReplayChatModel")
+
+BACKENDS = ("live", "record", "replay")
+
+
+def _live_model(
+    provider: str,
+    model: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    timeout: Optional[float],
+):
+    if provider == "groq":
+        options: Dict[str, Any] = {}
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        if timeout is not None:
+            options["timeout"] = timeout
+        return ChatGroq(
+            model=model, temperature=temperature, api_key=settings.GROQ_API_KEY, **options
+        )
+    if provider == "gemini":
+        options = {}
+        if max_tokens is not None:
+            options["max_output_tokens"] = max_tokens
+        if timeout is not None:
+            options["timeout"] = timeout
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            google_api_key=settings.GEMINI_API_KEY,
+            **options,
+        )
+    raise ValueError(f"Unknown LLM provider {provider!r}")
+
+
+def create_chat_model(
+    provider: str,
+    model: str,
+    temperature: float,
+    max_tokens: Optional[int] = None,
+    timeout: Optional[float] = None,
+):
+    """Chat model for *provider* (``groq`` or ``gemini``) as selected by ``LLM_BACKEND``."""
+    backend = settings.LLM_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"LLM_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    if backend == "replay":
+        return ReplayChatModel(
+            provider=provider, model_name=model, temperature=temperature, max_tokens=max_tokens
+        )
+    live = _live_model(provider, model, temperature, max_tokens, timeout)
+    if backend == "record":
+        return RecordingChatModel(
+            inner=live,
+            provider=provider,
+            model_name=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+    return live
@@ -0,0 +1,501 @@
+"""Central gateway for LLM provider calls.
+
+Every chat model call (LangGraph nodes, agent chat, document analysis and
+the Gemini agents) goes through :func:`invoke_llm` or :func:`stream_llm`.
+Calls are admitted against per-model request and token budgets, so a burst
+queues here instead of turning into a cascade of provider 429s:
+
+* each (provider, model) has a sliding one-minute window of requests and
+  tokens, which is how Groq and Gemini account their RPM/TPM limits. A call
+  reserves its estimated prompt tokens plus an expected completion and is
+  settled with the provider-reported usage when it returns,
+* waiting calls are served by priority (interactive chat, then on-demand
+  work, then background precomputation) and, within a priority,
+  round-robin across users so one user's burst cannot starve the others.
+  Priority only orders the queue, so a share of every budget is also
+  reserved for interactive calls; otherwise a background burst admitted a
+  moment earlier would hold chat up for the rest of the minute,
+* a 429 that still gets through (another process sharing the API key)
+  pauses that model's budget for the provider's ``Retry-After`` and the
+  call is retried through the queue.
+
+Budgets are per process: with several API workers sharing one key, divide
+the configured limits between them. Providers without configured limits
+pass straight through. The clock is injectable, so tests drive the gateway
+with a fake clock and a fake provider that enforces its own limits.
+"""
+
+import contextvars
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import (
+    LLM_CALLS,
+    LLM_FIRST_TOKEN,
+    LLM_QUEUE_WAIT,
+    LLM_RATE_LIMITED,
+    record_llm_response,
+)
+from app.services.admission import AdmissionRejectedError
+from app.services.context_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Call priorities, most urgent first
+INTERACTIVE = 0  # chat replies a user is waiting on
+STANDARD = 1     # on-demand briefings and document analysis
+BACKGROUND = 2   # scheduled precomputation
+PRIORITY_NAMES = ("interactive", "standard", "background")
+
+WINDOW_SECONDS = 60.0
+
+# Pause after a 429 that carries no Retry-After header
+DEFAULT_RATE_LIMIT_PAUSE = 10.0
+
+ModelKey = Tuple[str, str]
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar("llm_priority", default=STANDARD)
+_user: contextvars.ContextVar[Optional[Hashable]] = contextvars.ContextVar("llm_user", default=None)
+
+
+@contextmanager
+def llm_context(priority: Optional[int] = None, user_id: Optional[Hashable] = None) -> Iterator[None]:
+    """Default priority and user for LLM calls made inside the block.
+
+    The context follows the work into LangGraph nodes, so the scheduler can
+    mark a whole briefing workflow as background work.
+    """
+    tokens = []
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    if user_id is not None:
+        tokens.append((_user, _user.set(user_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def model_key(llm) -> ModelKey:
+    # (provider, model) of a LangChain chat model; budgets are kept per key
+    name = type(llm).__name__
+    if "Groq" in name:
+        provider = "groq"
+    elif "Google" in name or "Gemini" in name:
+        provider = "gemini"
+    else:
+        provider = getattr(llm, "provider", None)
+        if not isinstance(provider, str):
+            provider = name.lower()
+    for attribute in ("model_name", "model"):
+        model = getattr(llm, attribute, None)
+        if isinstance(model, str):
+            return provider, model
+    return provider, "default"
+
+
+def prompt_tokens(messages) -> int:
+    # Estimated tokens of a prompt given as a string or a list of messages
+    if isinstance(messages, str):
+        return estimate_tokens(messages)
+    return estimate_tokens("\n".join(str(getattr(message, "content", message)) for message in messages))
+
+
+def completion_tokens(llm) -> int:
+    # Completion tokens a call is expected to use until usage is known
+    completion = settings.LLM_COMPLETION_TOKEN_ESTIMATE
+    max_tokens = getattr(llm, "max_tokens", None)
+    if isinstance(max_tokens, int) and max_tokens > 0:
+        completion = min(completion, max_tokens)
+    return completion
+
+
+def estimate_call_tokens(llm, messages) -> int:
+    return prompt_tokens(messages) + completion_tokens(llm)
+
+
+def used_tokens(response, estimate: int) -> int:
+    # Provider-reported total, falling back to the estimate
+    usage = getattr(response, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        return estimate
+    total = usage.get("total_tokens") or (usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+    return total or estimate
+
+
+def rate_limit_retry_after(error: BaseException) -> Optional[float]:
+    # Seconds to pause a model after a provider 429; None for other errors
+    status = getattr(error, "status_code", None)
+    if status != 429 and getattr(error, "code", None) != 429:
+        if type(error).__name__ not in ("RateLimitError", "ResourceExhausted"):
+            return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(1.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return DEFAULT_RATE_LIMIT_PAUSE
+
+
+class RateBudget:
+    """Sliding one-minute request and token window for one provider model.
+
+    A limit of zero or less leaves that dimension unlimited.
+    """
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float) -> None:
+        self.requests_per_minute = int(requests_per_minute) if requests_per_minute > 0 else 0
+        self.tokens_per_minute = int(tokens_per_minute) if tokens_per_minute > 0 else 0
+        if 0 < requests_per_minute < 1:
+            self.requests_per_minute = 1
+        # [started_at, tokens] of every call admitted in the last minute
+        self._window: Deque[List[float]] = deque()
+        self._tokens = 0.0
+        self._paused_until = 0.0
+
+    def clamp(self, tokens: int) -> int:
+        # A call larger than the whole token budget would never fit
+        if self.tokens_per_minute:
+            return min(tokens, self.tokens_per_minute)
+        return tokens
+
+    def _expire(self, now: float) -> None:
+        while self._window and self._window[0][0] <= now - WINDOW_SECONDS:
+            self._tokens -= self._window.popleft()[1]
+
+    def delay(self, tokens: int, now: float, reserve: float = 0.0) -> float:
+        """Seconds until a call of *tokens* fits in the window (0 if it fits now).
+
+        *reserve* is the fraction of both limits the call may not use.
+        """
+        self._expire(now)
+        delay = max(0.0, self._paused_until - now)
+        requests = self.requests_per_minute
+        if requests:
+            requests = max(1, requests - int(requests * reserve))
+            if len(self._window) >= requests:
+                oldest = self._window[len(self._window) - requests]
+                delay = max(delay, oldest[0] + WINDOW_SECONDS - now)
+        limit = self.tokens_per_minute - int(self.tokens_per_minute * reserve)
+        excess = self._tokens + tokens - max(tokens, limit)
+        if self.tokens_per_minute and excess > 0:
+            for started_at, used in self._window:
+                excess -= used
+                if excess <= 0:
+                    delay = max(delay, started_at + WINDOW_SECONDS - now)
+                    break
+        return delay
+
+    def reserve(self, tokens: int, now: float) -> List[float]:
+        entry = [now, float(tokens)]
+        self._window.append(entry)
+        self._tokens += tokens
+        return entry
+
+    def settle(self, entry: List[float], tokens: int) -> None:
+        # Replace a reservation with the provider-reported usage
+        if any(admitted is entry for admitted in self._window):
+            self._tokens += tokens - entry[1]
+        entry[1] = float(tokens)
+
+    def pause(self, until: float) -> None:
+        self._paused_until = max(self._paused_until, until)
+
+    def usage(self, now: float) -> Dict[str, int]:
+        self._expire(now)
+        return {"requests": len(self._window), "tokens": int(self._tokens)}
+
+
+class _Waiter:
+    __slots__ = ("priority", "user")
+
+    def __init__(self, priority: int, user: Hashable) -> None:
+        self.priority = priority
+        self.user = user
+
+
+class FairQueue:
+    """Waiters by priority, then round-robin across users within a priority."""
+
+    def __init__(self) -> None:
+        self._classes: List["OrderedDict[Hashable, Deque[_Waiter]]"] = [
+            OrderedDict() for _ in PRIORITY_NAMES
+        ]
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, waiter: _Waiter) -> None:
+        users = self._classes[waiter.priority]
+        users.setdefault(waiter.user, deque()).append(waiter)
+        self._size += 1
+
+    def head(self) -> Optional[_Waiter]:
+        for users in self._classes:
+            for waiters in users.values():
+                return waiters[0]
+        return None
+
+    def pop(self) -> _Waiter:
+        # Serve the head, then move its user behind the others in its class
+        for users in self._classes:
+            for user, waiters in users.items():
+                waiter = waiters.popleft()
+                if waiters:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                self._size -= 1
+                return waiter
+        raise IndexError("pop from an empty FairQueue")
+
+    def remove(self, waiter: _Waiter) -> None:
+        waiters = self._classes[waiter.priority].get(waiter.user)
+        if waiters is None or waiter not in waiters:
+            return
+        waiters.remove(waiter)
+        if not waiters:
+            del self._classes[waiter.priority][waiter.user]
+        self._size -= 1
+
+
+class LLMGateway:
+    """Admits LLM calls against per-model RPM/TPM budgets with a fair priority queue."""
+
+    def __init__(
+        self,
+        limits: Dict[str, Tuple[float, float]],
+        queue_timeout: float,
+        interactive_reserve: float = 0.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        # limits: provider -> (requests per minute, tokens per minute), applied per model
+        self.limits = limits
+        self.queue_timeout = queue_timeout
+        self.interactive_reserve = interactive_reserve
+        self.clock = clock
+        self._budgets: Dict[ModelKey, RateBudget] = {}
+        self._queues: Dict[ModelKey, FairQueue] = {}
+        self._cond = threading.Condition()
+
+    def budget(self, key: ModelKey) -> Optional[RateBudget]:
+        with self._cond:
+            budget = self._budgets.get(key)
+            if budget is None and key[0] in self.limits:
+                budget = self._budgets[key] = RateBudget(*self.limits[key[0]])
+                self._queues[key] = FairQueue()
+            return budget
+
+    def acquire(
+        self, key: ModelKey, tokens: int, user: Hashable = None, priority: int = STANDARD
+    ) -> Optional[List[float]]:
+        """Block until the call fits the model's budget; returns its reservation.
+
+        Raises :class:`AdmissionRejectedError` after waiting ``queue_timeout``.
+        Returns None for providers without limits.
+        """
+        budget = self.budget(key)
+        if budget is None:
+            return None
+        tokens = budget.clamp(tokens)
+        waiter = _Waiter(priority, user)
+        reserve = 0.0 if priority == INTERACTIVE else self.interactive_reserve
+        started = self.clock()
+        deadline = started + self.queue_timeout
+
+        with self._cond:
+            queue = self._queues[key]
+            queue.push(waiter)
+            try:
+                while True:
+                    now = self.clock()
+                    delay = budget.delay(tokens, now, reserve) if queue.head() is waiter else None
+                    if delay is not None and delay <= 0:
+                        queue.pop()
+                        entry = budget.reserve(tokens, now)
+                        break
+                    if now >= deadline:
+                        # Time for this model's budget to free up plus the calls queued ahead
+                        ahead = len(queue) * WINDOW_SECONDS / max(1, budget.requests_per_minute)
+                        retry_after = budget.delay(tokens, now, reserve) + ahead
+                        raise AdmissionRejectedError(
+                            f"Timed out waiting for {key[0]} {key[1]} rate budget",
+                            max(1, math.ceil(retry_after)),
+                        )
+                    self._cond.wait(deadline - now if delay is None else min(delay, deadline - now))
+            finally:
+                queue.remove(waiter)
+                # The next waiter may be the head now
+                self._cond.notify_all()
+
+        LLM_QUEUE_WAIT.labels(key[0], PRIORITY_NAMES[priority]).observe(now - started)
+        return entry
+
+    def wait_estimate(self, key: ModelKey, tokens: int, priority: int = STANDARD) -> float:
+        # Seconds a call would wait for budget right now, including calls queued ahead
+        budget = self.budget(key)
+        if budget is None:
+            return 0.0
+        reserve = 0.0 if priority == INTERACTIVE else self.interactive_reserve
+        with self._cond:
+            ahead = len(self._queues[key]) * WINDOW_SECONDS / max(1, budget.requests_per_minute)
+            return budget.delay(budget.clamp(tokens), self.clock(), reserve) + ahead
+
+    def settle(self, key: ModelKey, entry: Optional[List[float]], tokens: int) -> None:
+        if entry is None:
+            return
+        with self._cond:
+            self._budgets[key].settle(entry, self._budgets[key].clamp(tokens))
+            self._cond.notify_all()
+
+    def penalize(self, key: ModelKey, seconds: float) -> None:
+        # The provider rejected a call anyway: hold the model's queue
+        budget = self.budget(key)
+        if budget is None:
+            return
+        with self._cond:
+            budget.pause(self.clock() + seconds)
+        logger.warning(f"{key[0]} {key[1]} rate limited; pausing calls for {seconds:.0f}s")
+
+    def wake(self) -> None:
+        # Re-check waiting calls, e.g. after a fake clock was advanced
+        with self._cond:
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            now = self.clock()
+            return {
+                "queued": sum(len(queue) for queue in self._queues.values()),
+                "models": {
+                    f"{provider}/{model}": {**budget.usage(now), "queued": len(self._queues[(provider, model)])}
+                    for (provider, model), budget in self._budgets.items()
+                },
+            }
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    # Lazily build the process-wide gateway from the configured limits
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = LLMGateway(
+                    {
+                        "groq": (settings.GROQ_REQUESTS_PER_MINUTE, settings.GROQ_TOKENS_PER_MINUTE),
+                        "gemini": (settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE),
+                    },
+                    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+                    interactive_reserve=settings.LLM_INTERACTIVE_RESERVE,
+                )
+    return _gateway
+
+
+def get_gateway_stats() -> Dict[str, Any]:
+    return get_llm_gateway().stats()
+
+
+def _call_context(user_id: Optional[Hashable], priority: Optional[int]) -> Tuple[Hashable, int]:
+    user = user_id if user_id is not None else _user.get()
+    return user, _priority.get() if priority is None else priority
+
+
+def _acquire(gateway: LLMGateway, key: ModelKey, tokens: int, user, priority: int, node: str):
+    try:
+        return gateway.acquire(key, tokens, user, priority)
+    except AdmissionRejectedError:
+        LLM_CALLS.labels(node, "rejected").inc()
+        raise
+
+
+def invoke_llm(
+    llm,
+    messages,
+    node: str,
+    user_id: Optional[Hashable] = None,
+    priority: Optional[int] = None,
+    rate_limit_retries: Optional[int] = None,
+):
+    """Invoke the chat model through the gateway and record per-node metrics.
+
+    *user_id* and *priority* default to the enclosing :func:`llm_context`;
+    *rate_limit_retries* to ``LLM_RATE_LIMIT_RETRIES``.
+    """
+    gateway = get_llm_gateway()
+    key = model_key(llm)
+    user, priority = _call_context(user_id, priority)
+    estimate = estimate_call_tokens(llm, messages)
+    retries = settings.LLM_RATE_LIMIT_RETRIES if rate_limit_retries is None else rate_limit_retries
+
+    for attempt in range(retries + 1):
+        entry = _acquire(gateway, key, estimate, user, priority, node)
+        started = time.perf_counter()
+        try:
+            response = llm.invoke(messages)
+        except Exception as e:
+            retry_after = rate_limit_retry_after(e)
+            if retry_after is not None:
+                LLM_RATE_LIMITED.labels(key[0]).inc()
+                gateway.penalize(key, retry_after)
+                if attempt < retries:
+                    continue
+            LLM_CALLS.labels(node, "error").inc()
+            raise
+        gateway.settle(key, entry, used_tokens(response, estimate))
+        record_llm_response(node, response, started)
+        return response
+
+
+def stream_llm(
+    llm,
+    messages,
+    node: str,
+    user_id: Optional[Hashable] = None,
+    priority: Optional[int] = None,
+    rate_limit_retries: Optional[int] = None,
+) -> Iterator[str]:
+    # Stream the chat model's reply as text chunks; records the same metrics
+    # as invoke_llm (tokens from the aggregated chunks) plus time to first token.
+    # A 429 is retried only before the first chunk.
+    gateway = get_llm_gateway()
+    key = model_key(llm)
+    user, priority = _call_context(user_id, priority)
+    estimate = estimate_call_tokens(llm, messages)
+    retries = settings.LLM_RATE_LIMIT_RETRIES if rate_limit_retries is None else rate_limit_retries
+
+    for attempt in range(retries + 1):
+        entry = _acquire(gateway, key, estimate, user, priority, node)
+        started = time.perf_counter()
+        response = None
+        try:
+            for chunk in llm.stream(messages):
+                if response is None:
+                    LLM_FIRST_TOKEN.labels(node).observe(time.perf_counter() - started)
+                    response = chunk
+                else:
+                    response += chunk
+                if chunk.content:
+                    yield chunk.content
+        except Exception as e:
+            retry_after = rate_limit_retry_after(e)
+            if retry_after is not None:
+                LLM_RATE_LIMITED.labels(key[0]).inc()
+                gateway.penalize(key, retry_after)
+                if response is None and attempt < retries:
+                    continue
+            LLM_CALLS.labels(node, "error").inc()
+            raise
+        gateway.settle(key, entry, used_tokens(response, estimate))
+        record_llm_response(node, response, started)
+        return
@@ -0,0 +1,277 @@
+"""Hedged LLM calls across Groq and Gemini.
+
+Briefing calls normally use one provider each (Groq in ``langgraph/``,
+Gemini in ``services/agents/``), so one slow provider sets the briefing's
+tail latency. With ``LLM_HEDGING_ENABLED`` the call goes through
+:func:`hedged_invoke` instead:
+
+* the primary request is streamed, and if it has not produced a first token
+  within ``LLM_HEDGE_PERCENTILE`` of that provider's recent first-token
+  latencies (never sooner than ``LLM_HEDGE_MIN_DELAY_SECONDS``), a backup
+  request goes to the other provider,
+* whichever produces a first token first is read to the end; the other
+  stream is closed at its first chunk, which stops the generation,
+* a primary that fails before its first token falls back to the other
+  provider straight away.
+
+Backups are a hard-capped share of calls: every call earns
+``LLM_HEDGE_MAX_RATIO`` of a hedge credit (up to ``HEDGE_BURST``) and each
+backup sent to cover a slow primary spends one. Fallbacks after an error
+are not capped. Both legs go through the gateway, so a backup also waits
+for its provider's rate budget; no backup is sent while that provider has
+a queue.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage
+
+from app.core.config import settings
+from app.core.metrics import LLM_HEDGES
+from app.services.llm_factory import create_chat_model
+from app.services.llm_gateway import (
+    STANDARD,
+    estimate_call_tokens,
+    get_llm_gateway,
+    invoke_llm,
+    model_key,
+    stream_llm,
+)
+from app.services.llm_router import route_invoke, route_stream
+
+logger = logging.getLogger(__name__)
+
+# First-token latencies kept per provider, and how many are needed before the
+# percentile is trusted over INITIAL_HEDGE_DELAY_SECONDS
+LATENCY_SAMPLES = 200
+MIN_SAMPLES = 20
+INITIAL_HEDGE_DELAY_SECONDS = 5.0
+# Hedge credits that can be saved up for a burst of slow calls
+HEDGE_BURST = 2.0
+
+
+class _Leg:
+    __slots__ = ("name", "llm", "started", "first_token", "chunks", "error", "done")
+
+    def __init__(self, name: str, llm) -> None:
+        self.name = name
+        self.llm = llm
+        self.started = time.monotonic()
+        self.first_token: Optional[float] = None
+        self.chunks: List[str] = []
+        self.error: Optional[Exception] = None
+        self.done = False
+
+
+class LLMHedger:
+    """Races a backup provider against a primary whose first token is late."""
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        min_delay: float = 0.5,
+        max_ratio: float = 0.1,
+        backups: Optional[Callable[[object], Optional[object]]] = None,
+    ) -> None:
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_ratio = max_ratio
+        self.backups = backups or backup_llm
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._credits = min(HEDGE_BURST, 1.0)
+        self._lock = threading.Lock()
+
+    def hedge_delay(self, provider: str) -> float:
+        # Seconds to wait for the primary's first token before sending a backup
+        with self._lock:
+            samples = sorted(self._latencies.get(provider, ()))
+        if len(samples) < MIN_SAMPLES:
+            return max(self.min_delay, INITIAL_HEDGE_DELAY_SECONDS)
+        index = min(len(samples) - 1, int(len(samples) * self.percentile / 100))
+        return max(self.min_delay, samples[index])
+
+    def observe(self, provider: str, first_token: float) -> None:
+        with self._lock:
+            samples = self._latencies.setdefault(provider, deque(maxlen=LATENCY_SAMPLES))
+            samples.append(first_token)
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._credits = min(HEDGE_BURST, self._credits + self.max_ratio)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._credits < 1.0:
+                return False
+            self._credits -= 1.0
+            return True
+
+    def _backup_ready(self, backup, messages, priority: Optional[int]) -> bool:
+        # A backup that would queue for rate budget cannot beat the primary
+        tokens = estimate_call_tokens(backup, messages)
+        wait = get_llm_gateway().wait_estimate(
+            model_key(backup), tokens, STANDARD if priority is None else priority
+        )
+        return wait <= 0
+
+    def invoke(
+        self,
+        llm,
+        messages,
+        node: str,
+        user_id: Optional[Hashable] = None,
+        priority: Optional[int] = None,
+        route: Optional[str] = None,
+    ) -> AIMessage:
+        backup = self.backups(llm)
+        if backup is None:
+            if route is not None:
+                return route_invoke(route, llm, messages, node, user_id=user_id, priority=priority)
+            return invoke_llm(llm, messages, node, user_id=user_id, priority=priority)
+
+        self._earn()
+        provider = model_key(llm)[0]
+        cond = threading.Condition()
+        winner: List[_Leg] = []
+
+        def stream(leg: _Leg) -> Iterator[str]:
+            if leg.llm is llm and route is not None:
+                return route_stream(route, llm, messages, node, user_id=user_id, priority=priority)
+            return stream_llm(leg.llm, messages, node, user_id=user_id, priority=priority)
+
+        def run(leg: _Leg) -> None:
+            chunks = None
+            try:
+                chunks = stream(leg)
+                for text in chunks:
+                    with cond:
+                        if not winner:
+                            winner.append(leg)
+                            leg.first_token = time.monotonic() - leg.started
+                            cond.notify_all()
+                        if winner[0] is not leg:
+                            break  # lost the race: closing the stream cancels it
+                        leg.chunks.append(text)
+            except Exception as e:
+                leg.error = e
+            finally:
+                if chunks is not None and hasattr(chunks, "close"):
+                    chunks.close()
+                with cond:
+                    leg.done = True
+                    cond.notify_all()
+
+        def start(leg: _Leg) -> _Leg:
+            context = contextvars.copy_context()
+            threading.Thread(
+                target=context.run, args=(run, leg), name=f"llm-hedge-{leg.name}", daemon=True
+            ).start()
+            return leg
+
+        primary = start(_Leg("primary", llm))
+        secondary: Optional[_Leg] = None
+        deadline: Optional[float] = primary.started + self.hedge_delay(provider)
+        outcome = "primary"
+
+        with cond:
+            while True:
+                if winner and winner[0].done:
+                    break
+                legs = [leg for leg in (primary, secondary) if leg is not None]
+                if not winner and all(leg.done for leg in legs):
+                    if secondary is not None:
+                        break
+                    # Primary failed before its first token
+                    secondary = start(_Leg("backup", backup))
+                    outcome = "fallback"
+                    logger.warning(
+                        f"LLM hedge {node}: {provider} failed ({primary.error}); "
+                        f"falling back to {model_key(backup)[0]}"
+                    )
+                    continue
+                now = time.monotonic()
+                if secondary is None and not winner and deadline is not None and now >= deadline:
+                    deadline = None
+                    if self._spend() and self._backup_ready(backup, messages, priority):
+                        secondary = start(_Leg("backup", backup))
+                        outcome = "hedged"
+                        logger.info(
+                            f"LLM hedge {node}: no first token from {provider} after "
+                            f"{now - primary.started:.2f}s, sent backup to {model_key(backup)[0]}"
+                        )
+                    else:
+                        outcome = "capped"
+                    continue
+                cond.wait(None if deadline is None else max(0.0, deadline - now))
+
+        for leg in (primary, secondary):
+            if leg is not None and leg.first_token is not None:
+                self.observe(model_key(leg.llm)[0], leg.first_token)
+        if not winner or winner[0].error is not None:
+            error = (winner[0] if winner else secondary or primary).error
+            LLM_HEDGES.labels(node, "failed").inc()
+            raise error if error is not None else RuntimeError("LLM returned no content")
+
+        if outcome == "hedged":
+            outcome = f"{winner[0].name}_won"
+        LLM_HEDGES.labels(node, outcome).inc()
+        return AIMessage(content="".join(winner[0].chunks))
+
+
+_backup_llms: Dict[Tuple[str, float], object] = {}
+_backup_lock = threading.Lock()
+
+
+def _configured(key: Optional[str]) -> bool:
+    return bool(key) and "your_" not in key and "placeholder" not in key
+
+
+def backup_llm(llm):
+    """The other provider's chat model, or None when its key is not configured."""
+    provider = model_key(llm)[0]
+    temperature = getattr(llm, "temperature", None)
+    temperature = 0.1 if not isinstance(temperature, (int, float)) else float(temperature)
+    with _backup_lock:
+        cached = _backup_llms.get((provider, temperature))
+        if cached is not None:
+            return cached
+        if provider == "groq" and _configured(settings.GEMINI_API_KEY):
+            backup = create_chat_model("gemini", settings.LLM_HEDGE_GEMINI_MODEL, temperature)
+        elif provider == "gemini" and _configured(settings.GROQ_API_KEY):
+            backup = create_chat_model("groq", settings.LLM_FAST_MODEL, temperature)
+        else:
+            return None
+        _backup_llms[(provider, temperature)] = backup
+        return backup
+
+
+_hedger: Optional[LLMHedger] = None
+_hedger_lock = threading.Lock()
+
+
+def get_llm_hedger() -> LLMHedger:
+    global _hedger
+    if _hedger is None:
+        with _hedger_lock:
+            if _hedger is None:
+                _hedger = LLMHedger(
+                    percentile=settings.LLM_HEDGE_PERCENTILE,
+                    min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS,
+                    max_ratio=settings.LLM_HEDGE_MAX_RATIO,
+                )
+    return _hedger
+
+
+def hedged_invoke(llm, messages, node: str, route: Optional[str] = None, **kwargs):
+    """Invoke *llm* (through the model router when *route* is given), hedged
+    against the other provider when ``LLM_HEDGING_ENABLED``."""
+    if not settings.LLM_HEDGING_ENABLED:
+        if route is not None:
+            return route_invoke(route, llm, messages, node, **kwargs)
+        return invoke_llm(llm, messages, node, **kwargs)
+    return get_llm_hedger().invoke(llm, messages, node, route=route, **kwargs)
@@ -0,0 +1,312 @@
+"""Per-call model routing for Groq chat models.
+
+Callers keep one configured chat model (``LangGraphCoordinator.llm``,
+``AgentNodes.llm``) and call :func:`route_invoke` / :func:`route_stream`
+with a route name instead of invoking it directly. The router picks the
+model for each call from:
+
+* the estimated prompt size: prompts up to ``LLM_SMALL_PROMPT_TOKENS`` try
+  the fast model first, larger ones the capable model, and a model whose
+  context window cannot hold the prompt is skipped,
+* the route's latency budget (``chat``, ``document``, ``briefing``),
+* the latency recently observed for each model on that route, plus the
+  wait for its rate budget in :mod:`app.services.llm_gateway`. Observations
+  decay back towards the model's typical latency, so a model that was
+  slow for a while gets tried again once it has had time to recover.
+
+A model that fails or is rate limited is cooled down and the call falls
+back to the next candidate straight away (streams only before the first
+chunk). Every decision is logged and counted by route, model and reason.
+
+Only models of the routed provider are swapped; anything else (Gemini,
+test doubles) is invoked as given. The models are variants of the caller's
+client (``model_copy``), so temperature, max tokens and timeout carry over.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.metrics import LLM_ROUTE_DECISIONS
+from app.services.admission import AdmissionRejectedError
+from app.services.llm_gateway import (
+    STANDARD,
+    completion_tokens,
+    get_llm_gateway,
+    invoke_llm,
+    model_key,
+    prompt_tokens,
+    rate_limit_retry_after,
+    stream_llm,
+)
+
+logger = logging.getLogger(__name__)
+
+# Known models: (context window in tokens, typical latency in seconds before
+# anything has been observed)
+MODEL_PROFILES: Dict[str, Tuple[int, float]] = {
+    "llama-3.1-8b-instant": (131072, 0.8),
+    "llama-3.3-70b-versatile": (131072, 2.5),
+}
+DEFAULT_PROFILE = (8192, 2.0)
+
+# Half-life of an observed latency's pull away from the typical latency
+LATENCY_HALF_LIFE_SECONDS = 120.0
+# Weight of the newest observation in the moving average
+LATENCY_SMOOTHING = 0.3
+
+
+def route_budgets() -> Dict[str, float]:
+    # Latency budget in seconds per route
+    return {
+        "chat": settings.LLM_CHAT_LATENCY_BUDGET_SECONDS,
+        "document": settings.LLM_DOCUMENT_LATENCY_BUDGET_SECONDS,
+        "briefing": settings.LLM_BRIEFING_LATENCY_BUDGET_SECONDS,
+    }
+
+
+class _Observed:
+    __slots__ = ("latency", "at")
+
+    def __init__(self, latency: float, at: float) -> None:
+        self.latency = latency
+        self.at = at
+
+
+class ModelRouter:
+    """Chooses a model per call and falls back when one is slow or failing."""
+
+    def __init__(
+        self,
+        models: Sequence[str],
+        provider: str = "groq",
+        small_prompt_tokens: int = 1000,
+        cooldown_seconds: float = 30.0,
+        budgets: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+        gateway=None,
+    ) -> None:
+        # models are ordered fastest first
+        self.models = tuple(models)
+        self.provider = provider
+        self.small_prompt_tokens = small_prompt_tokens
+        self.cooldown_seconds = cooldown_seconds
+        self.budgets = budgets if budgets is not None else route_budgets()
+        self.clock = clock
+        self.gateway = gateway
+        self._observed: Dict[Tuple[str, str], _Observed] = {}
+        self._cooling: Dict[str, float] = {}
+        self._variants: Dict[Tuple[int, str], Tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+
+    def routes(self, llm) -> bool:
+        provider, model = model_key(llm)
+        return provider == self.provider and model in self.models
+
+    def predicted_latency(self, route: str, model: str, now: float) -> float:
+        typical = MODEL_PROFILES.get(model, DEFAULT_PROFILE)[1]
+        with self._lock:
+            observed = self._observed.get((route, model))
+        if observed is None:
+            return typical
+        weight = 0.5 ** ((now - observed.at) / LATENCY_HALF_LIFE_SECONDS)
+        return typical + (observed.latency - typical) * weight
+
+    def observe(self, route: str, model: str, latency: float) -> None:
+        now = self.clock()
+        current = self.predicted_latency(route, model, now)
+        with self._lock:
+            self._observed[(route, model)] = _Observed(
+                current + (latency - current) * LATENCY_SMOOTHING, now
+            )
+
+    def cool_down(self, model: str, seconds: float) -> None:
+        with self._lock:
+            self._cooling[model] = max(self._cooling.get(model, 0.0), self.clock() + seconds)
+
+    def plan(
+        self, route: str, tokens: int, completion: int, priority: int = STANDARD
+    ) -> Tuple[List[Tuple[str, float]], str]:
+        """Models to try in order with their predicted latency, and why the first was chosen.
+
+        Reasons: ``preferred`` (first choice for the prompt size), ``context``,
+        ``slow`` or ``cooling`` (the first choice was skipped for that), or
+        ``over_budget`` (no model is predicted to meet the budget, so the
+        fastest goes first).
+        """
+        now = self.clock()
+        budget = self.budgets.get(route, settings.LLM_CHAT_LATENCY_BUDGET_SECONDS)
+        order = self.models if tokens <= self.small_prompt_tokens else tuple(reversed(self.models))
+        gateway = self.gateway or get_llm_gateway()
+
+        ready: List[Tuple[str, float]] = []
+        held: List[Tuple[bool, float, str]] = []
+        skipped: Optional[str] = None
+        for model in order:
+            predicted = self.predicted_latency(route, model, now) + gateway.wait_estimate(
+                (self.provider, model), tokens + completion, priority
+            )
+            with self._lock:
+                cooling = self._cooling.get(model, 0.0) > now
+            if tokens + completion > MODEL_PROFILES.get(model, DEFAULT_PROFILE)[0]:
+                reason = "context"
+            elif cooling:
+                reason = "cooling"
+            elif predicted > budget:
+                reason = "slow"
+            else:
+                ready.append((model, predicted))
+                continue
+            skipped = skipped or reason
+            if reason != "context":
+                held.append((cooling, predicted, model))
+
+        # Slow models before cooling ones, fastest first
+        fallbacks = [(model, predicted) for _, predicted, model in sorted(held)]
+        if ready:
+            return ready + fallbacks, skipped or "preferred"
+        # Nothing meets the budget; if nothing fits the context either, still
+        # try the largest window
+        return fallbacks or [(order[-1], 0.0)], "over_budget"
+
+    def _variant(self, llm, model: str):
+        # The caller's client with another model name, built once per client
+        if model_key(llm)[1] == model:
+            return llm
+        key = (id(llm), model)
+        with self._lock:
+            cached = self._variants.get(key)
+            if cached is None or cached[0] is not llm:
+                cached = self._variants[key] = (llm, llm.model_copy(update={"model_name": model}))
+            return cached[1]
+
+    def _choose(self, route: str, llm, messages, node: str, priority: Optional[int]):
+        tokens = prompt_tokens(messages)
+        candidates, reason = self.plan(
+            route, tokens, completion_tokens(llm), STANDARD if priority is None else priority
+        )
+        model, predicted = candidates[0]
+        budget = self.budgets.get(route, settings.LLM_CHAT_LATENCY_BUDGET_SECONDS)
+        logger.info(
+            f"LLM route {route}/{node}: {model} ({reason}), prompt ~{tokens} tokens, "
+            f"predicted {predicted:.2f}s of {budget:.1f}s budget"
+        )
+        LLM_ROUTE_DECISIONS.labels(route, model, reason).inc()
+        return candidates
+
+    def _failed(
+        self, route: str, node: str, model: str, error: Exception, fallback: Optional[str]
+    ) -> None:
+        seconds = rate_limit_retry_after(error)
+        if seconds is None or isinstance(error, AdmissionRejectedError):
+            seconds = self.cooldown_seconds
+        self.cool_down(model, seconds)
+        if fallback is not None:
+            logger.warning(
+                f"LLM route {route}/{node}: {model} failed ({error}); falling back to {fallback}"
+            )
+            LLM_ROUTE_DECISIONS.labels(route, fallback, "fallback").inc()
+
+    def invoke(
+        self,
+        route: str,
+        llm,
+        messages,
+        node: str,
+        user_id: Optional[Hashable] = None,
+        priority: Optional[int] = None,
+    ):
+        if not self.routes(llm):
+            return invoke_llm(llm, messages, node, user_id=user_id, priority=priority)
+        candidates = self._choose(route, llm, messages, node, priority)
+        for index, (model, _) in enumerate(candidates):
+            last = index == len(candidates) - 1
+            started = self.clock()
+            try:
+                # Fall back rather than wait out a 429, unless this is the last model
+                response = invoke_llm(
+                    self._variant(llm, model),
+                    messages,
+                    node,
+                    user_id=user_id,
+                    priority=priority,
+                    rate_limit_retries=None if last else 0,
+                )
+            except Exception as e:
+                self._failed(route, node, model, e, None if last else candidates[index + 1][0])
+                if last:
+                    raise
+                continue
+            self.observe(route, model, self.clock() - started)
+            return response
+
+    def stream(
+        self,
+        route: str,
+        llm,
+        messages,
+        node: str,
+        user_id: Optional[Hashable] = None,
+        priority: Optional[int] = None,
+    ) -> Iterator[str]:
+        if not self.routes(llm):
+            yield from stream_llm(llm, messages, node, user_id=user_id, priority=priority)
+            return
+        candidates = self._choose(route, llm, messages, node, priority)
+        for index, (model, _) in enumerate(candidates):
+            last = index == len(candidates) - 1
+            started = self.clock()
+            streamed = False
+            try:
+                for text in stream_llm(
+                    self._variant(llm, model),
+                    messages,
+                    node,
+                    user_id=user_id,
+                    priority=priority,
+                    rate_limit_retries=None if last else 0,
+                ):
+                    streamed = True
+                    yield text
+            except Exception as e:
+                # Text already sent cannot be taken back
+                fallback = None if last or streamed else candidates[index + 1][0]
+                self._failed(route, node, model, e, fallback)
+                if fallback is None:
+                    raise
+                continue
+            self.observe(route, model, self.clock() - started)
+            return
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter(
+                    (settings.LLM_FAST_MODEL, settings.LLM_CAPABLE_MODEL),
+                    small_prompt_tokens=settings.LLM_SMALL_PROMPT_TOKENS,
+                    cooldown_seconds=settings.LLM_ROUTE_COOLDOWN_SECONDS,
+                )
+    return _router
+
+
+def route_invoke(route: str, llm, messages, node: str, **kwargs):
+    """Invoke *llm* or a faster/more capable variant chosen for this call."""
+    if not settings.LLM_ROUTING_ENABLED:
+        return invoke_llm(llm, messages, node, **kwargs)
+    return get_model_router().invoke(route, llm, messages, node, **kwargs)
+
+
+def route_stream(route: str, llm, messages, node: str, **kwargs) -> Iterator[str]:
+    """Streaming counterpart of :func:`route_invoke`."""
+    if not settings.LLM_ROUTING_ENABLED:
+        return stream_llm(llm, messages, node, **kwargs)
+    return get_model_router().stream(route, llm, messages, node, **kwargs)
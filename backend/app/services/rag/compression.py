@@ -0,0 +1,117 @@
+"""Compressed embeddings for the NumPy vector index.
+
+llama3 embeddings have 4096 dimensions: 16 KB per chunk at float32. With
+``NUMPY_INDEX_COMPRESSION`` set, a user's index keeps its full-precision
+rows on disk (memory-mapped) and holds only compact codes in memory:
+
+* dimensionality reduction to ``NUMPY_INDEX_REDUCED_DIMENSIONS``, either
+  ``pca`` (principal components of a sample of the user's corpus; the
+  embedding space is far from isotropic, so a few hundred components keep
+  most of the similarity structure) or ``random`` (a seeded Gaussian
+  projection, which needs no training and preserves dot products in
+  expectation);
+* int8 scalar quantization of each reduced dimension, scaled by the largest
+  magnitude seen in the training sample.
+
+A search scores the codes to pick ``NUMPY_INDEX_RERANK_CANDIDATES`` rows,
+then reranks those with their full-precision vectors, so the returned
+scores and order are exact within the candidates.
+"""
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("pca", "random")
+
+# Rows of the corpus a compressor is trained on
+TRAIN_SAMPLE_ROWS = 2048
+
+# Rows projected per block when encoding or scoring
+BLOCK_ROWS = 4096
+
+
+class VectorCompressor:
+    """Dimensionality reduction followed by int8 quantization of unit vectors."""
+
+    def __init__(self, method: str = "pca", dimensions: int = 256, seed: int = 0) -> None:
+        if method not in METHODS:
+            raise ValueError(f"Unknown compression method: {method} (expected one of {METHODS})")
+        self.method = method
+        self.dimensions = dimensions
+        self.seed = seed
+        self.mean: Optional[np.ndarray] = None  # (input dimensions,)
+        self.components: Optional[np.ndarray] = None  # (input dimensions, reduced dimensions)
+        self.scale: Optional[np.ndarray] = None  # (reduced dimensions,)
+
+    @property
+    def trained(self) -> bool:
+        return self.components is not None
+
+    def train(self, sample: np.ndarray) -> None:
+        """Fit the projection and quantization scale to *sample* (rows of the corpus)."""
+        sample = np.asarray(sample, dtype=np.float32)
+        rows, input_dimensions = sample.shape
+        if self.method == "pca":
+            self.mean = sample.mean(axis=0)
+            _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+            self.components = np.ascontiguousarray(vt[: min(self.dimensions, rows)].T)
+        else:
+            dimensions = min(self.dimensions, input_dimensions)
+            rng = np.random.default_rng(self.seed)
+            self.mean = np.zeros(input_dimensions, dtype=np.float32)
+            self.components = rng.standard_normal(
+                (input_dimensions, dimensions), dtype=np.float32
+            ) / np.sqrt(dimensions)
+        projected = (sample - self.mean) @ self.components
+        scale = np.abs(projected).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """int8 codes of *vectors*, one row each."""
+        codes = np.empty((len(vectors), len(self.scale)), dtype=np.int8)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            block = np.asarray(vectors[start : start + BLOCK_ROWS], dtype=np.float32)
+            projected = (block - self.mean) @ self.components / self.scale
+            codes[start : start + len(block)] = np.clip(np.rint(projected), -127, 127)
+        return codes
+
+    def query_weights(self, queries: np.ndarray) -> np.ndarray:
+        # codes @ weights.T approximates the dot product with each query, up to
+        # a per-query constant (mean . query) that does not change the ranking
+        return ((queries @ self.components) * self.scale).astype(np.float32)
+
+    def scores(self, codes: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Approximate similarity of every code row to every query: rows x queries."""
+        weights = self.query_weights(queries)
+        out = np.empty((len(codes), len(queries)), dtype=np.float32)
+        for start in range(0, len(codes), BLOCK_ROWS):
+            block = codes[start : start + BLOCK_ROWS].astype(np.float32)
+            out[start : start + len(block)] = block @ weights.T
+        return out
+
+    def save(self, path: str) -> None:
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                method=np.array(self.method),
+                mean=self.mean,
+                components=self.components,
+                scale=self.scale,
+            )
+
+    def load(self, path: str) -> None:
+        with np.load(path) as data:
+            self.method = str(data["method"])
+            self.mean = data["mean"]
+            self.components = data["components"]
+            self.scale = data["scale"]
+        self.dimensions = len(self.scale)
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return len(self.scale) if self.trained else 0
@@ -0,0 +1,141 @@
+"""In-process CPU embedding backends: an ONNX model and a hashing vectorizer.
+
+Both have the ``embed_documents`` / ``embed_query`` interface of LangChain
+embeddings and are selected with ``EMBEDDING_BACKEND`` (see
+:mod:`app.services.rag.embeddings`).
+
+:class:`OnnxEmbeddings` runs a sentence-embedding model exported to ONNX,
+such as all-MiniLM-L6-v2 (384 dimensions, about 90 MB): ``model.onnx`` and
+the Hugging Face ``tokenizer.json`` are read from one directory. Texts are
+tokenized in one call, sorted by length so batches carry little padding,
+split into batches and run concurrently on a thread pool (onnxruntime
+releases the GIL; each run is single-threaded so the pool size is the CPU
+budget). Token vectors are mean-pooled over the attention mask and
+normalized, unless the model already outputs one vector per text.
+
+:class:`HashingEmbeddings` needs no model: words and word bigrams are hashed
+into a fixed number of signed buckets. It keeps exact-term overlap only,
+which is enough for tests and offline development.
+"""
+
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from app.core.lazy import lazy_import
+
+logger = logging.getLogger(__name__)
+
+np = lazy_import("numpy")
+ort = lazy_import("onnxruntime")
+Tokenizer = lazy_import("tokenizers", "Tokenizer")
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class OnnxEmbeddings:
+    """Sentence embeddings from an ONNX model in *model_path*, on CPU threads."""
+
+    def __init__(
+        self, model_path: str, batch_size: int = 32, threads: int = 0, max_tokens: int = 256
+    ) -> None:
+        self.model_path = model_path
+        self.batch_size = batch_size
+        self.threads = threads or os.cpu_count() or 1
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_tokens)
+        self.tokenizer.no_padding()  # padded per batch, to that batch's longest text
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = 1
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            os.path.join(model_path, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.threads, thread_name_prefix="onnx-embedding"
+        )
+        logger.info(
+            f"ONNX embedding model loaded from {model_path} "
+            f"({self.threads} threads, batches of {batch_size})"
+        )
+
+    def _run(self, encodings):
+        # One padded batch through the model; returns unit vectors
+        length = max(len(encoding.ids) for encoding in encodings)
+        ids = np.zeros((len(encodings), length), dtype=np.int64)
+        mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            ids[row, : len(encoding.ids)] = encoding.ids
+            mask[row, : len(encoding.ids)] = encoding.attention_mask
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+        output = self.session.run(None, feeds)[0]
+        if output.ndim == 3:
+            weights = mask[:, :, None].astype(np.float32)
+            output = (output * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1.0)
+        return _normalize(output.astype(np.float32))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = sorted(range(len(texts)), key=lambda i: len(encodings[i].ids))
+        batches = [
+            order[start : start + self.batch_size]
+            for start in range(0, len(order), self.batch_size)
+        ]
+
+        def run(batch):
+            return self._run([encodings[i] for i in batch])
+
+        if len(batches) == 1:
+            results = [run(batches[0])]
+        else:
+            results = self._pool.map(run, batches)
+        vectors: List[List[float]] = [[] for _ in texts]
+        for batch, result in zip(batches, results):
+            for i, vector in zip(batch, result.tolist()):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class HashingEmbeddings:
+    """Signed feature hashing of words and word bigrams; deterministic, no model."""
+
+    def __init__(self, dimensions: int = 384) -> None:
+        self.dimensions = dimensions
+
+    def _embed(self, text: str):
+        words = _WORD.findall(text.lower())
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            digest = int.from_bytes(digest, "big")
+            vector[digest % self.dimensions] += 1.0 if digest >> 63 else -1.0
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return _normalize(np.stack([self._embed(text) for text in texts])).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -1,41 +1,112 @@
-import logging
-from typing import List, Union
+"""Embeddings for RAG, from the backend selected by ``EMBEDDING_BACKEND``.
+
+* ``ollama`` (default): ``EMBEDDING_OLLAMA_MODEL`` served by Ollama at
+  ``OLLAMA_BASE_URL``;
+* ``onnx``: a sentence-embedding model run in process on CPU threads
+  (:class:`~app.services.rag.cpu_embeddings.OnnxEmbeddings`), no server;
+* ``hashing``: a feature-hashing vectorizer with no model
+  (:class:`~app.services.rag.cpu_embeddings.HashingEmbeddings`), for tests
+  and offline development.
 
-from langchain_ollama import OllamaEmbeddings
+Vectors from different backends are not comparable, so documents ingested
+under one backend must be re-ingested after switching. Further backends
+are added with :func:`register_embedding_backend`.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Union
 
 from app.core.config import settings
+from app.core.lazy import LazyObject, lazy_import
+from app.core.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_DURATION
+from app.core.tracing import traced
 
 logger = logging.getLogger(__name__)
 
+# langchain_ollama takes about a second to import; defer it to first use
+OllamaEmbeddings = lazy_import("langchain_ollama", "OllamaEmbeddings")
+# NumPy, onnxruntime and tokenizers load only with a CPU backend
+OnnxEmbeddings = lazy_import("app.services.rag.cpu_embeddings", "OnnxEmbeddings")
+HashingEmbeddings = lazy_import("app.services.rag.cpu_embeddings", "HashingEmbeddings")
+
+
+def _ollama_backend():
+    return OllamaEmbeddings(
+        model=settings.EMBEDDING_OLLAMA_MODEL, base_url=settings.OLLAMA_BASE_URL
+    )
+
+
+def _onnx_backend():
+    if not settings.EMBEDDING_ONNX_MODEL_PATH:
+        raise ValueError("EMBEDDING_BACKEND=onnx needs EMBEDDING_ONNX_MODEL_PATH")
+    return OnnxEmbeddings(
+        settings.EMBEDDING_ONNX_MODEL_PATH,
+        batch_size=settings.EMBEDDING_ONNX_BATCH_SIZE,
+        threads=settings.EMBEDDING_ONNX_THREADS,
+        max_tokens=settings.EMBEDDING_ONNX_MAX_TOKENS,
+    )
+
+
+def _hashing_backend():
+    return HashingEmbeddings(settings.EMBEDDING_HASHING_DIMENSIONS)
+
+
+# Backend name -> factory of an object with embed_documents and embed_query
+EMBEDDING_BACKENDS: Dict[str, Callable[[], Any]] = {
+    "ollama": _ollama_backend,
+    "onnx": _onnx_backend,
+    "hashing": _hashing_backend,
+}
+
+
+def register_embedding_backend(name: str, factory: Callable[[], Any]) -> None:
+    """Make *factory* selectable as ``EMBEDDING_BACKEND=<name>``."""
+    EMBEDDING_BACKENDS[name] = factory
+
+
+def create_embedding_backend(name: Optional[str] = None):
+    """The embedding backend *name* (default ``EMBEDDING_BACKEND``)."""
+    name = name or settings.EMBEDDING_BACKEND
+    factory = EMBEDDING_BACKENDS.get(name)
+    if factory is None:
+        raise ValueError(
+            f"EMBEDDING_BACKEND must be one of {', '.join(EMBEDDING_BACKENDS)}, not {name!r}"
+        )
+    return factory()
+
 
 class EmbeddingManager:
-    # Manages embeddings using Ollama
+    # Manages embeddings through the backend selected by EMBEDDING_BACKEND
 
     def __init__(self):
         self.embedding_model = None
         self._initialize()
 
     def _initialize(self):
-        # Initialize Ollama embeddings model
+        # Initialize the embedding backend
         try:
-            self.embedding_model = OllamaEmbeddings(
-                model="llama3", base_url=settings.OLLAMA_BASE_URL
-            )
-            logger.info("Ollama embeddings initialized successfully with llama3 model")
+            self.embedding_model = create_embedding_backend()
+            logger.info(f"Embeddings initialized with the {settings.EMBEDDING_BACKEND} backend")
         except Exception as e:
-            logger.error(f"Failed to initialize Ollama embeddings: {e}")
+            logger.error(f"Failed to initialize {settings.EMBEDDING_BACKEND} embeddings: {e}")
             raise
 
+    @traced("embedding.embed_query")
+    @EMBEDDING_DURATION.labels("embed_query").time()
     def embed_query(self, text: str) -> List[float]:
         # Embed a single query text
+        EMBEDDING_BATCH_SIZE.labels("embed_query").observe(1)
         try:
             return self.embedding_model.embed_query(text)
         except Exception as e:
             logger.error(f"Failed to embed query: {e}")
             raise
 
+    @traced("embedding.embed_documents")
+    @EMBEDDING_DURATION.labels("embed_documents").time()
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         # Embed multiple documents
+        EMBEDDING_BATCH_SIZE.labels("embed_documents").observe(len(texts))
         try:
             return self.embedding_model.embed_documents(texts)
         except Exception as e:
@@ -51,7 +122,7 @@ class ChromaEmbeddingFunction:
 
     def name(self) -> str:
         # Required by ChromaDB
-        return "ollama_embeddings"
+        return f"{settings.EMBEDDING_BACKEND}_embeddings"
 
     def __call__(
         self, input: Union[str, List[str]]
@@ -73,5 +144,5 @@ class ChromaEmbeddingFunction:
         return self.embedding_manager.embed_documents(input)
 
 
-# Global embedding manager instance
-embedding_manager = EmbeddingManager()
+# Global embedding manager instance, created on first use
+embedding_manager = LazyObject(EmbeddingManager)
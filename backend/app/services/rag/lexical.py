@@ -0,0 +1,220 @@
+"""BM25 lexical index kept alongside the Chroma vector store.
+
+Dense similarity ranks exact identifiers poorly: a sender address, a phone
+number or a message ID embeds like any other string. The lexical index
+scores them by term overlap (Okapi BM25) instead, and
+:meth:`~app.services.rag.vector_store.VectorStore.hybrid_query` fuses both
+rankings with reciprocal rank fusion.
+
+The index is sharded by the ``user_id`` metadata of each document, so a
+search only scores the caller's own documents. A user's shard is built from
+the Chroma collection the first time it is searched, then kept up to date
+as documents are added and deleted; at most ``max_shards`` users' shards
+are held in memory, least recently searched evicted first.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and joined identifiers (alice@example.com, 0772-123-456)
+_TOKEN = re.compile(r"[a-z0-9]+(?:[@._+\-'][a-z0-9]+)*")
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Matches scoring under this share of the best match are not ranked: a query
+# like <id@mail.example.com> matches every document on "mail" and "com", and
+# those near-zero matches would otherwise outvote the exact one in fusion
+MIN_SCORE_RATIO = 0.2
+
+# (document id, text, metadata) rows of one user, read from the vector store
+ShardLoader = Callable[[Any], Iterable[Tuple[str, str, Dict[str, Any]]]]
+
+
+def tokenize(text: str) -> List[str]:
+    # Joined identifiers are indexed whole and as their parts, so both
+    # "alice@example.com" and "alice" match
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        tokens.append(token)
+        parts = _WORD.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[str]], k: int = 60
+) -> List[Tuple[str, float]]:
+    """Document ids of all *rankings*, best first, scored by sum of 1 / (k + rank)."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class _Shard:
+    # Inverted index of one user's documents
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.terms: Dict[str, Tuple[str, ...]] = {}
+        self.lengths: Dict[str, int] = {}
+        self.metadatas: Dict[str, Dict[str, Any]] = {}
+        self.total_length = 0
+
+    def add(self, doc_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        self.remove(doc_id)
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        self.terms[doc_id] = tuple(counts)
+        self.lengths[doc_id] = sum(counts.values())
+        self.metadatas[doc_id] = metadata
+        self.total_length += self.lengths[doc_id]
+
+    def remove(self, doc_id: str) -> None:
+        terms = self.terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id)
+        del self.metadatas[doc_id]
+
+    def search(
+        self, terms: List[str], n_results: int, where: Dict[str, Any], k1: float, b: float
+    ) -> List[Tuple[str, float]]:
+        count = len(self.lengths)
+        if not count:
+            return []
+        average_length = self.total_length / count or 1.0
+        scores: Dict[str, float] = {}
+        for term, query_tf in Counter(terms).items():
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1.0 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                norm = k1 * (1.0 - b + b * self.lengths[doc_id] / average_length)
+                scores[doc_id] = (
+                    scores.get(doc_id, 0.0) + query_tf * idf * tf * (k1 + 1.0) / (tf + norm)
+                )
+        matches = [
+            (doc_id, score)
+            for doc_id, score in scores.items()
+            if all(self.metadatas[doc_id].get(key) == value for key, value in where.items())
+        ]
+        if not matches:
+            return []
+        matches.sort(key=lambda item: item[1], reverse=True)
+        floor = matches[0][1] * MIN_SCORE_RATIO
+        return [match for match in matches[:n_results] if match[1] >= floor]
+
+
+class LexicalIndex:
+    """Per-user BM25 index over the vector store's documents."""
+
+    def __init__(
+        self, loader: ShardLoader, max_shards: int = 256, k1: float = 1.2, b: float = 0.75
+    ) -> None:
+        self.loader = loader
+        self.max_shards = max_shards
+        self.k1 = k1
+        self.b = b
+        self._shards: "OrderedDict[Any, _Shard]" = OrderedDict()
+        self._doc_shards: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _shard(self, user_id: Any) -> _Shard:
+        # The user's shard, built from the vector store on first use
+        with self._lock:
+            shard = self._shards.get(user_id)
+            if shard is not None:
+                self._shards.move_to_end(user_id)
+                return shard
+            shard = self._shards[user_id] = _Shard()
+            # Held until loaded, so searches and adds wait for the full shard
+            shard.lock.acquire()
+            evicted = []
+            while len(self._shards) > self.max_shards:
+                evicted.append(self._shards.popitem(last=False))
+            for _, evicted_shard in evicted:
+                for doc_id in evicted_shard.terms:
+                    self._doc_shards.pop(doc_id, None)
+        try:
+            rows = list(self.loader(user_id))
+            for doc_id, text, metadata in rows:
+                shard.add(doc_id, text, metadata)
+            with self._lock:
+                for doc_id, _, _ in rows:
+                    self._doc_shards[doc_id] = user_id
+            logger.info(f"Built lexical index shard for user {user_id}: {len(rows)} documents")
+        except Exception:
+            with self._lock:
+                if self._shards.get(user_id) is shard:
+                    del self._shards[user_id]
+            raise
+        finally:
+            shard.lock.release()
+        return shard
+
+    def add(
+        self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]]
+    ) -> None:
+        """Index new documents of users whose shard is loaded; others are read when built."""
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            user_id = metadata.get("user_id")
+            with self._lock:
+                shard = self._shards.get(user_id)
+                if shard is None:
+                    continue
+                self._doc_shards[doc_id] = user_id
+            with shard.lock:
+                shard.add(doc_id, text, metadata)
+
+    def remove(self, ids: Iterable[str]) -> None:
+        for doc_id in ids:
+            with self._lock:
+                user_id = self._doc_shards.pop(doc_id, None)
+                shard = self._shards.get(user_id) if user_id is not None else None
+            if shard is not None:
+                with shard.lock:
+                    shard.remove(doc_id)
+
+    def drop_user(self, user_id: Any) -> None:
+        """Forget *user_id*'s shard once all of their documents are deleted."""
+        with self._lock:
+            shard = self._shards.pop(user_id, None)
+            if shard is not None:
+                for doc_id in shard.terms:
+                    self._doc_shards.pop(doc_id, None)
+
+    def search(
+        self, user_id: Any, query: str, n_results: int, where: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, float]]:
+        """*user_id*'s best (document id, BM25 score) matches for *query*.
+
+        *where* holds exact-match metadata filters besides ``user_id``.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return []
+        where = {key: value for key, value in (where or {}).items() if key != "user_id"}
+        shard = self._shard(user_id)
+        with shard.lock:
+            return shard.search(terms, n_results, where, self.k1, self.b)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._shards.clear()
+            self._doc_shards.clear()
@@ -0,0 +1,769 @@
+"""In-process NumPy vector index, an alternative backend to Chroma.
+
+For tenants with up to a few hundred thousand chunks, Chroma's SQLite
+metadata tables, HNSW build and result conversion cost more than the
+similarity search itself. :class:`NumpyVectorStore` keeps each user's
+embeddings in one contiguous matrix (``NUMPY_INDEX_DTYPE``, float32 or
+float16), unit-normalized, and answers a query with one matrix-vector
+product and ``argpartition`` top-k: exact cosine ranking, no index to build.
+
+Each user's index lives in its own directory under ``NUMPY_INDEX_PATH``:
+
+* ``vectors.bin`` - raw rows, appended as documents are added and opened
+  with ``np.memmap`` on startup, so a restart reads pages on demand
+  instead of loading or re-embedding anything;
+* ``records.jsonl`` - one line per added row (id, document, metadata) and
+  one per deletion, replayed on load;
+* ``index.json`` - the user key, dimensions and dtype;
+* with ``NUMPY_INDEX_COMPRESSION``, ``compression.npz`` (the trained
+  :class:`~app.services.rag.compression.VectorCompressor`) and
+  ``codes.bin`` (int8 codes, appended like the vectors). The vectors then
+  stay memory-mapped and only the codes are held in memory.
+
+Deleted rows are masked out and the files compacted once half the rows
+are dead. ``where`` filters (``{"source": "email"}``, ``$eq``, ``$ne``,
+``$in``, ``$nin``, ``$and``, ``$or``) are evaluated as boolean row masks,
+cached per (key, value) until the index changes. ``distance`` in results
+is the squared L2 distance between the unit vectors, ``2 - 2 * cosine``.
+"""
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import NUMPY_INDEX_DURATION
+from app.core.tracing import traced
+
+from .compression import TRAIN_SAMPLE_ROWS, VectorCompressor
+from .embeddings import embedding_manager
+from .vector_store import DELETE_PAGE_SIZE, VectorStore, _filter_user
+
+logger = logging.getLogger(__name__)
+
+# Documents without a user_id share one index
+SHARED_KEY = "_shared"
+
+# Rows scored per block when the matrix is float16: each block is upcast to
+# float32, small enough to stay in cache (NumPy has no fast float16 matmul)
+SCORE_BLOCK_ROWS = 1024
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top(scores: np.ndarray, k: int) -> np.ndarray:
+    # Positions of the k highest scores, best first
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+class _UserIndex:
+    # Contiguous embedding matrix and records of one user's documents
+
+    def __init__(
+        self,
+        directory: str,
+        key: Any,
+        dtype: str,
+        compressor: Optional[VectorCompressor] = None,
+        compress_after: int = 1000,
+        rerank_candidates: int = 100,
+    ) -> None:
+        self.directory = directory
+        self.key = key
+        self.dtype = np.dtype(dtype)
+        self.dimensions = 0
+        self.lock = threading.RLock()
+        # Without a compressor: a memmap until first written to, then in memory.
+        # With one: always the memmap; searches score self.codes instead
+        self.matrix: Optional[np.ndarray] = None
+        self.compressor = compressor
+        self.compress_after = compress_after
+        self.rerank_candidates = rerank_candidates
+        self.codes: Optional[np.ndarray] = None  # int8, once the compressor is trained
+        self.count = 0
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.rows: Dict[str, int] = {}
+        self.alive = np.zeros(0, dtype=bool)
+        self.dead = 0
+        self._masks: Dict[Tuple[str, str], np.ndarray] = {}
+
+    # Persistence
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.bin")
+
+    @property
+    def _records_path(self) -> str:
+        return os.path.join(self.directory, "records.jsonl")
+
+    @property
+    def _codes_path(self) -> str:
+        return os.path.join(self.directory, "codes.bin")
+
+    @property
+    def _compressor_path(self) -> str:
+        return os.path.join(self.directory, "compression.npz")
+
+    def load(self) -> None:
+        with open(os.path.join(self.directory, "index.json")) as f:
+            info = json.load(f)
+        self.dimensions = info["dimensions"]
+        self.dtype = np.dtype(info["dtype"])
+        row_bytes = self.dimensions * self.dtype.itemsize
+        for path in (self._vectors_path, self._records_path):
+            open(path, "ab").close()  # created before the first row was written
+        stored_rows = os.path.getsize(self._vectors_path) // row_bytes if row_bytes else 0
+
+        dead = set()
+        good_bytes = 0  # records file length up to the last complete record
+        with open(self._records_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # a write cut short by a crash
+                if "deleted" in record:
+                    for doc_id in record["deleted"]:
+                        row = self.rows.pop(doc_id, None)
+                        if row is not None:
+                            dead.add(row)
+                else:
+                    if len(self.ids) == stored_rows:
+                        break  # its vector never reached the disk
+                    previous = self.rows.get(record["id"])
+                    if previous is not None:
+                        dead.add(previous)  # replaced by this row
+                    self.rows[record["id"]] = len(self.ids)
+                    self.ids.append(record["id"])
+                    self.documents.append(record["document"])
+                    self.metadatas.append(record["metadata"])
+                good_bytes += len(line)
+        self.count = len(self.ids)
+
+        # Drop anything after the last complete row, so later appends line up
+        os.truncate(self._records_path, good_bytes)
+        os.truncate(self._vectors_path, self.count * row_bytes)
+
+        self.alive = np.ones(self.count, dtype=bool)
+        self.alive[list(dead)] = False
+        self.dead = len(dead)
+        self._map_vectors()
+        if self.compressor is not None and os.path.exists(self._compressor_path):
+            self.compressor.load(self._compressor_path)
+            self._load_codes()
+
+    def _map_vectors(self) -> None:
+        self.matrix = None
+        if self.count:
+            self.matrix = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dimensions)
+            )
+
+    def _load_codes(self) -> None:
+        # Codes of rows added while compression was off are encoded now
+        width = len(self.compressor.scale)
+        stored = 0
+        if os.path.exists(self._codes_path):
+            stored = min(os.path.getsize(self._codes_path) // width, self.count)
+        if stored:
+            os.truncate(self._codes_path, stored * width)
+        else:
+            open(self._codes_path, "wb").close()
+        codes = np.empty((self.count, width), dtype=np.int8)
+        codes[:stored] = np.fromfile(self._codes_path, dtype=np.int8).reshape(stored, width)
+        if stored < self.count:
+            codes[stored:] = self.compressor.encode(self.matrix[stored:])
+            with open(self._codes_path, "ab") as f:
+                f.write(codes[stored:].tobytes())
+        self.codes = codes
+
+    def _write_info(self, directory: Optional[str] = None) -> None:
+        with open(os.path.join(directory or self.directory, "index.json"), "w") as f:
+            json.dump(
+                {"key": self.key, "dimensions": self.dimensions, "dtype": self.dtype.name}, f
+            )
+
+    # Mutation
+
+    def _reserve(self, rows: int) -> None:
+        # Room for *rows* more rows in the in-memory arrays
+        needed = self.count + rows
+        capacity = max(needed, 2 * self.count, 1024)
+        if len(self.alive) < needed:
+            alive = np.zeros(capacity, dtype=bool)
+            alive[: self.count] = self.alive[: self.count]
+            self.alive = alive
+            if self.codes is not None:
+                codes = np.empty((capacity, self.codes.shape[1]), dtype=np.int8)
+                codes[: self.count] = self.codes[: self.count]
+                self.codes = codes
+        if self.compressor is None and (
+            isinstance(self.matrix, np.memmap) or self.matrix is None or len(self.matrix) < needed
+        ):
+            matrix = np.empty((max(capacity, len(self.alive)), self.dimensions), dtype=self.dtype)
+            if self.count:
+                matrix[: self.count] = self.matrix[: self.count]
+            self.matrix = matrix
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        vectors: np.ndarray,
+    ) -> None:
+        with self.lock:
+            if not self.dimensions:
+                self.dimensions = vectors.shape[1]
+                os.makedirs(self.directory, exist_ok=True)
+                self._write_info()
+            elif vectors.shape[1] != self.dimensions:
+                raise ValueError(
+                    f"Embedding has {vectors.shape[1]} dimensions, index has {self.dimensions}"
+                )
+            rows = _normalize(vectors.astype(np.float32)).astype(self.dtype)
+            for doc_id in ids:
+                if doc_id in self.rows:
+                    self._mark_deleted(doc_id)
+
+            codes = self.compressor.encode(rows) if self.codes is not None else None
+
+            # Vectors first: on load, a record without its vector is dropped
+            with open(self._vectors_path, "ab") as f:
+                f.write(rows.tobytes())
+            if codes is not None:
+                with open(self._codes_path, "ab") as f:
+                    f.write(codes.tobytes())
+            with open(self._records_path, "a") as f:
+                for doc_id, document, metadata in zip(ids, documents, metadatas):
+                    f.write(
+                        json.dumps({"id": doc_id, "document": document, "metadata": metadata})
+                        + "\n"
+                    )
+
+            self._reserve(len(ids))
+            if self.compressor is None:
+                self.matrix[self.count : self.count + len(ids)] = rows
+            if codes is not None:
+                self.codes[self.count : self.count + len(ids)] = codes
+            self.alive[self.count : self.count + len(ids)] = True
+            for doc_id, document, metadata in zip(ids, documents, metadatas):
+                self.rows[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+            self.count += len(ids)
+            self._masks.clear()
+            if self.compressor is not None:
+                self._map_vectors()
+                if self.codes is None and self.count - self.dead >= self.compress_after:
+                    self._train()
+
+    def _train(self) -> None:
+        # Fit the compressor to a sample of the live rows and encode them all
+        started = time.perf_counter()
+        live = np.flatnonzero(self.alive[: self.count])
+        if len(live) > TRAIN_SAMPLE_ROWS:
+            rng = np.random.default_rng(0)
+            live = np.sort(rng.choice(live, TRAIN_SAMPLE_ROWS, replace=False))
+        self.compressor.train(self.matrix[live])
+        codes = self.compressor.encode(self.matrix[: self.count])
+        with open(self._codes_path, "wb") as f:
+            f.write(codes.tobytes())
+        # Written last: an index without it is untrained and ignores codes.bin
+        self.compressor.save(self._compressor_path)
+        self.codes = np.empty((len(self.alive), codes.shape[1]), dtype=np.int8)
+        self.codes[: self.count] = codes
+        logger.info(
+            f"Trained {self.compressor.method} compression for user {self.key} in "
+            f"{time.perf_counter() - started:.2f}s: {self.dimensions} dimensions -> "
+            f"{codes.shape[1]} int8 codes"
+        )
+
+    def _mark_deleted(self, doc_id: str) -> bool:
+        row = self.rows.pop(doc_id, None)
+        if row is None or not self.alive[row]:
+            return False
+        self.alive[row] = False
+        self.dead += 1
+        return True
+
+    def delete(self, doc_ids: Iterable[str]) -> List[str]:
+        with self.lock:
+            deleted = [doc_id for doc_id in doc_ids if self._mark_deleted(doc_id)]
+            if deleted:
+                with open(self._records_path, "a") as f:
+                    f.write(json.dumps({"deleted": deleted}) + "\n")
+                self._masks.clear()
+                if self.dead * 2 > self.count:
+                    self.compact()
+            return deleted
+
+    def compact(self) -> None:
+        # Rewrite the files with live rows only
+        with self.lock:
+            live = np.flatnonzero(self.alive[: self.count])
+            tmp = f"{self.directory}.compacting"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            with open(os.path.join(tmp, "vectors.bin"), "wb") as f:
+                for start in range(0, len(live), SCORE_BLOCK_ROWS):
+                    block = self.matrix[live[start : start + SCORE_BLOCK_ROWS]]
+                    f.write(np.ascontiguousarray(block).tobytes())
+            if self.codes is not None:
+                codes = self.codes[live]
+                with open(os.path.join(tmp, "codes.bin"), "wb") as f:
+                    f.write(codes.tobytes())
+                shutil.copy(self._compressor_path, tmp)
+            with open(os.path.join(tmp, "records.jsonl"), "w") as f:
+                for row in live:
+                    f.write(
+                        json.dumps(
+                            {
+                                "id": self.ids[row],
+                                "document": self.documents[row],
+                                "metadata": self.metadatas[row],
+                            }
+                        )
+                        + "\n"
+                    )
+            self._write_info(tmp)
+            previous = f"{self.directory}.previous"
+            os.rename(self.directory, previous)
+            os.rename(tmp, self.directory)
+            shutil.rmtree(previous)
+
+            self.ids = [self.ids[row] for row in live]
+            self.documents = [self.documents[row] for row in live]
+            self.metadatas = [self.metadatas[row] for row in live]
+            self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            self.count = len(live)
+            if self.compressor is None:
+                self.matrix = self.matrix[live]
+            else:
+                self._map_vectors()
+            if self.codes is not None:
+                self.codes = codes
+            self.alive = np.ones(self.count, dtype=bool)
+            self.dead = 0
+            self._masks.clear()
+
+    # Search
+
+    def _equals(self, key: str, value: Any) -> np.ndarray:
+        cache_key = (key, json.dumps(value, sort_keys=True, default=str))
+        mask = self._masks.get(cache_key)
+        if mask is None:
+            mask = np.fromiter(
+                (metadata.get(key) == value for metadata in self.metadatas),
+                dtype=bool,
+                count=self.count,
+            )
+            self._masks[cache_key] = mask
+        return mask
+
+    def where_mask(self, where: Optional[Dict[str, Any]]) -> np.ndarray:
+        mask = self.alive[: self.count].copy()
+        if where:
+            mask &= self._where(where)
+        return mask
+
+    def _where(self, where: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(self.count, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._where(clause)
+            elif key == "$or":
+                either = np.zeros(self.count, dtype=bool)
+                for clause in condition:
+                    either |= self._where(clause)
+                mask &= either
+            elif isinstance(condition, dict):
+                for operator, value in condition.items():
+                    if operator == "$eq":
+                        mask &= self._equals(key, value)
+                    elif operator == "$ne":
+                        mask &= ~self._equals(key, value)
+                    elif operator in ("$in", "$nin"):
+                        found = np.zeros(self.count, dtype=bool)
+                        for item in value:
+                            found |= self._equals(key, item)
+                        mask &= found if operator == "$in" else ~found
+                    else:
+                        raise ValueError(f"Unsupported where operator: {operator}")
+            else:
+                mask &= self._equals(key, condition)
+        return mask
+
+    def scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        # Cosine similarity of every (selected) row to every query: rows x queries
+        matrix = self.matrix[: self.count] if rows is None else self.matrix[rows]
+        if matrix.dtype == np.float32:
+            return matrix @ queries.T
+        out = np.empty((len(matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_BLOCK_ROWS):
+            block = matrix[start : start + SCORE_BLOCK_ROWS].astype(np.float32)
+            out[start : start + len(block)] = block @ queries.T
+        return out
+
+    def search(
+        self, queries: np.ndarray, n_results: int, where: Optional[Dict[str, Any]]
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        # Best (score, document) per query, best first. Documents are read under
+        # the lock: a concurrent delete may compact and renumber the rows
+        with self.lock:
+            if not self.count:
+                return [[] for _ in queries]
+            mask = self.where_mask(where)
+            selected = np.flatnonzero(mask)
+            if not len(selected):
+                return [[] for _ in queries]
+            rows = None if len(selected) == self.count else selected
+            k = min(n_results, len(selected))
+            if self.codes is not None:
+                return self._search_compressed(queries, k, rows, selected)
+            scores = self.scores(queries, rows)
+            results = []
+            for column in range(len(queries)):
+                top = _top(scores[:, column], k)
+                found = top if rows is None else rows[top]
+                results.append(
+                    [(float(scores[i, column]), self.document(row)) for i, row in zip(top, found)]
+                )
+            return results
+
+    def _search_compressed(
+        self, queries: np.ndarray, k: int, rows: Optional[np.ndarray], selected: np.ndarray
+    ) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        # Candidates by their codes, then reranked with the full-precision rows
+        codes = self.codes[: self.count] if rows is None else self.codes[rows]
+        approximate = self.compressor.scores(codes, queries)
+        candidates = min(max(k, self.rerank_candidates), len(selected))
+        results = []
+        for column in range(len(queries)):
+            top = _top(approximate[:, column], candidates)
+            found = np.sort(top if rows is None else rows[top])  # in file order
+            exact = self.scores(queries[column : column + 1], found)[:, 0]
+            results.append([(float(exact[i]), self.document(found[i])) for i in _top(exact, k)])
+        return results
+
+    def document(self, row: int) -> Dict[str, Any]:
+        # Call with the lock held; compact() renumbers rows
+        return {
+            "id": self.ids[row],
+            "content": self.documents[row],
+            "metadata": self.metadatas[row],
+        }
+
+    def live_documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self.lock:
+            rows = np.flatnonzero(self.alive[: self.count])[:limit]
+            return [self.document(row) for row in rows]
+
+
+class NumpyVectorStore(VectorStore):
+    """Vector store backed by one in-process NumPy matrix per user."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        dtype: Optional[str] = None,
+        compression: Optional[str] = None,
+    ):
+        self.path = path or settings.NUMPY_INDEX_PATH
+        self.dtype = dtype or settings.NUMPY_INDEX_DTYPE
+        # "" for none, or a VectorCompressor method
+        self.compression = (
+            settings.NUMPY_INDEX_COMPRESSION if compression is None else compression
+        )
+        self.reduced_dimensions = settings.NUMPY_INDEX_REDUCED_DIMENSIONS
+        self.compress_after = settings.NUMPY_INDEX_COMPRESS_AFTER
+        self.rerank_candidates = settings.NUMPY_INDEX_RERANK_CANDIDATES
+        super().__init__(collection_name="numpy")
+
+    def _initialize(self):
+        self._indexes: Dict[str, _UserIndex] = {}
+        self._keys: Dict[str, Any] = {}  # directory -> user key, of every index on disk
+        self._indexes_lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        for name in sorted(os.listdir(self.path)):
+            directory = os.path.join(self.path, name)
+            if name.endswith(".compacting"):
+                shutil.rmtree(directory, ignore_errors=True)
+            elif name.endswith(".previous"):
+                # Compaction interrupted between swapping the directories
+                current = directory[: -len(".previous")]
+                if os.path.exists(os.path.join(current, "index.json")):
+                    shutil.rmtree(directory, ignore_errors=True)
+                else:
+                    shutil.rmtree(current, ignore_errors=True)
+                    os.rename(directory, current)
+        for name in os.listdir(self.path):
+            info = os.path.join(self.path, name, "index.json")
+            if name.startswith("user-") and os.path.exists(info):
+                with open(info) as f:
+                    self._keys[os.path.join(self.path, name)] = json.load(f)["key"]
+        logger.info(
+            f"NumPy vector index opened at {self.path}: {len(self._keys)} users ({self.dtype})"
+        )
+
+    # User indexes
+
+    def _directory(self, key: Any) -> str:
+        name = re.sub(r"[^A-Za-z0-9_-]", "_", str(key))
+        return os.path.join(self.path, f"user-{name}")
+
+    def _index(self, key: Any, create: bool = False) -> Optional[_UserIndex]:
+        # The user's index, loaded from disk on first use
+        directory = self._directory(key)
+        with self._indexes_lock:
+            index = self._indexes.get(directory)
+            if index is None:
+                if directory not in self._keys and not create:
+                    return None
+                index = self._new_index(directory, key)
+                if directory in self._keys:
+                    index.load()
+                self._indexes[directory] = index
+                self._keys[directory] = key
+            return index
+
+    def _new_index(self, directory: str, key: Any) -> _UserIndex:
+        compressor = None
+        if self.compression:
+            compressor = VectorCompressor(self.compression, self.reduced_dimensions)
+        return _UserIndex(
+            directory,
+            key,
+            self.dtype,
+            compressor,
+            compress_after=self.compress_after,
+            rerank_candidates=self.rerank_candidates,
+        )
+
+    def _all_indexes(self) -> List[_UserIndex]:
+        with self._indexes_lock:
+            keys = list(self._keys.values())
+        return [index for index in map(self._index, keys) if index is not None]
+
+    def _indexes_for(self, where: Optional[Dict[str, Any]]) -> List[_UserIndex]:
+        user_id = _filter_user(where)
+        if user_id is None:
+            return self._all_indexes()
+        index = self._index(user_id)
+        return [index] if index is not None else []
+
+    def _drop(self, index: _UserIndex) -> int:
+        # Remove a user's whole index; returns the live rows it held
+        with self._indexes_lock:
+            self._indexes.pop(index.directory, None)
+            self._keys.pop(index.directory, None)
+        with index.lock:
+            ids = [index.ids[row] for row in np.flatnonzero(index.alive[: index.count])]
+            shutil.rmtree(index.directory, ignore_errors=True)
+        self.lexical.remove(ids)
+        return len(ids)
+
+    # VectorStore interface
+
+    @traced("numpy_index.add")
+    @NUMPY_INDEX_DURATION.labels("add").time()
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        # Add documents to the vector store
+        try:
+            if ids is None:
+                ids = [self._generate_id(doc, meta) for doc, meta in zip(documents, metadatas)]
+            for metadata in metadatas:
+                if "added_at" not in metadata:
+                    metadata["added_at"] = datetime.now(timezone.utc).isoformat()
+
+            vectors = np.asarray(embedding_manager.embed_documents(documents), dtype=np.float32)
+            by_user: Dict[Any, List[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                by_user.setdefault(metadata.get("user_id", SHARED_KEY), []).append(i)
+            for key, positions in by_user.items():
+                self._index(key, create=True).add(
+                    [ids[i] for i in positions],
+                    [documents[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                    vectors[positions],
+                )
+            self.lexical.add(ids, documents, metadatas)
+
+            logger.info(f"Added {len(documents)} documents to vector store")
+            return ids
+
+        except Exception as e:
+            logger.error(f"Failed to add documents to vector store: {e}")
+            raise
+
+    @traced("numpy_index.query")
+    @NUMPY_INDEX_DURATION.labels("query").time()
+    def query_documents(
+        self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # Query the vector store for relevant documents
+        try:
+            formatted_results = self._search_vectors(
+                self._query_embeddings([query]), n_results, filter_metadata
+            )[0]
+            logger.info(
+                f"Retrieved {len(formatted_results)} results for query: {query[:50]}..."
+            )
+            return formatted_results
+
+        except Exception as e:
+            logger.error(f"Failed to query vector store: {e}")
+            raise
+
+    @traced("numpy_index.query_many")
+    @NUMPY_INDEX_DURATION.labels("query_many").time()
+    def query_many(
+        self, queries: List[str], n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # Run several queries as one matrix product per user; results are in query order
+        try:
+            return self._search_vectors(
+                self._query_embeddings(queries), n_results, filter_metadata
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to query vector store: {e}")
+            raise
+
+    def _search_vectors(
+        self, vectors: List[List[float]], n_results: int, filter_metadata: Optional[Dict]
+    ) -> List[List[Dict[str, Any]]]:
+        queries = _normalize(np.asarray(vectors, dtype=np.float32))
+        # (score, document) per query across the matching user indexes
+        found: List[List[Tuple[float, Dict[str, Any]]]] = [[] for _ in vectors]
+        for index in self._indexes_for(filter_metadata):
+            if index.dimensions and index.dimensions != queries.shape[1]:
+                raise ValueError(
+                    f"Query has {queries.shape[1]} dimensions, index has {index.dimensions}"
+                )
+            for matches, best in zip(found, index.search(queries, n_results, filter_metadata)):
+                matches.extend(best)
+        results = []
+        for matches in found:
+            matches.sort(key=lambda match: match[0], reverse=True)
+            results.append(
+                [
+                    {**document, "distance": 2.0 - 2.0 * score}
+                    for score, document in matches[:n_results]
+                ]
+            )
+        return results
+
+    def _get_documents(
+        self, ids: List[str], filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        wanted = set(ids)
+        documents = []
+        for index in self._indexes_for(filter_metadata):
+            with index.lock:
+                documents.extend(
+                    index.document(index.rows[doc_id])
+                    for doc_id in wanted.intersection(index.rows)
+                )
+        return documents
+
+    def _user_rows(self, user_id: Any):
+        index = self._index(user_id)
+        if index is None:
+            return []
+        return [
+            (document["id"], document["content"], document["metadata"])
+            for document in index.live_documents()
+        ]
+
+    @traced("numpy_index.get_all")
+    @NUMPY_INDEX_DURATION.labels("get_all").time()
+    def get_all_documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Get all documents from the vector store
+        try:
+            formatted_results = []
+            for index in self._all_indexes():
+                if limit is not None and len(formatted_results) >= limit:
+                    break
+                remaining = None if limit is None else limit - len(formatted_results)
+                formatted_results.extend(index.live_documents(remaining))
+            return formatted_results
+
+        except Exception as e:
+            logger.error(f"Failed to get all documents: {e}")
+            raise
+
+    @traced("numpy_index.delete")
+    @NUMPY_INDEX_DURATION.labels("delete").time()
+    def delete_documents(self, filter_metadata: Dict[str, Any]) -> int:
+        # Delete documents matching the filter criteria
+        try:
+            deleted_count = sum(self.delete_pages(filter_metadata))
+            if deleted_count:
+                logger.info(f"Deleted {deleted_count} documents")
+            return deleted_count
+
+        except Exception as e:
+            logger.error(f"Failed to delete documents: {e}")
+            raise
+
+    def delete_pages(
+        self, filter_metadata: Dict[str, Any], page_size: int = DELETE_PAGE_SIZE
+    ) -> Iterator[int]:
+        # Rows are selected by mask without reading documents, then deleted
+        # page_size ids at a time
+        user_id = _filter_user(filter_metadata)
+        if set(filter_metadata) == {"user_id"} and user_id is not None:
+            # Everything of one user: drop the directory instead of masking each row
+            index = self._index(user_id)
+            yield self._drop(index) if index is not None else 0
+            return
+        for index in self._indexes_for(filter_metadata):
+            with index.lock:
+                mask = index.where_mask(filter_metadata)
+                ids = [index.ids[row] for row in np.flatnonzero(mask)]
+            for start in range(0, len(ids), page_size):
+                deleted = index.delete(ids[start : start + page_size])
+                self.lexical.remove(deleted)
+                yield len(deleted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        # Get statistics about the vector index
+        try:
+            indexes = self._all_indexes()
+            return {
+                "total_documents": sum(index.count - index.dead for index in indexes),
+                "collection_name": self.collection_name,
+                "database_path": self.path,
+                "backend": "numpy",
+                "users": len(indexes),
+                "dtype": self.dtype,
+                "compression": self.compression or None,
+                "compressed_users": sum(index.codes is not None for index in indexes),
+            }
+        except Exception as e:
+            logger.error(f"Failed to get index stats: {e}")
+            return {"error": str(e)}
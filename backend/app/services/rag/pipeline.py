@@ -1,8 +1,11 @@
 import logging
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
 from app.core.config import settings
+from app.core.lazy import LazyObject
+from app.core.metrics import INGEST_CHUNKS, INGEST_DOCUMENTS
+from app.core.tracing import traced
 from .chunker import text_chunker
 from .embeddings import embedding_manager
 from .vector_store import vector_store
@@ -33,6 +36,7 @@ class RAGPipeline:
             self.backend = None
             logger.info("RAG Pipeline initialized with ChromaDB backend")
 
+    @traced("rag.add_text")
     def add_text(self, text: str, metadata: Dict[str, Any]) -> List[str]:
         # Add text to the RAG pipeline with automatic chunking and embedding
         try:
@@ -53,6 +57,8 @@ class RAGPipeline:
                     ]
                     
                     document_ids = self.backend.add_documents_batch(documents_to_add)
+                    INGEST_DOCUMENTS.inc()
+                    INGEST_CHUNKS.inc(len(document_ids))
                     logger.info(f"Added {len(chunk_data)} chunks to Backboard")
                     return document_ids
                 except Exception as e:
@@ -75,6 +81,8 @@ class RAGPipeline:
 
                 # Add to vector store
                 document_ids = self.vector_store.add_documents(documents, metadatas)
+                INGEST_DOCUMENTS.inc()
+                INGEST_CHUNKS.inc(len(documents))
 
                 logger.info(f"Added {len(chunk_data)} chunks to ChromaDB")
                 return document_ids
@@ -83,10 +91,16 @@ class RAGPipeline:
             logger.error(f"Failed to add text to RAG pipeline: {e}")
             raise
 
+    @traced("rag.query_texts")
     def query_texts(
-        self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
+        self,
+        query: str,
+        n_results: int = 5,
+        filter_metadata: Optional[Dict] = None,
+        mode: str = "vector",
     ) -> List[Dict[str, Any]]:
-        # Query the RAG pipeline for relevant documents
+        # Query the RAG pipeline for relevant documents. mode "hybrid" also ranks
+        # by exact terms (ChromaDB only; needs a user_id filter).
         try:
             if self.use_backboard:
                 # Route to Backboard backend
@@ -99,11 +113,40 @@ class RAGPipeline:
                     return []
             else:
                 # Route to ChromaDB backend
+                if mode == "hybrid":
+                    return self.vector_store.hybrid_query(query, n_results, filter_metadata)
                 return self.vector_store.query_documents(query, n_results, filter_metadata)
         except Exception as e:
             logger.error(f"Failed to query RAG pipeline: {e}")
             raise
 
+    @traced("rag.query_many")
+    def query_many(
+        self, queries: List[str], n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # Several queries at once, results in query order. ChromaDB embeds them
+        # in one batch and searches them in one call.
+        try:
+            if self.use_backboard:
+                # Backboard searches one query per request
+                try:
+                    return [
+                        self.backend.search_documents(query, n_results, filter_metadata)
+                        for query in queries
+                    ]
+                except Exception as e:
+                    # Graceful degradation: log error and return empty results
+                    logger.error(f"Backboard query_many failed, operating in degraded mode: {e}", exc_info=True)
+                    logger.warning("Operating in degraded mode: Backboard unavailable for document search")
+                    return [[] for _ in queries]
+            else:
+                # Route to ChromaDB backend
+                return self.vector_store.query_many(queries, n_results, filter_metadata)
+        except Exception as e:
+            logger.error(f"Failed to query RAG pipeline: {e}")
+            raise
+
+    @traced("rag.get_recent_documents")
     def get_recent_documents(
         self, days: int = 7, limit: int = 50
     ) -> List[Dict[str, Any]]:
@@ -169,6 +212,7 @@ class RAGPipeline:
             logger.error(f"Failed to get recent documents: {e}")
             raise
 
+    @traced("rag.delete_documents")
     def delete_documents(self, filter_metadata: Dict[str, Any]) -> int:
         # Delete documents matching the filter criteria
         try:
@@ -188,6 +232,15 @@ class RAGPipeline:
             logger.error(f"Failed to delete documents: {e}")
             raise
 
+    def delete_document_pages(self, filter_metadata: Dict[str, Any]) -> Iterator[int]:
+        # Delete matching documents step by step, yielding how many each step
+        # removed. Unlike delete_documents, Backboard failures are raised.
+        if self.use_backboard:
+            # One server-side delete by filter
+            yield self.backend.delete_documents(filter_metadata)
+        else:
+            yield from self.vector_store.delete_pages(filter_metadata)
+
     def get_collection_stats(self) -> Dict[str, Any]:
         # Get statistics about the document collection
         try:
@@ -243,6 +296,7 @@ class RAGPipeline:
             logger.error(f"Failed to search by content type: {e}")
             raise
 
+    @traced("rag.get_user_documents")
     def get_user_documents(
         self, user_id: int, n_results: int = 50
     ) -> List[Dict[str, Any]]:
@@ -279,5 +333,5 @@ class RAGPipeline:
             raise
 
 
-# Global RAG pipeline instance
-rag_pipeline = RAGPipeline()
+# Global RAG pipeline instance, created on first use
+rag_pipeline = LazyObject(RAGPipeline)
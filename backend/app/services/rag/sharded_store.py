@@ -0,0 +1,570 @@
+"""Chroma collections sharded by user (``CHROMA_SHARDING``).
+
+With one ``londoolink_documents`` collection, every query searches an HNSW
+index dominated by other tenants' vectors and filters by ``user_id`` in
+SQLite, and deleting a user's documents scans the collection with
+``get(where)``. :class:`ShardedVectorStore` gives each user their own
+collection (``CHROMA_SHARDING=user``, named ``londoolink_documents_u_<id>``)
+or hashes users into ``CHROMA_SHARD_BUCKETS`` collections (``bucket``,
+``londoolink_documents_b<n>``, for very many small tenants). Documents
+without a ``user_id`` stay in the shared collection.
+
+A query pinned to a user (``{"user_id": X}``, also inside ``$and``) searches
+only that user's shard; in ``user`` mode the ``user_id`` clause is dropped
+there, so Chroma runs a plain HNSW search with no metadata filter, and
+deleting everything of a user drops the collection. Queries without a user
+fan out over every shard and merge by distance.
+
+Open shards are kept in an LRU of ``CHROMA_MAX_OPEN_COLLECTIONS``; shards in
+use by a call are never closed. How closing bounds memory depends on the
+client:
+
+* in-memory client with ``CHROMA_SNAPSHOT_DIR``: each shard has its own
+  :class:`~app.services.rag.snapshots.CollectionJournal`; a closed shard's
+  collection is deleted from the client and restored from its snapshot and
+  log on next use, without re-embedding;
+* persistent client (development): the collection stays on disk and
+  ``CHROMA_SEGMENT_MEMORY_MB`` caps the HNSW indexes Chroma keeps loaded,
+  evicting the least recently used;
+* in-memory client without snapshots: nothing can be unloaded without
+  losing it, so only the handle is closed.
+
+Existing documents are moved into shards with
+:meth:`ShardedVectorStore.split_shared_collection`
+(``python -m scripts.shard_vector_store``).
+"""
+
+import hashlib
+import logging
+import os
+import re
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import CHROMA_DURATION, CHROMA_SHARD_EVENTS
+from app.core.tracing import traced
+
+from .embeddings import ChromaEmbeddingFunction, embedding_manager
+from .snapshots import BATCH_SIZE, CollectionJournal, snapshots_enabled
+from .vector_store import (
+    DELETE_PAGE_SIZE,
+    ChromaSettings,
+    VectorStore,
+    _chroma_where,
+    _filter_user,
+)
+
+logger = logging.getLogger(__name__)
+
+SHARDING_MODES = ("user", "bucket")
+
+_NUMERIC_ID = re.compile(r"[0-9]{1,30}")
+
+
+class _Shard:
+    # A shard collection, set once *ready*: until then another thread is
+    # opening it (or dropping it). *active* counts the calls using it
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.collection = None
+        self.journal: Optional[CollectionJournal] = None
+        self.active = 0
+        self.ready = threading.Event()
+
+
+class ShardedVectorStore(VectorStore):
+    """VectorStore with a Chroma collection per user, or per hash bucket of users."""
+
+    def __init__(
+        self,
+        collection_name: str = "londoolink_documents",
+        sharding: Optional[str] = None,
+        buckets: Optional[int] = None,
+        max_open: Optional[int] = None,
+    ):
+        self.sharding = sharding or settings.CHROMA_SHARDING
+        if self.sharding not in SHARDING_MODES:
+            raise ValueError(
+                f"CHROMA_SHARDING must be one of {', '.join(SHARDING_MODES)}, "
+                f"not {self.sharding!r}"
+            )
+        self.buckets = buckets or settings.CHROMA_SHARD_BUCKETS
+        self.max_open = max_open or settings.CHROMA_MAX_OPEN_COLLECTIONS
+        self.segment_memory_mb = settings.CHROMA_SEGMENT_MEMORY_MB
+        self._shards: "OrderedDict[str, _Shard]" = OrderedDict()
+        self._shards_lock = threading.Lock()
+        super().__init__(collection_name)
+
+    def _client_settings(self):
+        if settings.ENVIRONMENT == "development" and self.segment_memory_mb > 0:
+            return ChromaSettings(
+                anonymized_telemetry=False,
+                allow_reset=True,
+                chroma_segment_cache_policy="LRU",
+                chroma_memory_limit_bytes=self.segment_memory_mb * 1024 * 1024,
+            )
+        return super()._client_settings()
+
+    def _initialize(self):
+        # The client and the shared collection, for documents without a user_id
+        super()._initialize()
+        self._embedding_function = ChromaEmbeddingFunction(embedding_manager)
+        logger.info(
+            f"ChromaDB sharded by {self.sharding}: {len(self._shard_names())} shard collections"
+        )
+
+    # Shards
+
+    @property
+    def _prefix(self) -> str:
+        marker = "_u_" if self.sharding == "user" else "_b"
+        return f"{self.collection_name}{marker}"
+
+    def _shard_name(self, user_id: Any) -> str:
+        key = str(user_id)
+        if self.sharding == "bucket":
+            bucket = int(hashlib.md5(key.encode()).hexdigest()[:8], 16) % self.buckets
+            return f"{self._prefix}{bucket:04d}"
+        if not _NUMERIC_ID.fullmatch(key):
+            # Chroma names are [A-Za-z0-9._-], at most 63 characters
+            key = "h" + hashlib.md5(key.encode()).hexdigest()[:24]
+        return f"{self._prefix}{key}"
+
+    def _shard_names(self) -> List[str]:
+        # Every shard collection: in the client, or closed in its journal
+        names = {
+            collection if isinstance(collection, str) else collection.name
+            for collection in self.client.list_collections()
+        }
+        if snapshots_enabled() and os.path.isdir(settings.CHROMA_SNAPSHOT_DIR):
+            names.update(os.listdir(settings.CHROMA_SNAPSHOT_DIR))
+        return sorted(name for name in names if name.startswith(self._prefix))
+
+    def _shard_filter(self, where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        # Inside a user's own collection their user_id clause matches every row
+        if self.sharding != "user" or not where:
+            return where
+        rest = {
+            key: value
+            for key, value in where.items()
+            if key != "user_id" or _filter_user({key: value}) is None
+        }
+        if "$and" in rest:
+            clauses = [clause for clause in rest.pop("$and") if _filter_user(clause) is None]
+            if len(clauses) == 1:
+                rest.update(clauses[0])
+            elif clauses:
+                rest["$and"] = clauses
+        return rest or None
+
+    def _drop_collection(self, name: str) -> None:
+        try:
+            self.client.delete_collection(name)
+        except ValueError:
+            pass  # not in the client
+
+    def _open(
+        self, name: str, create: bool
+    ) -> Optional[Tuple[Any, Optional[CollectionJournal]]]:
+        # The shard's collection and journal, or None if it has no documents yet.
+        # Called by one thread per shard, without _shards_lock held
+        if snapshots_enabled():
+            # The shard lives in its journal while closed
+            directory = os.path.join(settings.CHROMA_SNAPSHOT_DIR, name)
+            if not create and not os.path.isdir(directory):
+                return None
+            self._drop_collection(name)  # a copy left by a failed close
+            collection = self.client.create_collection(
+                name=name, embedding_function=self._embedding_function
+            )
+            journal = CollectionJournal(
+                directory,
+                snapshot_every=settings.CHROMA_SNAPSHOT_WAL_ENTRIES,
+                fsync=settings.CHROMA_WAL_FSYNC,
+            )
+            journal.restore(collection)
+            CHROMA_SHARD_EVENTS.labels("restored").inc()
+            return collection, journal
+        if create:
+            collection = self.client.get_or_create_collection(
+                name=name, embedding_function=self._embedding_function
+            )
+        else:
+            try:
+                collection = self.client.get_collection(
+                    name=name, embedding_function=self._embedding_function
+                )
+            except Exception:
+                return None  # no documents for this shard yet
+        CHROMA_SHARD_EVENTS.labels("opened").inc()
+        return collection, None
+
+    def _close_idle(self) -> None:
+        # Close the least recently used shards past the cap, skipping those in use
+        excess = len(self._shards) - self.max_open
+        for name, shard in list(self._shards.items()):
+            if excess <= 0:
+                break
+            if shard.active:
+                continue
+            del self._shards[name]
+            excess -= 1
+            if shard.journal is not None:
+                # Every write is in the journal: free the collection's memory
+                shard.journal.close()
+                self._drop_collection(name)
+            CHROMA_SHARD_EVENTS.labels("evicted").inc()
+
+    @contextmanager
+    def _shard(self, name: str, create: bool = False) -> Iterator[Optional[_Shard]]:
+        # The shard, opened on first use and held open for the block
+        shard = self._acquire(name, create)
+        try:
+            yield shard
+        finally:
+            if shard is not None:
+                with self._shards_lock:
+                    shard.active -= 1
+                    self._close_idle()
+
+    def _acquire(self, name: str, create: bool) -> Optional[_Shard]:
+        # The shard, marked in use. Restoring a closed shard from its journal
+        # can take minutes, so it runs outside _shards_lock: only callers of
+        # the same shard wait for it
+        while True:
+            with self._shards_lock:
+                shard = self._shards.get(name)
+                opening = shard is None
+                if opening:
+                    shard = self._shards[name] = _Shard(name)
+                self._shards.move_to_end(name)
+                shard.active += 1
+                self._close_idle()
+            if opening:
+                try:
+                    opened = self._open(name, create)
+                except BaseException:
+                    self._abandon(shard)
+                    raise
+                if opened is None:
+                    self._abandon(shard)
+                    return None
+                shard.collection, shard.journal = opened
+                shard.ready.set()
+                return shard
+            shard.ready.wait()
+            if shard.collection is not None:
+                return shard
+            # It failed to open, had no documents or was dropped: look again
+            with self._shards_lock:
+                shard.active -= 1
+
+    def _abandon(self, shard: _Shard) -> None:
+        # Release a shard that never opened, waking the callers waiting for it
+        with self._shards_lock:
+            shard.active -= 1
+            if self._shards.get(shard.name) is shard:
+                del self._shards[shard.name]
+        shard.ready.set()
+
+    def _collections(
+        self, where: Optional[Dict[str, Any]]
+    ) -> Iterator[Tuple[Any, Optional[CollectionJournal], Optional[Dict[str, Any]]]]:
+        # (collection, journal, filter within it) for each collection *where* can match
+        user_id = _filter_user(where)
+        if user_id is None:
+            yield self.collection, self.journal, where
+            names = self._shard_names()
+        else:
+            names = [self._shard_name(user_id)]
+        for name in names:
+            with self._shard(name) as shard:
+                if shard is not None:
+                    yield shard.collection, shard.journal, self._shard_filter(where)
+
+    def journals(self) -> List[CollectionJournal]:
+        with self._shards_lock:
+            shards = list(self._shards.values())
+        return super().journals() + [
+            shard.journal for shard in shards if shard.journal is not None
+        ]
+
+    # VectorStore interface
+
+    @traced("chroma.add")
+    @CHROMA_DURATION.labels("add").time()
+    def add_documents(
+        self,
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        ids: Optional[List[str]] = None,
+    ) -> List[str]:
+        # Add documents to their users' shards
+        try:
+            if ids is None:
+                ids = [self._generate_id(doc, meta) for doc, meta in zip(documents, metadatas)]
+            for metadata in metadatas:
+                if "added_at" not in metadata:
+                    metadata["added_at"] = datetime.now(timezone.utc).isoformat()
+
+            by_shard: Dict[Optional[str], List[int]] = {}
+            for i, metadata in enumerate(metadatas):
+                user_id = metadata.get("user_id")
+                name = None if user_id is None else self._shard_name(user_id)
+                by_shard.setdefault(name, []).append(i)
+            for name, positions in by_shard.items():
+                batch = (
+                    [ids[i] for i in positions],
+                    [documents[i] for i in positions],
+                    [metadatas[i] for i in positions],
+                )
+                if name is None:
+                    self._add_to(self.collection, self.journal, *batch)
+                    continue
+                with self._shard(name, create=True) as shard:
+                    self._add_to(shard.collection, shard.journal, *batch)
+            self.lexical.add(ids, documents, metadatas)
+
+            logger.info(f"Added {len(documents)} documents to vector store")
+            return ids
+
+        except Exception as e:
+            logger.error(f"Failed to add documents to vector store: {e}")
+            raise
+
+    @traced("chroma.query")
+    @CHROMA_DURATION.labels("query").time()
+    def query_documents(
+        self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # Query the vector store for relevant documents
+        try:
+            formatted_results = self._search_vectors(
+                self._query_embeddings([query]), n_results, filter_metadata
+            )[0]
+            logger.info(
+                f"Retrieved {len(formatted_results)} results for query: {query[:50]}..."
+            )
+            return formatted_results
+
+        except Exception as e:
+            logger.error(f"Failed to query vector store: {e}")
+            raise
+
+    def _search_vectors(
+        self, vectors: List[List[float]], n_results: int, filter_metadata: Optional[Dict]
+    ) -> List[List[Dict[str, Any]]]:
+        found: List[List[Dict[str, Any]]] = [[] for _ in vectors]
+        for collection, _, where in self._collections(_chroma_where(filter_metadata)):
+            results = collection.query(
+                query_embeddings=vectors, n_results=n_results, where=where
+            )
+            for i, matches in enumerate(found):
+                matches.extend(self._format_query_results(results, i))
+        return [
+            sorted(matches, key=lambda match: match["distance"])[:n_results]
+            for matches in found
+        ]
+
+    def _get_documents(
+        self, ids: List[str], filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        wanted = list(ids)
+        documents = []
+        with closing(self._collections(filter_metadata)) as collections:
+            for collection, _, _ in collections:
+                found = collection.get(ids=wanted, include=["documents", "metadatas"])
+                documents.extend(
+                    {"id": doc_id, "content": content, "metadata": metadata}
+                    for doc_id, content, metadata in zip(
+                        found["ids"], found["documents"], found["metadatas"]
+                    )
+                )
+                seen = set(found["ids"])
+                wanted = [doc_id for doc_id in wanted if doc_id not in seen]
+                if not wanted:
+                    break
+        return documents
+
+    def _user_rows(self, user_id: Any):
+        with self._shard(self._shard_name(user_id)) as shard:
+            if shard is None:
+                return []
+            results = shard.collection.get(
+                where=self._shard_filter({"user_id": user_id}),
+                include=["documents", "metadatas"],
+            )
+        return list(zip(results["ids"], results["documents"], results["metadatas"]))
+
+    @traced("chroma.get_all")
+    @CHROMA_DURATION.labels("get_all").time()
+    def get_all_documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        # Get all documents, shared collection first, then shard by shard
+        try:
+            formatted_results = []
+            with closing(self._collections(None)) as collections:
+                for collection, _, _ in collections:
+                    remaining = None if limit is None else limit - len(formatted_results)
+                    if remaining is not None and remaining <= 0:
+                        break
+                    results = collection.get(limit=remaining)
+                    formatted_results.extend(
+                        {"id": doc_id, "content": content, "metadata": metadata or {}}
+                        for doc_id, content, metadata in zip(
+                            results["ids"], results["documents"], results["metadatas"]
+                        )
+                    )
+            return formatted_results
+
+        except Exception as e:
+            logger.error(f"Failed to get all documents: {e}")
+            raise
+
+    def _drop_shard(self, user_id: Any) -> int:
+        # Delete a user's whole collection and journal; returns the documents it held
+        name = self._shard_name(user_id)
+        dropping = _Shard(name)
+        dropping.active = 1
+        with self._shards_lock:
+            shard = self._shards.pop(name, None)
+            # Callers of the shard wait until it is gone, then find it empty
+            self._shards[name] = dropping
+        try:
+            if shard is not None:
+                shard.ready.wait()  # still being opened
+            if shard is not None and shard.collection is not None:
+                count = shard.collection.count()
+                if shard.journal is not None:
+                    shard.journal.close()
+            else:
+                count = self._closed_count(name)
+            if count is None:
+                return 0
+            if snapshots_enabled():
+                shutil.rmtree(
+                    os.path.join(settings.CHROMA_SNAPSHOT_DIR, name), ignore_errors=True
+                )
+            self._drop_collection(name)
+        finally:
+            self._abandon(dropping)
+        self.lexical.drop_user(user_id)
+        CHROMA_SHARD_EVENTS.labels("dropped").inc()
+        return count
+
+    def _closed_count(self, name: str) -> Optional[int]:
+        # Documents in a shard that is not open, None if it does not exist;
+        # a journaled shard is counted from its files, not restored
+        if snapshots_enabled():
+            directory = os.path.join(settings.CHROMA_SNAPSHOT_DIR, name)
+            if not os.path.isdir(directory):
+                return None
+            return len(CollectionJournal(directory).stored_ids())
+        try:
+            return self.client.get_collection(
+                name=name, embedding_function=self._embedding_function
+            ).count()
+        except Exception:
+            return None
+
+    def delete_pages(
+        self, filter_metadata: Dict[str, Any], page_size: int = DELETE_PAGE_SIZE
+    ) -> Iterator[int]:
+        user_id = _filter_user(filter_metadata)
+        whole_user = set(filter_metadata) == {"user_id"} and user_id is not None
+        if self.sharding == "user" and whole_user:
+            # Everything of one user: drop their collection instead of paging through it
+            yield self._drop_shard(user_id)
+            return
+        for collection, journal, where in self._collections(_chroma_where(filter_metadata)):
+            while True:
+                ids = collection.get(where=where, limit=page_size, include=[])["ids"]
+                if not ids:
+                    break
+                collection.delete(ids=ids)
+                if journal is not None:
+                    journal.log_delete(ids)
+                self.lexical.remove(ids)
+                yield len(ids)
+                if len(ids) < page_size:
+                    break  # the last page
+
+    def get_stats(self) -> Dict[str, Any]:
+        # Documents in the collections loaded in the client; closed journaled
+        # shards are counted as shards only (counting them would restore them)
+        try:
+            names = self._shard_names()
+            loaded = {
+                collection if isinstance(collection, str) else collection.name
+                for collection in self.client.list_collections()
+            }
+            total = self.collection.count()
+            for name in names:
+                if name in loaded:
+                    total += self.client.get_collection(
+                        name=name, embedding_function=self._embedding_function
+                    ).count()
+            with self._shards_lock:
+                open_shards = len(self._shards)
+            return {
+                "total_documents": total,
+                "collection_name": self.collection.name,
+                "database_path": settings.CHROMA_DB_PATH,
+                "sharding": self.sharding,
+                "shards": len(names),
+                "open_shards": open_shards,
+                "closed_shards": len([name for name in names if name not in loaded]),
+            }
+        except Exception as e:
+            logger.error(f"Failed to get collection stats: {e}")
+            return {"error": str(e)}
+
+    # Migration
+
+    def split_shared_collection(self, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+        """Move documents with a ``user_id`` from the shared collection into their shards.
+
+        Embeddings are copied, not recomputed. Each batch is written to its
+        shards before it is deleted from the shared collection, so an
+        interrupted run can be started again.
+        """
+        ids = self.collection.get(include=[])["ids"]
+        moved = 0
+        shards = set()
+        for start in range(0, len(ids), batch_size):
+            rows = self.collection.get(
+                ids=ids[start : start + batch_size],
+                include=["embeddings", "documents", "metadatas"],
+            )
+            by_shard: Dict[str, List[int]] = {}
+            for i, metadata in enumerate(rows["metadatas"]):
+                if (metadata or {}).get("user_id") is not None:
+                    by_shard.setdefault(self._shard_name(metadata["user_id"]), []).append(i)
+            for name, positions in by_shard.items():
+                batch_ids = [rows["ids"][i] for i in positions]
+                documents = [rows["documents"][i] for i in positions]
+                metadatas = [rows["metadatas"][i] for i in positions]
+                embeddings = [list(map(float, rows["embeddings"][i])) for i in positions]
+                with self._shard(name, create=True) as shard:
+                    shard.collection.upsert(
+                        ids=batch_ids,
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas,
+                    )
+                    if shard.journal is not None:
+                        shard.journal.log_add(batch_ids, documents, metadatas, embeddings)
+                shards.add(name)
+            moving = [rows["ids"][i] for positions in by_shard.values() for i in positions]
+            if moving:
+                self.collection.delete(ids=moving)
+                if self.journal is not None:
+                    self.journal.log_delete(moving)
+                moved += len(moving)
+            logger.info(f"Split {moved} of {len(ids)} shared documents into shards")
+        return {"moved": moved, "kept": len(ids) - moved, "shards": len(shards)}
@@ -0,0 +1,365 @@
+"""Snapshots and write-ahead log for the in-memory Chroma collection.
+
+Outside development the vector store runs on ``chromadb.EphemeralClient``,
+so a restart or deploy loses every ingested chunk. With
+``CHROMA_SNAPSHOT_DIR`` set, :class:`CollectionJournal` keeps the collection
+on local disk in two parts:
+
+* a snapshot: ``vectors.npy`` (float32, one row per chunk, loaded with
+  ``mmap_mode="r"``), ``records.jsonl`` (id, document and metadata of each
+  row) and ``manifest.json`` (row count and the last log sequence number
+  the snapshot covers);
+* write-ahead log segments ``wal-<first seq>.log``: one JSON line per
+  ``add`` (with its embeddings, base64 float32) or ``delete`` since the
+  snapshot, flushed and optionally fsynced before the write returns.
+
+On startup the snapshot is loaded and the log replayed into the collection
+with the stored embeddings, so nothing is re-embedded. After
+``CHROMA_SNAPSHOT_WAL_ENTRIES`` logged writes a new snapshot is written in
+a background thread and the log segments it covers are deleted.
+"""
+
+import base64
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.lazy import lazy_import, resolve
+from app.core.metrics import VECTOR_SNAPSHOT_DURATION
+
+logger = logging.getLogger(__name__)
+
+# NumPy is only imported once a snapshot is read or written
+np = lazy_import("numpy")
+
+# Rows per Chroma call when restoring or reading the collection for a snapshot
+BATCH_SIZE = 5000
+
+SNAPSHOT = "snapshot"
+PREVIOUS_SNAPSHOT = "snapshot.previous"
+
+
+def snapshots_enabled() -> bool:
+    return bool(settings.CHROMA_SNAPSHOT_DIR) and settings.ENVIRONMENT != "development"
+
+
+def _encode(embeddings: List[List[float]]) -> Dict[str, Any]:
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    return {
+        "dimensions": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "data": base64.b64encode(vectors.tobytes()).decode("ascii"),
+    }
+
+
+def _decode(encoded: Dict[str, Any]):
+    vectors = np.frombuffer(base64.b64decode(encoded["data"]), dtype=np.float32)
+    return vectors.reshape(-1, encoded["dimensions"]) if encoded["dimensions"] else []
+
+
+def _fsync_directory(path: str) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CollectionJournal:
+    """Snapshots and write-ahead log of one Chroma collection, in *directory*."""
+
+    def __init__(self, directory: str, snapshot_every: int = 1000, fsync: bool = True) -> None:
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+        self.collection = None
+        self._seq = 0
+        self._since_snapshot = 0
+        self._wal = None
+        self._wal_path: Optional[str] = None
+        self._lock = threading.Lock()  # log appends and segment rotation
+        self._snapshot_lock = threading.Lock()  # one snapshot at a time
+        self._snapshot_thread: Optional[threading.Thread] = None
+        os.makedirs(directory, exist_ok=True)
+
+    # Startup
+
+    def restore(self, collection) -> Dict[str, int]:
+        """Load the snapshot and replay the log into *collection*, then start logging."""
+        started = time.perf_counter()
+        self.collection = collection
+        snapshot_rows, seq = self._load_snapshot(collection)
+        replayed = 0
+        for path in self._segments():
+            for entry in self._read_segment(path):
+                if entry["seq"] <= seq:
+                    continue
+                self._apply(collection, entry)
+                seq = entry["seq"]
+                replayed += 1
+        with self._lock:
+            self._seq = seq
+            self._since_snapshot = replayed
+            self._rotate()
+        elapsed = time.perf_counter() - started
+        VECTOR_SNAPSHOT_DURATION.labels("restore").observe(elapsed)
+        logger.info(
+            f"Restored vector store from {self.directory} in {elapsed:.2f}s: "
+            f"{snapshot_rows} snapshot rows, {replayed} logged writes"
+        )
+        return {"snapshot_rows": snapshot_rows, "replayed": replayed}
+
+    def _snapshot_path(self) -> Optional[str]:
+        path = os.path.join(self.directory, SNAPSHOT)
+        if not os.path.exists(os.path.join(path, "manifest.json")):
+            # Interrupted between replacing the snapshot directories
+            path = os.path.join(self.directory, PREVIOUS_SNAPSHOT)
+            if not os.path.exists(os.path.join(path, "manifest.json")):
+                return None
+        return path
+
+    def _load_snapshot(self, collection) -> Tuple[int, int]:
+        path = self._snapshot_path()
+        if path is None:
+            return 0, 0
+        with open(os.path.join(path, "manifest.json")) as f:
+            manifest = json.load(f)
+        count = manifest["count"]
+        if count:
+            vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+            with open(os.path.join(path, "records.jsonl")) as f:
+                for start in range(0, count, BATCH_SIZE):
+                    size = min(BATCH_SIZE, count - start)
+                    records = [json.loads(f.readline()) for _ in range(size)]
+                    collection.add(
+                        ids=[record["id"] for record in records],
+                        # Arrays, not lists: Chroma validates lists value by value
+                        embeddings=np.ascontiguousarray(vectors[start : start + size]),
+                        documents=[record["document"] for record in records],
+                        metadatas=[record["metadata"] for record in records],
+                    )
+        return count, manifest["seq"]
+
+    def stored_ids(self) -> Set[str]:
+        """Ids in the snapshot and log, read from the files without a collection."""
+        ids: Set[str] = set()
+        seq = 0
+        path = self._snapshot_path()
+        if path is not None:
+            with open(os.path.join(path, "manifest.json")) as f:
+                manifest = json.load(f)
+            seq = manifest["seq"]
+            with open(os.path.join(path, "records.jsonl")) as f:
+                for _ in range(manifest["count"]):
+                    ids.add(json.loads(f.readline())["id"])
+        for segment in self._segments():
+            for entry in self._read_segment(segment):
+                if entry["seq"] <= seq:
+                    continue
+                if entry["op"] == "add":
+                    ids.update(entry["ids"])
+                elif entry["op"] == "delete":
+                    ids.difference_update(entry["ids"])
+        return ids
+
+    def _segments(self) -> List[str]:
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("wal-") and name.endswith(".log")
+        )
+        return [os.path.join(self.directory, name) for name in names]
+
+    @staticmethod
+    def _read_segment(path: str):
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A write cut short by a crash; it was never acknowledged
+                    logger.warning(f"Ignoring incomplete write-ahead log entry in {path}")
+                    return
+
+    @staticmethod
+    def _apply(collection, entry: Dict[str, Any]) -> None:
+        if entry["op"] == "add":
+            collection.upsert(
+                ids=entry["ids"],
+                embeddings=_decode(entry["embeddings"]),
+                documents=entry["documents"],
+                metadatas=entry["metadatas"],
+            )
+        elif entry["op"] == "delete" and entry["ids"]:
+            collection.delete(ids=entry["ids"])
+
+    # Logging
+
+    def _rotate(self) -> None:
+        # Start a new log segment; caller holds self._lock
+        if self._wal is not None:
+            self._wal.close()
+        self._wal_path = os.path.join(self.directory, f"wal-{self._seq + 1:012d}.log")
+        self._wal = open(self._wal_path, "a")
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._seq += 1
+            entry["seq"] = self._seq
+            self._wal.write(json.dumps(entry) + "\n")
+            self._wal.flush()
+            if self.fsync:
+                os.fsync(self._wal.fileno())
+            self._since_snapshot += 1
+            due = self._since_snapshot >= self.snapshot_every
+        if due:
+            self._snapshot_in_background()
+
+    def log_add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+        embeddings: List[List[float]],
+    ) -> None:
+        self._append(
+            {
+                "op": "add",
+                "ids": ids,
+                "documents": documents,
+                "metadatas": metadatas,
+                "embeddings": _encode(embeddings),
+            }
+        )
+
+    def log_delete(self, ids: List[str]) -> None:
+        self._append({"op": "delete", "ids": ids})
+
+    # Snapshots
+
+    def _snapshot_in_background(self) -> None:
+        with self._lock:
+            if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+                return
+            self._snapshot_thread = threading.Thread(
+                target=self._snapshot_logged, name="vector-snapshot", daemon=True
+            )
+            self._snapshot_thread.start()
+
+    def _snapshot_logged(self) -> None:
+        try:
+            self.snapshot()
+        except Exception as e:
+            logger.error(f"Vector store snapshot failed: {e}", exc_info=True)
+
+    def snapshot(self) -> int:
+        """Write a snapshot of the collection and drop the log it covers. Returns its rows."""
+        with self._snapshot_lock:
+            started = time.perf_counter()
+            with self._lock:
+                # Writes from here on go to a new segment, replayed over this snapshot
+                seq = self._seq
+                self._rotate()
+                covered = [path for path in self._segments() if path != self._wal_path]
+                self._since_snapshot = 0
+            count = self._write_snapshot(seq)
+            for path in covered:
+                os.remove(path)
+            elapsed = time.perf_counter() - started
+            VECTOR_SNAPSHOT_DURATION.labels("snapshot").observe(elapsed)
+            logger.info(f"Wrote vector store snapshot of {count} rows in {elapsed:.2f}s")
+            return count
+
+    def _write_snapshot(self, seq: int) -> int:
+        ids = self.collection.get(include=[])["ids"]
+        tmp = os.path.join(self.directory, f"{SNAPSHOT}.tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        vectors = None
+        count = 0
+        with open(os.path.join(tmp, "records.jsonl"), "w") as records:
+            for start in range(0, len(ids), BATCH_SIZE):
+                # Rows deleted since listing the ids are skipped; their delete is logged
+                rows = self.collection.get(
+                    ids=ids[start : start + BATCH_SIZE],
+                    include=["embeddings", "documents", "metadatas"],
+                )
+                if not rows["ids"]:
+                    continue
+                embeddings = np.asarray(rows["embeddings"], dtype=np.float32)
+                if vectors is None:
+                    vectors = np.lib.format.open_memmap(
+                        os.path.join(tmp, "vectors.npy"),
+                        mode="w+",
+                        dtype=np.float32,
+                        shape=(len(ids), embeddings.shape[1]),
+                    )
+                vectors[count : count + len(embeddings)] = embeddings
+                for doc_id, document, metadata in zip(
+                    rows["ids"], rows["documents"], rows["metadatas"]
+                ):
+                    records.write(
+                        json.dumps({"id": doc_id, "document": document, "metadata": metadata})
+                        + "\n"
+                    )
+                count += len(embeddings)
+            records.flush()
+            os.fsync(records.fileno())
+        if vectors is not None:
+            vectors.flush()
+            del vectors
+
+        with open(os.path.join(tmp, "manifest.json"), "w") as f:
+            json.dump({"count": count, "seq": seq, "created_at": time.time()}, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        current = os.path.join(self.directory, SNAPSHOT)
+        previous = os.path.join(self.directory, PREVIOUS_SNAPSHOT)
+        shutil.rmtree(previous, ignore_errors=True)
+        if os.path.exists(current):
+            os.rename(current, previous)
+        os.rename(tmp, current)
+        _fsync_directory(self.directory)
+        shutil.rmtree(previous, ignore_errors=True)
+        return count
+
+    def close(self) -> None:
+        thread = self._snapshot_thread
+        if thread is not None and thread.is_alive():
+            thread.join()  # the collection may be dropped once its journal is closed
+        with self._lock:
+            if self._wal is not None:
+                self._wal.close()
+                self._wal = None
+
+
+def start_snapshot_restore() -> None:
+    # Restore the vector store at startup, in the background, instead of on
+    # the first request that needs it
+    if not snapshots_enabled():
+        return
+    from app.services.rag.vector_store import vector_store
+
+    threading.Thread(
+        target=resolve, args=(vector_store,), name="vector-restore", daemon=True
+    ).start()
+
+
+def write_shutdown_snapshot() -> None:
+    # Snapshot on shutdown so the next start has no log to replay
+    if not snapshots_enabled():
+        return
+    from app.services.rag.vector_store import vector_store
+
+    if not vector_store.is_resolved:
+        return
+    for journal in vector_store.journals():
+        try:
+            journal.snapshot()
+        except Exception as e:
+            logger.error(f"Vector store snapshot on shutdown failed: {e}", exc_info=True)
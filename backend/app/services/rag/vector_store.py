@@ -1,17 +1,68 @@
 import hashlib
 import logging
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
-
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+from typing import Any, Dict, Iterator, List, Optional
 
 from app.core.config import settings
+from app.core.lazy import LazyObject, lazy_import
+from app.core.metrics import CHROMA_DURATION
+from app.core.tracing import traced
 
 from .embeddings import ChromaEmbeddingFunction, embedding_manager
+from .lexical import LexicalIndex, reciprocal_rank_fusion
+from .snapshots import CollectionJournal, snapshots_enabled
 
 logger = logging.getLogger(__name__)
 
+# Chroma is only imported once the vector store is first used
+chromadb = lazy_import("chromadb")
+ChromaSettings = lazy_import("chromadb.config", "Settings")
+
+# Recent query embeddings kept so repeated queries skip the embedding call
+QUERY_EMBEDDING_MEMO_SIZE = 128
+
+# Document ids read and deleted per step of a delete by filter
+DELETE_PAGE_SIZE = 1000
+
+
+def _filter_user(where: Optional[Dict[str, Any]]) -> Any:
+    # The user_id a filter pins, directly or inside $and; None if any user matches
+    if not where:
+        return None
+    if "user_id" in where and not isinstance(where["user_id"], dict):
+        return where["user_id"]
+    if "user_id" in where and "$eq" in where["user_id"]:
+        return where["user_id"]["$eq"]
+    for clause in where.get("$and", ()):
+        user_id = _filter_user(clause)
+        if user_id is not None:
+            return user_id
+    return None
+
+
+def _chroma_where(where: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    # Chroma takes one key per filter level: {"a": 1, "b": 2} becomes an $and
+    if not where or len(where) <= 1:
+        return where
+    return {"$and": [{key: value} for key, value in where.items()]}
+
+
+def _exact_filters(where: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    # The key: value equalities of a filter, directly, as $eq or inside $and
+    exact: Dict[str, Any] = {}
+    for key, value in (where or {}).items():
+        if key == "$and":
+            for clause in value:
+                exact.update(_exact_filters(clause))
+        elif not isinstance(value, dict):
+            exact[key] = value
+        elif "$eq" in value:
+            exact[key] = value["$eq"]
+    return exact
+
 
 class VectorStore:
     # Manages ChromaDB vector storage operations
@@ -20,6 +71,10 @@ class VectorStore:
         self.client = None
         self.collection = None
         self.collection_name = collection_name
+        self._query_vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
+        self.lexical = LexicalIndex(self._user_rows, max_shards=settings.RAG_LEXICAL_MAX_USERS)
+        self.journal: Optional[CollectionJournal] = None
         self._initialize()
 
     def _initialize(self):
@@ -29,13 +84,10 @@ class VectorStore:
             # Use persistent client only in development
             if settings.ENVIRONMENT == "development":
                 self.client = chromadb.PersistentClient(
-                    path=settings.CHROMA_DB_PATH,
-                    settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True),
+                    path=settings.CHROMA_DB_PATH, settings=self._client_settings()
                 )
             else:
-                self.client = chromadb.EphemeralClient(
-                    settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True),
-                )
+                self.client = chromadb.EphemeralClient(settings=self._client_settings())
 
             # Create embedding function
             embedding_function = ChromaEmbeddingFunction(embedding_manager)
@@ -47,6 +99,15 @@ class VectorStore:
                 embedding_function=embedding_function,
             )
 
+            # The in-memory client is restored from the last snapshot and log
+            if settings.ENVIRONMENT != "development" and snapshots_enabled():
+                self.journal = CollectionJournal(
+                    os.path.join(settings.CHROMA_SNAPSHOT_DIR, self.collection_name),
+                    snapshot_every=settings.CHROMA_SNAPSHOT_WAL_ENTRIES,
+                    fsync=settings.CHROMA_WAL_FSYNC,
+                )
+                self.journal.restore(self.collection)
+
             logger.info(
                 f"ChromaDB initialized with {self.collection.count()} documents"
             )
@@ -55,6 +116,15 @@ class VectorStore:
             logger.error(f"Failed to initialize ChromaDB: {e}")
             raise
 
+    def _client_settings(self):
+        return ChromaSettings(anonymized_telemetry=False, allow_reset=True)
+
+    def journals(self) -> List[CollectionJournal]:
+        # Journals of the collections open in this process, snapshotted on shutdown
+        return [self.journal] if self.journal is not None else []
+
+    @traced("chroma.add")
+    @CHROMA_DURATION.labels("add").time()
     def add_documents(
         self,
         documents: List[str],
@@ -75,7 +145,8 @@ class VectorStore:
                     metadata["added_at"] = datetime.now(timezone.utc).isoformat()
 
             # Add to ChromaDB
-            self.collection.add(ids=ids, documents=documents, metadatas=metadatas)
+            self._add_to(self.collection, self.journal, ids, documents, metadatas)
+            self.lexical.add(ids, documents, metadatas)
 
             logger.info(f"Added {len(documents)} documents to vector store")
             return ids
@@ -84,6 +155,26 @@ class VectorStore:
             logger.error(f"Failed to add documents to vector store: {e}")
             raise
 
+    @staticmethod
+    def _add_to(
+        collection,
+        journal: Optional[CollectionJournal],
+        ids: List[str],
+        documents: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        if journal is None:
+            collection.add(ids=ids, documents=documents, metadatas=metadatas)
+        else:
+            # Embedded here so the log holds the vectors and a restore needs no model
+            embeddings = embedding_manager.embed_documents(documents)
+            collection.add(
+                ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas
+            )
+            journal.log_add(ids, documents, metadatas, embeddings)
+
+    @traced("chroma.query")
+    @CHROMA_DURATION.labels("query").time()
     def query_documents(
         self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
@@ -91,23 +182,10 @@ class VectorStore:
         try:
             # Query ChromaDB
             results = self.collection.query(
-                query_texts=[query], n_results=n_results, where=filter_metadata
+                query_texts=[query], n_results=n_results, where=_chroma_where(filter_metadata)
             )
 
-            # Format results
-            formatted_results = []
-
-            if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    result = {
-                        "id": results["ids"][0][i],
-                        "content": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": (
-                            results["distances"][0][i] if results["distances"] else None
-                        ),
-                    }
-                    formatted_results.append(result)
+            formatted_results = self._format_query_results(results, 0)
 
             logger.info(
                 f"Retrieved {len(formatted_results)} results for query: {query[:50]}..."
@@ -118,6 +196,129 @@ class VectorStore:
             logger.error(f"Failed to query vector store: {e}")
             raise
 
+    @traced("chroma.query_many")
+    @CHROMA_DURATION.labels("query_many").time()
+    def query_many(
+        self, queries: List[str], n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[List[Dict[str, Any]]]:
+        # Run several queries as one Chroma search; results are in query order
+        try:
+            return self._search_vectors(
+                self._query_embeddings(queries), n_results, filter_metadata
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to query vector store: {e}")
+            raise
+
+    @traced("chroma.hybrid_query")
+    @CHROMA_DURATION.labels("hybrid_query").time()
+    def hybrid_query(
+        self, query: str, n_results: int = 5, filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # Vector and BM25 rankings of one user's documents, fused by reciprocal
+        # rank. Without a user_id filter there is no lexical shard to search.
+        user_id = _filter_user(filter_metadata)
+        if user_id is None:
+            return self.query_documents(query, n_results, filter_metadata)
+        try:
+            candidates = max(n_results, settings.RAG_HYBRID_CANDIDATES)
+            results = self._search_vectors(
+                self._query_embeddings([query]), candidates, filter_metadata
+            )[0]
+            dense = {result["id"]: result for result in results}
+            lexical = self.lexical.search(
+                user_id, query, candidates, _exact_filters(filter_metadata)
+            )
+
+            fused = reciprocal_rank_fusion(
+                [list(dense), [doc_id for doc_id, _ in lexical]], k=settings.RAG_RRF_K
+            )[:n_results]
+
+            # Lexical-only matches still need their content
+            missing = [doc_id for doc_id, _ in fused if doc_id not in dense]
+            if missing:
+                for document in self._get_documents(missing, filter_metadata):
+                    dense[document["id"]] = {**document, "distance": None}
+
+            formatted_results = [
+                {**dense[doc_id], "score": score} for doc_id, score in fused if doc_id in dense
+            ]
+            logger.info(
+                f"Retrieved {len(formatted_results)} hybrid results for query: {query[:50]}..."
+            )
+            return formatted_results
+
+        except Exception as e:
+            logger.error(f"Failed to run hybrid query: {e}")
+            raise
+
+    def _search_vectors(
+        self, vectors: List[List[float]], n_results: int, filter_metadata: Optional[Dict]
+    ) -> List[List[Dict[str, Any]]]:
+        # Nearest documents to each query vector, in query order
+        results = self.collection.query(
+            query_embeddings=vectors, n_results=n_results, where=_chroma_where(filter_metadata)
+        )
+        return [self._format_query_results(results, i) for i in range(len(vectors))]
+
+    def _get_documents(
+        self, ids: List[str], filter_metadata: Optional[Dict] = None
+    ) -> List[Dict[str, Any]]:
+        # Documents by id; a filter only narrows where to look
+        found = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return [
+            {"id": doc_id, "content": content, "metadata": metadata}
+            for doc_id, content, metadata in zip(
+                found["ids"], found["documents"], found["metadatas"]
+            )
+        ]
+
+    def _user_rows(self, user_id: Any):
+        # Every document of one user, to build their lexical index shard
+        results = self.collection.get(
+            where={"user_id": user_id}, include=["documents", "metadatas"]
+        )
+        return zip(results["ids"], results["documents"], results["metadatas"])
+
+    def _query_embeddings(self, queries: List[str]) -> List[List[float]]:
+        # Embed the queries not seen recently in one batched call
+        with self._query_vectors_lock:
+            known = {}
+            for query in queries:
+                if query in self._query_vectors:
+                    self._query_vectors.move_to_end(query)
+                    known[query] = self._query_vectors[query]
+        missing = [query for query in dict.fromkeys(queries) if query not in known]
+        if missing:
+            vectors = embedding_manager.embed_documents(missing)
+            known.update(zip(missing, vectors))
+            with self._query_vectors_lock:
+                self._query_vectors.update(zip(missing, vectors))
+                while len(self._query_vectors) > QUERY_EMBEDDING_MEMO_SIZE:
+                    self._query_vectors.popitem(last=False)
+        return [known[query] for query in queries]
+
+    @staticmethod
+    def _format_query_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        formatted_results = []
+
+        if results["documents"] and results["documents"][index]:
+            for i in range(len(results["documents"][index])):
+                result = {
+                    "id": results["ids"][index][i],
+                    "content": results["documents"][index][i],
+                    "metadata": results["metadatas"][index][i],
+                    "distance": (
+                        results["distances"][index][i] if results["distances"] else None
+                    ),
+                }
+                formatted_results.append(result)
+
+        return formatted_results
+
+    @traced("chroma.get_all")
+    @CHROMA_DURATION.labels("get_all").time()
     def get_all_documents(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         # Get all documents from the collection
         try:
@@ -141,25 +342,38 @@ class VectorStore:
             logger.error(f"Failed to get all documents: {e}")
             raise
 
+    @traced("chroma.delete")
+    @CHROMA_DURATION.labels("delete").time()
     def delete_documents(self, filter_metadata: Dict[str, Any]) -> int:
         # Delete documents matching the filter criteria
         try:
-            # Get documents matching the filter
-            results = self.collection.get(where=filter_metadata)
-
-            if results["ids"]:
-                # Delete the documents
-                self.collection.delete(ids=results["ids"])
-                deleted_count = len(results["ids"])
+            deleted_count = sum(self.delete_pages(filter_metadata))
+            if deleted_count:
                 logger.info(f"Deleted {deleted_count} documents")
-                return deleted_count
-
-            return 0
+            return deleted_count
 
         except Exception as e:
             logger.error(f"Failed to delete documents: {e}")
             raise
 
+    def delete_pages(
+        self, filter_metadata: Dict[str, Any], page_size: int = DELETE_PAGE_SIZE
+    ) -> Iterator[int]:
+        # Delete matching documents a page of ids at a time, yielding each
+        # page's count; only ids are read, never contents or metadata
+        filter_metadata = _chroma_where(filter_metadata)
+        while True:
+            ids = self.collection.get(where=filter_metadata, limit=page_size, include=[])["ids"]
+            if not ids:
+                return
+            self.collection.delete(ids=ids)
+            if self.journal is not None:
+                self.journal.log_delete(ids)
+            self.lexical.remove(ids)
+            yield len(ids)
+            if len(ids) < page_size:
+                return  # the last page
+
     def get_stats(self) -> Dict[str, Any]:
         # Get statistics about the document collection
         try:
@@ -179,5 +393,18 @@ class VectorStore:
         return hashlib.md5(content.encode()).hexdigest()
 
 
-# Global vector store instance
-vector_store = VectorStore()
+def create_vector_store() -> VectorStore:
+    # The backend chosen by VECTOR_STORE_BACKEND
+    if settings.VECTOR_STORE_BACKEND == "numpy":
+        from .numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore()
+    if settings.CHROMA_SHARDING:
+        from .sharded_store import ShardedVectorStore
+
+        return ShardedVectorStore()
+    return VectorStore()
+
+
+# Global vector store instance; the backend is opened on first use
+vector_store = LazyObject(create_vector_store, "vector_store")
@@ -0,0 +1,306 @@
+"""LLM response cache for document analysis and agent chat.
+
+Responses are keyed by a hash of the normalized prompt, the model and the
+temperature, scoped to the user who asked, and stored in SQLite
+(``RESPONSE_CACHE_PATH``) so they survive restarts. Entries expire after the
+TTL of their kind (``document`` or ``chat``) and the least recently used are
+evicted beyond ``RESPONSE_CACHE_MAX_ENTRIES``.
+
+For chat, an exact miss can fall back to the same user's most similar earlier
+message to the same agent and model, by embedding cosine similarity
+(``RESPONSE_CACHE_SEMANTIC_THRESHOLD``; 0 disables it).
+
+Hits, misses and the LLM latency saved by hits are counted per kind.
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+from app.core.config import settings
+from app.core.metrics import RESPONSE_CACHE, RESPONSE_CACHE_SAVED_SECONDS
+from app.services.llm_gateway import model_key
+
+logger = logging.getLogger(__name__)
+
+# Embeddings of recently seen chat messages, so a miss is not embedded twice
+EMBEDDING_MEMO_SIZE = 64
+
+_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS llm_responses (
+        user_key TEXT NOT NULL,
+        key TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        namespace TEXT NOT NULL,
+        response TEXT NOT NULL,
+        latency REAL NOT NULL,
+        embedding BLOB,
+        created_at REAL NOT NULL,
+        used_at REAL NOT NULL,
+        PRIMARY KEY (user_key, key)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_llm_responses_used_at ON llm_responses (used_at)",
+    "CREATE INDEX IF NOT EXISTS ix_llm_responses_namespace ON llm_responses (user_key, namespace)",
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    # Unicode and whitespace differences do not change the answer
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", prompt)).strip()
+
+
+def _temperature(llm) -> Optional[float]:
+    temperature = getattr(llm, "temperature", None)
+    return float(temperature) if isinstance(temperature, (int, float)) else None
+
+
+def _cosine(a: Sequence[float], b: Sequence[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+def _embed(text: str) -> List[float]:
+    # Imported here so the cache does not load the embedding model until used
+    from app.services.rag import embeddings
+
+    return embeddings.embedding_manager.embed_query(text)
+
+
+class ResponseCache:
+    """Per-user, TTL- and size-bounded LLM response cache persisted to SQLite."""
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int,
+        ttls: Dict[str, float],
+        semantic_threshold: float = 0.0,
+        embed: Optional[Callable[[str], List[float]]] = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self.semantic_threshold = semantic_threshold
+        self.embed = embed or _embed
+        self.clock = clock
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5.0)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        self._vectors: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, namespace: str, prompt: str) -> str:
+        return hashlib.sha256(
+            json.dumps([namespace, normalize_prompt(prompt)]).encode("utf-8")
+        ).hexdigest()
+
+    def _namespace(self, kind: str, node: str, llm) -> str:
+        provider, model = model_key(llm)
+        return f"{kind}:{node}:{provider}/{model}:{_temperature(llm)}"
+
+    def _vector(self, text: str) -> List[float]:
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+        vector = list(self.embed(text))
+        with self._lock:
+            self._vectors[text] = vector
+            while len(self._vectors) > EMBEDDING_MEMO_SIZE:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def _semantic(self, user_key: str, namespace: str, text: str, oldest: float):
+        vector = self._vector(text)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, response, latency, embedding FROM llm_responses "
+                "WHERE user_key = ? AND namespace = ? AND created_at >= ? "
+                "AND embedding IS NOT NULL",
+                (user_key, namespace, oldest),
+            ).fetchall()
+        best, best_score = None, self.semantic_threshold
+        for key, response, latency, blob in rows:
+            score = _cosine(vector, array("f", blob))
+            if score >= best_score:
+                best, best_score = (key, response, latency), score
+        return best
+
+    def get(
+        self,
+        kind: str,
+        node: str,
+        user_id: Optional[Hashable],
+        llm,
+        prompt: str,
+        semantic_text: Optional[str] = None,
+    ) -> Optional[str]:
+        """Cached response for this prompt, or None. Counts the hit or miss."""
+        user_key = "" if user_id is None else str(user_id)
+        namespace = self._namespace(kind, node, llm)
+        key = self._key(namespace, prompt)
+        now = self.clock()
+        oldest = now - self.ttls.get(kind, 0.0)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, latency, created_at FROM llm_responses "
+                "WHERE user_key = ? AND key = ?",
+                (user_key, key),
+            ).fetchone()
+            if row is not None and row[2] < oldest:
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE user_key = ? AND key = ?", (user_key, key)
+                )
+                self._conn.commit()
+                RESPONSE_CACHE.labels(kind, "expired").inc()
+                row = None
+        result = "hit"
+        if row is None and self.semantic_threshold > 0 and semantic_text:
+            match = self._semantic(user_key, namespace, semantic_text, oldest)
+            if match is not None:
+                key, row, result = match[0], match[1:], "semantic_hit"
+        if row is None:
+            RESPONSE_CACHE.labels(kind, "miss").inc()
+            return None
+        with self._lock:
+            self._conn.execute(
+                "UPDATE llm_responses SET used_at = ? WHERE user_key = ? AND key = ?",
+                (now, user_key, key),
+            )
+            self._conn.commit()
+        RESPONSE_CACHE.labels(kind, result).inc()
+        RESPONSE_CACHE_SAVED_SECONDS.labels(kind).inc(row[1])
+        return row[0]
+
+    def put(
+        self,
+        kind: str,
+        node: str,
+        user_id: Optional[Hashable],
+        llm,
+        prompt: str,
+        response: str,
+        latency: float,
+        semantic_text: Optional[str] = None,
+    ) -> None:
+        user_key = "" if user_id is None else str(user_id)
+        namespace = self._namespace(kind, node, llm)
+        embedding = None
+        if self.semantic_threshold > 0 and semantic_text:
+            embedding = array("f", self._vector(semantic_text)).tobytes()
+        now = self.clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (user_key, key, kind, namespace, "
+                "response, latency, embedding, created_at, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    user_key,
+                    self._key(namespace, prompt),
+                    kind,
+                    namespace,
+                    response,
+                    latency,
+                    embedding,
+                    now,
+                    now,
+                ),
+            )
+            for expiring_kind, ttl in self.ttls.items():
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE kind = ? AND created_at < ?",
+                    (expiring_kind, now - ttl),
+                )
+            excess = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+            excess -= self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM llm_responses WHERE rowid IN "
+                    "(SELECT rowid FROM llm_responses ORDER BY used_at LIMIT ?)",
+                    (excess,),
+                )
+                logger.debug(f"Response cache evicted {excess} least recently used entries")
+            self._conn.commit()
+
+    def clear(self, user_id: Optional[Hashable] = None) -> int:
+        """Drop every entry, or only *user_id*'s. Returns the number removed."""
+        with self._lock:
+            if user_id is None:
+                cursor = self._conn.execute("DELETE FROM llm_responses")
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM llm_responses WHERE user_key = ?", (str(user_id),)
+                )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The process-wide cache, or None when ``RESPONSE_CACHE_ENABLED`` is off."""
+    global _cache
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    settings.RESPONSE_CACHE_PATH,
+                    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                    ttls={
+                        "document": settings.RESPONSE_CACHE_DOCUMENT_TTL_SECONDS,
+                        "chat": settings.RESPONSE_CACHE_CHAT_TTL_SECONDS,
+                    },
+                    semantic_threshold=settings.RESPONSE_CACHE_SEMANTIC_THRESHOLD,
+                )
+    return _cache
+
+
+def cached_response(
+    kind: str,
+    node: str,
+    user_id: Optional[Hashable],
+    llm,
+    prompt: str,
+    call: Callable[[], str],
+    semantic_text: Optional[str] = None,
+) -> str:
+    """Return the cached response for *prompt*, or run *call* and cache its result.
+
+    Errors raised by *call* propagate and nothing is cached.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return call()
+    cached = cache.get(kind, node, user_id, llm, prompt, semantic_text)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    response = call()
+    cache.put(
+        kind, node, user_id, llm, prompt, response, time.perf_counter() - started, semantic_text
+    )
+    return response
@@ -0,0 +1,56 @@
+"""Request coalescing ("single flight") for expensive idempotent work.
+
+When a user's dashboard, mobile app and a retry ask for the same daily
+briefing at once, only the first caller runs the workflow; the others await
+the in-flight computation and receive the same result (or the same error).
+Nothing is cached: once the computation finishes the next call starts a new
+one.
+
+The computation runs as its own task, so a caller that disconnects does not
+cancel it for the callers still waiting on it.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.core.metrics import SINGLEFLIGHT_COALESCED
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._coalesced = SINGLEFLIGHT_COALESCED.labels(name)
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            logger.info(f"Joining in-flight {self.name} call for {key}")
+            self._coalesced.inc()
+        # shield: one caller going away must not cancel the shared computation
+        return await asyncio.shield(call)
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def _finished(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the error retrieved even if every caller went away
+            call.exception()
+
+
+# Daily briefings, keyed by (user_id, model_size)
+briefing_flights = SingleFlight("daily_briefing")
@@ -16,7 +16,7 @@ import pyotp
 
 from app.db.base import SessionLocal
 from app.models.user import User
-from app.security.password import verify_password
+from app.security.password import verify_password_async
 from app.services.token_vault.exceptions import StepUpRequiredError
 
 
@@ -104,7 +104,7 @@ class StepUpService:
         if user.two_factor_enabled:
             self._verify_totp(user, credential)
         else:
-            self._verify_password(user, credential)
+            await self._verify_password(user, credential)
 
         # Challenge consumed — remove it
         del _pending_challenges[user_id][challenge_id]
@@ -160,10 +160,10 @@ class StepUpService:
         if not totp.verify(code):
             raise InvalidCredentialError("Invalid TOTP code")
 
-    def _verify_password(self, user: User, plain_password: str) -> None:
+    async def _verify_password(self, user: User, plain_password: str) -> None:
         if not user.hashed_password:
             raise InvalidCredentialError("User has no password configured")
-        if not verify_password(plain_password, user.hashed_password):
+        if not await verify_password_async(plain_password, user.hashed_password):
             raise InvalidCredentialError("Invalid password")
 
 
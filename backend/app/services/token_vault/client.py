@@ -22,6 +22,8 @@ from typing import Any, Optional
 import httpx
 
 from app.core.config import settings
+from app.core.metrics import VAULT_CALLS, VAULT_DURATION, track_calls
+from app.core.tracing import traced
 
 from .exceptions import ScopeNotGrantedError, TokenRevokedError, TokenVaultError
 
@@ -50,6 +52,8 @@ class TokenVaultClient:
     # M2M token management
     # ------------------------------------------------------------------
 
+    @traced("vault.m2m_token")
+    @track_calls(VAULT_DURATION, VAULT_CALLS, "m2m_token")
     async def _get_m2m_token(self) -> str:
         """Return a valid M2M access token, refreshing if expired."""
         # Leave a 30-second buffer before the stated expiry
@@ -103,6 +107,8 @@ class TokenVaultClient:
     # Public API
     # ------------------------------------------------------------------
 
+    @traced("vault.store_token")
+    @track_calls(VAULT_DURATION, VAULT_CALLS, "store_token")
     async def store_token(
         self,
         auth0_sub: str,
@@ -149,6 +155,8 @@ class TokenVaultClient:
                 f"with status {response.status_code}."
             )
 
+    @traced("vault.retrieve_token")
+    @track_calls(VAULT_DURATION, VAULT_CALLS, "retrieve_token")
     async def retrieve_token(
         self,
         auth0_sub: str,
@@ -253,6 +261,8 @@ class TokenVaultClient:
 
         return token_data
 
+    @traced("vault.delete_token")
+    @track_calls(VAULT_DURATION, VAULT_CALLS, "delete_token")
     async def delete_token(
         self,
         auth0_sub: str,
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import threading
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Set, TypeVar
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+T = TypeVar("T")
+
+_DONE = object()
+
+# Strong references to producer tasks so they are not collected mid-stream
+_background: Set[asyncio.Future] = set()
+
+# Headers for streamed responses: no caching, and no proxy (nginx) buffering
+STREAM_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def ndjson_event(event: str, data: Any) -> str:
+    """Format one newline-delimited JSON line: the payload plus an ``event`` field."""
+    return json.dumps({"event": event, **data}, default=str) + "\n"
+
+
+async def iterate_in_thread(factory: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+    """Consume a blocking iterator on one worker thread, yielding on the event loop.
+
+    The whole iterator runs on a single thread (unlike starlette's
+    ``iterate_in_threadpool``, which hops threads per item) so iterators that
+    keep thread or context-local state, such as a LangGraph stream, are safe.
+    If the consumer stops early (e.g. the client disconnected), the producer
+    stops at the next item.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stopped = threading.Event()
+
+    def put(item: Any, error: Optional[BaseException] = None) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # The event loop closed underneath us; nobody is listening
+            stopped.set()
+
+    def produce() -> None:
+        try:
+            for item in factory():
+                if stopped.is_set():
+                    break
+                put(item)
+        except BaseException as e:
+            put(_DONE, e)
+        else:
+            put(_DONE)
+
+    # produce() never raises, so the task needs no result handling
+    producer = asyncio.ensure_future(run_in_threadpool(produce))
+    _background.add(producer)
+    producer.add_done_callback(_background.discard)
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        # The worker finishes its current item in the background and exits
+        stopped.set()
+
+
+class HeldStreamingResponse(StreamingResponse):
+    """A streamed response that closes *held* once it has been sent or abandoned.
+
+    Resources taken before the response is returned (an admission slot) can
+    not be released by the body generator alone: it never starts if the
+    client disconnects first, and starlette skips background tasks then.
+    """
+
+    def __init__(self, content: Any, held: AsyncExitStack, **kwargs: Any) -> None:
+        super().__init__(content, **kwargs)
+        self.held = held
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.held.aclose()
@@ -1,35 +1,196 @@
 import html
 import re
-from typing import Optional
+from typing import Optional, Tuple
+
+# Markdown cleanup rules, applied in order. Bold and italic never span lines
+# ("." does not match a newline), so every rule except blank-line collapsing
+# works on one line at a time; StreamingResponseCleaner relies on that.
+_BOLD = re.compile(r'\*\*(.*?)\*\*')
+_ITALIC = re.compile(r'\*(.*?)\*')
+_HEADER = re.compile(r'^#{1,6}\s+', flags=re.MULTILINE)
+_LIST_ITEM = re.compile(r'^\s*[-*+]\s+', flags=re.MULTILINE)
+_NUMBERED_ITEM = re.compile(r'^\s*\d+\.\s+', flags=re.MULTILINE)
+_BLANK_LINES = re.compile(r'\n\s*\n\s*\n')
+
+# A trailing "&..." that may still turn into an HTML entity
+_PARTIAL_ENTITY = re.compile(r'&[#\w]{0,31}$')
+# Characters that can begin a header or list marker
+_MARKER_CHARS = frozenset("#-*+.0123456789")
+# A line holding nothing but a marker: its "\s+" runs on into the next line
+_MARKER_ONLY = re.compile(r'#{1,6}(\s+([-*+]|\d+\.))?\s*|\s*([-*+]|\d+\.)\s*')
+
+
+def _strip_emphasis_and_header(text: str) -> str:
+    cleaned = _BOLD.sub(r'\1', text)  # Remove bold markdown
+    cleaned = _ITALIC.sub(r'\1', cleaned)  # Remove italic markdown
+    return _HEADER.sub('', cleaned)  # Remove headers
+
+
+def _clean_markdown(text: str) -> str:
+    # Remove excessive markdown formatting while preserving structure
+    cleaned = _strip_emphasis_and_header(text)
+
+    # Convert markdown lists to simple bullets
+    cleaned = _LIST_ITEM.sub('• ', cleaned)
+    return _NUMBERED_ITEM.sub('• ', cleaned)
 
 
 def clean_ai_response(text: Optional[str]) -> str:
     """
     Clean and format AI response text for better display.
-    
+
     Args:
         text: Raw AI response text
-        
+
     Returns:
         Cleaned and formatted text
     """
     if not text:
         return ""
-    
+
     # Decode HTML entities
     cleaned = html.unescape(text)
-    
-    # Remove excessive markdown formatting while preserving structure
-    cleaned = re.sub(r'\*\*(.*?)\*\*', r'\1', cleaned)  # Remove bold markdown
-    cleaned = re.sub(r'\*(.*?)\*', r'\1', cleaned)      # Remove italic markdown
-    cleaned = re.sub(r'^#{1,6}\s+', '', cleaned, flags=re.MULTILINE)  # Remove headers
-    
-    # Convert markdown lists to simple bullets
-    cleaned = re.sub(r'^\s*[-*+]\s+', '• ', cleaned, flags=re.MULTILINE)
-    cleaned = re.sub(r'^\s*\d+\.\s+', '• ', cleaned, flags=re.MULTILINE)
-    
+
+    cleaned = _clean_markdown(cleaned)
+
     # Clean up excessive whitespace
-    cleaned = re.sub(r'\n\s*\n\s*\n', '\n\n', cleaned)  # Max 2 consecutive newlines
+    cleaned = _BLANK_LINES.sub('\n\n', cleaned)  # Max 2 consecutive newlines
     cleaned = cleaned.strip()
-    
-    return cleaned
\ No newline at end of file
+
+    return cleaned
+
+
+def _is_list_item(line: str) -> bool:
+    stripped = _strip_emphasis_and_header(line)
+    return bool(_LIST_ITEM.match(stripped) or _NUMBERED_ITEM.match(stripped))
+
+
+def _stable_prefix(line: str) -> str:
+    # Longest prefix whose "*" pairing cannot change as the line grows
+    first = line.find("*")
+    if first < 0:
+        return line
+    stable = first
+    for end in range(first + 1, len(line) + 1):
+        if end < len(line) and line[end] != "*":
+            continue
+        segment = line[first:end]
+        if not segment.endswith("*") and "*" not in _strip_emphasis_and_header(segment):
+            stable = end
+    return line[:stable]
+
+
+def _is_marker_only(line: str) -> bool:
+    stripped = _ITALIC.sub(r'\1', _BOLD.sub(r'\1', line))
+    return bool(_MARKER_ONLY.fullmatch(stripped))
+
+
+def _marker_decided(line: str) -> bool:
+    # A header/list marker can no longer appear once a non-marker char is seen
+    return any(char not in _MARKER_CHARS and not char.isspace() for char in line)
+
+
+class StreamingResponseCleaner:
+    """Incremental :func:`clean_ai_response` for streamed LLM output.
+
+    ``feed()`` takes raw chunks and returns cleaned text that is safe to show
+    now; ``finish()`` returns the remainder. Joined together the output
+    matches ``clean_ai_response`` of the full text (runs of empty list
+    markers aside, which batch cleaning folds together). Text is only held
+    back while it is ambiguous: an unterminated HTML entity, a line whose
+    list or header marker is not known yet, an unpaired ``*``, or whitespace
+    that the final strip or blank-line collapsing may remove.
+    """
+
+    def __init__(self) -> None:
+        self._entity = ""  # raw tail that may be a partial HTML entity
+        self._line = ""  # unescaped text of the current line
+        self._emitted = 0  # cleaned characters of the current line already returned
+        self._gap = ""  # whitespace between the last content line and this one
+        self._gap_resolved = False
+        self._started = False  # any content returned yet (leading strip)
+        self._first_line = True
+
+    def feed(self, chunk: str) -> str:
+        text = self._entity + (chunk or "")
+        partial = _PARTIAL_ENTITY.search(text)
+        if partial:
+            self._entity = text[partial.start():]
+            text = text[: partial.start()]
+        else:
+            self._entity = ""
+        return self._push(html.unescape(text)) + self._flush_partial()
+
+    def finish(self) -> str:
+        out = self._push(html.unescape(self._entity))
+        self._entity = ""
+        if _clean_markdown(self._line).strip():
+            out += self._emit(self._line)[0]
+        self._line = ""
+        self._gap = ""
+        return out
+
+    def _push(self, text: str) -> str:
+        out = []
+        while True:
+            newline = text.find("\n")
+            if newline < 0:
+                self._line += text
+                return "".join(out)
+            self._line += text[:newline]
+            text = text[newline + 1:]
+            out.append(self._end_line())
+
+    def _end_line(self) -> str:
+        line = self._line
+        if _is_marker_only(line):
+            # The marker's whitespace swallows the newline, so the next
+            # content line is cleaned together with this one
+            self._line += "\n"
+            return ""
+        cleaned = _clean_markdown(line)
+        if not cleaned.strip():
+            # Blank once cleaned: part of the whitespace run before the next content
+            self._line = ""
+            self._gap += cleaned + "\n"
+            return ""
+        self._line = ""
+        out, trailing = self._emit(line)
+        self._gap = trailing + "\n"
+        self._gap_resolved = False
+        self._emitted = 0
+        return out
+
+    def _flush_partial(self) -> str:
+        stable = _stable_prefix(self._line)
+        if not _marker_decided(stable) or not _clean_markdown(stable).strip():
+            return ""
+        return self._emit(stable)[0]
+
+    def _emit(self, line: str) -> Tuple[str, str]:
+        # Returns the new cleaned text and the trailing whitespace held back
+        out = ""
+        if not self._gap_resolved:
+            out = self._resolve_gap(line)
+        cleaned = _clean_markdown(line)
+        if self._first_line:
+            cleaned = cleaned.lstrip()
+        content = cleaned.rstrip()
+        out += content[self._emitted:]
+        self._emitted = max(self._emitted, len(content))
+        return out, cleaned[len(content):]
+
+    def _resolve_gap(self, line: str) -> str:
+        gap, self._gap = self._gap, ""
+        self._gap_resolved = True
+        self._first_line = not self._started
+        self._started = True
+        if self._first_line:
+            return ""
+        first_newline = gap.index("\n")
+        if _is_list_item(line):
+            # The list-item rule's leading \s* swallows the blank lines before it
+            return gap[: first_newline + 1]
+        if gap.count("\n") >= 3:
+            return gap[:first_newline] + "\n\n"
+        return gap
@@ -0,0 +1,30 @@
+"""Shared setup for offline benchmarks.
+
+Import this module before anything from ``app`` so that ``Settings`` can be
+constructed without a ``.env`` file.
+"""
+
+import os
+import tempfile
+
+_DEFAULTS = {
+    "SECRET_KEY": "benchmark-secret-key-32-characters-long",
+    "JWT_ALGORITHM": "HS256",
+    "ACCESS_TOKEN_EXPIRE_MINUTES": "30",
+    "ENCRYPTION_KEY": "0123456789abcdef0123456789abcdef0123456789abcdef0123456789abcdef",
+    "DATABASE_URL": "sqlite:///:memory:",
+    "CHROMA_DB_PATH": os.path.join(tempfile.gettempdir(), "londoolink_bench_chroma"),
+    "ENVIRONMENT": "development",
+}
+
+for _name, _value in _DEFAULTS.items():
+    os.environ.setdefault(_name, _value)
+
+
+def percentile(samples, pct: float) -> float:
+    # Nearest-rank percentile of a list of samples
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
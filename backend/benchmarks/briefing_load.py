@@ -0,0 +1,198 @@
+"""Daily briefing load test.
+
+Fires N concurrent ``GET /agent/briefing/daily`` requests against the ASGI
+app with the LangGraph workflow replaced by a stand-in that allocates
+``--alloc-mb`` of memory and blocks for ``--work-ms`` (the shape of a
+briefing: a burst of allocations held across slow LLM calls). Reports
+latency percentiles, shed requests and peak RSS for three modes:
+
+* ``inline``     - old behaviour: the workflow blocks the event loop and
+                   every request forces ``gc.collect()``;
+* ``unbounded``  - workflow in the threadpool with no admission limit;
+* ``admission``  - workflow in the threadpool behind the admission
+                   controller sized from the memory budget.
+
+Usage::
+
+    python -m benchmarks.briefing_load [--requests 50] [--alloc-mb 16]
+"""
+
+import argparse
+import asyncio
+import gc
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+import httpx
+import psutil
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.session import get_db
+from app.main import app
+from app.models.user import User
+from app.security.jwt import create_access_token
+from app.services.admission import AdmissionController, RSSSampler
+
+EMAIL = "briefing-load@example.com"
+
+
+def _setup_database() -> None:
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = session_factory()
+    db.add(User(email=EMAIL, hashed_password="unused", is_active=True))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+
+def _fake_coordinator(alloc_mb: int, work_ms: int, collect: bool) -> Mock:
+    def get_daily_briefing(user_id, notify_urgent=True):
+        buffer = bytearray(alloc_mb * 1024 * 1024)
+        for offset in range(0, len(buffer), 4096):
+            buffer[offset] = 1
+        time.sleep(work_ms / 1000)
+        del buffer
+        if collect:
+            gc.collect()
+        return {"summary": "load test"}
+
+    coordinator = Mock()
+    coordinator.get_daily_briefing.side_effect = get_daily_briefing
+    coordinator.MODEL_CONFIGS = {"small": {"max_tokens": 4096, "temperature": 0.1}}
+    return coordinator
+
+
+class _PeakRSS:
+    def __init__(self) -> None:
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self.peak_mb = 0.0
+
+    def __enter__(self) -> "_PeakRSS":
+        self.peak_mb = self._process.memory_info().rss / (1024 * 1024)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(0.005):
+            rss = self._process.memory_info().rss / (1024 * 1024)
+            self.peak_mb = max(self.peak_mb, rss)
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+async def _inline_threadpool(func, *args, **kwargs):
+    # Old behaviour: run the blocking workflow directly on the event loop
+    return func(*args, **kwargs)
+
+
+async def _load(requests: int, headers: dict) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=600
+    ) as client:
+
+        async def one():
+            started = time.perf_counter()
+            response = await client.get("/api/v1/agent/briefing/daily", headers=headers)
+            return response.status_code, (time.perf_counter() - started) * 1000
+
+        results = await asyncio.gather(*(one() for _ in range(requests)))
+
+    ok = [latency for status, latency in results if status == 200]
+    return {
+        "ok": len(ok),
+        "shed": sum(1 for status, _ in results if status == 503),
+        "p50": percentile(ok, 50),
+        "p99": percentile(ok, 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--alloc-mb", type=int, default=16)
+    parser.add_argument("--work-ms", type=int, default=300)
+    parser.add_argument("--headroom-mb", type=int, default=128)
+    parser.add_argument("--queue", type=int, default=32)
+    args = parser.parse_args()
+
+    _setup_database()
+    headers = {"Authorization": f"Bearer {create_access_token(data={'sub': EMAIL})}"}
+
+    process = psutil.Process(os.getpid())
+    admitted = max(1, args.headroom_mb // args.alloc_mb)
+
+    def make_controller(name: str):
+        if name == "admission":
+            # Budget leaves room for the admitted briefings plus slack
+            baseline_mb = process.memory_info().rss / (1024 * 1024)
+            sampler = RSSSampler(1.0, baseline_mb + args.headroom_mb * 2)
+            sampler.start()
+            return AdmissionController(name, admitted, args.queue, 30, sampler=sampler)
+        return AdmissionController(name, args.requests, args.requests, 600)
+
+    print(
+        f"{args.requests} concurrent briefings, {args.alloc_mb}MB x {args.work_ms}ms each, "
+        f"admission limit {admitted}, queue {args.queue}"
+    )
+    print(f"{'mode':<10} {'ok':>4} {'shed':>5} {'p50 ms':>9} {'p99 ms':>9} {'peak RSS +':>11}")
+    # Unbounded runs last: the allocator keeps its high-water mark afterwards
+    for name in ("inline", "admission", "unbounded"):
+        inline = name == "inline"
+        controller = make_controller(name)
+        coordinator = _fake_coordinator(args.alloc_mb, args.work_ms, collect=inline)
+        patches = [
+            patch("app.api.endpoints.agent.get_briefing_admission", return_value=controller),
+            patch("app.api.endpoints.agent.get_langgraph_coordinator", return_value=coordinator),
+        ]
+        if inline:
+            patches.append(
+                patch("app.api.endpoints.agent.run_in_threadpool", _inline_threadpool)
+            )
+        for active in patches:
+            active.start()
+        try:
+            gc.collect()
+            start_mb = process.memory_info().rss / (1024 * 1024)
+            with _PeakRSS() as rss:
+                result = asyncio.run(_load(args.requests, headers))
+        finally:
+            for active in patches:
+                active.stop()
+            if controller.sampler is not None:
+                controller.sampler.stop()
+        print(
+            f"{name:<10} {result['ok']:>4} {result['shed']:>5} {result['p50']:>9.0f} "
+            f"{result['p99']:>9.0f} {rss.peak_mb - start_mb:>9.0f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
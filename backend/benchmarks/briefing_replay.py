@@ -0,0 +1,181 @@
+"""Offline daily briefing benchmark on recorded LLM calls.
+
+Runs the full LangGraph briefing workflow ``--briefings`` times with
+``LLM_BACKEND=replay``: every Groq call is answered from the cassette after
+its recorded latency (times ``--latency-scale``, plus ``--extra-latency``),
+so runs are repeatable and need no API key. Reports briefing latency
+percentiles and how much of it was LLM time versus workflow overhead.
+
+Record a cassette from the real providers once with ``--record`` (needs
+``GROQ_API_KEY``). Without one, a cassette is synthesized from seeded fake
+responses with Groq-like latencies.
+
+The response cache, briefing checkpoints, hedging and the gateway's rate
+budgets are turned off so that every run replays the same calls.
+
+Usage::
+
+    python -m benchmarks.briefing_replay [--briefings 20] [--latency-scale 1.0]
+    python -m benchmarks.briefing_replay --record --cassette briefing.jsonl
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.core.config import settings
+from app.services import llm_cassette
+from app.services.langgraph.coordinator import LangGraphCoordinator
+
+USER_ID = 1
+
+WORDS = (
+    "review the quarterly report before the 10:00 standup, reply to Sarah about the "
+    "contract, prepare slides for the client call, two invoices are overdue, the design "
+    "doc has new comments, book travel for the offsite"
+).split()
+
+
+class SyntheticGroq(GenericFakeChatModel):
+    """Seeded stand-in for ChatGroq used to synthesize a cassette."""
+
+    model_name: str = "llama-3.1-8b-instant"
+
+
+def _synthetic_model(rng):
+    def live_model(provider, model, temperature, max_tokens, timeout):
+        replies = (
+            AIMessage(content=" ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 160))))
+            for _ in iter(int, 1)
+        )
+        return SyntheticGroq(messages=replies, model_name=model)
+
+    return live_model
+
+
+def _synthesize(path: str, seed: int) -> None:
+    # Record one briefing from the fake model, then give each call Groq-like
+    # timing: ~0.3s to first token and ~40 tokens/s after it
+    rng = random.Random(seed)
+    with patch("app.services.llm_factory._live_model", _synthetic_model(rng)):
+        _record(path)
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for entry in entries:
+        first_token = rng.lognormvariate(-1.2, 0.5)
+        entry["first_token"] = round(first_token, 4)
+        entry["latency"] = round(first_token + len(entry["response"].split()) / 40, 4)
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+
+
+def _record(path: str) -> None:
+    settings.LLM_BACKEND = "record"
+    settings.LLM_CASSETTE_PATH = path
+    llm_cassette._cassette = None
+    briefing = LangGraphCoordinator().get_daily_briefing(USER_ID, notify_urgent=False)
+    if briefing["workflow_status"] != "completed":
+        raise SystemExit(f"Recording failed: {briefing.get('error')}")
+
+
+class _LLMClock:
+    """Replay sleep that also adds up the injected LLM time per thread."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+
+    def __call__(self, seconds: float) -> None:
+        self._local.total = self.total + seconds
+        time.sleep(seconds)
+
+    @property
+    def total(self) -> float:
+        return getattr(self._local, "total", 0.0)
+
+    def reset(self) -> None:
+        self._local.total = 0.0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--briefings", type=int, default=20)
+    parser.add_argument("--cassette", help="JSON-lines cassette (default: synthesized)")
+    parser.add_argument("--record", action="store_true", help="record the cassette from Groq first")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--extra-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    settings.RESPONSE_CACHE_ENABLED = False
+    # Checkpoints saved while synthesizing would answer every replayed node
+    settings.BRIEFING_CHECKPOINTS_ENABLED = False
+    settings.LLM_HEDGING_ENABLED = False
+    settings.GROQ_REQUESTS_PER_MINUTE = settings.GROQ_TOKENS_PER_MINUTE = 0
+    settings.GEMINI_REQUESTS_PER_MINUTE = settings.GEMINI_TOKENS_PER_MINUTE = 0
+
+    path = args.cassette
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix="londoolink_bench_"), "briefing.jsonl")
+    if args.record:
+        if os.path.exists(path):
+            os.remove(path)
+        _record(path)
+    elif not os.path.exists(path):
+        _synthesize(path, args.seed)
+
+    settings.LLM_BACKEND = "replay"
+    settings.LLM_CASSETTE_PATH = path
+    settings.LLM_REPLAY_LATENCY_SCALE = args.latency_scale
+    settings.LLM_REPLAY_EXTRA_LATENCY_SECONDS = args.extra_latency
+    llm_cassette._cassette = None
+    cassette = llm_cassette.get_cassette()
+    clock = _LLMClock()
+    cassette.sleep = clock
+
+    coordinator = LangGraphCoordinator()
+    wall, llm = [], []
+    for _ in range(args.briefings):
+        clock.reset()
+        started = time.perf_counter()
+        briefing = coordinator.get_daily_briefing(USER_ID, notify_urgent=False)
+        wall.append(time.perf_counter() - started)
+        llm.append(clock.total)
+        if briefing["workflow_status"] != "completed":
+            raise SystemExit(f"Replay failed: {briefing.get('error')}")
+        failed = [
+            name
+            for name in ("email_insights", "priority_recommendations")
+            if briefing[name].get("status") != "completed"
+        ]
+        if failed:
+            raise SystemExit(f"Replay failed in {', '.join(failed)}: {briefing[failed[0]]}")
+        if clock.total <= 0:
+            raise SystemExit("Replay made no LLM calls; the briefing was answered from a cache")
+
+    overhead = [total - waited for total, waited in zip(wall, llm)]
+    print(
+        f"{args.briefings} briefings from {len(cassette)} recorded calls in {path} "
+        f"(latency x{args.latency_scale:g} +{args.extra_latency:g}s)"
+    )
+    print(f"briefing: p50 {percentile(wall, 50):.3f}s p95 {percentile(wall, 95):.3f}s")
+    print(f"LLM:      p50 {percentile(llm, 50):.3f}s p95 {percentile(llm, 95):.3f}s")
+    print(
+        f"overhead: p50 {percentile(overhead, 50) * 1000:.1f}ms "
+        f"p95 {percentile(overhead, 95) * 1000:.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
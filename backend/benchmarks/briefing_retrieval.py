@@ -0,0 +1,156 @@
+"""Briefing retrieval prefetch benchmark.
+
+Fills a real Chroma collection with ``--users`` x ``--docs`` documents spread
+over the four briefing sources, with a stand-in embedding model that takes
+``--embed-ms`` per call (one Ollama round-trip) whatever the batch size.
+Reports, per briefing, the retrieval latency of:
+
+* ``serial``         - one query per source agent node, each embedding its
+                       query and searching on its own (the naive wiring);
+* ``prefetch cold``  - the workflow's prefetch stage on a new process: one
+                       batched embedding call and one multi-query search;
+* ``prefetch warm``  - the prefetch stage once the fixed query embeddings
+                       are memoized: one multi-query search.
+
+Usage::
+
+    python -m benchmarks.briefing_retrieval [--users 50] [--docs 200] [--embed-ms 40]
+"""
+
+import argparse
+import math
+import random
+import re
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+from app.core.config import settings
+from app.services.briefing_retrieval import SOURCE_QUERIES, prefetch_briefing_context
+from app.services.rag.pipeline import RAGPipeline
+from app.services.rag.vector_store import VectorStore
+
+DIMENSIONS = 256
+SOURCES = ["email", "calendar", "whatsapp", "slack", "notion"]
+WORDS = (
+    "urgent reply deadline meeting invoice contract budget standup review project notes "
+    "task follow-up call travel offsite client report slides agenda message contact "
+    "appointment event tomorrow today week action item important family opportunity"
+).split()
+
+
+def _vector(text):
+    # Deterministic unit-length bag-of-words embedding
+    vector = [0.0] * DIMENSIONS
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class SlowEmbedder:
+    """Embedding model with a fixed per-call round-trip."""
+
+    def __init__(self, round_trip: float) -> None:
+        self.round_trip = round_trip
+        self.calls = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.round_trip)
+        return [_vector(text) for text in texts]
+
+
+def _timed(run, repeat):
+    samples = []
+    for i in range(repeat):
+        started = time.perf_counter()
+        run(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--docs", type=int, default=200, help="documents per user")
+    parser.add_argument("--embed-ms", type=float, default=40.0)
+    parser.add_argument("--briefings", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    embedder = SlowEmbedder(args.embed_ms / 1000)
+    n_results = settings.BRIEFING_RETRIEVAL_RESULTS
+
+    with patch("app.services.rag.vector_store.embedding_manager", embedder), patch(
+        "app.services.rag.embeddings.embedding_manager", embedder
+    ):
+        store = VectorStore(collection_name=f"bench_retrieval_{uuid.uuid4().hex[:8]}")
+        documents, metadatas = [], []
+        for user_id in range(1, args.users + 1):
+            for i in range(args.docs):
+                documents.append(" ".join(rng.choice(WORDS) for _ in range(30)))
+                metadatas.append({"source": rng.choice(SOURCES), "user_id": user_id})
+        for start in range(0, len(documents), 5000):
+            store.collection.add(
+                ids=[f"doc{i}" for i in range(start, min(start + 5000, len(documents)))],
+                documents=documents[start : start + 5000],
+                metadatas=metadatas[start : start + 5000],
+                embeddings=[_vector(text) for text in documents[start : start + 5000]],
+            )
+
+        pipeline = RAGPipeline()
+        pipeline.vector_store = store
+
+        def user(i):
+            return i % args.users + 1
+
+        def serial(i):
+            for query in SOURCE_QUERIES.values():
+                store.query_documents(query, n_results, {"user_id": user(i)})
+
+        def prefetch(i):
+            prefetch_briefing_context(user(i))
+
+        with patch("app.services.briefing_retrieval.rag_pipeline", pipeline):
+            serial_ms = _timed(serial, args.briefings)
+            serial_calls = embedder.calls
+            store._query_vectors = OrderedDict()
+            cold_ms = _timed(prefetch, 1)
+            calls_before = embedder.calls
+            warm_ms = _timed(prefetch, args.briefings)
+            warm_calls = embedder.calls - calls_before
+
+        store.client.delete_collection(store.collection_name)
+
+    print(
+        f"{args.users} users x {args.docs} documents, embedding round-trip "
+        f"{args.embed_ms:g}ms, {n_results} results per source"
+    )
+    print(
+        f"serial:        p50 {percentile(serial_ms, 50):7.1f}ms "
+        f"p95 {percentile(serial_ms, 95):7.1f}ms"
+        f"  ({serial_calls / args.briefings:.0f} embedding calls per briefing)"
+    )
+    print(f"prefetch cold:     {cold_ms[0]:7.1f}ms              (1 embedding call)")
+    print(
+        f"prefetch warm: p50 {percentile(warm_ms, 50):7.1f}ms "
+        f"p95 {percentile(warm_ms, 95):7.1f}ms"
+        f"  ({warm_calls / args.briefings:.0f} embedding calls per briefing)"
+    )
+    print(
+        f"warm prefetch p95 is {percentile(warm_ms, 95) / args.embed_ms:.2f}x "
+        f"one embedding round-trip"
+    )
+
+
+if __name__ == "__main__":
+    main()
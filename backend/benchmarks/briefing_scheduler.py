@@ -0,0 +1,132 @@
+"""Morning briefing precompute scheduler benchmark.
+
+Simulates one UTC day for thousands of opted-in users spread over a few
+timezones, with a fake clock and an instant fake briefing generator. Reports
+the cost of a scheduling pass, the peak number of workflows started in any
+minute (what Groq sees), and how many briefings were ready by each user's
+local morning.
+
+Usage::
+
+    python -m benchmarks.briefing_scheduler [--users 5000] [--per-minute 60]
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.daily_briefing import DailyBriefing
+from app.models.user import User
+from app.services.briefing_scheduler import BriefingScheduler, due_at
+from app.services.briefing_store import user_zone
+
+ZONES = ["UTC", "Europe/London", "Africa/Kampala", "America/New_York", "Asia/Tokyo"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--per-minute", type=float, default=60.0)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--window", type=int, default=120, help="minutes before the morning hour")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="londoolink_bench_")
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, 'scheduler.db')}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(1)
+    window = timedelta(minutes=args.window)
+    start = datetime(2026, 3, 1, 18, tzinfo=timezone.utc)
+    end = datetime(2026, 3, 2, 14, tzinfo=timezone.utc)
+
+    db = Session()
+    users = [
+        User(
+            email=f"user{i}@example.com",
+            timezone=rng.choice(ZONES),
+            notification_preferences=json.dumps({"dailyBriefing": rng.random() < 0.9}),
+        )
+        for i in range(args.users)
+    ]
+    db.add_all(users)
+    db.commit()
+    opted_in = {
+        user.id: user_zone(user.timezone)
+        for user in users
+        if json.loads(user.notification_preferences)["dailyBriefing"]
+    }
+    # Users whose slot already passed today got their briefing before the run
+    for user_id, zone in opted_in.items():
+        day = start.astimezone(zone).date()
+        if start >= due_at(user_id, zone, day, 7, window):
+            db.add(
+                DailyBriefing(
+                    user_id=user_id, briefing_date=day, model_size="small", content="{}", source="scheduled"
+                )
+            )
+    db.commit()
+    db.close()
+
+    clock = [start]
+    started_at = {}
+
+    def generate(user_id):
+        started_at[user_id] = clock[0]
+        return {"summary": "ok"}
+
+    scheduler = BriefingScheduler(
+        generate=generate,
+        session_factory=Session,
+        workers=args.workers,
+        rate_per_minute=args.per_minute,
+        morning_hour=7,
+        window_minutes=args.window,
+        interval_seconds=30,
+    )
+
+    tick_seconds = []
+    while clock[0] < end:
+        tick_started = time.perf_counter()
+        scheduler.tick(clock[0])
+        tick_seconds.append(time.perf_counter() - tick_started)
+        scheduler.wait_idle()
+        clock[0] += timedelta(seconds=30)
+    scheduler.stop()
+
+    per_minute = Counter(at.replace(second=0) for at in started_at.values())
+    late = Counter()
+    for user_id, at in started_at.items():
+        zone = opted_in[user_id]
+        local = at.astimezone(zone)
+        if local.hour >= 7:
+            late[zone.key] += 1
+
+    tick_seconds.sort()
+    print(f"users {args.users}, opted in {len(opted_in)}, precomputed {len(started_at)}")
+    print(
+        f"pass: median {tick_seconds[len(tick_seconds) // 2] * 1000:.2f}ms "
+        f"max {tick_seconds[-1] * 1000:.2f}ms"
+    )
+    print(
+        f"workflow starts: peak {max(per_minute.values())}/min "
+        f"(limit {args.per_minute:g}/min) over {len(per_minute)} minutes"
+    )
+    zones = Counter(zone.key for zone in opted_in.values())
+    for zone in ZONES:
+        print(f"  {zone:<18} {zones[zone]:>5} users, {late[zone]:>5} started after 07:00 local")
+
+
+if __name__ == "__main__":
+    main()
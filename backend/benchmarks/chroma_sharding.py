@@ -0,0 +1,151 @@
+"""Chroma sharding benchmark: query and delete cost as the tenant count grows.
+
+For each tenant count in ``--tenants``, ``--docs`` documents per tenant
+(random unit vectors of ``--dimensions``, precomputed so no embedding time
+is counted) are ingested into a fresh store in the development Chroma
+client (persistent, in a temporary directory) with each layout:
+
+* ``shared`` - :class:`~app.services.rag.vector_store.VectorStore`, one
+  collection filtered by ``user_id``;
+* ``user`` - :class:`~app.services.rag.sharded_store.ShardedVectorStore`
+  with a collection per tenant;
+* ``bucket`` - the same with tenants hashed into ``--buckets`` collections.
+
+Then ``--queries`` searches for the top ``-k`` with ``{"user_id": ...}``
+run against random tenants, and ``--deletes`` tenants are removed with
+``delete_documents({"user_id": ...})``. Reports ingest time, query latency
+p50/p95 and delete latency p50/max.
+
+Usage::
+
+    python -m benchmarks.chroma_sharding [--tenants 10 50 200] [--docs 200]
+"""
+
+import argparse
+import random
+import time
+import uuid
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+import numpy as np
+
+from app.services.rag.sharded_store import ShardedVectorStore
+from app.services.rag.vector_store import VectorStore
+
+
+class TableEmbedder:
+    """Returns precomputed vectors ("<tenant> <row>" and "query <i>" texts)."""
+
+    def __init__(self, vectors) -> None:
+        self.vectors = vectors
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        rows = [text.split()[:2] for text in texts]
+        return [self.vectors[kind][int(row)].tolist() for kind, row in rows]
+
+
+def _unit(rng, rows, dimensions):
+    vectors = rng.standard_normal((rows, dimensions), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _open(layout, args):
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    if layout == "shared":
+        return VectorStore(collection_name=name)
+    return ShardedVectorStore(
+        collection_name=name, sharding=layout, buckets=args.buckets, max_open=args.max_open
+    )
+
+
+def _drop(store):
+    names = [store.collection_name]
+    if isinstance(store, ShardedVectorStore):
+        names += store._shard_names()
+    for name in names:
+        store.client.delete_collection(name)
+
+
+def _run(layout, tenants, embedder, args):
+    rng = random.Random(args.seed)
+    with (
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+        patch("app.services.rag.sharded_store.embedding_manager", embedder),
+    ):
+        store = _open(layout, args)
+        try:
+            started = time.perf_counter()
+            for tenant in range(tenants):
+                rows = range(tenant * args.docs, (tenant + 1) * args.docs)
+                store.add_documents(
+                    [f"doc {row} chunk of an email thread" for row in rows],
+                    [{"source": "email", "user_id": tenant} for _ in rows],
+                    ids=[f"t{tenant}-{row}" for row in rows],
+                )
+            ingest_seconds = time.perf_counter() - started
+
+            queries = []
+            for i in range(args.queries):
+                tenant = rng.randrange(tenants)
+                started = time.perf_counter()
+                results = store.query_documents(f"query {i}", args.k, {"user_id": tenant})
+                queries.append((time.perf_counter() - started) * 1000)
+                assert all(result["metadata"]["user_id"] == tenant for result in results)
+
+            deletes = []
+            for tenant in rng.sample(range(tenants), min(args.deletes, tenants)):
+                started = time.perf_counter()
+                deleted = store.delete_documents({"user_id": tenant})
+                deletes.append((time.perf_counter() - started) * 1000)
+                assert deleted == args.docs
+        finally:
+            _drop(store)
+    return ingest_seconds, queries, deletes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenants", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--docs", type=int, default=200, help="documents per tenant")
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--deletes", type=int, default=5, help="tenants deleted per run")
+    parser.add_argument("--buckets", type=int, default=16, help="bucket layout collections")
+    parser.add_argument("--max-open", type=int, default=128, help="open shard collections")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{args.docs} documents per tenant, {args.dimensions} dimensions, top-{args.k}, "
+        f"{args.queries} queries and {args.deletes} tenant deletes per run"
+    )
+    print(
+        f"{'tenants':>8}  {'layout':<8}{'ingest':>9}{'query p50':>11}{'p95':>10}"
+        f"{'delete p50':>12}{'max':>10}"
+    )
+    for tenants in args.tenants:
+        rng = np.random.default_rng(args.seed)
+        embedder = TableEmbedder(
+            {
+                "doc": _unit(rng, tenants * args.docs, args.dimensions),
+                "query": _unit(rng, args.queries, args.dimensions),
+            }
+        )
+        for layout in ("shared", "user", "bucket"):
+            ingest_seconds, queries, deletes = _run(layout, tenants, embedder, args)
+            print(
+                f"{tenants:>8}  {layout:<8}{ingest_seconds:>8.1f}s"
+                f"{percentile(queries, 50):>9.2f}ms{percentile(queries, 95):>8.2f}ms"
+                f"{percentile(deletes, 50):>10.2f}ms{max(deletes):>8.2f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
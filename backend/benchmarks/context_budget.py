@@ -0,0 +1,68 @@
+"""Priority prompt context assembly benchmark.
+
+Builds synthetic agent analyses of growing size (with the overlap real
+analyses have: the calendar and social agents repeat items the email agent
+already reported) and compares the naive concatenated context with the
+token-budgeted one. Reports estimated tokens before and after, duplicates
+and truncated items removed, and the assembly cost.
+
+Usage::
+
+    python -m benchmarks.context_budget [--budget 3000]
+"""
+
+import argparse
+import time
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+from app.services.context_budget import assemble_briefing_context, estimate_tokens
+
+
+def _analysis(agent: str, items: int, shared: int) -> str:
+    lines = [f"**{agent.title()} summary:**"]
+    # The first *shared* items are reported by every agent
+    for i in range(items):
+        if i < shared:
+            lines.append(f"- Quarterly board review with investors needs slides by Friday ({i})")
+        else:
+            lines.append(
+                f"- {agent} item {i}: follow up with the project team about the "
+                f"delivery timeline and confirm owners for the open actions"
+            )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"budget {args.budget} estimated tokens")
+    print(f"{'items/agent':>11} {'raw tok':>8} {'assembled':>10} {'dupes':>6} {'cut':>5} {'assemble':>10}")
+    for items in (10, 40, 100, 250):
+        analyses = {
+            agent: _analysis(agent, items, shared=items // 5)
+            for agent in ("email", "calendar", "social", "notion")
+        }
+        preferences = ["Prefers morning meetings", "Flag anything from the CFO"] * 3
+        naive = "\n".join(analyses.values()) + "\n" + "\n".join(preferences)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            context = assemble_briefing_context(
+                analyses, preferences, node="benchmark", budget=args.budget
+            )
+        elapsed_us = (time.perf_counter() - started) / args.repeat * 1e6
+
+        stats = context.stats().values()
+        print(
+            f"{items:>11} {estimate_tokens(naive):>8} {context.tokens:>10} "
+            f"{sum(s['duplicates'] for s in stats):>6} {sum(s['truncated'] for s in stats):>5} "
+            f"{elapsed_us:>8.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
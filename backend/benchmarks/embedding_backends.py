@@ -0,0 +1,131 @@
+"""Embedding backend throughput benchmark, in documents per second.
+
+Embeds ``--docs`` synthetic chunks (about ``--words`` words each) in calls
+of ``--batch`` texts, as ingestion does, through each backend built by
+:func:`~app.services.rag.embeddings.create_embedding_backend`:
+
+* ``ollama`` - the real ``OllamaEmbeddings`` client against a local stub of
+  Ollama's ``/api/embed`` that answers with 4096-dimension vectors (llama3's
+  width) after ``--ollama-ms`` per text, processed one at a time as a
+  CPU-only Ollama does. The HTTP and JSON cost is real; the model time is
+  the stub's assumption (llama3 on a CPU-only host takes far longer);
+* ``onnx`` - :class:`~app.services.rag.cpu_embeddings.OnnxEmbeddings` on the
+  model in ``--onnx-model`` (``model.onnx`` + ``tokenizer.json``, e.g.
+  all-MiniLM-L6-v2), once per ``--threads`` value; skipped without a model;
+* ``hashing`` - :class:`~app.services.rag.cpu_embeddings.HashingEmbeddings`.
+
+Usage::
+
+    python -m benchmarks.embedding_backends [--docs 512] [--onnx-model DIR] [--threads 1 4]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+from app.core.config import settings
+from app.services.rag.embeddings import create_embedding_backend
+
+WORDS = (
+    "invoice payment overdue meeting agenda flight hotel contract signature review "
+    "delivery parcel tracking schedule reminder call friday monday kampala nairobi "
+    "please attached draft confirm budget quarter report team client update"
+).split()
+
+
+class OllamaStub(BaseHTTPRequestHandler):
+    """``POST /api/embed``: one vector per input after a fixed per-text delay."""
+
+    seconds_per_text = 0.05
+    dimensions = 4096
+    lock = threading.Lock()  # one model: texts are embedded one at a time
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = request["input"] if isinstance(request["input"], list) else [request["input"]]
+        with self.lock:
+            time.sleep(self.seconds_per_text * len(texts))
+        rng = random.Random(len(texts))
+        vector = [rng.uniform(-1, 1) for _ in range(self.dimensions)]
+        body = json.dumps({"model": request["model"], "embeddings": [vector] * len(texts)})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+def _throughput(backend, texts, batch):
+    backend.embed_documents(texts[:batch])  # warm-up: connections, first inference
+    started = time.perf_counter()
+    for start in range(0, len(texts), batch):
+        backend.embed_documents(texts[start : start + batch])
+    return len(texts) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=512)
+    parser.add_argument("--words", type=int, default=120, help="words per chunk")
+    parser.add_argument("--batch", type=int, default=64, help="texts per embed_documents call")
+    parser.add_argument("--ollama-ms", type=float, default=50.0, help="stub model time per text")
+    parser.add_argument("--onnx-model", default="", help="directory with model.onnx")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1], help="onnx thread counts")
+    parser.add_argument("--onnx-batch", type=int, default=32, help="onnx texts per inference")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    texts = [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(args.words // 2, args.words)))
+        for _ in range(args.docs)
+    ]
+    OllamaStub.seconds_per_text = args.ollama_ms / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OllamaStub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    runs = [("ollama", {"OLLAMA_BASE_URL": f"http://127.0.0.1:{server.server_port}"})]
+    if args.onnx_model:
+        for threads in args.threads:
+            runs.append(
+                (
+                    "onnx",
+                    {
+                        "EMBEDDING_ONNX_MODEL_PATH": args.onnx_model,
+                        "EMBEDDING_ONNX_THREADS": threads,
+                        "EMBEDDING_ONNX_BATCH_SIZE": args.onnx_batch,
+                    },
+                )
+            )
+    runs.append(("hashing", {}))
+
+    print(
+        f"{args.docs} chunks of up to {args.words} words, {args.batch} per call; "
+        f"Ollama stub at {args.ollama_ms:g}ms per text"
+    )
+    try:
+        for name, overrides in runs:
+            with patch.multiple(settings, EMBEDDING_BACKEND=name, **overrides):
+                backend = create_embedding_backend()
+                docs_per_second = _throughput(backend, texts, args.batch)
+                dimensions = len(backend.embed_query(texts[0]))
+            label = name
+            if name == "onnx":
+                label = f"onnx x{overrides['EMBEDDING_ONNX_THREADS']} threads"
+            print(f"{label:<22}{docs_per_second:>10.1f} docs/s  ({dimensions} dimensions)")
+        if not args.onnx_model:
+            print("onnx: skipped (pass --onnx-model DIR with model.onnx and tokenizer.json)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Credential encryption micro-benchmark.
+
+Compares the previous implementation (Fernet rebuilt on every call, token
+base64-encoded a second time) with the cached key ring and compact format.
+Reports ops/sec for single and bulk calls and stored bytes per credential.
+
+Usage::
+
+    python -m benchmarks.encryption [--iterations 5000]
+"""
+
+import argparse
+import base64
+import json
+import time
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+from cryptography.fernet import Fernet
+
+from app.core.config import settings
+from app.security.encryption import decrypt, decrypt_many, encrypt, encrypt_many
+
+# Shape of the OAuth credentials stored per connected service
+SAMPLE_CREDENTIAL = json.dumps(
+    {
+        "access_token": "ya29." + "a" * 180,
+        "refresh_token": "1//0" + "b" * 100,
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "scopes": [
+            "https://www.googleapis.com/auth/gmail.readonly",
+            "https://www.googleapis.com/auth/calendar.readonly",
+        ],
+        "expiry": "2026-10-19T12:00:00Z",
+    }
+)
+
+
+def _legacy_encrypt(data: str) -> str:
+    key_bytes = bytes.fromhex(settings.ENCRYPTION_KEY)
+    fernet = Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
+    return base64.b64encode(fernet.encrypt(data.encode("utf-8"))).decode("utf-8")
+
+
+def _legacy_decrypt(encrypted_data: str) -> str:
+    key_bytes = bytes.fromhex(settings.ENCRYPTION_KEY)
+    fernet = Fernet(base64.urlsafe_b64encode(key_bytes[:32]))
+    return fernet.decrypt(base64.b64decode(encrypted_data.encode("utf-8"))).decode("utf-8")
+
+
+def _ops_per_second(func, iterations: int) -> float:
+    started = time.perf_counter()
+    func(iterations)
+    return iterations / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    legacy_token = _legacy_encrypt(SAMPLE_CREDENTIAL)
+    compact_token = encrypt(SAMPLE_CREDENTIAL)
+
+    rows = [
+        (
+            "legacy encrypt",
+            _ops_per_second(lambda k: [_legacy_encrypt(SAMPLE_CREDENTIAL) for _ in range(k)], n),
+        ),
+        (
+            "legacy decrypt",
+            _ops_per_second(lambda k: [_legacy_decrypt(legacy_token) for _ in range(k)], n),
+        ),
+        (
+            "encrypt",
+            _ops_per_second(lambda k: [encrypt(SAMPLE_CREDENTIAL) for _ in range(k)], n),
+        ),
+        (
+            "decrypt",
+            _ops_per_second(lambda k: [decrypt(compact_token) for _ in range(k)], n),
+        ),
+        (
+            "encrypt_many",
+            _ops_per_second(lambda k: encrypt_many([SAMPLE_CREDENTIAL] * k), n),
+        ),
+        (
+            "decrypt_many",
+            _ops_per_second(lambda k: decrypt_many([compact_token] * k), n),
+        ),
+    ]
+
+    print(f"{'operation':<16} {'ops/sec':>12}")
+    for name, ops in rows:
+        print(f"{name:<16} {ops:>12,.0f}")
+
+    print()
+    print(f"plaintext bytes per credential:  {len(SAMPLE_CREDENTIAL)}")
+    print(f"legacy stored bytes:             {len(legacy_token)}")
+    print(f"compact stored bytes:            {len(compact_token)}")
+    print(f"saving:                          {1 - len(compact_token) / len(legacy_token):.1%}")
+
+
+if __name__ == "__main__":
+    main()
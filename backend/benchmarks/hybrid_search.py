@@ -0,0 +1,180 @@
+"""Hybrid (BM25 + vector) versus pure vector RAG search benchmark.
+
+Ingests a synthetic mailbox per user into a real Chroma collection through
+``VectorStore.add_documents`` (so the lexical index is maintained as in
+production) and runs four kinds of query against each user's documents:
+
+* ``sender``     - an exact sender address;
+* ``phone``      - a phone number quoted in the message body;
+* ``message_id`` - a Message-ID header;
+* ``topic``      - a few topic words (no identifiers).
+
+The stand-in dense embedder hashes character trigrams of every word into
+``--dimensions`` buckets, which, like a real embedding model, places
+near-identical identifiers (0772123456 / 0772123465) close together.
+Reports recall@k per query kind and search latency for ``vector`` and
+``hybrid`` mode, plus the one-off cost of building a user's lexical shard.
+
+Usage::
+
+    python -m benchmarks.hybrid_search [--users 10] [--emails 500] [--queries 40] [-k 5]
+"""
+
+import argparse
+import math
+import random
+import time
+import uuid
+import zlib
+from collections import defaultdict
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+from app.core.config import settings
+from app.services.rag.vector_store import VectorStore
+
+FIRST = "alice brian carol david esther frank grace henry irene james kato lydia moses".split()
+LAST = "nakato okello mugisha namuli ssebunya achieng kamau wanjiru otieno nansubuga".split()
+DOMAINS = ["example.com", "mail.example.org", "corp.example.net"]
+TOPICS = {
+    "invoice": "invoice payment overdue amount billing receipt accounts",
+    "meeting": "meeting agenda schedule calendar room minutes attendees",
+    "travel": "flight hotel booking itinerary airport checkin visa",
+    "contract": "contract signature clause legal review draft terms",
+    "delivery": "parcel delivery courier tracking shipment address package",
+}
+
+
+class TrigramEmbedder:
+    """Deterministic dense stand-in: hashed character trigrams, unit length."""
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+
+    def _embed(self, text):
+        vector = [0.0] * self.dimensions
+        for word in text.lower().split():
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                vector[zlib.crc32(padded[i : i + 3].encode()) % self.dimensions] += 1.0
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+
+def _mailbox(rng, emails):
+    # (text, facts) per email; facts are the identifiers a query can target
+    senders = [
+        f"{rng.choice(FIRST)}.{rng.choice(LAST)}@{rng.choice(DOMAINS)}" for _ in range(40)
+    ]
+    mailbox = []
+    for _ in range(emails):
+        topic = rng.choice(list(TOPICS))
+        words = TOPICS[topic].split()
+        phone = "07" + "".join(rng.choice("0123456789") for _ in range(8))
+        facts = {
+            "sender": rng.choice(senders),
+            "phone": phone,
+            "message_id": f"<{uuid.UUID(int=rng.getrandbits(128)).hex[:16]}@mail.example.com>",
+            "topic": topic,
+        }
+        body = " ".join(rng.choice(words) for _ in range(25))
+        text = (
+            f"From: {facts['sender']}\nMessage-ID: {facts['message_id']}\n"
+            f"Subject: {words[0]} {words[1]}\n{body}. Call me on {phone}."
+        )
+        mailbox.append((text, facts))
+    return mailbox
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--emails", type=int, default=500, help="emails per user")
+    parser.add_argument("--queries", type=int, default=40, help="queries per kind per user")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--dimensions", type=int, default=384)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    embedder = TrigramEmbedder(args.dimensions)
+    recall = defaultdict(list)  # (mode, kind) -> recall per query
+    latency = defaultdict(list)  # mode -> ms per query
+    shard_build_ms = []
+
+    with patch("app.services.rag.vector_store.embedding_manager", embedder):
+        store = VectorStore(collection_name=f"bench_hybrid_{uuid.uuid4().hex[:8]}")
+        started = time.perf_counter()
+        mailboxes = {}
+        for user_id in range(1, args.users + 1):
+            mailboxes[user_id] = _mailbox(rng, args.emails)
+            texts = [text for text, _ in mailboxes[user_id]]
+            for start in range(0, len(texts), 500):
+                batch = texts[start : start + 500]
+                store.add_documents(
+                    batch,
+                    [{"source": "email", "user_id": user_id} for _ in batch],
+                    ids=[f"u{user_id}-{start + i}" for i in range(len(batch))],
+                )
+        ingest_seconds = time.perf_counter() - started
+
+        for user_id, mailbox in mailboxes.items():
+            where = {"user_id": user_id}
+            started = time.perf_counter()
+            store.lexical.search(user_id, "warmup", 1)
+            shard_build_ms.append((time.perf_counter() - started) * 1000)
+
+            for kind in ("sender", "phone", "message_id", "topic"):
+                for _ in range(args.queries):
+                    target = rng.choice(mailbox)[1][kind]
+                    query = " ".join(TOPICS[target].split()[:3]) if kind == "topic" else target
+                    relevant = {
+                        f"u{user_id}-{i}" for i, (_, facts) in enumerate(mailbox)
+                        if facts[kind] == target
+                    }
+                    for mode in ("vector", "hybrid"):
+                        started = time.perf_counter()
+                        if mode == "hybrid":
+                            results = store.hybrid_query(query, args.k, where)
+                        else:
+                            results = store.query_documents(query, args.k, where)
+                        latency[mode].append((time.perf_counter() - started) * 1000)
+                        found = {result["id"] for result in results}
+                        recall[(mode, kind)].append(
+                            len(found & relevant) / min(args.k, len(relevant))
+                        )
+
+        store.client.delete_collection(store.collection_name)
+
+    total = args.users * args.emails
+    print(
+        f"{args.users} users x {args.emails} emails ({total} documents, ingest "
+        f"{ingest_seconds:.1f}s), recall@{args.k}, "
+        f"{settings.RAG_HYBRID_CANDIDATES} fusion candidates per ranking"
+    )
+    print(f"{'query':<12}{'vector':>10}{'hybrid':>10}")
+    for kind in ("sender", "phone", "message_id", "topic"):
+        vector = sum(recall[("vector", kind)]) / len(recall[("vector", kind)])
+        hybrid = sum(recall[("hybrid", kind)]) / len(recall[("hybrid", kind)])
+        print(f"{kind:<12}{vector:>10.3f}{hybrid:>10.3f}")
+    for mode in ("vector", "hybrid"):
+        print(
+            f"{mode} latency: p50 {percentile(latency[mode], 50):6.2f}ms "
+            f"p95 {percentile(latency[mode], 95):6.2f}ms"
+        )
+    print(
+        f"lexical shard build ({args.emails} documents): "
+        f"p50 {percentile(shard_build_ms, 50):.1f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""LLM gateway burst benchmark.
+
+Simulates a morning burst against a fake provider that enforces Groq-style
+RPM/TPM limits over a sliding minute: background briefing calls (five per
+user) arrive all at once and interactive chat calls trickle in on top.
+Time is simulated with a fake clock, so the run takes seconds. Reports, for
+calls sent straight to the provider and through the gateway, how many got a
+429 and how long each priority waited.
+
+Usage::
+
+    python -m benchmarks.llm_gateway [--users 12] [--chats 20] [--rpm 30] [--reserve 0.2]
+"""
+
+import argparse
+import threading
+import time
+from collections import deque
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+from langchain_core.messages import AIMessage
+
+from app.services.llm_gateway import BACKGROUND, INTERACTIVE, LLMGateway, invoke_llm
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeProvider:
+    provider = "fake"
+    model_name = "fake-model"
+    max_tokens = 300
+
+    def __init__(self, clock, rpm, tpm, tokens_per_call):
+        self.clock = clock
+        self.rpm = rpm
+        self.tpm = tpm
+        self.tokens_per_call = tokens_per_call
+        self.window = deque()
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, messages):
+        with self._lock:
+            now = self.clock()
+            while self.window and self.window[0] <= now - 60:
+                self.window.popleft()
+            if len(self.window) >= self.rpm or (len(self.window) + 1) * self.tokens_per_call > self.tpm:
+                self.rejected += 1
+                raise RateLimitError("429 Too Many Requests")
+            self.window.append(now)
+        usage = {"input_tokens": 100, "output_tokens": self.tokens_per_call - 100,
+                 "total_tokens": self.tokens_per_call}
+        return AIMessage(content="ok", usage_metadata=usage)
+
+
+def run(args, gated: bool):
+    clock = FakeClock()
+    provider = FakeProvider(clock, args.rpm, args.tpm, args.tokens_per_call)
+    limits = {"fake": (args.rpm, args.tpm)} if gated else {}
+    gateway = LLMGateway(
+        limits, queue_timeout=3600, interactive_reserve=args.reserve, clock=clock
+    )
+    waits = {"background": [], "interactive": []}
+    failed = {"background": 0, "interactive": 0}
+    threads = []
+
+    def call(kind, priority, user):
+        started = clock()
+        try:
+            invoke_llm(provider, "x" * 400, "bench_gateway", user_id=user, priority=priority)
+            waits[kind].append(clock() - started)
+        except Exception:
+            failed[kind] += 1
+
+    def launch(kind, priority, user):
+        thread = threading.Thread(target=call, args=(kind, priority, user))
+        thread.start()
+        threads.append(thread)
+
+    with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway), patch(
+        "app.services.llm_gateway.settings.LLM_RATE_LIMIT_RETRIES", 0
+    ):
+        for user in range(args.users):
+            for _ in range(5):
+                launch("background", BACKGROUND, user)
+        chats_sent = 0
+        while any(thread.is_alive() for thread in threads) or chats_sent < args.chats:
+            time.sleep(0.005)
+            if chats_sent < args.chats and clock.now >= chats_sent * 6:
+                launch("interactive", INTERACTIVE, 1000 + chats_sent)
+                chats_sent += 1
+                time.sleep(0.005)
+            clock.now += 1.0
+            gateway.wake()
+
+    return provider.rejected, waits, failed, clock.now
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=12, help="background briefings (5 calls each)")
+    parser.add_argument("--chats", type=int, default=20, help="interactive chat calls, one every 6s")
+    parser.add_argument("--rpm", type=int, default=30)
+    parser.add_argument("--tpm", type=int, default=12000)
+    parser.add_argument("--tokens-per-call", type=int, default=400)
+    parser.add_argument("--reserve", type=float, default=0.2, help="budget share kept for chat")
+    args = parser.parse_args()
+
+    for label, gated in (("direct", False), ("gateway", True)):
+        rejected, waits, failed, elapsed = run(args, gated)
+        print(f"{label}: {rejected} provider 429s, simulated {elapsed / 60:.1f} min")
+        for kind in ("interactive", "background"):
+            samples = waits[kind]
+            print(
+                f"  {kind:<12} completed {len(samples):>3}, failed {failed[kind]:>3}, "
+                f"wait p50 {percentile(samples, 50):6.1f}s p95 {percentile(samples, 95):6.1f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Login burst load test.
+
+Fires a burst of concurrent ``POST /auth/login`` requests while a steady
+stream of non-auth requests (``GET /``) runs alongside, then reports login
+p50/p99 and the p99 of the non-auth requests. Runs twice: once with Argon2
+verification inline on the event loop (the old behaviour) and once on the
+bounded password hashing pool.
+
+Usage::
+
+    python -m benchmarks.login_burst [--logins 50] [--pings 200]
+"""
+
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base
+from app.db.session import get_db
+from app.main import app
+from app.models.user import User
+from app.security.password import (
+    get_password_pool_stats,
+    hash_password,
+    verify_and_update_password,
+)
+
+EMAIL = "burst@example.com"
+PASSWORD = "burst-password-123"
+
+
+def _setup_database():
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = session_factory()
+    db.add(User(email=EMAIL, hashed_password=hash_password(PASSWORD), is_active=True))
+    db.commit()
+    db.close()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+
+
+async def _timed(client: httpx.AsyncClient, method: str, url: str, **kwargs) -> float:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    response.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _burst(logins: int, pings: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_tasks = [
+            asyncio.create_task(
+                _timed(
+                    client,
+                    "POST",
+                    "/api/v1/auth/login",
+                    json={"email": EMAIL, "password": PASSWORD},
+                )
+            )
+            for _ in range(logins)
+        ]
+
+        ping_latencies = []
+        for _ in range(pings):
+            ping_latencies.append(await _timed(client, "GET", "/"))
+            await asyncio.sleep(0.002)
+
+        login_latencies = await asyncio.gather(*login_tasks)
+
+    return {
+        "login_p50_ms": round(percentile(login_latencies, 50), 1),
+        "login_p99_ms": round(percentile(login_latencies, 99), 1),
+        "non_auth_p50_ms": round(percentile(ping_latencies, 50), 1),
+        "non_auth_p99_ms": round(percentile(ping_latencies, 99), 1),
+    }
+
+
+async def _inline_verify(plain_password: str, hashed_password: str):
+    # Old behaviour: Argon2 runs directly on the event loop
+    return verify_and_update_password(plain_password, hashed_password)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--pings", type=int, default=200)
+    args = parser.parse_args()
+
+    _setup_database()
+
+    with patch(
+        "app.api.endpoints.auth.verify_and_update_password_async", _inline_verify
+    ):
+        inline = asyncio.run(_burst(args.logins, args.pings))
+    pooled = asyncio.run(_burst(args.logins, args.pings))
+
+    print(f"{'mode':<8} {'login p50':>10} {'login p99':>10} {'other p50':>10} {'other p99':>10}")
+    for name, result in (("inline", inline), ("pool", pooled)):
+        print(
+            f"{name:<8} {result['login_p50_ms']:>10} {result['login_p99_ms']:>10} "
+            f"{result['non_auth_p50_ms']:>10} {result['non_auth_p99_ms']:>10}"
+        )
+    print(f"pool stats: {get_password_pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
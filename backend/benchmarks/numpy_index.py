@@ -0,0 +1,149 @@
+"""NumPy vector index versus Chroma benchmark.
+
+For each size in ``--sizes`` one user's documents (random unit vectors of
+``--dimensions``, precomputed so no embedding time is counted) are ingested
+into a fresh in-memory Chroma collection through ``VectorStore.add_documents``
+and into a :class:`~app.services.rag.numpy_store.NumpyVectorStore` in a
+temporary directory, alongside 9 other users' documents so that both
+backends have to filter by ``user_id``. Then ``--queries`` searches with
+``{"user_id": ...}`` are run through ``query_documents`` on each.
+
+Reports ingest time, query latency p50/p95, recall@k against the exact
+float32 top-k and the resident memory each backend added (RSS delta, so run
+sizes one at a time for clean numbers). Chroma's HNSW search is approximate
+and random vectors are its worst case, so its recall here is a lower bound.
+The app's llama3 embeddings have 4096 dimensions; the default of 768 keeps
+the 100k run within a few GB.
+
+Usage::
+
+    python -m benchmarks.numpy_index [--sizes 1000 10000 100000] [--dimensions 768]
+"""
+
+import argparse
+import resource
+import shutil
+import tempfile
+import time
+import uuid
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+import numpy as np
+
+from app.services.rag.numpy_store import NumpyVectorStore
+from app.services.rag.vector_store import VectorStore
+
+OTHER_USERS = 9
+
+
+class TableEmbedder:
+    """Returns precomputed vectors ("<user> <row>" texts), so no backend pays for embedding."""
+
+    def __init__(self, vectors) -> None:
+        self.vectors = vectors  # user -> (rows, dimensions) array
+
+    def _lookup(self, text):
+        user, row = text.split()[:2]
+        return self.vectors[user][int(row)].tolist()
+
+    def embed_query(self, text):
+        return self._lookup(text)
+
+    def embed_documents(self, texts):
+        return [self._lookup(text) for text in texts]
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1e6
+
+
+def _vectors(size, dimensions, queries, seed):
+    rng = np.random.default_rng(seed)
+    vectors = {}
+    for user_id in range(OTHER_USERS + 1):
+        count = size if user_id == 0 else max(1, size // 10)
+        matrix = rng.standard_normal((count, dimensions), dtype=np.float32)
+        vectors[str(user_id)] = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    vectors["query"] = rng.standard_normal((queries, dimensions), dtype=np.float32)
+    return vectors
+
+
+def _run(backend, vectors, args):
+    embedder = TableEmbedder(vectors)
+    directory = tempfile.mkdtemp(prefix="londoolink_numpy_index_")
+    rss = _rss_mb()
+    with (
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+        patch("app.services.rag.numpy_store.embedding_manager", embedder),
+    ):
+        if backend == "chroma":
+            store = VectorStore(collection_name=f"bench_numpy_{uuid.uuid4().hex[:8]}")
+        else:
+            store = NumpyVectorStore(path=directory, dtype=backend.split("-")[1])
+        try:
+            started = time.perf_counter()
+            for user_id in range(OTHER_USERS + 1):
+                count = len(vectors[str(user_id)])
+                for start in range(0, count, args.batch):
+                    rows = range(start, min(count, start + args.batch))
+                    store.add_documents(
+                        [f"{user_id} {row} chunk of an email thread" for row in rows],
+                        [{"source": "email", "user_id": user_id} for _ in rows],
+                        ids=[f"u{user_id}-{row}" for row in rows],
+                    )
+            ingest_seconds = time.perf_counter() - started
+            memory = _rss_mb() - rss
+
+            latency = []
+            found = []
+            for i in range(len(vectors["query"])):
+                started = time.perf_counter()
+                results = store.query_documents(f"query {i}", args.k, {"user_id": 0})
+                latency.append((time.perf_counter() - started) * 1000)
+                found.append({result["id"] for result in results})
+        finally:
+            if backend == "chroma":
+                store.client.delete_collection(store.collection_name)
+            shutil.rmtree(directory, ignore_errors=True)
+    return ingest_seconds, latency, found, memory
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=1000, help="chunks per add_documents call")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{args.dimensions} dimensions, top-{args.k}, {args.queries} queries per run, "
+        f"{OTHER_USERS} other users at a tenth of the size"
+    )
+    print(
+        f"{'vectors/user':>12}  {'backend':<14}{'ingest':>9}{'p50':>10}{'p95':>10}"
+        f"{'RSS':>10}{'recall':>8}"
+    )
+    for size in args.sizes:
+        vectors = _vectors(size, args.dimensions, args.queries, args.seed)
+        exact = None
+        for backend in ("numpy-float32", "numpy-float16", "chroma"):
+            ingest_seconds, latency, found, memory = _run(backend, vectors, args)
+            if exact is None:
+                exact = found  # float32 brute force: the exact top-k
+            recall = sum(len(a & b) for a, b in zip(found, exact)) / sum(map(len, exact))
+            print(
+                f"{size:>12}  {backend:<14}{ingest_seconds:>8.1f}s"
+                f"{percentile(latency, 50):>8.2f}ms{percentile(latency, 95):>8.2f}ms"
+                f"{memory:>8.0f}MB{recall:>8.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Cold-start benchmark.
+
+Starts a fresh interpreter per run and measures, for ``import app.main``:
+
+* wall-clock import time and the slowest top-level imports reported by
+  ``python -X importtime``;
+* time to the first ``GET /health`` response through the ASGI app;
+* which heavy subsystems (Chroma, LangChain providers, LangGraph) ended up
+  in ``sys.modules`` - none of them should be loaded by ``/health``.
+
+Usage::
+
+    python -m benchmarks.startup [--runs 3] [--top 10]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+HEAVY_MODULES = (
+    "chromadb",
+    "langchain_google_genai",
+    "langchain_groq",
+    "langchain_ollama",
+    "langgraph",
+    "psutil",
+    "qrcode",
+)
+
+# Runs in the child interpreter so that nothing is already imported
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    status = client.get("/health").status_code
+responded = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_response_ms": (responded - started) * 1000,
+    "status": status,
+    "loaded": sorted(m for m in %r if m in sys.modules),
+}))
+""" % (HEAVY_MODULES,)
+
+_IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def run_probe(importtime: bool = False) -> dict:
+    # Measure one cold start in a fresh interpreter
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += ["-c", _PROBE]
+    result = subprocess.run(
+        command,
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=dict(os.environ),
+        check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+    if importtime:
+        probe["imports"] = [
+            (int(match.group(1)) / 1000, len(match.group(2)) // 2, match.group(3))
+            for match in map(_IMPORTTIME.match, result.stderr.splitlines())
+            if match
+        ]
+    return probe
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    probes = [run_probe() for _ in range(args.runs)]
+    imports = [probe["import_ms"] for probe in probes]
+    responses = [probe["first_response_ms"] for probe in probes]
+
+    print(f"{args.runs} cold starts of app.main")
+    print(f"{'import app.main':<24} {percentile(imports, 50):>8.0f} ms (p50)")
+    print(f"{'first /health response':<24} {percentile(responses, 50):>8.0f} ms (p50)")
+    print(f"{'heavy modules loaded':<24} {', '.join(probes[-1]['loaded']) or 'none'}")
+
+    # Cumulative time of each top-level package (first import only)
+    detail = run_probe(importtime=True)
+    top_level = [
+        (cumulative_ms, name)
+        for cumulative_ms, _depth, name in detail["imports"]
+        if "." not in name and name not in ("site", "app")
+    ]
+    print()
+    print("slowest packages (-X importtime, cumulative):")
+    for cumulative_ms, name in sorted(top_level, reverse=True)[: args.top]:
+        print(f"  {name:<40} {cumulative_ms:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""Tracing overhead benchmark.
+
+Measures the cost of the request tracer at three levels:
+
+* per span: ``span()`` with no active trace, with an unsampled trace and
+  with a sampled trace;
+* a synthetic request of 12 stages (DB, embedding, Chroma, LLM) doing a
+  small amount of CPU work each, untraced vs. sampled;
+* end-to-end ``GET /`` through the ASGI app at different sample rates.
+
+Usage::
+
+    python -m benchmarks.tracing_overhead [--iterations 20000] [--requests 2000]
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+import httpx
+
+from app.core.tracing import end_trace, span, start_trace
+from app.main import app
+
+STAGES = [
+    "db.query",
+    "db.query",
+    "embedding.embed_query",
+    "chroma.query",
+    "db.query",
+    "llm.email_agent",
+    "llm.calendar_agent",
+    "llm.social_agent",
+    "llm.notion_agent",
+    "llm.priority_agent",
+    "vault.retrieve_token",
+    "db.query",
+]
+
+
+def _busy(microseconds: float) -> None:
+    deadline = time.perf_counter() + microseconds / 1_000_000
+    while time.perf_counter() < deadline:
+        pass
+
+
+def _per_span_ns(iterations: int, sampled) -> float:
+    token = None
+    if sampled is not None:
+        _, token = start_trace(sampled=sampled)
+    try:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with span("db.query"):
+                pass
+        return (time.perf_counter() - started) / iterations * 1e9
+    finally:
+        if token is not None:
+            end_trace(token)
+
+
+def _synthetic_request(traced: bool, stage_us: float) -> float:
+    token = None
+    if traced:
+        _, token = start_trace(sampled=True)
+    started = time.perf_counter()
+    try:
+        for name in STAGES:
+            if traced:
+                with span(name):
+                    _busy(stage_us)
+            else:
+                _busy(stage_us)
+    finally:
+        if token is not None:
+            end_trace(token)
+    return time.perf_counter() - started
+
+
+async def _end_to_end(requests: int, rate: float) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        with patch("app.core.tracing.settings.TRACE_SAMPLE_RATE", rate):
+            for _ in range(50):
+                await client.get("/")
+            started = time.perf_counter()
+            for _ in range(requests):
+                await client.get("/")
+            return (time.perf_counter() - started) / requests * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--stage-us", type=float, default=200.0)
+    args = parser.parse_args()
+
+    # Keep the per-request logs of the ASGI client and the tracer out of the
+    # measurement so only the span bookkeeping is compared
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("app.tracing").setLevel(logging.WARNING)
+
+    print("per span")
+    for label, sampled in (("no trace", None), ("unsampled", False), ("sampled", True)):
+        print(f"  {label:<12} {_per_span_ns(args.iterations, sampled):>8.0f} ns")
+
+    rounds = 200
+    baseline = sum(_synthetic_request(False, args.stage_us) for _ in range(rounds))
+    traced = sum(_synthetic_request(True, args.stage_us) for _ in range(rounds))
+    print()
+    print(f"synthetic request ({len(STAGES)} stages x {args.stage_us:.0f}us)")
+    print(f"  untraced     {baseline / rounds * 1000:>8.3f} ms")
+    print(f"  sampled      {traced / rounds * 1000:>8.3f} ms")
+    print(f"  overhead     {(traced - baseline) / baseline:>8.2%}")
+
+    print()
+    print("end-to-end GET /")
+    for rate in (0.0, 0.1, 1.0):
+        mean_ms = asyncio.run(_end_to_end(args.requests, rate))
+        print(f"  rate={rate:<4}    {mean_ms:>8.3f} ms/request")
+
+
+if __name__ == "__main__":
+    main()
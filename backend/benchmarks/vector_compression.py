@@ -0,0 +1,155 @@
+"""Compressed NumPy vector index benchmark: memory, latency and recall.
+
+Ingests ``--vectors`` synthetic embeddings of ``--dimensions`` (4096, like
+llama3) for one user into a :class:`~app.services.rag.numpy_store.NumpyVectorStore`
+once per configuration, then runs ``--queries`` searches for the top ``-k``:
+
+* ``float32`` / ``float16`` - the uncompressed index, all rows in memory;
+* ``pca-<d>`` / ``random-<d>`` - reduction to ``d`` dimensions and int8
+  codes in memory, full-precision rows memory-mapped from disk, reranking
+  ``--rerank`` candidates (``+0`` reranks only the top k, i.e. the codes'
+  own ranking).
+
+The vectors are drawn from a low-rank latent space plus noise, unit length,
+so that like real embeddings they are far from isotropic (PCA has structure
+to find; on isotropic random vectors no reduction can work). Reports bytes
+per vector held in memory, query latency p50/p95 (page cache warm) and
+recall@k against the exact float32 top k.
+
+Usage::
+
+    python -m benchmarks.vector_compression [--vectors 20000] [--dimensions 4096]
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+from unittest.mock import patch
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+from benchmarks._env import percentile
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.rag.numpy_store import NumpyVectorStore
+
+
+class TableEmbedder:
+    """Returns precomputed vectors ("doc <row>" / "query <row>" texts)."""
+
+    def __init__(self, documents, queries) -> None:
+        self.vectors = {"doc": documents, "query": queries}
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        rows = [text.split() for text in texts]
+        return [self.vectors[kind][int(row)] for kind, row in rows]
+
+
+def _embeddings(rows, dimensions, rank, rng):
+    # Low-rank latent factors with a decaying spectrum, plus isotropic noise
+    basis = rng.standard_normal((rank, dimensions)).astype(np.float32)
+    spectrum = (1.0 / np.sqrt(np.arange(1, rank + 1))).astype(np.float32)
+    vectors = (rng.standard_normal((rows, rank)).astype(np.float32) * spectrum) @ basis
+    vectors += 0.5 * np.sqrt(rank / dimensions) * rng.standard_normal(
+        (rows, dimensions)
+    ).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _run(name, compression, dimensions, rerank, embedder, args):
+    directory = tempfile.mkdtemp(prefix="londoolink_compression_")
+    overrides = {
+        "NUMPY_INDEX_REDUCED_DIMENSIONS": dimensions,
+        "NUMPY_INDEX_COMPRESS_AFTER": 1,
+        "NUMPY_INDEX_RERANK_CANDIDATES": rerank,
+    }
+    try:
+        with (
+            patch.multiple(settings, **overrides),
+            patch("app.services.rag.vector_store.embedding_manager", embedder),
+            patch("app.services.rag.numpy_store.embedding_manager", embedder),
+        ):
+            dtype = "float16" if name == "float16" else "float32"
+            store = NumpyVectorStore(path=directory, dtype=dtype, compression=compression)
+            # The first batch trains the compressor (on up to its sample size of rows)
+            started = time.perf_counter()
+            for start in range(0, args.vectors, args.batch):
+                rows = range(start, min(args.vectors, start + args.batch))
+                store.add_documents(
+                    [f"doc {row}" for row in rows],
+                    [{"user_id": 1} for _ in rows],
+                    ids=[str(row) for row in rows],
+                )
+            ingest_seconds = time.perf_counter() - started
+            index = store._index(1)
+            if index.codes is not None:
+                memory = index.codes.shape[1]
+            else:
+                memory = index.dimensions * index.dtype.itemsize
+
+            latency = []
+            found = []
+            for i in range(args.queries):
+                started = time.perf_counter()
+                results = store.query_documents(f"query {i}", args.k, {"user_id": 1})
+                latency.append((time.perf_counter() - started) * 1000)
+                found.append({result["id"] for result in results})
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return ingest_seconds, memory, latency, found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=4096)
+    parser.add_argument("--rank", type=int, default=256, help="latent dimensions of the data")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--rerank", type=int, default=100, help="candidates reranked")
+    parser.add_argument("--batch", type=int, default=2000, help="chunks per add_documents call")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = _embeddings(args.vectors + args.queries, args.dimensions, args.rank, rng)
+    embedder = TableEmbedder(vectors[: args.vectors], vectors[args.vectors :])
+
+    configurations = [
+        ("float32", "", 0, 0),
+        ("float16", "", 0, 0),
+        ("pca-256", "pca", 256, args.rerank),
+        ("pca-256 +0", "pca", 256, args.k),
+        ("pca-128", "pca", 128, args.rerank),
+        ("random-256", "random", 256, args.rerank),
+        ("random-512", "random", 512, args.rerank),
+    ]
+    print(
+        f"{args.vectors} vectors x {args.dimensions} dimensions (latent rank {args.rank}), "
+        f"{args.queries} queries, recall@{args.k} against exact float32, "
+        f"rerank {args.rerank} candidates"
+    )
+    print(
+        f"{'index':<12}{'bytes/vector':>13}{'ingest':>9}{'p50':>10}{'p95':>10}{'recall':>8}"
+    )
+    exact = None
+    for name, compression, dimensions, rerank in configurations:
+        ingest_seconds, memory, latency, found = _run(
+            name, compression, dimensions, rerank, embedder, args
+        )
+        if exact is None:
+            exact = found
+        recall = sum(len(a & b) for a, b in zip(found, exact)) / sum(map(len, exact))
+        print(
+            f"{name:<12}{memory:>13}{ingest_seconds:>8.1f}s"
+            f"{percentile(latency, 50):>8.2f}ms{percentile(latency, 95):>8.2f}ms{recall:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
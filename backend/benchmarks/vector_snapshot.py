@@ -0,0 +1,141 @@
+"""Vector store restart benchmark: snapshot + write-ahead log restore.
+
+Ingests ``--chunks`` chunks of random ``--dimensions`` vectors into an
+in-memory Chroma collection through
+:class:`~app.services.rag.snapshots.CollectionJournal`, snapshotting once
+``--logged`` chunks remain, which go to the write-ahead log only. It then
+"restarts": drops the collection, creates an empty one and restores it.
+The app's llama3 embeddings have 4096 dimensions; the default of 768 keeps
+a 100k-chunk run within a few GB of memory.
+
+Reports restart-to-ready time, the embedding calls made during the restore
+(the collection's embedding function counts them; expected 0) and, for
+comparison, the time re-embedding the corpus would take at ``--embed-ms``
+per chunk, which is what every restart cost before.
+
+Usage::
+
+    python -m benchmarks.vector_snapshot [--chunks 100000] [--logged 5000] [--dimensions 768]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import uuid
+
+from benchmarks import _env  # noqa: F401  (must precede app imports)
+
+import chromadb
+import numpy as np
+
+from app.services.rag.snapshots import CollectionJournal
+
+
+class CountingEmbeddingFunction:
+    """Chroma embedding function that only counts the texts it is asked to embed."""
+
+    def __init__(self, dimensions: int) -> None:
+        self.dimensions = dimensions
+        self.texts = 0
+
+    def name(self) -> str:
+        return "counting"
+
+    def __call__(self, input):
+        self.texts += len(input)
+        return [[0.0] * self.dimensions for _ in input]
+
+
+def _size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100000)
+    parser.add_argument(
+        "--logged", type=int, default=5000, help="chunks written after the snapshot"
+    )
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--batch", type=int, default=500, help="chunks per ingest call")
+    parser.add_argument(
+        "--embed-ms", type=float, default=50.0, help="llama3 embedding cost per chunk"
+    )
+    parser.add_argument("--fsync", action="store_true", help="fsync the log on every write")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    directory = tempfile.mkdtemp(prefix="londoolink_snapshot_")
+    client = chromadb.EphemeralClient(
+        settings=chromadb.config.Settings(anonymized_telemetry=False, allow_reset=True)
+    )
+    name = f"bench_snapshot_{uuid.uuid4().hex[:8]}"
+    embedding_function = CountingEmbeddingFunction(args.dimensions)
+
+    try:
+        collection = client.create_collection(name, embedding_function=embedding_function)
+        journal = CollectionJournal(directory, snapshot_every=args.chunks + 1, fsync=args.fsync)
+        journal.restore(collection)
+
+        started = time.perf_counter()
+        snapshot_seconds = 0.0
+        snapshot_at = args.chunks - args.logged
+        for start in range(0, args.chunks, args.batch):
+            if start == snapshot_at or (start < snapshot_at < start + args.batch):
+                snapshot_started = time.perf_counter()
+                journal.snapshot()
+                snapshot_seconds = time.perf_counter() - snapshot_started
+            size = min(args.batch, args.chunks - start)
+            ids = [f"chunk{start + i}" for i in range(size)]
+            vectors = rng.standard_normal((size, args.dimensions), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            documents = [f"Chunk {start + i} of an ingested email thread" for i in range(size)]
+            metadatas = [{"source": "email", "user_id": (start + i) % 50} for i in range(size)]
+            collection.add(ids=ids, embeddings=vectors, documents=documents, metadatas=metadatas)
+            journal.log_add(ids, documents, metadatas, vectors)
+        ingest_seconds = time.perf_counter() - started - snapshot_seconds
+        journal.close()
+        snapshot_bytes = _size(os.path.join(directory, "snapshot"))
+        log_bytes = _size(directory) - snapshot_bytes
+
+        # Restart: a new process starts with an empty in-memory collection
+        client.delete_collection(name)
+        embedding_function.texts = 0
+        started = time.perf_counter()
+        collection = client.create_collection(name, embedding_function=embedding_function)
+        stats = CollectionJournal(directory).restore(collection)
+        restore_seconds = time.perf_counter() - started
+        restored = collection.count()
+    finally:
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass
+        shutil.rmtree(directory, ignore_errors=True)
+
+    print(f"{args.chunks} chunks x {args.dimensions} dimensions, {args.logged} in the log")
+    print(f"ingest (Chroma add + log):  {ingest_seconds:7.1f}s")
+    print(
+        f"snapshot write:             {snapshot_seconds:7.1f}s  "
+        f"({snapshot_bytes / 1e6:.0f} MB snapshot, {log_bytes / 1e6:.0f} MB log)"
+    )
+    print(
+        f"restart to ready:           {restore_seconds:7.1f}s  "
+        f"({stats['snapshot_rows']} snapshot rows + {stats['replayed']} logged writes, "
+        f"{restored} chunks)"
+    )
+    print(f"texts embedded on restart:  {embedding_function.texts:7d}")
+    print(
+        f"re-embedding instead:       {args.chunks * args.embed_ms / 1000:7.1f}s  "
+        f"(at {args.embed_ms:g}ms per chunk, plus the Chroma adds)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,9 @@ from app.models.user import User
 from app.models.consent import UserConsent
 from app.models.connected_service import ConnectedService
 from app.models.audit_log import AuditLog
+from app.models.daily_briefing import DailyBriefing
+from app.models.briefing_checkpoint import BriefingCheckpoint
+from app.models.erasure_job import ErasureJob
 
 target_metadata = Base.metadata
 
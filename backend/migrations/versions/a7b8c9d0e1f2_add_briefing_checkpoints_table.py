@@ -0,0 +1,48 @@
+"""Add briefing_checkpoints table
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7b8c9d0e1f2'
+down_revision: Union[str, Sequence[str], None] = 'f6a7b8c9d0e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'briefing_checkpoints',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('node', sa.String(length=40), nullable=False),
+        sa.Column('inputs_hash', sa.String(length=64), nullable=False),
+        sa.Column('state', sa.Text(), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'node', name='uq_briefing_checkpoints_user_node'),
+    )
+    op.create_index(op.f('ix_briefing_checkpoints_id'), 'briefing_checkpoints', ['id'], unique=False)
+    op.create_index(op.f('ix_briefing_checkpoints_user_id'), 'briefing_checkpoints', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_briefing_checkpoints_user_id'), table_name='briefing_checkpoints')
+    op.drop_index(op.f('ix_briefing_checkpoints_id'), table_name='briefing_checkpoints')
+    op.drop_table('briefing_checkpoints')
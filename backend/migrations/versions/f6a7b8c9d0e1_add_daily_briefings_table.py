@@ -0,0 +1,49 @@
+"""Add daily_briefings table
+
+Revision ID: f6a7b8c9d0e1
+Revises: e5f6a7b8c9d0
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a7b8c9d0e1'
+down_revision: Union[str, Sequence[str], None] = 'e5f6a7b8c9d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'daily_briefings',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('briefing_date', sa.Date(), nullable=False),
+        sa.Column('model_size', sa.String(length=10), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column(
+            'created_at',
+            sa.DateTime(timezone=True),
+            server_default=sa.text('CURRENT_TIMESTAMP'),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'briefing_date', 'model_size', name='uq_daily_briefings_user_date_model'),
+    )
+    op.create_index(op.f('ix_daily_briefings_id'), 'daily_briefings', ['id'], unique=False)
+    op.create_index(op.f('ix_daily_briefings_user_id'), 'daily_briefings', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_daily_briefings_user_id'), table_name='daily_briefings')
+    op.drop_index(op.f('ix_daily_briefings_id'), table_name='daily_briefings')
+    op.drop_table('daily_briefings')
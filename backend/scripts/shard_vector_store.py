@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""Split the shared Chroma collection into per-user shard collections.
+
+Run once, with the app stopped, after setting CHROMA_SHARDING (and the same
+CHROMA_DB_PATH / CHROMA_SNAPSHOT_DIR the app uses):
+
+    CHROMA_SHARDING=user python -m scripts.shard_vector_store
+
+Documents keep their ids and embeddings; nothing is re-embedded. The run
+can be repeated safely if it is interrupted.
+"""
+import sys
+
+from app.core.config import settings
+from app.services.rag.sharded_store import ShardedVectorStore
+
+
+def shard_vector_store() -> bool:
+    if not settings.CHROMA_SHARDING:
+        print("❌ Set CHROMA_SHARDING to user or bucket first")
+        return False
+
+    store = ShardedVectorStore()
+    print(f"✓ Shared collection: {store.collection.count()} documents")
+    result = store.split_shared_collection()
+    # Snapshot so the next start has no log to replay
+    for journal in store.journals():
+        journal.snapshot()
+    print(
+        f"✅ Moved {result['moved']} documents into {result['shards']} "
+        f"{settings.CHROMA_SHARDING} shards; {result['kept']} without a user_id stay shared"
+    )
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if shard_vector_store() else 1)
@@ -23,6 +23,10 @@ from app.main import app
 from app.models.user import User
 from app.security.jwt import create_access_token
 from app.security.password import hash_password
+from app.models.briefing_checkpoint import BriefingCheckpoint
+from app.services.briefing_checkpoints import BriefingCheckpointer
+from app.services.erasure import ErasureService
+from app.services.response_cache import ResponseCache
 
 # Test database setup - use in-memory SQLite for faster tests
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -203,11 +207,88 @@ def mock_settings():
             m.JWT_ALGORITHM = "HS256"
             m.ACCESS_TOKEN_EXPIRE_MINUTES = 30
             m.ENCRYPTION_KEY = _hex_key
+            m.ENCRYPTION_KEY_PREVIOUS = ""
             m.GROQ_API_KEY = "test-groq-key"
             m.OLLAMA_BASE_URL = "http://localhost:11434"
+            m.EMBEDDING_BACKEND = "ollama"
+            m.EMBEDDING_OLLAMA_MODEL = "llama3"
+            m.EMBEDDING_ONNX_MODEL_PATH = ""
+            m.EMBEDDING_ONNX_BATCH_SIZE = 32
+            m.EMBEDDING_ONNX_THREADS = 0
+            m.EMBEDDING_ONNX_MAX_TOKENS = 256
+            m.EMBEDDING_HASHING_DIMENSIONS = 384
             m.CHROMA_DB_PATH = "./test_chroma_db"
+            m.VECTOR_STORE_BACKEND = "chroma"
+            m.NUMPY_INDEX_PATH = "./test_vector_index"
+            m.NUMPY_INDEX_DTYPE = "float32"
+            m.NUMPY_INDEX_COMPRESSION = ""
+            m.NUMPY_INDEX_REDUCED_DIMENSIONS = 256
+            m.NUMPY_INDEX_COMPRESS_AFTER = 1000
+            m.NUMPY_INDEX_RERANK_CANDIDATES = 100
+            m.CHROMA_SNAPSHOT_DIR = ""
+            m.CHROMA_SNAPSHOT_WAL_ENTRIES = 1000
+            m.CHROMA_WAL_FSYNC = True
+            m.CHROMA_SHARDING = ""
+            m.CHROMA_SHARD_BUCKETS = 64
+            m.CHROMA_MAX_OPEN_COLLECTIONS = 128
+            m.CHROMA_SEGMENT_MEMORY_MB = 0
             m.DATABASE_URL = SQLALCHEMY_DATABASE_URL
             m.ENVIRONMENT = "testing"
+            m.TRACE_SAMPLE_RATE = 1.0
+            m.WORKER_MEMORY_BUDGET_MB = 4096
+            m.BRIEFING_MEMORY_MB = 64
+            m.BRIEFING_MAX_CONCURRENCY = 0
+            m.BRIEFING_MAX_QUEUE = 16
+            m.BRIEFING_QUEUE_TIMEOUT_SECONDS = 15.0
+            m.RSS_SAMPLE_INTERVAL_SECONDS = 5.0
+            m.PRIORITY_CONTEXT_TOKEN_BUDGET = 3000
+            m.CONTEXT_MIN_SECTION_TOKENS = 120
+            m.BRIEFING_PRECOMPUTE_ENABLED = False
+            m.BRIEFING_MORNING_HOUR = 7
+            m.BRIEFING_PRECOMPUTE_WINDOW_MINUTES = 120
+            m.BRIEFING_PRECOMPUTE_WORKERS = 2
+            m.BRIEFING_PRECOMPUTE_PER_MINUTE = 6.0
+            m.BRIEFING_SCHEDULER_INTERVAL_SECONDS = 30.0
+            m.BRIEFING_CHECKPOINTS_ENABLED = True
+            m.BRIEFING_CHECKPOINT_MAX_AGE_SECONDS = 900.0
+            m.BRIEFING_RETRIEVAL_ENABLED = True
+            m.BRIEFING_RETRIEVAL_RESULTS = 5
+            m.RAG_SEARCH_MODE = "hybrid"
+            m.RAG_HYBRID_CANDIDATES = 50
+            m.RAG_RRF_K = 60
+            m.RAG_LEXICAL_MAX_USERS = 256
+            m.ERASURE_JOB_LEASE_SECONDS = 300.0
+            m.GROQ_REQUESTS_PER_MINUTE = 30
+            m.GROQ_TOKENS_PER_MINUTE = 6000
+            m.GEMINI_REQUESTS_PER_MINUTE = 15
+            m.GEMINI_TOKENS_PER_MINUTE = 1000000
+            m.LLM_QUEUE_TIMEOUT_SECONDS = 30.0
+            m.LLM_INTERACTIVE_RESERVE = 0.2
+            m.LLM_COMPLETION_TOKEN_ESTIMATE = 512
+            m.LLM_RATE_LIMIT_RETRIES = 2
+            m.LLM_ROUTING_ENABLED = True
+            m.LLM_FAST_MODEL = "llama-3.1-8b-instant"
+            m.LLM_CAPABLE_MODEL = "llama-3.3-70b-versatile"
+            m.LLM_SMALL_PROMPT_TOKENS = 1000
+            m.LLM_CHAT_LATENCY_BUDGET_SECONDS = 3.0
+            m.LLM_DOCUMENT_LATENCY_BUDGET_SECONDS = 10.0
+            m.LLM_BRIEFING_LATENCY_BUDGET_SECONDS = 20.0
+            m.LLM_ROUTE_COOLDOWN_SECONDS = 30.0
+            m.LLM_HEDGING_ENABLED = False
+            m.LLM_HEDGE_PERCENTILE = 95.0
+            m.LLM_HEDGE_MIN_DELAY_SECONDS = 0.5
+            m.LLM_HEDGE_MAX_RATIO = 0.1
+            m.LLM_HEDGE_GEMINI_MODEL = "gemini-1.5-flash"
+            m.RESPONSE_CACHE_ENABLED = True
+            m.RESPONSE_CACHE_PATH = ":memory:"
+            m.RESPONSE_CACHE_MAX_ENTRIES = 5000
+            m.RESPONSE_CACHE_DOCUMENT_TTL_SECONDS = 86400.0
+            m.RESPONSE_CACHE_CHAT_TTL_SECONDS = 3600.0
+            m.RESPONSE_CACHE_SEMANTIC_THRESHOLD = 0.0
+            m.LLM_BACKEND = "live"
+            m.LLM_CASSETTE_PATH = "./test_llm_cassette.jsonl"
+            m.LLM_REPLAY_LATENCY_SCALE = 1.0
+            m.LLM_REPLAY_EXTRA_LATENCY_SECONDS = 0.0
         yield mock
 
 
@@ -223,6 +304,7 @@ def mock_global_instances():
         patch("app.services.rag.pipeline.embedding_manager", mock_em),
         patch("app.services.rag.pipeline.rag_pipeline") as mock_rp,
         patch("app.services.tools.rag_pipeline", mock_rp),
+        patch("app.services.briefing_retrieval.rag_pipeline", mock_rp),
         patch("app.api.endpoints.agent.rag_pipeline", mock_rp),
         patch("app.api.endpoints.ingest.rag_pipeline", mock_rp),
         patch("app.services.coordinator.ai_coordinator") as mock_coord,
@@ -246,6 +328,7 @@ def mock_global_instances():
         # Configure RAGPipeline mock
         mock_rp.add_text.return_value = ["doc1"]
         mock_rp.query_texts.return_value = []
+        mock_rp.query_many.side_effect = lambda queries, *args, **kwargs: [[] for _ in queries]
         mock_rp.get_collection_stats.return_value = {"total_documents": 0}
         mock_rp.get_recent_documents.return_value = []
         mock_rp.delete_documents.return_value = 0
@@ -262,6 +345,36 @@ def mock_global_instances():
         }
 
 
+@pytest.fixture(autouse=True)
+def response_cache():
+    # Every test starts with an empty in-memory LLM response cache
+    cache = ResponseCache(":memory:", max_entries=100, ttls={"document": 3600.0, "chat": 3600.0})
+    with patch("app.services.response_cache._cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def briefing_checkpoints():
+    # Every test starts with no briefing workflow checkpoints
+    checkpoint_engine = create_engine(
+        "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    BriefingCheckpoint.__table__.create(bind=checkpoint_engine)
+    checkpointer = BriefingCheckpointer(sessionmaker(bind=checkpoint_engine))
+    with patch("app.services.briefing_checkpoints._checkpointer", checkpointer):
+        yield checkpointer
+    checkpoint_engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def erasure_service():
+    # The lifespan resumes erasure jobs from the test database, never the real one
+    service = ErasureService(session_factory=TestingSessionLocal)
+    with patch("app.services.erasure._service", service):
+        yield service
+    service.shutdown()
+
+
 @pytest.fixture(autouse=True)
 def configure_global_mocks():
     # Configure the patches started at the top of the file
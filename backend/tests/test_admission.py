@@ -0,0 +1,152 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.admission import (
+    AdmissionController,
+    AdmissionRejectedError,
+    RSSSampler,
+    briefing_concurrency_limit,
+)
+
+
+def _controller(**overrides):
+    options = {"max_concurrent": 2, "max_queue": 2, "queue_timeout": 1.0}
+    options.update(overrides)
+    return AdmissionController("test", **options)
+
+
+class TestAdmissionController:
+    def test_admits_up_to_limit_then_queues(self):
+        controller = _controller()
+
+        async def scenario():
+            await controller.acquire()
+            await controller.acquire()
+            # Third request waits until a slot is released
+            waiter = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0.01)
+            assert controller.stats()["queued"] == 1
+            controller.release()
+            await asyncio.wait_for(waiter, 1)
+            return controller.stats()
+
+        stats = asyncio.run(scenario())
+
+        assert stats["in_flight"] == 2
+        assert stats["queued"] == 0
+        assert stats["admitted"] == 3
+
+    def test_full_queue_sheds_with_retry_after(self):
+        controller = _controller(max_concurrent=1, max_queue=0)
+
+        async def scenario():
+            await controller.acquire()
+            with pytest.raises(AdmissionRejectedError) as exc_info:
+                await controller.acquire()
+            return exc_info.value
+
+        error = asyncio.run(scenario())
+
+        assert error.retry_after >= 1
+        assert controller.stats()["rejected"] == 1
+
+    def test_queue_timeout_sheds_and_frees_queue(self):
+        controller = _controller(max_concurrent=1, queue_timeout=0.05)
+
+        async def scenario():
+            await controller.acquire()
+            with pytest.raises(AdmissionRejectedError):
+                await controller.acquire()
+
+        asyncio.run(scenario())
+
+        stats = controller.stats()
+        assert stats["timed_out"] == 1
+        assert stats["queued"] == 0
+        assert stats["in_flight"] == 1
+
+    def test_try_acquire_never_waits_or_jumps_the_queue(self):
+        controller = _controller(max_concurrent=2)
+
+        async def scenario():
+            assert controller.try_acquire()
+            await controller.acquire()
+            assert not controller.try_acquire()  # full
+            waiter = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0.01)
+            controller.release()
+            # The freed slot went to the waiting request
+            assert not controller.try_acquire()
+            await asyncio.wait_for(waiter, 1)
+
+        asyncio.run(scenario())
+
+        assert controller.stats()["in_flight"] == 2
+        assert controller.stats()["rejected"] == 0
+
+    def test_slot_releases_on_error(self):
+        controller = _controller(max_concurrent=1)
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                async with controller.slot():
+                    raise RuntimeError("workflow failed")
+
+        asyncio.run(scenario())
+
+        assert controller.stats()["in_flight"] == 0
+
+    def test_over_budget_limits_to_one(self):
+        sampler = RSSSampler(interval_seconds=60, budget_mb=100)
+        controller = _controller(max_concurrent=4, sampler=sampler)
+
+        sampler.over_budget = True
+
+        assert controller.limit == 1
+
+    def test_limit_derived_from_memory_budget(self):
+        with patch("app.services.admission.settings") as mock_settings:
+            mock_settings.BRIEFING_MAX_CONCURRENCY = 0
+            mock_settings.WORKER_MEMORY_BUDGET_MB = 512
+            mock_settings.BRIEFING_MEMORY_MB = 64
+
+            # (512 - 256) / 64 = 4 slots; never below one
+            assert briefing_concurrency_limit(256) == 4
+            assert briefing_concurrency_limit(600) == 1
+
+            mock_settings.BRIEFING_MAX_CONCURRENCY = 7
+            assert briefing_concurrency_limit(256) == 7
+
+
+class TestBriefingEndpointAdmission:
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_saturated_worker_returns_503(self, mock_get_admission, client, auth_headers):
+        controller = _controller(max_concurrent=1, max_queue=0)
+        asyncio.run(controller.acquire())
+        mock_get_admission.return_value = controller
+
+        response = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_briefing_runs_in_worker_thread(
+        self, mock_get_admission, mock_get_coordinator, client, auth_headers
+    ):
+        mock_get_admission.return_value = _controller()
+        coordinator = Mock()
+        coordinator.get_daily_briefing.return_value = {"summary": "ok"}
+        coordinator.MODEL_CONFIGS = {"small": {"max_tokens": 1, "temperature": 0.1}}
+        mock_get_coordinator.return_value = coordinator
+
+        response = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+
+        assert response.status_code == 200
+        # SMS scheduling happens on the event loop, not inside the worker thread
+        coordinator.get_daily_briefing.assert_called_once_with(1, notify_urgent=False)
+        coordinator.schedule_urgent_sms.assert_called_once()
+        assert mock_get_admission.return_value.stats()["in_flight"] == 0
@@ -140,6 +140,32 @@ class TestAgentEndpoints:
         assert "results" in data
         assert len(data["results"]) == 1
 
+    @patch("app.api.endpoints.agent.rag_pipeline")
+    def test_semantic_search_scoped_to_user(self, mock_rag, client, auth_headers):
+        # Search only covers the caller's documents, in the requested mode
+        mock_rag.query_texts.return_value = []
+
+        response = client.post(
+            "/api/v1/agent/rag/search",
+            json={"query": "0772123456", "mode": "vector"},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["mode"] == "vector"
+        kwargs = mock_rag.query_texts.call_args.kwargs
+        assert kwargs["filter_metadata"] == {"user_id": response.json()["user_id"]}
+        assert kwargs["mode"] == "vector"
+
+    def test_semantic_search_invalid_mode(self, client, auth_headers):
+        response = client.post(
+            "/api/v1/agent/rag/search",
+            json={"query": "test", "mode": "fuzzy"},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
     def test_semantic_search_missing_query(self, client, auth_headers):
         # Test semantic search without query
         search_data = {}
@@ -321,10 +347,13 @@ class TestIngestEndpoints:
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    @patch("app.api.endpoints.ingest.rag_pipeline")
-    def test_delete_documents_success(self, mock_rag, client, auth_headers):
-        # Test successful document deletion
-        mock_rag.delete_documents.return_value = 5
+    @patch("app.api.endpoints.ingest.get_erasure_service")
+    def test_delete_documents_success(self, mock_service, client, auth_headers, test_user):
+        # Test document deletion is queued as a background job
+        mock_service.return_value.submit.return_value = {
+            "job_id": "abc",
+            "status": "queued",
+        }
 
         filter_data = {"source": "test"}
 
@@ -332,10 +361,13 @@ class TestIngestEndpoints:
             "DELETE", "/api/v1/ingest/documents", json=filter_data, headers=auth_headers
         )
 
-        assert response.status_code == status.HTTP_200_OK
+        assert response.status_code == status.HTTP_202_ACCEPTED
         data = response.json()
-        assert data["status"] == "success"
-        assert data["deleted_count"] == 5
+        assert data["status"] == "accepted"
+        assert data["job"]["job_id"] == "abc"
+        mock_service.return_value.submit.assert_called_once_with(
+            test_user.id, {"source": "test", "user_id": test_user.id}
+        )
 
 
 class TestSecurityEndpoints:
@@ -746,6 +746,17 @@ class TestThreadOperations:
         assert "metadata.user_id" in call_args[1]["params"]
         assert "metadata.thread_type" not in call_args[1]["params"]
     
+    @patch("requests.delete")
+    def test_delete_thread_success(self, mock_delete):
+        """Test thread deletion accepts an empty 204 response."""
+        mock_delete.return_value.status_code = 204
+        
+        service = BackboardService(api_key="espr_test")
+        service.delete_thread("thread_1")
+        
+        assert mock_delete.call_args[0][0].endswith("/threads/thread_1")
+        mock_delete.return_value.json.assert_not_called()
+    
     @patch("requests.post")
     def test_create_thread_handles_auth_error(self, mock_post):
         """Test authentication error handling in thread creation."""
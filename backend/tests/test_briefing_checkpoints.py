@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta, timezone
+from itertools import count
+from typing import List
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.core.metrics import BRIEFING_CHECKPOINTS
+from app.models.briefing_checkpoint import BriefingCheckpoint
+from app.services.admission import AdmissionController
+from app.services.briefing_checkpoints import (
+    CHECKPOINTED_NODES,
+    BriefingCheckpointer,
+    get_briefing_checkpointer,
+)
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.services.langgraph.nodes import AgentNodes
+from app.services.langgraph.state import create_initial_state
+from app.services.langgraph.workflow import WorkflowBuilder
+
+PRIORITY_PROMPT = "Master Prioritization Agent"
+
+
+class FlakyChatModel(GenericFakeChatModel):
+    # Fake LLM that records each prompt and times out on prompts containing fail_on
+
+    prompts: List[str] = []
+    fail_on: str = ""
+
+    def _generate(self, messages, *args, **kwargs):
+        prompt = messages[-1].content
+        self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise TimeoutError("LLM call timed out")
+        return super()._generate(messages, *args, **kwargs)
+
+
+def _llm(fail_on=""):
+    replies = (AIMessage(content=f"Analysis {i}") for i in count())
+    return FlakyChatModel(messages=replies, prompts=[], fail_on=fail_on)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = datetime(2026, 3, 2, 6, 0, tzinfo=timezone.utc)
+
+    def __call__(self):
+        return self.now
+
+
+def _run_agents(checkpointer, nodes, user_id=1):
+    # Every agent node in workflow order, as the coordinator steps through them
+    state = create_initial_state(user_id)
+    for name in CHECKPOINTED_NODES:
+        state = checkpointer.wrap(name, getattr(nodes, f"{name}_node"))(state)
+    return state
+
+
+def _nodes(llm):
+    nodes = AgentNodes()
+    nodes.llm = llm
+    return nodes
+
+
+class TestBriefingCheckpoints:
+    def test_retry_after_priority_timeout_cuts_llm_calls(self, briefing_checkpoints):
+        llm = _llm(fail_on=PRIORITY_PROMPT)
+        nodes = _nodes(llm)
+
+        failed = _run_agents(briefing_checkpoints, nodes)
+        first_attempt = len(llm.prompts)
+        assert failed["priority_recommendations"]["status"] == "error"
+
+        llm.fail_on = ""
+        llm.prompts.clear()
+        retried = _run_agents(briefing_checkpoints, nodes)
+
+        assert retried["priority_recommendations"]["status"] == "completed"
+        assert retried["email_analysis"] == failed["email_analysis"]
+        # Only the priority agent runs again: 1 call instead of 5
+        assert first_attempt == 5
+        assert [PRIORITY_PROMPT in prompt for prompt in llm.prompts] == [True]
+        assert 1 - len(llm.prompts) / first_attempt >= 0.6
+
+    def test_completed_briefing_clears_its_checkpoints(self, briefing_checkpoints):
+        llm = _llm()
+        nodes = _nodes(llm)
+
+        _run_agents(briefing_checkpoints, nodes)
+        assert briefing_checkpoints.clear(1) == 0
+        _run_agents(briefing_checkpoints, nodes)
+
+        assert len(llm.prompts) == 10  # nothing reused from the finished run
+
+    def test_coordinator_retry_resumes_from_last_completed_node(self):
+        reused_before = BRIEFING_CHECKPOINTS.value("email_agent", "reused")
+        llm = _llm(fail_on=PRIORITY_PROMPT)
+        coordinator = LangGraphCoordinator()
+        coordinator.workflow_builder = WorkflowBuilder()
+        coordinator.workflow_builder.agent_nodes.llm = llm
+        coordinator.graph = coordinator.workflow_builder.build_workflow()
+
+        failed = coordinator.get_daily_briefing(1, notify_urgent=False)
+        assert failed["priority_recommendations"]["status"] == "error"
+
+        llm.fail_on = ""
+        llm.prompts.clear()
+        retried = coordinator.get_daily_briefing(1, notify_urgent=False)
+
+        assert retried["priority_recommendations"]["status"] == "completed"
+        assert retried["email_insights"] == failed["email_insights"]
+        assert len(llm.prompts) == 1 and PRIORITY_PROMPT in llm.prompts[0]
+        assert BRIEFING_CHECKPOINTS.value("email_agent", "reused") - reused_before == 1
+
+    def test_refresh_after_completed_briefing_reruns_the_agents(
+        self, client, auth_headers, test_user
+    ):
+        llm = _llm()
+        coordinator = LangGraphCoordinator()
+        coordinator.workflow_builder = WorkflowBuilder()
+        coordinator.workflow_builder.agent_nodes.llm = llm
+        coordinator.graph = coordinator.workflow_builder.build_workflow()
+        admission = AdmissionController("test", 2, 2, 1.0)
+
+        with (
+            patch("app.api.endpoints.agent.get_langgraph_coordinator", return_value=coordinator),
+            patch("app.api.endpoints.agent.get_briefing_admission", return_value=admission),
+        ):
+            first = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+            first_calls = len(llm.prompts)
+            refreshed = client.get(
+                "/api/v1/agent/briefing/daily?refresh=true", headers=auth_headers
+            )
+
+        assert first.status_code == refreshed.status_code == 200
+        assert first_calls > 0
+        assert len(llm.prompts) == 2 * first_calls  # every LLM call was made again
+
+    def test_outputs_older_than_max_age_are_recomputed(self, briefing_checkpoints):
+        clock = FakeClock()
+        checkpointer = BriefingCheckpointer(
+            briefing_checkpoints.session_factory, max_age_seconds=900, clock=clock
+        )
+        llm = _llm(fail_on=PRIORITY_PROMPT)
+        nodes = _nodes(llm)
+        _run_agents(checkpointer, nodes)
+
+        clock.now += timedelta(minutes=10)
+        _run_agents(checkpointer, nodes)
+        assert len(llm.prompts) == 6  # only the priority agent again
+
+        clock.now += timedelta(minutes=10)
+        _run_agents(checkpointer, nodes)
+        assert len(llm.prompts) == 11
+
+    def test_only_missing_source_analyses_rerun(self, briefing_checkpoints):
+        llm = _llm(fail_on=PRIORITY_PROMPT)
+        nodes = _nodes(llm)
+        _run_agents(briefing_checkpoints, nodes)
+
+        db = briefing_checkpoints.session_factory()
+        db.query(BriefingCheckpoint).filter(BriefingCheckpoint.node == "email_agent").delete()
+        db.commit()
+        db.close()
+        llm.fail_on = ""
+        llm.prompts.clear()
+        _run_agents(briefing_checkpoints, nodes)
+
+        assert len(llm.prompts) == 2
+        assert "Email Triage Agent" in llm.prompts[0]
+        assert PRIORITY_PROMPT in llm.prompts[1]
+
+    def test_checkpoints_are_per_user(self, briefing_checkpoints):
+        llm = _llm(fail_on=PRIORITY_PROMPT)
+        nodes = _nodes(llm)
+        _run_agents(briefing_checkpoints, nodes, user_id=1)
+        _run_agents(briefing_checkpoints, nodes, user_id=2)
+        assert len(llm.prompts) == 10
+
+        assert briefing_checkpoints.clear(1) == 4
+        _run_agents(briefing_checkpoints, nodes, user_id=2)
+        assert len(llm.prompts) == 11  # user 2's source analyses were kept
+
+    def test_disabled_checkpoints_leave_nodes_unwrapped(self, mock_settings):
+        mock_settings.BRIEFING_CHECKPOINTS_ENABLED = False
+        with patch("app.services.briefing_checkpoints.settings", mock_settings):
+            assert get_briefing_checkpointer() is None
+            builder = WorkflowBuilder()
+
+        assert builder.checkpointer is None
+        assert builder._node("email_agent", len) is len
@@ -0,0 +1,190 @@
+import math
+import re
+import threading
+import uuid
+import zlib
+from collections import OrderedDict
+from itertools import count
+from typing import List
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.services.briefing_retrieval import SOURCE_QUERIES, prefetch_briefing_context
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.services.langgraph.workflow import WorkflowBuilder
+from app.services.rag.pipeline import RAGPipeline
+from app.services.rag.vector_store import VectorStore
+
+DIMENSIONS = 64
+
+
+def _vector(text):
+    # Deterministic unit-length bag-of-words embedding
+    vector = [0.0] * DIMENSIONS
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.batches: List[List[str]] = []
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        return [_vector(text) for text in texts]
+
+
+def _store(documents):
+    # Real in-memory Chroma collection holding precomputed embeddings
+    import chromadb
+
+    store = VectorStore.__new__(VectorStore)
+    store.collection_name = f"test_{uuid.uuid4().hex}"
+    store._query_vectors = OrderedDict()
+    store._query_vectors_lock = threading.Lock()
+    store.client = chromadb.EphemeralClient()
+    store.collection = store.client.create_collection(store.collection_name)
+    store.collection.add(
+        ids=[f"doc{i}" for i in range(len(documents))],
+        documents=[text for text, _ in documents],
+        metadatas=[metadata for _, metadata in documents],
+        embeddings=[_vector(text) for text, _ in documents],
+    )
+    return store
+
+
+DOCUMENTS = [
+    ("Urgent emails: reply to the CFO about the deadline", {"source": "email", "user_id": 1}),
+    ("Meetings today: board meeting and appointments", {"source": "calendar", "user_id": 1}),
+    ("WhatsApp messages from important contacts: call back", {"source": "whatsapp", "user_id": 1}),
+    ("Project notes: tasks and meeting follow-ups", {"source": "notion", "user_id": 1}),
+    ("Urgent emails: someone else's deadline", {"source": "email", "user_id": 2}),
+]
+
+
+class TestMultiQuerySearch:
+    def test_queries_share_one_embedding_batch_and_one_search(self):
+        store = _store(DOCUMENTS)
+        embedder = FakeEmbedder()
+        queries = list(SOURCE_QUERIES.values())
+
+        with patch("app.services.rag.vector_store.embedding_manager", embedder), patch.object(
+            store.collection, "query", wraps=store.collection.query
+        ) as query:
+            results = store.query_many(queries, n_results=2, filter_metadata={"user_id": 1})
+
+        assert embedder.batches == [queries]
+        assert query.call_count == 1
+        assert len(results) == len(queries)
+        assert [per_query[0]["metadata"]["source"] for per_query in results] == [
+            "email",
+            "calendar",
+            "whatsapp",
+            "notion",
+        ]
+        assert all(r["metadata"]["user_id"] == 1 for per_query in results for r in per_query)
+
+    def test_repeated_queries_skip_the_embedding_call(self):
+        store = _store(DOCUMENTS)
+        embedder = FakeEmbedder()
+        queries = list(SOURCE_QUERIES.values())
+
+        with patch("app.services.rag.vector_store.embedding_manager", embedder):
+            first = store.query_many(queries, n_results=2, filter_metadata={"user_id": 1})
+            again = store.query_many(queries, n_results=2, filter_metadata={"user_id": 1})
+            store.query_many(queries + ["new query"], n_results=2, filter_metadata={"user_id": 1})
+
+        assert first == again
+        assert embedder.batches == [queries, ["new query"]]
+
+    def test_backboard_degrades_to_empty_results(self, mock_settings):
+        pipeline = RAGPipeline.__new__(RAGPipeline)
+        pipeline.use_backboard = True
+        pipeline.backend = Mock()
+        pipeline.backend.search_documents.side_effect = RuntimeError("Backboard down")
+
+        assert pipeline.query_many(["a", "b"], 3, {"user_id": 1}) == [[], []]
+
+
+class TestPrefetch:
+    def test_results_grouped_by_source_agent(self, mock_global_instances, mock_settings):
+        pipeline = mock_global_instances["rag_pipeline"]
+
+        def query_many(queries, n_results, filter_metadata):
+            found = [
+                {"content": "slack ping", "metadata": {"source": "slack"}},
+                {"content": "email 1", "metadata": {"source": "email"}},
+                {"content": "email 2", "metadata": {"source": "email"}},
+            ]
+            return [found for _ in queries]
+
+        pipeline.query_many.side_effect = query_many
+        mock_settings.BRIEFING_RETRIEVAL_RESULTS = 1
+        with patch("app.services.briefing_retrieval.settings", mock_settings):
+            context = prefetch_briefing_context(7)
+
+        assert pipeline.query_many.call_count == 1
+        args = pipeline.query_many.call_args.args
+        assert args[0] == list(SOURCE_QUERIES.values())
+        assert args[2] == {"user_id": 7}
+        assert context == {
+            "email": [{"content": "email 1", "metadata": {"source": "email"}}],
+            "calendar": [],
+            "social": [{"content": "slack ping", "metadata": {"source": "slack"}}],
+            "notion": [],
+        }
+
+    def test_disabled_prefetch_skips_search(self, mock_global_instances, mock_settings):
+        mock_settings.BRIEFING_RETRIEVAL_ENABLED = False
+        with patch("app.services.briefing_retrieval.settings", mock_settings):
+            assert prefetch_briefing_context(1) == {}
+        assert mock_global_instances["rag_pipeline"].query_many.call_count == 0
+
+
+class RecordingChatModel(GenericFakeChatModel):
+    prompts: List[str] = []
+
+    def _generate(self, messages, *args, **kwargs):
+        self.prompts.append(messages[-1].content)
+        return super()._generate(messages, *args, **kwargs)
+
+
+def _coordinator(llm):
+    coordinator = LangGraphCoordinator()
+    coordinator.workflow_builder = WorkflowBuilder()
+    coordinator.workflow_builder.agent_nodes.llm = llm
+    coordinator.graph = coordinator.workflow_builder.build_workflow()
+    return coordinator
+
+
+class TestGroundedWorkflow:
+    @pytest.fixture
+    def llm(self):
+        replies = (AIMessage(content=f"Analysis {i}") for i in count())
+        return RecordingChatModel(messages=replies, prompts=[])
+
+    def test_agents_see_prefetched_documents(self, mock_global_instances, llm):
+        pipeline = mock_global_instances["rag_pipeline"]
+        pipeline.query_many.side_effect = lambda queries, *args: [
+            [{"content": "CFO needs the budget by 3pm", "metadata": {"source": "email"}}]
+            for _ in queries
+        ]
+
+        briefing = _coordinator(llm).get_daily_briefing(1, notify_urgent=False)
+
+        assert briefing["workflow_status"] == "completed"
+        assert pipeline.query_many.call_count == 1
+        assert "CFO needs the budget by 3pm" in llm.prompts[0]
+
+    def test_failed_prefetch_falls_back_to_generic_prompts(self, mock_global_instances, llm):
+        mock_global_instances["rag_pipeline"].query_many.side_effect = RuntimeError("Chroma down")
+
+        briefing = _coordinator(llm).get_daily_briefing(1, notify_urgent=False)
+
+        assert briefing["email_insights"]["status"] == "completed"
+        assert "relevant email items" not in llm.prompts[0]
@@ -0,0 +1,275 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+from zoneinfo import ZoneInfo
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from sqlalchemy.orm import sessionmaker
+
+from app.models.daily_briefing import DailyBriefing
+from app.models.user import User
+from app.services.admission import AdmissionController
+from app.services.briefing_scheduler import BriefingScheduler, TokenBucket, due_at, wants_daily_briefing
+from app.services.briefing_store import load_briefing, local_date, save_briefing
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.services.langgraph.workflow import WorkflowBuilder
+
+WINDOW = timedelta(minutes=120)
+
+
+def _add_user(db, email, tz="UTC", opted_in=True):
+    user = User(
+        email=email,
+        hashed_password="x",
+        timezone=tz,
+        notification_preferences=json.dumps({"dailyBriefing": opted_in}),
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _scheduler(db_session, generate, **options):
+    defaults = {
+        "workers": 2,
+        "rate_per_minute": 6,
+        "morning_hour": 7,
+        "window_minutes": 120,
+        "admission": AdmissionController("test", 4, 0, 1.0),
+    }
+    defaults.update(options)
+    return BriefingScheduler(
+        generate=generate,
+        session_factory=sessionmaker(bind=db_session.get_bind()),
+        **defaults,
+    )
+
+
+def _briefing(user_id):
+    return {"user_id": user_id, "summary": f"briefing {user_id}", "workflow_status": "completed"}
+
+
+class TestSchedule:
+    def test_slots_spread_over_window_before_morning(self):
+        zone = ZoneInfo("UTC")
+        day = date(2026, 3, 2)
+        morning = datetime(2026, 3, 2, 7, tzinfo=zone)
+        slots = [due_at(user_id, zone, day, 7, WINDOW) for user_id in range(1, 3001)]
+
+        assert all(morning - WINDOW <= slot < morning for slot in slots)
+        # Ten-minute buckets each get close to their share of 3000 users
+        buckets = [0] * 12
+        for slot in slots:
+            buckets[int((slot - (morning - WINDOW)) / timedelta(minutes=10))] += 1
+        assert min(buckets) > 150 and max(buckets) < 350
+
+    def test_slot_follows_user_timezone(self):
+        tokyo = ZoneInfo("Asia/Tokyo")
+        slot = due_at(42, tokyo, date(2026, 3, 2), 7, WINDOW)
+
+        assert slot.astimezone(tokyo).hour in (5, 6)
+        assert slot.astimezone(timezone.utc).day == 1  # still the previous day in UTC
+
+    def test_opt_in_preference(self):
+        assert wants_daily_briefing('{"dailyBriefing": true, "email": false}')
+        assert not wants_daily_briefing('{"dailyBriefing": false}')
+        assert not wants_daily_briefing(None)
+        assert not wants_daily_briefing("not json")
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate_per_minute=6, burst=2)
+
+        assert [bucket.take(0.0), bucket.take(0.0), bucket.take(0.0)] == [True, True, False]
+        assert bucket.take(5.0) is False
+        assert bucket.take(10.0) is True
+
+
+class TestBriefingScheduler:
+    def test_precomputes_opted_in_users_at_their_slot(self, db_session):
+        tokyo = _add_user(db_session, "tokyo@example.com", "Asia/Tokyo")
+        nyc = _add_user(db_session, "nyc@example.com", "America/New_York")
+        _add_user(db_session, "out@example.com", "Asia/Tokyo", opted_in=False)
+        generate = Mock(side_effect=_briefing)
+        scheduler = _scheduler(db_session, generate)
+
+        # 19:00 UTC is 04:00 on 2 March in Tokyo (before the window) and 14:00
+        # on 1 March in New York, whose slot has passed: caught up right away
+        assert scheduler.tick(datetime(2026, 3, 1, 19, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(5)
+        generate.assert_called_once_with(nyc.id)
+        assert scheduler.tick(datetime(2026, 3, 1, 20, tzinfo=timezone.utc)) == 0
+
+        # 22:00 UTC is 07:00 in Tokyo: every Tokyo slot has come
+        assert scheduler.tick(datetime(2026, 3, 1, 22, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(5)
+
+        generate.assert_called_with(tokyo.id)
+        assert generate.call_count == 2
+        stored = load_briefing(db_session, tokyo.id, date(2026, 3, 2), "small")
+        assert stored["summary"] == f"briefing {tokyo.id}"
+        assert load_briefing(db_session, nyc.id, date(2026, 3, 1), "small") is not None
+        # Both are done for their local day
+        assert scheduler.tick(datetime(2026, 3, 1, 23, tzinfo=timezone.utc)) == 0
+        scheduler.stop()
+
+    def test_rate_limit_spreads_catch_up(self, db_session):
+        for i in range(6):
+            _add_user(db_session, f"user{i}@example.com")
+        generate = Mock(side_effect=_briefing)
+        # Burst is one pass's worth of starts (one per ten seconds), at least a worker each
+        scheduler = _scheduler(db_session, generate, workers=2, rate_per_minute=6, interval_seconds=10)
+        now = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)  # after everyone's slot
+
+        started = [scheduler.tick(now)]
+        for seconds in (5, 10, 20, 30, 40):
+            scheduler.wait_idle(5)
+            started.append(scheduler.tick(now + timedelta(seconds=seconds)))
+
+        # Burst of two workers, then one every ten seconds
+        assert started == [2, 0, 1, 1, 1, 1]
+        scheduler.wait_idle(5)
+        assert db_session.query(DailyBriefing).count() == 6
+        scheduler.stop()
+
+    def test_free_worker_drains_queue_between_passes(self, db_session):
+        for i in range(5):
+            _add_user(db_session, f"drain{i}@example.com")
+        generate = Mock(side_effect=_briefing)
+        scheduler = _scheduler(db_session, generate, workers=1, rate_per_minute=60, interval_seconds=30)
+
+        assert scheduler.tick(datetime(2026, 3, 2, 9, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(5)
+
+        # One worker, but the pass's rate budget (30 starts) covered all five
+        assert generate.call_count == 5
+        assert scheduler.stats()["queued"] == 0
+        scheduler.stop()
+
+    def test_skips_users_with_stored_briefing(self, db_session):
+        user = _add_user(db_session, "early@example.com")
+        save_briefing(db_session, user.id, date(2026, 3, 2), "small", _briefing(user.id), "on_demand")
+        generate = Mock(side_effect=_briefing)
+        scheduler = _scheduler(db_session, generate)
+
+        assert scheduler.tick(datetime(2026, 3, 2, 8, tzinfo=timezone.utc)) == 0
+        generate.assert_not_called()
+        scheduler.stop()
+
+    def test_failed_workflow_not_stored_or_retried_same_day(self, db_session):
+        user = _add_user(db_session, "fail@example.com")
+        generate = Mock(return_value={"workflow_status": "error", "error": "Groq down"})
+        scheduler = _scheduler(db_session, generate)
+
+        assert scheduler.tick(datetime(2026, 3, 2, 8, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(5)
+        assert scheduler.tick(datetime(2026, 3, 2, 9, tzinfo=timezone.utc)) == 0
+        assert load_briefing(db_session, user.id, date(2026, 3, 2), "small") is None
+        # Next morning it is tried again
+        assert scheduler.tick(datetime(2026, 3, 3, 8, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(5)
+        scheduler.stop()
+
+    def test_waits_for_a_briefing_admission_slot(self, db_session):
+        first = _add_user(db_session, "first@example.com")
+        second = _add_user(db_session, "second@example.com")
+        admission = AdmissionController("test", 1, 0, 1.0)
+        generate = Mock(side_effect=_briefing)
+        scheduler = _scheduler(db_session, generate, workers=1, admission=admission)
+        now = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+
+        assert admission.try_acquire()  # an on-demand briefing holds the only slot
+        assert scheduler.tick(now) == 1
+        scheduler.wait_idle(5)
+        generate.assert_not_called()
+        assert scheduler.stats()["queued"] == 2  # deferred, still first in line
+
+        admission.release()
+        assert scheduler.tick(now + timedelta(seconds=30)) == 1
+        scheduler.wait_idle(5)
+
+        assert sorted(c.args[0] for c in generate.call_args_list) == [first.id, second.id]
+        assert admission.stats()["in_flight"] == 0
+        scheduler.stop()
+
+    def test_runs_real_workflow_with_fake_llm(self, db_session):
+        user = _add_user(db_session, "fake-llm@example.com")
+        coordinator = LangGraphCoordinator()
+        coordinator.workflow_builder = WorkflowBuilder()
+        coordinator.workflow_builder.agent_nodes.llm = GenericFakeChatModel(
+            messages=iter(
+                [
+                    AIMessage(content="Reply to the CFO today"),
+                    AIMessage(content="Top priority: reply to the CFO before noon"),
+                ]
+            )
+        )
+        coordinator.graph = coordinator.workflow_builder.build_workflow()
+        scheduler = _scheduler(
+            db_session, lambda user_id: coordinator.get_daily_briefing(user_id, notify_urgent=False)
+        )
+
+        assert scheduler.tick(datetime(2026, 3, 2, 8, tzinfo=timezone.utc)) == 1
+        scheduler.wait_idle(10)
+
+        stored = load_briefing(db_session, user.id, date(2026, 3, 2), "small")
+        assert stored["summary"] == "Top priority: reply to the CFO before noon"
+        scheduler.stop()
+
+
+class TestBriefingEndpointCache:
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_stored_briefing_served_without_workflow(
+        self, mock_get_admission, mock_get_coordinator, client, auth_headers, test_user, db_session
+    ):
+        mock_get_admission.return_value = AdmissionController("test", 2, 2, 1.0)
+        coordinator = Mock()
+        coordinator.MODEL_CONFIGS = {"small": {"max_tokens": 1, "temperature": 0.1}}
+        mock_get_coordinator.return_value = coordinator
+        today = local_date(test_user.timezone)
+        save_briefing(db_session, test_user.id, today, "small", {"summary": "precomputed"}, "scheduled")
+
+        response = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.json()["briefing"]["summary"] == "precomputed"
+        assert response.json()["cached"] is True
+        coordinator.get_daily_briefing.assert_not_called()
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_on_demand_briefing_stored_for_the_day(
+        self, mock_get_admission, mock_get_coordinator, client, auth_headers
+    ):
+        mock_get_admission.return_value = AdmissionController("test", 2, 2, 1.0)
+        coordinator = Mock()
+        coordinator.MODEL_CONFIGS = {"small": {"max_tokens": 1, "temperature": 0.1}}
+        coordinator.get_daily_briefing.return_value = {"summary": "fresh"}
+        mock_get_coordinator.return_value = coordinator
+
+        first = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+        second = client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+        refreshed = client.get("/api/v1/agent/briefing/daily?refresh=true", headers=auth_headers)
+
+        assert first.json()["cached"] is False
+        assert second.json()["cached"] is True
+        assert second.json()["briefing"] == {"summary": "fresh"}
+        assert refreshed.json()["cached"] is False
+        assert coordinator.get_daily_briefing.call_count == 2
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_failed_briefing_not_stored(
+        self, mock_get_admission, mock_get_coordinator, client, auth_headers
+    ):
+        mock_get_admission.return_value = AdmissionController("test", 2, 2, 1.0)
+        coordinator = Mock()
+        coordinator.MODEL_CONFIGS = {"small": {"max_tokens": 1, "temperature": 0.1}}
+        coordinator.get_daily_briefing.return_value = {"workflow_status": "error", "error": "boom"}
+        mock_get_coordinator.return_value = coordinator
+
+        client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+        client.get("/api/v1/agent/briefing/daily", headers=auth_headers)
+
+        assert coordinator.get_daily_briefing.call_count == 2
@@ -0,0 +1,231 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch
+
+import pytest
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from starlette.requests import ClientDisconnect
+
+from app.services.admission import AdmissionController
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.services.langgraph.workflow import WorkflowBuilder
+from app.utils.streaming import iterate_in_thread
+
+LLM_DELAY = 0.3
+
+
+class DelayedChatModel(GenericFakeChatModel):
+    # Fake LLM that waits before answering, like a slow provider call.
+    # Streaming goes through _generate too, then splits the reply into tokens.
+
+    def _generate(self, *args, **kwargs):
+        time.sleep(LLM_DELAY)
+        return super()._generate(*args, **kwargs)
+
+
+def _coordinator():
+    # Email agent answers first, then the priority agent writes the briefing
+    coordinator = LangGraphCoordinator()
+    coordinator.workflow_builder = WorkflowBuilder()
+    coordinator.workflow_builder.agent_nodes.llm = DelayedChatModel(
+        messages=iter(
+            [
+                AIMessage(content="Reply to the CFO today"),
+                AIMessage(content="Top priority: reply to the CFO before noon"),
+            ]
+        )
+    )
+    coordinator.graph = coordinator.workflow_builder.build_workflow()
+    return coordinator
+
+
+def _parse_sse(lines):
+    # Yield (event, data, seconds since start) from an SSE line stream
+    started = time.perf_counter()
+    event = None
+    for line in lines:
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            yield event, json.loads(line[len("data: "):]), time.perf_counter() - started
+
+
+class TestStreamDailyBriefing:
+    def test_sections_stream_before_workflow_finishes(self):
+        coordinator = _coordinator()
+        started = time.perf_counter()
+        events = []
+
+        for event, payload in coordinator.stream_daily_briefing(1):
+            events.append((event, payload, time.perf_counter() - started))
+
+        names = [event for event, _, _ in events]
+        first_section = next(at for event, _, at in events if event == "section")
+        done_at = events[-1][2]
+
+        assert names[0] == "section"
+        assert events[0][1]["section"] == "email_analysis"
+        assert names[-1] == "done"
+        # The email section arrives one LLM call in, not after the whole workflow
+        assert first_section < done_at - LLM_DELAY * 0.5
+
+        tokens = "".join(p["text"] for event, p, _ in events if event == "token")
+        assert tokens == "Top priority: reply to the CFO before noon"
+        assert events[-1][1]["summary"] == "Top priority: reply to the CFO before noon"
+        assert events[-1][1]["email_insights"]["analysis"] == "Reply to the CFO today"
+
+    def test_workflow_error_yields_error_event(self):
+        coordinator = LangGraphCoordinator()
+        coordinator.graph = object()
+
+        events = list(coordinator.stream_daily_briefing(1))
+
+        assert [event for event, _ in events] == ["error"]
+        assert events[0][1]["workflow_status"] == "error"
+
+
+class TestBriefingStreamEndpoint:
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_streams_sse_events(self, mock_get_admission, mock_get_coordinator, client, auth_headers):
+        controller = AdmissionController("test", 2, 2, 1.0)
+        mock_get_admission.return_value = controller
+        coordinator = _coordinator()
+        mock_get_coordinator.return_value = coordinator
+
+        with patch.object(coordinator, "schedule_urgent_sms") as mock_sms:
+            response = client.get("/api/v1/agent/briefing/daily/stream", headers=auth_headers)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        names = [event for event, _, _ in _parse_sse(response.text.splitlines())]
+        assert names[0] == "start"
+        assert names[1] == "section"
+        assert "token" in names
+        assert names[-1] == "done"
+        mock_sms.assert_called_once()
+        # The admission slot is released once the stream ends
+        assert controller.stats()["in_flight"] == 0
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_time_to_first_section(self, mock_get_admission, mock_get_coordinator, test_user):
+        from app.api.endpoints.agent import stream_daily_briefing
+
+        mock_get_admission.return_value = AdmissionController("test", 2, 2, 1.0)
+        coordinator = _coordinator()
+        mock_get_coordinator.return_value = coordinator
+
+        async def scenario():
+            # Time each chunk as the ASGI server would send it
+            response = await stream_daily_briefing(model_size="small", current_user=test_user)
+            started = time.perf_counter()
+            chunks = []
+            async for chunk in response.body_iterator:
+                chunks.append((chunk, time.perf_counter() - started))
+            return chunks
+
+        with patch.object(coordinator, "schedule_urgent_sms"):
+            chunks = asyncio.run(scenario())
+
+        first_section = next(at for chunk, at in chunks if chunk.startswith("event: section"))
+        done_at = next(at for chunk, at in chunks if chunk.startswith("event: done"))
+        # One LLM call (the email agent) in, not after the whole workflow
+        assert first_section < LLM_DELAY * 1.8
+        assert first_section < done_at - LLM_DELAY * 0.5
+
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_saturated_worker_returns_503(self, mock_get_admission, client, auth_headers):
+        controller = AdmissionController("test", 1, 0, 1.0)
+        asyncio.run(controller.acquire())
+        mock_get_admission.return_value = controller
+
+        response = client.get("/api/v1/agent/briefing/daily/stream", headers=auth_headers)
+
+        assert response.status_code == 503
+        assert int(response.headers["Retry-After"]) >= 1
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_slot_released_when_setup_fails(
+        self, mock_get_admission, mock_get_coordinator, test_user
+    ):
+        from app.api.endpoints.agent import stream_daily_briefing
+
+        controller = AdmissionController("test", 1, 0, 1.0)
+        mock_get_admission.return_value = controller
+        mock_get_coordinator.side_effect = RuntimeError("model unavailable")
+
+        async def scenario():
+            with pytest.raises(RuntimeError):
+                await stream_daily_briefing(model_size="small", current_user=test_user)
+            # Checked before the loop closes, which would finalize a leaked slot
+            return controller.stats()["in_flight"]
+
+        assert asyncio.run(scenario()) == 0
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_slot_released_when_client_leaves_before_body(
+        self, mock_get_admission, mock_get_coordinator, test_user
+    ):
+        from app.api.endpoints.agent import stream_daily_briefing
+
+        controller = AdmissionController("test", 1, 0, 1.0)
+        mock_get_admission.return_value = controller
+
+        async def disconnected(message):
+            raise OSError("client went away")
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        async def scenario():
+            response = await stream_daily_briefing(model_size="small", current_user=test_user)
+            assert controller.stats()["in_flight"] == 1
+            scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+            with pytest.raises(ClientDisconnect):
+                await response(scope, receive, disconnected)
+            return controller.stats()["in_flight"]
+
+        assert asyncio.run(scenario()) == 0
+        mock_get_coordinator.return_value.stream_daily_briefing.assert_not_called()
+
+
+class TestIterateInThread:
+    def test_producer_stops_when_consumer_stops(self):
+        produced = []
+
+        def numbers():
+            for i in range(100):
+                produced.append(i)
+                time.sleep(0.01)
+                yield i
+
+        async def consume():
+            async for number in iterate_in_thread(numbers):
+                if number == 2:
+                    break
+            await asyncio.sleep(0.1)
+
+        asyncio.run(consume())
+
+        assert len(produced) < 10
+
+    def test_errors_propagate_to_consumer(self):
+        def failing():
+            yield 1
+            raise ValueError("boom")
+
+        async def consume():
+            return [item async for item in iterate_in_thread(failing)]
+
+        try:
+            asyncio.run(consume())
+        except ValueError as e:
+            assert str(e) == "boom"
+        else:
+            raise AssertionError("expected ValueError")
@@ -0,0 +1,180 @@
+import json
+import random
+import time
+from unittest.mock import patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.utils.text_formatter import StreamingResponseCleaner, clean_ai_response
+
+TOKEN_DELAY = 0.05
+
+REPLY = (
+    "## Your inbox\n\n"
+    "**Top priorities:**\n\n\n\n"
+    "1. Reply to *Sarah* about the Q3 budget &amp; forecast\n"
+    "2. Prepare slides for the **board meeting**\n"
+    "- Standup at 9:00 &mdash; bring notes\n\n"
+    "Let me know if you need anything else!  \n"
+)
+
+
+class SlowStreamingChatModel(GenericFakeChatModel):
+    # Fake LLM that streams its reply one token at a time, with a pause per token
+
+    def _stream(self, *args, **kwargs):
+        for chunk in super()._stream(*args, **kwargs):
+            time.sleep(TOKEN_DELAY)
+            yield chunk
+
+
+def _coordinator(reply=REPLY):
+    coordinator = LangGraphCoordinator()
+    coordinator._llm = SlowStreamingChatModel(messages=iter([AIMessage(content=reply)]))
+    return coordinator
+
+
+def _stream(text, chunk_sizes):
+    cleaner = StreamingResponseCleaner()
+    out, i = [], 0
+    while i < len(text):
+        size = next(chunk_sizes)
+        out.append(cleaner.feed(text[i:i + size]))
+        i += size
+    out.append(cleaner.finish())
+    return out
+
+
+class TestStreamingResponseCleaner:
+    def test_matches_batch_cleaning_for_any_chunking(self):
+        rng = random.Random(7)
+        chunk_sizes = iter(lambda: rng.randint(1, 8), None)
+        samples = [
+            REPLY,
+            "Sure! Here's what I found:\n\n* **Email from CFO**: approve by EOD\n* Meeting moved",
+            "   Hello &lt;user&gt;, you have 3 unread emails.\n\n\n\nThanks",
+            "# \n\n- \nItem after an empty marker\n**\nAfter an empty bold line",
+        ]
+
+        for text in samples:
+            for _ in range(200):
+                assert "".join(_stream(text, chunk_sizes)) == clean_ai_response(text)
+
+    def test_entity_split_across_chunks(self):
+        assert "".join(_stream("Q3 &amp; Q4", iter([4, 3, 10]))) == "Q3 & Q4"
+
+    def test_plain_text_is_not_held_back(self):
+        cleaner = StreamingResponseCleaner()
+
+        assert cleaner.feed("Sure, the meeting") == "Sure, the meeting"
+        assert cleaner.feed(" is at 3pm") == " is at 3pm"
+
+    def test_emphasis_held_until_closed(self):
+        cleaner = StreamingResponseCleaner()
+
+        assert cleaner.feed("Reply to *Sar") == "Reply to"
+        assert cleaner.feed("ah* now") == " Sarah now"
+
+    def test_list_marker_decided_before_emitting(self):
+        cleaner = StreamingResponseCleaner()
+
+        assert cleaner.feed("Items:\n-") == "Items:"
+        assert cleaner.feed(" first") == "\n• first"
+
+
+class TestStreamChat:
+    def test_first_chunk_arrives_before_reply_completes(self):
+        coordinator = _coordinator()
+        started = time.perf_counter()
+        chunks = []
+
+        for text in coordinator.stream_chat(1, "email", "What needs my attention?"):
+            chunks.append((text, time.perf_counter() - started))
+
+        assert len(chunks) > 5
+        assert chunks[0][1] < chunks[-1][1] - TOKEN_DELAY * 5
+        assert "".join(text for text, _ in chunks) == clean_ai_response(REPLY)
+
+    def test_records_first_token_metric(self):
+        from app.core.metrics import LLM_CALLS, LLM_FIRST_TOKEN
+
+        coordinator = _coordinator("Quick answer")
+        first_before = LLM_FIRST_TOKEN.merged().get(("chat_calendar",), [0])[-1]
+        calls_before = LLM_CALLS.value("chat_calendar", "ok")
+
+        list(coordinator.stream_chat(1, "calendar", "When is standup?"))
+
+        assert LLM_FIRST_TOKEN.merged()[("chat_calendar",)][-1] == first_before + 1
+        assert LLM_CALLS.value("chat_calendar", "ok") == calls_before + 1
+
+    def test_non_streaming_chat_unchanged(self):
+        coordinator = _coordinator()
+
+        assert coordinator.chat_with_email_agent(1, "Hi") == clean_ai_response(REPLY)
+
+
+class TestChatStreamEndpoint:
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    def test_streams_sse_tokens(self, mock_get_coordinator, client, auth_headers):
+        mock_get_coordinator.return_value = _coordinator()
+
+        response = client.post(
+            "/api/v1/agent/chat/stream",
+            json={"agent_type": "email", "message": "What needs my attention?"},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = []
+        event = None
+        for line in response.text.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                events.append((event, json.loads(line[len("data: "):])))
+        names = [name for name, _ in events]
+        assert names[0] == "start"
+        assert names[-1] == "done"
+        assert names.count("token") > 5
+        tokens = "".join(data["text"] for name, data in events if name == "token")
+        assert tokens == events[-1][1]["message"] == clean_ai_response(REPLY)
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    def test_streams_ndjson(self, mock_get_coordinator, client, auth_headers):
+        mock_get_coordinator.return_value = _coordinator("Standup is at **9am**.")
+
+        response = client.post(
+            "/api/v1/agent/chat/stream?format=ndjson",
+            json={"agent_type": "calendar", "message": "When is standup?"},
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert events[0] == {"event": "start", "user_id": events[0]["user_id"], "agent_type": "calendar"}
+        assert events[-1]["event"] == "done"
+        assert events[-1]["message"] == "Standup is at 9am."
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    def test_llm_error_yields_error_event(self, mock_get_coordinator, client, auth_headers):
+        coordinator = _coordinator()
+        coordinator._llm = GenericFakeChatModel(messages=iter([]))
+        mock_get_coordinator.return_value = coordinator
+
+        response = client.post(
+            "/api/v1/agent/chat/stream?format=ndjson",
+            json={"message": "Hello"},
+            headers=auth_headers,
+        )
+
+        events = [json.loads(line) for line in response.text.splitlines()]
+        assert [event["event"] for event in events] == ["start", "error"]
+
+    def test_message_required(self, client, auth_headers):
+        response = client.post("/api/v1/agent/chat/stream", json={}, headers=auth_headers)
+
+        assert response.status_code == 400
@@ -0,0 +1,149 @@
+from unittest.mock import Mock
+
+from app.services.agents import PriorityAgent
+from app.services.context_budget import (
+    ContextSection,
+    assemble_briefing_context,
+    assemble_context,
+    estimate_tokens,
+)
+
+
+def _lines(prefix, count, width=80):
+    return "\n".join(f"{prefix} item {i}: " + "x" * width for i in range(count))
+
+
+class TestContextAssembly:
+    def test_small_context_is_unchanged(self):
+        context = assemble_briefing_context(
+            {"email": "Reply to Sarah about the contract", "calendar": "Standup at 9am"},
+            budget=1000,
+        )
+
+        rendered = context.render()
+        assert "Email Analysis:\nReply to Sarah about the contract" in rendered
+        assert "Calendar Analysis:\nStandup at 9am" in rendered
+        assert context.tokens == context.raw_tokens
+
+    def test_duplicates_dropped_from_lower_priority_sections(self):
+        repeated = "- Board meeting with investors moved to Friday 3pm"
+        context = assemble_briefing_context(
+            {
+                "email": repeated,
+                "calendar": f"{repeated}\n- Dentist at 11am tomorrow morning",
+                "social": "* board meeting with investors moved to Friday 3pm!",
+            },
+            budget=1000,
+        )
+
+        stats = context.stats()
+        assert stats["calendar"]["duplicates"] == 1
+        assert stats["social"]["duplicates"] == 1
+        assert context.render().count("Board meeting") == 1
+
+    def test_short_headings_are_not_deduped(self):
+        context = assemble_briefing_context(
+            {"email": "Action items:\n- Reply to Sarah", "calendar": "Action items:\n- Book room"},
+            budget=1000,
+        )
+
+        assert context.render().count("Action items:") == 2
+
+    def test_lower_priority_sections_truncated_first(self):
+        context = assemble_briefing_context(
+            {
+                "email": _lines("email", 20),
+                "calendar": _lines("calendar", 20),
+                "social": _lines("social", 20),
+            },
+            budget=1200,
+        )
+
+        stats = context.stats()
+        assert context.tokens <= 1200
+        # Email is highest priority and keeps everything; social loses the most
+        assert stats["email"]["truncated"] == 0
+        assert stats["social"]["truncated"] > stats["calendar"]["truncated"]
+        assert "more items omitted]" in context.render()
+
+    def test_every_section_keeps_a_floor(self):
+        context = assemble_briefing_context(
+            {"email": _lines("email", 100), "social": _lines("social", 100)},
+            budget=1000,
+        )
+
+        # Social is lowest priority but still gets the minimum section budget
+        assert context.stats()["social"]["tokens"] >= 100
+
+    def test_single_oversized_item_is_cut(self):
+        section = ContextSection("email", "Email Analysis", "word " * 1000, 0)
+
+        assembled = assemble_context([section], budget=50, min_section_tokens=10)
+
+        assert assembled.tokens <= 50
+        assert section.text.endswith("…")
+
+    def test_preferences_rendered_as_bullets(self):
+        context = assemble_briefing_context(
+            {"email": "Nothing urgent"},
+            preferences=["Prefers morning meetings", "Prefers morning meetings"],
+            budget=1000,
+        )
+
+        assert context.includes("preferences")
+        assert "User Preferences:\n- Prefers morning meetings" in context.render()
+        assert context.stats()["preferences"]["duplicates"] == 1
+
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+
+class TestPriorityAgentContextBudget:
+    def test_create_briefing_prompt_respects_budget(self, mock_langchain_agent):
+        agent = PriorityAgent([])
+        response = Mock()
+        response.content = "Briefing"
+        mock_langchain_agent.invoke.return_value = response
+        agent.agent = mock_langchain_agent
+
+        agent.create_briefing(
+            user_id=1,
+            email_analysis=_lines("email", 500),
+            calendar_analysis=_lines("calendar", 500),
+            social_analysis=_lines("social", 500),
+        )
+
+        prompt = mock_langchain_agent.invoke.call_args[0][0]
+        # Default budget (3000 tokens) plus the instruction text
+        assert estimate_tokens(prompt) < 3200
+        assert "Email Analysis:" in prompt
+
+
+class TestPriorityNodeContextBudget:
+    def test_node_prompt_trimmed_and_metrics_recorded(self):
+        from app.core.metrics import PROMPT_CONTEXT_TOKENS
+        from app.services.langgraph.nodes import AgentNodes
+
+        nodes = AgentNodes()
+        response = Mock()
+        response.content = "Briefing"
+        response.usage_metadata = None
+        nodes.llm = Mock()
+        nodes.llm.invoke.return_value = response
+        state = {
+            "email_analysis": {"analysis": _lines("email", 400)},
+            "calendar_analysis": {"analysis": _lines("calendar", 400)},
+            "social_analysis": {"analysis": _lines("social", 400)},
+        }
+        key = ("priority_agent", "assembled")
+        before = PROMPT_CONTEXT_TOKENS.merged().get(key, [0])[-1]
+
+        result = nodes.priority_agent_node(state)
+
+        prompt = nodes.llm.invoke.call_args[0][0][0].content
+        assert result["priority_recommendations"]["status"] == "completed"
+        assert estimate_tokens(prompt) < 3300
+        assert "Notion Analysis:\nNo notion analysis" in prompt
+        assert PROMPT_CONTEXT_TOKENS.merged()[key][-1] == before + 1
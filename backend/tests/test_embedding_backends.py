@@ -0,0 +1,168 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from app.services.rag import embeddings
+from app.services.rag.cpu_embeddings import HashingEmbeddings, OnnxEmbeddings
+from app.services.rag.embeddings import (
+    EmbeddingManager,
+    create_embedding_backend,
+    register_embedding_backend,
+)
+
+VOCAB = ["[UNK]", "invoice", "from", "acme", "due", "friday", "dinner", "with", "sam"]
+
+
+@pytest.fixture
+def backend_settings(mock_settings):
+    with patch("app.services.rag.embeddings.settings", mock_settings):
+        yield mock_settings
+
+
+class TestRegistry:
+    def test_ollama_is_the_default(self, backend_settings, mock_ollama_embeddings):
+        manager = EmbeddingManager()
+
+        assert manager.embedding_model is mock_ollama_embeddings
+        embeddings.OllamaEmbeddings.assert_called_once_with(
+            model="llama3", base_url="http://localhost:11434"
+        )
+
+    def test_backend_selected_by_settings(self, backend_settings):
+        backend_settings.EMBEDDING_BACKEND = "hashing"
+        backend_settings.EMBEDDING_HASHING_DIMENSIONS = 64
+
+        manager = EmbeddingManager()
+
+        assert isinstance(manager.embedding_model, HashingEmbeddings)
+        assert len(manager.embed_query("invoice from acme")) == 64
+
+    def test_registered_backend(self, backend_settings):
+        backend = Mock()
+        backend.embed_documents.return_value = [[1.0, 0.0]]
+        register_embedding_backend("custom", lambda: backend)
+        try:
+            backend_settings.EMBEDDING_BACKEND = "custom"
+            assert EmbeddingManager().embed_documents(["x"]) == [[1.0, 0.0]]
+        finally:
+            del embeddings.EMBEDDING_BACKENDS["custom"]
+
+    def test_unknown_backend(self, backend_settings):
+        with pytest.raises(ValueError, match="EMBEDDING_BACKEND must be one of"):
+            create_embedding_backend("word2vec")
+
+    def test_onnx_needs_a_model_path(self, backend_settings):
+        with pytest.raises(ValueError, match="EMBEDDING_ONNX_MODEL_PATH"):
+            create_embedding_backend("onnx")
+
+
+class TestHashingEmbeddings:
+    def test_deterministic_unit_vectors(self):
+        backend = HashingEmbeddings(dimensions=128)
+
+        vectors = np.array(backend.embed_documents(["Invoice from ACME", "invoice from acme"]))
+
+        assert vectors.shape == (2, 128)
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert np.allclose(vectors[0], vectors[1])
+        assert backend.embed_query("invoice from acme") == vectors[1].tolist()
+
+    def test_shared_terms_score_higher(self):
+        backend = HashingEmbeddings(dimensions=512)
+        query = np.array(backend.embed_query("invoice due friday"))
+        related, unrelated = np.array(
+            backend.embed_documents(["the invoice is due on friday", "dinner with sam tonight"])
+        )
+
+        assert query @ related > query @ unrelated
+
+    def test_empty_inputs(self):
+        backend = HashingEmbeddings(dimensions=16)
+
+        assert backend.embed_documents([]) == []
+        assert backend.embed_query("") == [0.0] * 16
+
+
+class FakeSession:
+    """Token vectors are one-hot token ids, so mean pooling is easy to check."""
+
+    def __init__(self, inputs=("input_ids", "attention_mask"), pooled=False):
+        self.inputs = inputs
+        self.pooled = pooled
+        self.feeds = []
+
+    def get_inputs(self):
+        return [SimpleNamespace(name=name) for name in self.inputs]
+
+    def run(self, output_names, feeds):
+        self.feeds.append(feeds)
+        hidden = np.eye(len(VOCAB), dtype=np.float32)[feeds["input_ids"]]
+        return [hidden.sum(axis=1) if self.pooled else hidden]
+
+
+def _one_hot_mean(text):
+    vector = np.zeros(len(VOCAB), dtype=np.float32)
+    for word in text.split():
+        vector[VOCAB.index(word)] += 1.0
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    from tokenizers import Tokenizer, models, pre_tokenizers
+
+    tokenizer = Tokenizer(
+        models.WordLevel(vocab={word: i for i, word in enumerate(VOCAB)}, unk_token="[UNK]")
+    )
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.save(str(tmp_path / "tokenizer.json"))
+    return str(tmp_path)
+
+
+def _onnx(model_dir, session, **options):
+    ort = Mock()
+    ort.InferenceSession.return_value = session
+    with patch("app.services.rag.cpu_embeddings.ort", ort):
+        backend = OnnxEmbeddings(model_dir, **options)
+    assert ort.InferenceSession.call_args.args[0].endswith("model.onnx")
+    return backend
+
+
+class TestOnnxEmbeddings:
+    TEXTS = ["invoice from acme due friday", "dinner", "invoice due", "dinner with sam"]
+
+    def test_batches_by_length_on_the_pool_in_input_order(self, model_dir):
+        session = FakeSession()
+        backend = _onnx(model_dir, session, batch_size=2, threads=2)
+
+        vectors = backend.embed_documents(self.TEXTS)
+
+        # Mean of the unpadded token vectors, in the order given
+        for text, vector in zip(self.TEXTS, vectors):
+            assert np.allclose(vector, _one_hot_mean(text), atol=1e-6)
+        # Shortest texts batched together: little padding
+        assert sorted(feeds["input_ids"].shape for feeds in session.feeds) == [(2, 2), (2, 5)]
+        assert all("token_type_ids" not in feeds for feeds in session.feeds)
+
+    def test_token_type_ids_when_the_model_takes_them(self, model_dir):
+        session = FakeSession(inputs=("input_ids", "attention_mask", "token_type_ids"))
+        backend = _onnx(model_dir, session)
+
+        backend.embed_query("invoice due")
+
+        assert not session.feeds[0]["token_type_ids"].any()
+
+    def test_pooled_model_output_is_used_as_is(self, model_dir):
+        backend = _onnx(model_dir, FakeSession(pooled=True))
+
+        assert np.allclose(backend.embed_query("dinner with sam"), _one_hot_mean("dinner with sam"))
+
+    def test_long_texts_are_truncated(self, model_dir):
+        session = FakeSession()
+        backend = _onnx(model_dir, session, max_tokens=3)
+
+        backend.embed_documents(["invoice from acme due friday"])
+
+        assert session.feeds[0]["input_ids"].shape == (1, 3)
@@ -0,0 +1,102 @@
+import base64
+from unittest.mock import patch
+
+import pytest
+from cryptography.fernet import Fernet
+
+from app.security.encryption import (
+    decrypt,
+    decrypt_many,
+    decrypt_with_ttl,
+    encrypt,
+    encrypt_many,
+    encrypt_with_ttl,
+    generate_encryption_key,
+    get_fernet_key,
+    get_key_ring,
+    rotate_many,
+)
+
+
+class TestKeyRing:
+    def test_fernet_instance_is_cached(self):
+        # Repeated calls reuse the parsed key instead of rebuilding Fernet
+        assert get_fernet_key() is get_fernet_key()
+        assert get_key_ring() is get_key_ring()
+
+    def test_key_change_builds_new_ring(self):
+        original = get_key_ring()
+        with patch("app.security.encryption.settings.ENCRYPTION_KEY", generate_encryption_key()):
+            assert get_key_ring() is not original
+
+    def test_invalid_key_raises_value_error(self):
+        with patch("app.security.encryption.settings.ENCRYPTION_KEY", "abcd"):
+            with pytest.raises(ValueError):
+                encrypt("secret")
+
+
+class TestCompactFormat:
+    def test_token_is_single_encoded(self):
+        token = encrypt("oauth-refresh-token")
+
+        assert token.startswith("gA")
+        # The stored value is the raw Fernet token, not base64 of it
+        assert get_fernet_key().decrypt(token.encode()).decode() == "oauth-refresh-token"
+
+    def test_compact_is_smaller_than_legacy(self):
+        token = encrypt("x" * 500)
+        legacy = base64.b64encode(token.encode()).decode()
+
+        assert len(token) < len(legacy)
+        assert len(legacy) / len(token) > 1.3
+
+    def test_decrypts_legacy_double_encoded_values(self):
+        legacy = base64.b64encode(get_fernet_key().encrypt(b"legacy value")).decode()
+
+        assert legacy.startswith("Z0FB")
+        assert decrypt(legacy) == "legacy value"
+        assert decrypt_with_ttl(legacy, ttl_seconds=60) == "legacy value"
+
+    def test_garbage_is_rejected(self):
+        with pytest.raises(ValueError):
+            decrypt("not-a-token!!")
+
+    def test_ttl_roundtrip(self):
+        token = encrypt_with_ttl("short lived", ttl_seconds=60)
+
+        assert token.startswith("gA")
+        assert decrypt_with_ttl(token, ttl_seconds=60) == "short lived"
+
+
+class TestBulkOperations:
+    def test_encrypt_many_roundtrip(self):
+        values = ["alpha", "", "gamma"]
+
+        tokens = encrypt_many(values)
+
+        assert tokens[1] == ""
+        assert decrypt_many(tokens) == values
+
+    def test_decrypt_many_reports_failing_index(self):
+        tokens = encrypt_many(["one", "two"]) + ["corrupt"]
+
+        with pytest.raises(ValueError, match="item 2"):
+            decrypt_many(tokens)
+
+    def test_rotation_with_previous_key(self):
+        old_key = generate_encryption_key()
+        old_token = Fernet(base64.urlsafe_b64encode(bytes.fromhex(old_key))).encrypt(
+            b"rotated secret"
+        )
+        legacy_value = base64.b64encode(old_token).decode()
+
+        with pytest.raises(ValueError):
+            decrypt(legacy_value)
+
+        with patch("app.security.encryption.settings.ENCRYPTION_KEY_PREVIOUS", old_key):
+            assert decrypt(legacy_value) == "rotated secret"
+            rotated = rotate_many([legacy_value])
+
+        # Rotated values only need the primary key and use the compact format
+        assert rotated[0].startswith("gA")
+        assert decrypt(rotated[0]) == "rotated secret"
@@ -0,0 +1,357 @@
+import json
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.models.backboard_thread import BackboardThread
+from app.db.base import Base
+from app.main import app
+from app.models.daily_briefing import DailyBriefing
+from app.models.erasure_job import ErasureJob
+from app.models.user import User
+from app.services.erasure import DONE, FAILED, QUEUED, RUNNING, ErasureService
+from app.services.rag.vector_store import VectorStore
+
+
+def _llm():
+    return Mock(model_name="llama-3.1-8b-instant", temperature=0.1, provider="groq")
+
+
+def _queue(service, user_id, **filter_metadata):
+    # A persisted job no worker has picked up yet
+    with patch.object(service._executor, "submit"):
+        return service.submit(user_id, filter_metadata)["job_id"]
+
+
+def _add_user(db, email):
+    user = User(email=email, hashed_password="x", notification_preferences=json.dumps({}))
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _add_user_data(db, user_id, response_cache, briefing_checkpoints):
+    db.add(
+        DailyBriefing(
+            user_id=user_id,
+            briefing_date=date(2026, 3, 2),
+            model_size="small",
+            content="{}",
+            source="scheduled",
+        )
+    )
+    db.add(BackboardThread(user_id=user_id, thread_id=f"thr-{user_id}", thread_type="daily"))
+    db.commit()
+    response_cache.put("chat", "chat_email", user_id, _llm(), "Any invoices?", "One", 1.0)
+    briefing_checkpoints.save(user_id, "email_analysis", "k", {"email_insights": {}})
+
+
+@pytest.fixture
+def store(mock_settings):
+    import chromadb
+
+    client = Mock()
+    client.EphemeralClient.return_value = chromadb.EphemeralClient()
+    embedder = Mock()
+    embedder.embed_documents.side_effect = lambda texts: [
+        [1.0, float(i)] for i, _ in enumerate(texts)
+    ]
+    with (
+        patch("app.services.rag.vector_store.chromadb", client),
+        patch("app.services.rag.vector_store.settings", mock_settings),
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+    ):
+        yield VectorStore(collection_name=f"test_{uuid.uuid4().hex[:12]}")
+
+
+def _service(db_session, store):
+    pipeline = Mock()
+    pipeline.delete_document_pages.side_effect = lambda where: store.delete_pages(
+        where, page_size=2
+    )
+    return ErasureService(
+        pipeline=pipeline,
+        session_factory=sessionmaker(bind=db_session.get_bind()),
+        backboard_factory=Mock(),
+    )
+
+
+@pytest.fixture
+def service(db_session, store):
+    service = _service(db_session, store)
+    yield service
+    service.shutdown()
+
+
+class TestErasureJob:
+    def test_documents_are_deleted_a_page_of_ids_at_a_time(self, service, store):
+        store.add_documents([f"email {i}" for i in range(5)], [{"user_id": 1}] * 5)
+        store.add_documents(["email for someone else"], [{"user_id": 2}])
+
+        with patch.object(store.collection, "get", wraps=store.collection.get) as get:
+            job = service.run(_queue(service, 1))
+
+        assert job["status"] == DONE
+        assert job["progress"]["documents"] == 5
+        assert get.call_count == 3  # pages of 2, 2 and 1
+        pages = [call.kwargs for call in get.call_args_list]
+        assert pages == [{"where": {"user_id": 1}, "limit": 2, "include": []}] * 3
+        assert store.collection.count() == 1
+
+    def test_whole_user_erase_clears_derived_data(
+        self, service, db_session, response_cache, briefing_checkpoints
+    ):
+        alice = _add_user(db_session, "alice@example.com")
+        bob = _add_user(db_session, "bob@example.com")
+        for user in (alice, bob):
+            _add_user_data(db_session, user.id, response_cache, briefing_checkpoints)
+
+        job = service.run(_queue(service, alice.id))
+
+        assert job["status"] == DONE
+        assert job["progress"] == {
+            "documents": 0,
+            "threads": 0,  # only the rows; Backboard is off
+            "response_cache": 1,
+            "briefing_checkpoints": 1,
+            "daily_briefings": 1,
+        }
+        db_session.expire_all()
+        assert [row.user_id for row in db_session.query(DailyBriefing)] == [bob.id]
+        assert [row.user_id for row in db_session.query(BackboardThread)] == [bob.id]
+        assert len(response_cache) == 1
+        assert briefing_checkpoints.load(bob.id, "email_analysis", "k") is not None
+
+    def test_partial_erase_keeps_threads(
+        self, service, store, db_session, response_cache, briefing_checkpoints
+    ):
+        alice = _add_user(db_session, "alice@example.com")
+        _add_user_data(db_session, alice.id, response_cache, briefing_checkpoints)
+        store.add_documents(
+            ["invoice email", "standup"],
+            [{"user_id": alice.id, "source": "email"}, {"user_id": alice.id, "source": "calendar"}],
+        )
+
+        job = service.run(_queue(service, alice.id, source="email"))
+
+        assert job["status"] == DONE
+        assert job["progress"]["documents"] == 1
+        assert store.get_all_documents()[0]["content"] == "standup"
+        assert "threads" not in job["progress"]
+        assert job["progress"]["response_cache"] == 1  # answers may quote the deleted emails
+        assert db_session.query(BackboardThread).count() == 1
+
+    def test_backboard_threads_are_deleted(self, service, db_session, mock_settings):
+        mock_settings.USE_BACKBOARD = True
+        backboard = service.backboard_factory.return_value
+        backboard.list_threads.return_value = [{"thread_id": "thr-a"}, {"thread_id": "thr-b"}]
+
+        with patch("app.services.erasure.settings", mock_settings):
+            job = service.run(_queue(service, 7))
+
+        assert job["progress"]["threads"] == 2
+        backboard.list_threads.assert_called_once_with(user_id=7)
+        assert [c.args[0] for c in backboard.delete_thread.call_args_list] == ["thr-a", "thr-b"]
+
+    def test_failed_step_fails_the_job(self, service, response_cache):
+        service.pipeline.delete_document_pages.side_effect = RuntimeError("store unavailable")
+        response_cache.put("chat", "chat_email", 1, _llm(), "Any invoices?", "One", 1.0)
+
+        job = service.run(_queue(service, 1))
+
+        assert job["status"] == FAILED
+        assert job["step"] == "documents"
+        assert job["error"] == "store unavailable"
+        assert len(response_cache) == 1  # later steps did not run
+
+
+class TestErasureService:
+    def test_submit_runs_in_the_background(self, service, store):
+        store.add_documents(["email 1", "email 2"], [{"user_id": 1}] * 2)
+
+        job = service.submit(1, {"user_id": 999})
+        service._executor.shutdown(wait=True)
+
+        assert job["filter"] == {"user_id": 1}
+        assert service.get(job["job_id"])["status"] == DONE
+        assert store.collection.count() == 0
+
+    def test_identical_pending_job_is_reused(self, service):
+        with patch.object(service._executor, "submit") as submit:
+            first = service.submit(1, {"source": "email"})
+            second = service.submit(1, {"source": "email"})
+            other = service.submit(1, {"source": "calendar"})
+
+        assert first["job_id"] == second["job_id"]
+        assert other["job_id"] != first["job_id"]
+        assert submit.call_count == 2
+
+    def test_queued_job_survives_a_restart(self, service, db_session, store):
+        store.add_documents(["email 1", "email 2", "email 3"], [{"user_id": 1}] * 3)
+        job_id = _queue(service, 1)  # the process stops before running it
+        service.shutdown()
+
+        restarted = _service(db_session, store)
+        assert restarted.resume() == [job_id]
+        restarted._executor.shutdown(wait=True)
+
+        job = restarted.get(job_id)
+        assert job["status"] == DONE
+        assert job["progress"]["documents"] == 3
+        assert store.collection.count() == 0
+
+    def test_job_stopped_at_shutdown_resumes_where_it_stopped(self, service, db_session, store):
+        store.add_documents([f"email {i}" for i in range(5)], [{"user_id": 1}] * 5)
+        job_id = _queue(service, 1)
+
+        service._stopping.set()  # shutting down while the job runs
+        assert service.run(job_id) is None
+
+        stopped = service.get(job_id)
+        assert stopped["status"] == QUEUED  # handed back for the next process
+        assert stopped["step"] == "documents"
+        assert stopped["progress"] == {"documents": 2}  # one page
+        assert store.collection.count() == 3
+
+        restarted = _service(db_session, store)
+        with patch.object(restarted._executor, "submit"):
+            (job_id,) = restarted.resume()
+        job = restarted.run(job_id)
+        restarted.shutdown()
+
+        assert job["status"] == DONE
+        assert job["progress"]["documents"] == 5
+        assert store.collection.count() == 0
+
+    def test_finished_job_is_not_run_again(self, service):
+        job_id = _queue(service, 1)
+        service.run(job_id)
+
+        assert service.run(job_id) is None
+        assert service.resume() == []
+        assert service.pipeline.delete_document_pages.call_count == 1
+
+    def test_live_lease_is_not_taken_over_until_it_expires(self, service, db_session, store):
+        job_id = _queue(service, 1)
+        assert service._claim(job_id) is not None  # running in the first process
+        other = _service(db_session, store)
+
+        assert other.run(job_id) is None
+        assert other.resume() == []
+        other.pipeline.delete_document_pages.assert_not_called()
+
+        # The first process stops heartbeating, e.g. it was killed
+        db_session.query(ErasureJob).update(
+            {"claimed_at": datetime.now(timezone.utc) - timedelta(seconds=301)}
+        )
+        db_session.commit()
+        with patch.object(other._executor, "submit"):
+            assert other.resume() == [job_id]
+        assert other.run(job_id)["status"] == DONE
+        other.shutdown()
+
+        # The first process finds the job taken over at its next heartbeat
+        assert not service._save(job_id, progress={"documents": 0})
+        assert service.get(job_id)["status"] == DONE
+
+    def test_two_processes_racing_for_a_job_run_it_once(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", poolclass=NullPool)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        barrier = threading.Barrier(2)
+
+        def pipeline():
+            pipeline = Mock()
+            pipeline.delete_document_pages.side_effect = lambda where: iter([1, 1])
+            return pipeline
+
+        services = [
+            ErasureService(pipeline(), session_factory, Mock(), lease_seconds=300)
+            for _ in range(2)
+        ]
+        job_id = _queue(services[0], 1)
+        results = [None, None]
+
+        def race(i):
+            barrier.wait()
+            results[i] = services[i].run(job_id)
+
+        threads = [threading.Thread(target=race, args=(i,)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        for service in services:
+            service.shutdown()
+
+        assert sorted(result is None for result in results) == [False, True]
+        assert sum(s.pipeline.delete_document_pages.call_count for s in services) == 1
+        finished = next(result for result in results if result is not None)
+        assert finished["status"] == DONE
+        assert finished["progress"]["documents"] == 2
+        engine.dispose()
+
+    def test_startup_resumes_unfinished_jobs(self, db_session, erasure_service):
+        now = datetime.now(timezone.utc)
+        for job_id, job_status, worker, claimed_at in (
+            ("a" * 32, QUEUED, None, None),
+            ("b" * 32, RUNNING, "dead", now - timedelta(hours=1)),  # its process died
+            ("c" * 32, DONE, None, None),
+            ("d" * 32, RUNNING, "live", now),  # another process is running it
+        ):
+            db_session.add(
+                ErasureJob(
+                    id=job_id,
+                    user_id=1,
+                    filter_metadata=json.dumps({"user_id": 1}),
+                    status=job_status,
+                    progress="{}",
+                    worker=worker,
+                    claimed_at=claimed_at,
+                )
+            )
+        db_session.commit()
+
+        with patch.object(erasure_service._executor, "submit") as submit:
+            with TestClient(app):
+                pass
+
+        assert sorted(c.args[1] for c in submit.call_args_list) == ["a" * 32, "b" * 32]
+        assert erasure_service._stopping.is_set()  # shut down with the app
+
+
+class TestErasureEndpoints:
+    def test_status_of_own_job(self, client, auth_headers, service, test_user):
+        with patch("app.api.endpoints.ingest.get_erasure_service", return_value=service):
+            with patch.object(service._executor, "submit"):
+                response = client.request(
+                    "DELETE", "/api/v1/ingest/documents", json={}, headers=auth_headers
+                )
+            job_id = response.json()["job"]["job_id"]
+            found = client.get(f"/api/v1/ingest/documents/erasures/{job_id}", headers=auth_headers)
+            missing = client.get("/api/v1/ingest/documents/erasures/nope", headers=auth_headers)
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert found.status_code == status.HTTP_200_OK
+        assert found.json()["status"] == "queued"
+        assert found.json()["filter"] == {"user_id": test_user.id}
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_other_users_jobs_are_hidden(self, client, auth_headers, service, test_user):
+        with patch.object(service._executor, "submit"):
+            job_id = service.submit(test_user.id + 1)["job_id"]
+
+        with patch("app.api.endpoints.ingest.get_erasure_service", return_value=service):
+            response = client.get(
+                f"/api/v1/ingest/documents/erasures/{job_id}", headers=auth_headers
+            )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
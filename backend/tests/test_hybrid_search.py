@@ -0,0 +1,180 @@
+import math
+import re
+import uuid
+import zlib
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.rag.lexical import LexicalIndex, reciprocal_rank_fusion, tokenize
+from app.services.rag.pipeline import RAGPipeline
+from app.services.rag.vector_store import VectorStore
+
+DIMENSIONS = 64
+
+
+def _vector(text):
+    # Bag-of-words embedding that, like a dense model, ignores exact digits
+    vector = [1e-3] * DIMENSIONS
+    for word in re.findall(r"[a-z]+", text.lower()):
+        vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+class FakeEmbedder:
+    def embed_query(self, text):
+        return _vector(text)
+
+    def embed_documents(self, texts):
+        return [_vector(text) for text in texts]
+
+
+@pytest.fixture
+def store(mock_settings):
+    # VectorStore on a real in-memory Chroma collection
+    import chromadb
+
+    client = Mock()
+    client.EphemeralClient.return_value = chromadb.EphemeralClient()
+    with (
+        patch("app.services.rag.vector_store.chromadb", client),
+        patch("app.services.rag.vector_store.embedding_manager", FakeEmbedder()),
+        patch("app.services.rag.vector_store.settings", mock_settings),
+    ):
+        yield VectorStore(collection_name=f"test_{uuid.uuid4().hex}")
+
+
+MAILBOX = [
+    "Missed call from 0772123456 about the invoice",
+    "Missed call from 0701998877 about the invoice",
+    "Missed call from 0755000111 about the invoice",
+    "Invoice reminder: please call back about the invoice today",
+    "Email from alice@example.com: contract draft attached",
+    "Email from bob@example.com: lunch on Friday",
+]
+
+
+def _ingest(store, user_id=1, texts=MAILBOX):
+    return store.add_documents(
+        list(texts), [{"source": "email", "user_id": user_id} for _ in texts]
+    )
+
+
+class TestLexicalIndex:
+    def test_identifiers_are_indexed_whole_and_in_parts(self):
+        tokens = tokenize("Reply to Alice@Example.com re: 0772-123-456")
+
+        assert "alice@example.com" in tokens
+        assert "alice" in tokens
+        assert "0772-123-456" in tokens
+        assert "123" in tokens
+
+    def test_reciprocal_rank_fusion_rewards_agreement(self):
+        fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+
+        assert [doc_id for doc_id, _ in fused] == ["b", "a", "d", "c"]
+
+    def test_shards_load_once_per_user_and_track_changes(self):
+        rows = {
+            1: [("e1", "budget meeting with Alice", {"user_id": 1})],
+            2: [("e2", "budget meeting with Bob", {"user_id": 2})],
+        }
+        loader = Mock(side_effect=lambda user_id: rows[user_id])
+        index = LexicalIndex(loader)
+
+        assert [doc_id for doc_id, _ in index.search(1, "budget", 5)] == ["e1"]
+        index.add(["e3"], ["budget review"], [{"user_id": 1}])
+        index.add(["e4"], ["budget review"], [{"user_id": 3}])  # shard not loaded: skipped
+        assert {doc_id for doc_id, _ in index.search(1, "budget", 5)} == {"e1", "e3"}
+        index.remove(["e1"])
+        assert [doc_id for doc_id, _ in index.search(1, "budget alice", 5)] == ["e3"]
+        assert loader.call_count == 1
+
+    def test_least_recently_searched_shard_is_evicted(self):
+        loader = Mock(side_effect=lambda user_id: [(f"d{user_id}", "note", {"user_id": user_id})])
+        index = LexicalIndex(loader, max_shards=2)
+
+        for user_id in (1, 2, 1, 3, 1, 2):
+            index.search(user_id, "note", 5)
+
+        # 2 was evicted by 3, then loaded again
+        assert [c.args[0] for c in loader.call_args_list] == [1, 2, 3, 2]
+
+
+class TestHybridQuery:
+    def test_exact_number_ranks_first(self, store):
+        _ingest(store)
+
+        # The digits are invisible to the embedder, so every dense rank is a tie
+        results = store.hybrid_query("0772123456", 3, {"user_id": 1})
+
+        assert results[0]["content"] == MAILBOX[0]
+        assert results[0]["score"] > results[1]["score"]
+
+    def test_lexical_only_matches_are_fetched(self, store, mock_settings):
+        _ingest(store)
+        mock_settings.RAG_HYBRID_CANDIDATES = 1
+
+        results = store.hybrid_query("alice@example.com", 2, {"user_id": 1})
+
+        contents = [result["content"] for result in results]
+        assert MAILBOX[4] in contents
+        assert all(result["content"] for result in results)
+
+    def test_other_users_documents_are_never_returned(self, store):
+        _ingest(store, user_id=1)
+        _ingest(store, user_id=2, texts=["Missed call from 0799555444"])
+
+        results = store.hybrid_query("0799555444", 5, {"user_id": 1})
+
+        assert all(result["metadata"]["user_id"] == 1 for result in results)
+
+    def test_documents_added_and_deleted_after_first_search(self, store):
+        _ingest(store)
+        store.hybrid_query("invoice", 3, {"user_id": 1})
+
+        _ingest(store, texts=["Parcel tracking number ZX90817 is out for delivery"])
+        assert store.hybrid_query("ZX90817", 1, {"user_id": 1})[0]["content"].startswith("Parcel")
+
+        store.delete_documents({"user_id": 1})
+        assert store.hybrid_query("ZX90817", 1, {"user_id": 1}) == []
+
+    def test_compound_filters(self, store):
+        _ingest(store)
+        store.add_documents(
+            ["Call 0772123456 about the invoice"], [{"source": "calendar", "user_id": 1}]
+        )
+
+        for where in (
+            {"user_id": 1, "source": "email"},
+            {"user_id": {"$eq": 1}, "source": "email"},
+            {"$and": [{"user_id": 1}, {"source": {"$eq": "email"}}]},
+        ):
+            results = store.hybrid_query("0772123456", 3, where)
+
+            assert results and "score" in results[0]  # hybrid, not the vector fallback
+            assert all(result["metadata"]["source"] == "email" for result in results)
+            assert MAILBOX[0] in [result["content"] for result in results]
+
+    def test_without_user_filter_falls_back_to_vector_search(self, store):
+        _ingest(store)
+
+        results = store.hybrid_query("invoice", 2)
+
+        assert len(results) == 2
+        assert "score" not in results[0]
+
+
+class TestPipelineRouting:
+    def test_hybrid_mode_routes_to_hybrid_query(self, mock_chromadb, mock_ollama_embeddings):
+        pipeline = RAGPipeline()
+        pipeline.vector_store = Mock()
+
+        pipeline.query_texts("0772123456", 3, {"user_id": 1}, mode="hybrid")
+        pipeline.query_texts("0772123456", 3, {"user_id": 1})
+
+        pipeline.vector_store.hybrid_query.assert_called_once_with("0772123456", 3, {"user_id": 1})
+        pipeline.vector_store.query_documents.assert_called_once_with(
+            "0772123456", 3, {"user_id": 1}
+        )
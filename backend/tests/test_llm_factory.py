@@ -0,0 +1,171 @@
+from unittest.mock import patch
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from app.services.llm_cassette import (
+    Cassette,
+    CassetteMissError,
+    RecordingChatModel,
+    ReplayChatModel,
+)
+from app.services.llm_factory import create_chat_model
+from app.services.llm_gateway import model_key
+
+
+class FakeSleep:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, seconds):
+        self.calls.append(seconds)
+
+
+class FakeLiveModel(GenericFakeChatModel):
+    """Fake provider client that remembers the model it was copied to."""
+
+    model_name: str = "llama-3.1-8b-instant"
+
+
+PROMPT = [SystemMessage(content="You are an email analyst."), HumanMessage(content="Inbox: 3")]
+
+
+def _recorder(cassette, *replies, model="llama-3.1-8b-instant"):
+    inner = FakeLiveModel(
+        messages=iter([AIMessage(content=reply) for reply in replies]), model_name=model
+    )
+    return RecordingChatModel(
+        inner=inner, provider="groq", model_name=model, temperature=0.1, cassette=cassette
+    )
+
+
+def _replayer(cassette, model="llama-3.1-8b-instant", provider="groq"):
+    return ReplayChatModel(provider=provider, model_name=model, cassette=cassette)
+
+
+class TestRecordReplay:
+    def test_invoke_round_trip(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        recorded = _recorder(Cassette(path), "Two urgent emails").invoke(PROMPT)
+
+        sleep = FakeSleep()
+        replayed = _replayer(Cassette(path, sleep=sleep)).invoke(PROMPT)
+
+        assert recorded.content == replayed.content == "Two urgent emails"
+        assert len(sleep.calls) == 1
+
+    def test_stream_round_trip_keeps_chunks(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        recorded = [c.content for c in _recorder(Cassette(path), "Standup at nine").stream(PROMPT)]
+
+        sleep = FakeSleep()
+        replayed = [c.content for c in _replayer(Cassette(path, sleep=sleep)).stream(PROMPT)]
+
+        assert replayed == recorded
+        assert "".join(replayed) == "Standup at nine"
+        assert len(sleep.calls) == len(replayed)
+
+    def test_latency_is_scaled_and_padded(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        Cassette(path).record("groq", "llama-3.1-8b-instant", PROMPT, AIMessage(content="ok"), 2.0)
+
+        sleep = FakeSleep()
+        _replayer(Cassette(path, latency_scale=0.5, extra_latency=0.25, sleep=sleep)).invoke(PROMPT)
+
+        assert sleep.calls == [pytest.approx(1.25)]
+
+    def test_streamed_replay_waits_for_recorded_first_token(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        Cassette(path).record(
+            "groq",
+            "llama-3.1-8b-instant",
+            PROMPT,
+            AIMessage(content="a b c"),
+            latency=1.2,
+            first_token=0.6,
+            chunks=["a", " b", " c"],
+        )
+
+        sleep = FakeSleep()
+        list(_replayer(Cassette(path, sleep=sleep)).stream(PROMPT))
+
+        assert sleep.calls == [pytest.approx(0.6), pytest.approx(0.3), pytest.approx(0.3)]
+
+    def test_repeated_prompts_replay_in_recorded_order(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        recorder = _recorder(Cassette(path), "first", "second")
+        recorder.invoke(PROMPT)
+        recorder.invoke(PROMPT)
+
+        replayer = _replayer(Cassette(path, sleep=FakeSleep()))
+        answers = [replayer.invoke(PROMPT).content for _ in range(3)]
+
+        assert answers == ["first", "second", "first"]
+
+    def test_replay_prefers_the_requested_model(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        cassette = Cassette(path)
+        cassette.record("groq", "llama-3.1-8b-instant", PROMPT, AIMessage(content="fast"), 0.1)
+        cassette.record("groq", "llama-3.3-70b-versatile", PROMPT, AIMessage(content="capable"), 1)
+
+        replay = Cassette(path, sleep=FakeSleep())
+        capable = _replayer(replay, model="llama-3.3-70b-versatile")
+        assert capable.invoke(PROMPT).content == "capable"
+        assert _replayer(replay).invoke(PROMPT).content == "fast"
+
+    def test_unrecorded_prompt_is_a_miss(self, tmp_path):
+        path = str(tmp_path / "calls.jsonl")
+        _recorder(Cassette(path), "reply").invoke(PROMPT)
+
+        replayer = _replayer(Cassette(path, sleep=FakeSleep()))
+        with pytest.raises(CassetteMissError):
+            replayer.invoke([HumanMessage(content="Something new")])
+        # Prompts are matched per provider too
+        with pytest.raises(CassetteMissError):
+            _replayer(Cassette(path), provider="gemini").invoke(PROMPT)
+
+
+class TestChatModelFactory:
+    def test_wrappers_report_the_model_they_stand_in_for(self, tmp_path):
+        cassette = Cassette(str(tmp_path / "calls.jsonl"))
+
+        assert model_key(_recorder(cassette)) == ("groq", "llama-3.1-8b-instant")
+        assert model_key(_replayer(cassette, "gemini-1.5-flash", "gemini")) == (
+            "gemini",
+            "gemini-1.5-flash",
+        )
+
+    def test_routed_copy_of_recorder_switches_live_model(self, tmp_path):
+        cassette = Cassette(str(tmp_path / "calls.jsonl"))
+        recorder = _recorder(cassette, "reply")
+
+        capable = recorder.model_copy(update={"model_name": "llama-3.3-70b-versatile"})
+        capable.invoke(PROMPT)
+
+        assert capable.inner.model_name == "llama-3.3-70b-versatile"
+        assert recorder.inner.model_name == "llama-3.1-8b-instant"
+        assert cassette.replay("groq", "llama-3.3-70b-versatile", PROMPT)["model"] == (
+            "llama-3.3-70b-versatile"
+        )
+
+    @pytest.mark.parametrize(
+        "backend, expected", [("record", RecordingChatModel), ("replay", ReplayChatModel)]
+    )
+    def test_backend_selects_model(self, mock_settings, backend, expected):
+        mock_settings.LLM_BACKEND = backend
+        with patch("app.services.llm_factory.settings", mock_settings):
+            llm = create_chat_model("groq", "llama-3.1-8b-instant", 0.1, max_tokens=4096)
+
+        assert isinstance(llm, expected)
+        assert (llm.provider, llm.model_name, llm.max_tokens) == (
+            "groq",
+            "llama-3.1-8b-instant",
+            4096,
+        )
+
+    def test_unknown_backend_is_rejected(self, mock_settings):
+        mock_settings.LLM_BACKEND = "mock"
+        with patch("app.services.llm_factory.settings", mock_settings):
+            with pytest.raises(ValueError, match="LLM_BACKEND"):
+                create_chat_model("groq", "llama-3.1-8b-instant", 0.1)
@@ -0,0 +1,400 @@
+import threading
+import time
+from collections import deque
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from app.core.metrics import LLM_CALLS, LLM_QUEUE_WAIT, LLM_RATE_LIMITED
+from app.services.admission import AdmissionRejectedError
+from app.services.llm_gateway import (
+    BACKGROUND,
+    INTERACTIVE,
+    STANDARD,
+    FairQueue,
+    LLMGateway,
+    RateBudget,
+    _Waiter,
+    invoke_llm,
+    llm_context,
+    model_key,
+    stream_llm,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limit exceeded")
+        self.response = Mock(headers={"retry-after": str(retry_after)})
+
+
+class FakeProvider:
+    # Local stand-in for a provider model that enforces its own RPM/TPM
+    # limits over a sliding minute and answers 429 like Groq does
+    provider = "fake"
+    model_name = "fake-model"
+    max_tokens = 150
+
+    def __init__(self, clock, requests_per_minute, tokens_per_minute, tokens_per_call=150):
+        self.clock = clock
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens_per_call = tokens_per_call
+        self.window = deque()
+        self.served = []
+        self.rejected = 0
+        self.peak_requests = 0
+        self._lock = threading.Lock()
+
+    def _admit(self, label):
+        with self._lock:
+            now = self.clock()
+            while self.window and self.window[0][0] <= now - 60:
+                self.window.popleft()
+            used = sum(tokens for _, tokens in self.window)
+            if (
+                len(self.window) >= self.requests_per_minute
+                or (self.tokens_per_minute and used + self.tokens_per_call > self.tokens_per_minute)
+            ):
+                self.rejected += 1
+                retry_after = self.window[0][0] + 60 - now if self.window else 1
+                raise FakeRateLimitError(retry_after)
+            self.window.append((now, self.tokens_per_call))
+            self.peak_requests = max(self.peak_requests, len(self.window))
+            self.served.append(label)
+
+    def _usage(self):
+        return {"input_tokens": 50, "output_tokens": 100, "total_tokens": self.tokens_per_call}
+
+    def invoke(self, messages):
+        self._admit(messages)
+        return AIMessage(content=f"reply to {messages}", usage_metadata=self._usage())
+
+    def stream(self, messages):
+        self._admit(messages)
+        yield AIMessageChunk(content="reply ")
+        yield AIMessageChunk(content=f"to {messages}", usage_metadata=self._usage())
+
+
+def _gateway(clock, rpm, tpm, queue_timeout=600.0):
+    return LLMGateway({"fake": (rpm, tpm)}, queue_timeout=queue_timeout, clock=clock)
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+
+def _advance_until_done(gateway, clock, threads, step=5.0):
+    # Move the fake clock forward until every caller has finished
+    for thread in threads:
+        if thread.ident is None:
+            thread.start()
+    deadline = time.monotonic() + 10
+    while any(thread.is_alive() for thread in threads):
+        assert time.monotonic() < deadline, "calls never completed"
+        time.sleep(0.01)
+        clock.now += step
+        gateway.wake()
+    for thread in threads:
+        thread.join()
+
+
+class TestRateBudget:
+    def test_request_window(self):
+        budget = RateBudget(requests_per_minute=2, tokens_per_minute=0)
+        budget.reserve(10, now=0.0)
+        budget.reserve(10, now=20.0)
+
+        assert budget.delay(10, now=30.0) == pytest.approx(30.0)
+        assert budget.delay(10, now=60.0) == 0
+
+    def test_token_window_settles_actual_usage(self):
+        budget = RateBudget(requests_per_minute=0, tokens_per_minute=1000)
+        first = budget.reserve(600, now=0.0)
+        budget.reserve(300, now=10.0)
+
+        assert budget.delay(300, now=20.0) == pytest.approx(40.0)
+        # The first call used far less than it reserved
+        budget.settle(first, 200)
+        assert budget.delay(300, now=20.0) == 0
+
+    def test_oversized_call_is_clamped_to_budget(self):
+        budget = RateBudget(requests_per_minute=0, tokens_per_minute=1000)
+
+        assert budget.clamp(5000) == 1000
+        assert budget.delay(budget.clamp(5000), now=0.0) == 0
+
+    def test_reserve_keeps_headroom(self):
+        budget = RateBudget(requests_per_minute=5, tokens_per_minute=0)
+        for second in range(4):
+            budget.reserve(10, now=float(second))
+
+        # Background calls may use four of the five requests, chat all five
+        assert budget.delay(10, now=10.0, reserve=0.2) == pytest.approx(50.0)
+        assert budget.delay(10, now=10.0) == 0
+
+    def test_pause(self):
+        budget = RateBudget(requests_per_minute=10, tokens_per_minute=0)
+        budget.pause(15.0)
+
+        assert budget.delay(1, now=5.0) == pytest.approx(10.0)
+
+
+class TestFairQueue:
+    def test_priority_then_round_robin_across_users(self):
+        queue = FairQueue()
+        for waiter in [
+            _Waiter(BACKGROUND, "a"),
+            _Waiter(STANDARD, "a"),
+            _Waiter(STANDARD, "a"),
+            _Waiter(STANDARD, "a"),
+            _Waiter(STANDARD, "b"),
+            _Waiter(INTERACTIVE, "c"),
+        ]:
+            queue.push(waiter)
+
+        order = [(waiter.priority, waiter.user) for waiter in (queue.pop() for _ in range(6))]
+
+        assert order == [
+            (INTERACTIVE, "c"),
+            (STANDARD, "a"),
+            (STANDARD, "b"),
+            (STANDARD, "a"),
+            (STANDARD, "a"),
+            (BACKGROUND, "a"),
+        ]
+        assert len(queue) == 0
+
+    def test_remove(self):
+        queue = FairQueue()
+        first, second = _Waiter(STANDARD, "a"), _Waiter(STANDARD, "b")
+        queue.push(first)
+        queue.push(second)
+        queue.remove(first)
+
+        assert queue.head() is second
+        assert len(queue) == 1
+
+
+class TestLLMGateway:
+    def test_burst_stays_within_provider_limits(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=4, tokens_per_minute=450)
+        gateway = _gateway(clock, rpm=4, tpm=450)
+        results = []
+
+        def call(i):
+            results.append(invoke_llm(provider, f"m{i}", "test_gateway", user_id=i % 3))
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(10)]
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            _advance_until_done(gateway, clock, threads)
+
+        assert len(results) == 10
+        assert provider.rejected == 0
+        # TPM (three 150-token calls a minute) is the binding limit here
+        assert provider.peak_requests <= 3
+
+    def test_fake_provider_rejects_unbudgeted_burst(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=4, tokens_per_minute=450)
+        unlimited = LLMGateway({}, queue_timeout=1.0, clock=clock)
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=unlimited):
+            for i in range(3):
+                invoke_llm(provider, f"m{i}", "test_gateway")
+            with pytest.raises(FakeRateLimitError):
+                invoke_llm(provider, "m3", "test_gateway")
+
+    def test_interactive_calls_overtake_background(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=1, tokens_per_minute=0)
+        gateway = _gateway(clock, rpm=1, tpm=0)
+        threads = []
+
+        def start(label, priority):
+            queued = gateway.stats()["queued"]
+            thread = threading.Thread(
+                target=invoke_llm, args=(provider, label, "test_gateway"), kwargs={"priority": priority}
+            )
+            thread.start()
+            threads.append(thread)
+            _wait_for(lambda: gateway.stats()["queued"] == queued + 1)
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            invoke_llm(provider, "first", "test_gateway")
+            start("background-1", BACKGROUND)
+            start("background-2", BACKGROUND)
+            start("chat", INTERACTIVE)
+            _advance_until_done(gateway, clock, threads, step=20.0)
+
+        assert provider.served == ["first", "chat", "background-1", "background-2"]
+
+    def test_users_share_budget_fairly(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=1, tokens_per_minute=0)
+        gateway = _gateway(clock, rpm=1, tpm=0)
+        threads = []
+
+        def start(label, user):
+            queued = gateway.stats()["queued"]
+            thread = threading.Thread(
+                target=invoke_llm, args=(provider, label, "test_gateway"), kwargs={"user_id": user}
+            )
+            thread.start()
+            threads.append(thread)
+            _wait_for(lambda: gateway.stats()["queued"] == queued + 1)
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            invoke_llm(provider, "first", "test_gateway")
+            for i in range(3):
+                start(f"alice-{i}", "alice")
+            start("bob-0", "bob")
+            _advance_until_done(gateway, clock, threads, step=20.0)
+
+        assert provider.served == ["first", "alice-0", "bob-0", "alice-1", "alice-2"]
+
+    def test_provider_429_pauses_budget_and_retries(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=2, tokens_per_minute=0)
+        # Another process sharing the API key already used the provider limit
+        provider.window.extend([(clock.now, 0), (clock.now, 0)])
+        gateway = _gateway(clock, rpm=2, tpm=0)
+        before = LLM_RATE_LIMITED.value("fake")
+        results = []
+
+        thread = threading.Thread(target=lambda: results.append(invoke_llm(provider, "late", "test_gateway")))
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            _advance_until_done(gateway, clock, [thread])
+
+        assert results[0].content == "reply to late"
+        assert provider.rejected == 1
+        assert LLM_RATE_LIMITED.value("fake") - before == 1
+
+    def test_queue_timeout_rejects_call(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=1, tokens_per_minute=0)
+        gateway = _gateway(clock, rpm=1, tpm=0, queue_timeout=0.0)
+        before = LLM_CALLS.value("test_gateway_timeout", "rejected")
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            invoke_llm(provider, "first", "test_gateway_timeout")
+            with pytest.raises(AdmissionRejectedError) as excinfo:
+                invoke_llm(provider, "second", "test_gateway_timeout")
+
+        assert excinfo.value.retry_after >= 60
+        assert LLM_CALLS.value("test_gateway_timeout", "rejected") - before == 1
+        assert gateway.stats()["queued"] == 0
+
+    def test_stream_goes_through_budget(self):
+        clock = FakeClock()
+        provider = FakeProvider(clock, requests_per_minute=1, tokens_per_minute=0)
+        gateway = _gateway(clock, rpm=1, tpm=0)
+        waited = LLM_QUEUE_WAIT.merged().get(("fake", "interactive"), [0])[-1]
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            text = "".join(stream_llm(provider, "hi", "test_gateway", priority=INTERACTIVE))
+
+        assert text == "reply to hi"
+        assert gateway.stats()["models"]["fake/fake-model"]["tokens"] == 150
+        assert LLM_QUEUE_WAIT.merged()[("fake", "interactive")][-1] == waited + 1
+
+    def test_unlimited_provider_passes_through(self):
+        gateway = LLMGateway({}, queue_timeout=1.0)
+        llm = Mock()
+        llm.invoke.return_value = Mock(content="ok")
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            assert invoke_llm(llm, ["hi"], "test_gateway").content == "ok"
+        assert gateway.stats() == {"queued": 0, "models": {}}
+
+
+class TestCallContext:
+    def _record_priorities(self):
+        gateway = Mock()
+        gateway.acquire.return_value = None
+        return gateway
+
+    def test_context_sets_default_priority_and_user(self):
+        gateway = self._record_priorities()
+        llm = Mock()
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            invoke_llm(llm, ["hi"], "test_gateway")
+            with llm_context(priority=BACKGROUND, user_id=7):
+                invoke_llm(llm, ["hi"], "test_gateway")
+                invoke_llm(llm, ["hi"], "test_gateway", priority=INTERACTIVE)
+
+        calls = [(c.args[2], c.args[3]) for c in gateway.acquire.call_args_list]
+        assert calls == [(None, STANDARD), (7, BACKGROUND), (7, INTERACTIVE)]
+
+    def test_chat_is_interactive(self):
+        from app.services.langgraph.coordinator import LangGraphCoordinator
+
+        gateway = self._record_priorities()
+        coordinator = LangGraphCoordinator()
+        coordinator._llm = Mock()
+        coordinator._llm.invoke.return_value = Mock(content="hello")
+
+        with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+            with llm_context(priority=BACKGROUND):
+                coordinator.general_chat(5, "hi")
+
+        assert gateway.acquire.call_args.args[2:] == (5, INTERACTIVE)
+
+    def test_model_key(self):
+        assert model_key(FakeProvider(FakeClock(), 1, 1)) == ("fake", "fake-model")
+        assert model_key(Mock()) == ("mock", "default")
+
+
+class TestAgentEndpoints:
+    # A call waiting for a gateway slot must not hold up the event loop
+
+    @pytest.mark.parametrize(
+        "endpoint, method, body",
+        [
+            ("chat_with_agent", "general_chat", {"agent_type": "general", "message": "hi"}),
+            ("analyze_document", "analyze_document", {"content": "Invoice due Friday"}),
+        ],
+    )
+    def test_waiting_call_leaves_the_event_loop_free(self, endpoint, method, body):
+        import asyncio
+
+        from app.api.endpoints import agent
+
+        slot_free = threading.Event()
+
+        def wait_for_slot(*args, **kwargs):
+            # Like LLMGateway.acquire: blocks until another request lets it in
+            if not slot_free.wait(timeout=5):
+                raise TimeoutError("the event loop was blocked")
+            return "ok"
+
+        coordinator = Mock()
+        getattr(coordinator, method).side_effect = wait_for_slot
+
+        async def scenario():
+            call = asyncio.create_task(getattr(agent, endpoint)(body, current_user=Mock(id=1)))
+            await asyncio.sleep(0.05)  # runs only if the call yields the loop
+            slot_free.set()
+            return await call
+
+        with patch("app.api.endpoints.agent.get_langgraph_coordinator", return_value=coordinator):
+            result = asyncio.run(scenario())
+
+        assert result["status"] == "success"
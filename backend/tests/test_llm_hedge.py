@@ -0,0 +1,173 @@
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessageChunk
+
+from app.core.metrics import LLM_HEDGES
+from app.services.llm_gateway import LLMGateway
+from app.services.llm_hedge import MIN_SAMPLES, LLMHedger, hedged_invoke
+
+
+class FakeStreamingProvider:
+    """Streams a fixed reply after a per-call first-token latency."""
+
+    max_tokens = 128
+
+    def __init__(self, provider, latencies, reply="ok", error=None):
+        self.provider = provider
+        self.model_name = f"{provider}-model"
+        self.latencies = latencies  # callable(call index) -> seconds
+        self.reply = reply
+        self.error = error
+        self.calls = 0
+        self.finished = 0
+        self.cancelled = 0
+        self.closed = threading.Event()
+        self._lock = threading.Lock()
+
+    def stream(self, messages):
+        with self._lock:
+            index = self.calls
+            self.calls += 1
+        completed = False
+        try:
+            time.sleep(self.latencies(index))
+            if self.error is not None:
+                raise self.error
+            for position, word in enumerate(self.reply.split(" ")):
+                yield AIMessageChunk(content=word if position == 0 else " " + word)
+            completed = True
+        finally:
+            with self._lock:
+                if completed:
+                    self.finished += 1
+                else:
+                    self.cancelled += 1
+            self.closed.set()
+
+    def invoke(self, messages):
+        time.sleep(self.latencies(self.calls))
+        self.calls += 1
+        return Mock(content=self.reply)
+
+
+def _fixed(seconds):
+    return lambda index: seconds
+
+
+@pytest.fixture(autouse=True)
+def gateway():
+    gateway = LLMGateway({}, queue_timeout=1.0)
+    with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway), patch(
+        "app.services.llm_hedge.get_llm_gateway", return_value=gateway
+    ):
+        yield gateway
+
+
+def _hedger(backup, max_ratio=0.1, min_delay=0.02):
+    return LLMHedger(
+        percentile=95, min_delay=min_delay, max_ratio=max_ratio, backups=lambda llm: backup
+    )
+
+
+def _p99(samples):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+
+
+def test_hedging_cuts_p99_latency():
+    # 4% of primary calls stall for 300ms before the first token
+    primary = FakeStreamingProvider("primary", lambda i: 0.3 if i % 25 == 7 else 0.005)
+    backup = FakeStreamingProvider("backup", _fixed(0.02))
+    hedger = _hedger(backup, min_delay=0.05)
+
+    unhedged = []
+    for _ in range(100):
+        started = time.monotonic()
+        list(primary.stream("x"))
+        unhedged.append(time.monotonic() - started)
+
+    for _ in range(MIN_SAMPLES):
+        hedger.observe("primary", 0.005)
+    hedged = []
+    for _ in range(100):
+        started = time.monotonic()
+        assert hedger.invoke(primary, "x", "test_hedge").content == "ok"
+        hedged.append(time.monotonic() - started)
+
+    assert _p99(unhedged) >= 0.3
+    assert _p99(hedged) < 0.15
+    # Only the stalled calls were duplicated
+    assert backup.calls == 4
+
+
+def test_loser_stream_is_cancelled():
+    primary = FakeStreamingProvider("primary", _fixed(0.3), reply="slow reply")
+    backup = FakeStreamingProvider("backup", _fixed(0.01), reply="fast reply")
+    hedger = _hedger(backup)
+    for _ in range(MIN_SAMPLES):
+        hedger.observe("primary", 0.01)
+    before = LLM_HEDGES.value("test_hedge_cancel", "backup_won")
+
+    assert hedger.invoke(primary, "x", "test_hedge_cancel").content == "fast reply"
+
+    assert primary.closed.wait(2.0)
+    assert (primary.finished, primary.cancelled) == (0, 1)
+    assert LLM_HEDGES.value("test_hedge_cancel", "backup_won") - before == 1
+
+
+def test_duplicate_spend_is_capped():
+    primary = FakeStreamingProvider("primary", _fixed(0.1))
+    backup = FakeStreamingProvider("backup", _fixed(0.01))
+    hedger = _hedger(backup, max_ratio=0.0)
+    for _ in range(MIN_SAMPLES):
+        hedger.observe("primary", 0.01)
+    before = LLM_HEDGES.value("test_hedge_cap", "capped")
+
+    for _ in range(3):
+        hedger.invoke(primary, "x", "test_hedge_cap")
+
+    # The one saved-up credit is spent, then every late call waits for the primary
+    assert backup.calls == 1
+    assert LLM_HEDGES.value("test_hedge_cap", "capped") - before == 2
+
+
+def test_primary_error_falls_back_to_other_provider():
+    primary = FakeStreamingProvider("primary", _fixed(0), error=RuntimeError("provider down"))
+    backup = FakeStreamingProvider("backup", _fixed(0.01), reply="from backup")
+    hedger = _hedger(backup, max_ratio=0.0)
+    hedger._credits = 0.0  # fallbacks do not need hedge credit
+    before = LLM_HEDGES.value("test_hedge_fallback", "fallback")
+
+    assert hedger.invoke(primary, "x", "test_hedge_fallback").content == "from backup"
+    assert LLM_HEDGES.value("test_hedge_fallback", "fallback") - before == 1
+
+
+def test_error_raised_when_both_providers_fail():
+    primary = FakeStreamingProvider("primary", _fixed(0), error=RuntimeError("primary down"))
+    backup = FakeStreamingProvider("backup", _fixed(0), error=RuntimeError("backup down"))
+
+    with pytest.raises(RuntimeError, match="backup down"):
+        _hedger(backup).invoke(primary, "x", "test_hedge_failed")
+
+
+def test_delay_follows_recent_first_token_percentile():
+    hedger = _hedger(None)
+    assert hedger.hedge_delay("primary") == 5.0  # not enough samples yet
+
+    for i in range(100):
+        hedger.observe("primary", (i + 1) / 100)
+
+    assert hedger.hedge_delay("primary") == pytest.approx(0.96)
+
+
+def test_without_backup_or_when_disabled_the_call_is_not_hedged(mock_settings):
+    llm = FakeStreamingProvider("primary", _fixed(0), reply="direct")
+
+    assert _hedger(None).invoke(llm, "x", "test_hedge").content == "direct"
+    with patch("app.services.llm_hedge.settings", mock_settings):
+        mock_settings.LLM_HEDGING_ENABLED = False
+        assert hedged_invoke(llm, "x", "test_hedge").content == "direct"
+    assert llm.calls == 2 and llm.finished == 0
@@ -0,0 +1,219 @@
+import logging
+import random
+from unittest.mock import Mock, patch
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from app.core.metrics import LLM_ROUTE_DECISIONS
+from app.services.llm_gateway import LLMGateway
+from app.services.llm_router import MODEL_PROFILES, ModelRouter, route_invoke
+
+FAST = "llama-3.1-8b-instant"
+CAPABLE = "llama-3.3-70b-versatile"
+SHORT = "What's on today?"
+LONG = "Summarize this thread:\n" + "The quarterly report is due next week. " * 40
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after=20):
+        super().__init__("rate limit exceeded")
+        self.response = Mock(headers={"retry-after": str(retry_after)})
+
+
+class SimulatedProvider:
+    """Fake provider whose models answer after a latency drawn from a distribution.
+
+    Each call advances the shared fake clock by the sampled latency, so a
+    simulation of hundreds of calls runs instantly.
+    """
+
+    def __init__(self, seed=7):
+        self.clock = FakeClock()
+        self.rng = random.Random(seed)
+        self.latency = {}
+        self.failing = {}
+        self.calls = []
+
+    def set_latency(self, model, median, spread=0.25):
+        self.latency[model] = lambda: self.rng.lognormvariate(0, spread) * median
+
+    def answer(self, model, messages):
+        error = self.failing.get(model)
+        if error is not None:
+            raise error
+        started = self.clock.now
+        self.clock.now += self.latency[model]()
+        self.calls.append((model, self.clock.now - started))
+        return model
+
+
+class SimulatedModel:
+    provider = "fake"
+    max_tokens = 256
+
+    def __init__(self, world, model_name):
+        self.world = world
+        self.model_name = model_name
+
+    def model_copy(self, update):
+        return SimulatedModel(self.world, update["model_name"])
+
+    def invoke(self, messages):
+        return AIMessage(content=self.world.answer(self.model_name, messages))
+
+    def stream(self, messages):
+        model = self.world.answer(self.model_name, messages)
+        yield AIMessageChunk(content=model)
+        yield AIMessageChunk(content=" done")
+
+
+@pytest.fixture
+def world():
+    world = SimulatedProvider()
+    world.set_latency(FAST, 0.6)
+    world.set_latency(CAPABLE, 2.0)
+    return world
+
+
+@pytest.fixture
+def router(world):
+    gateway = LLMGateway({}, queue_timeout=1.0, clock=world.clock)
+    with patch("app.services.llm_gateway.get_llm_gateway", return_value=gateway):
+        yield ModelRouter(
+            (FAST, CAPABLE),
+            provider="fake",
+            small_prompt_tokens=100,
+            cooldown_seconds=30.0,
+            budgets={"chat": 3.0, "briefing": 20.0},
+            clock=world.clock,
+            gateway=gateway,
+        )
+
+
+def _chat(router, world, prompt=SHORT, node="test_route"):
+    return router.invoke("chat", SimulatedModel(world, CAPABLE), prompt, node).content
+
+
+class TestRoutingDecisions:
+    def test_prompt_size_picks_model(self, router, world):
+        assert _chat(router, world, SHORT) == FAST
+        assert _chat(router, world, LONG) == CAPABLE
+
+    def test_model_without_room_for_prompt_is_skipped(self, router, world):
+        with patch.dict(MODEL_PROFILES, {FAST: (50, 0.8)}):
+            candidates, reason = router.plan("chat", 60, 0)
+
+        assert [model for model, _ in candidates] == [CAPABLE]
+        assert reason == "context"
+
+    def test_over_budget_tries_fastest_first(self, router, world):
+        router.budgets["chat"] = 0.1
+        candidates, reason = router.plan("chat", 500, 0)
+
+        assert reason == "over_budget"
+        assert [model for model, _ in candidates] == [FAST, CAPABLE]
+
+    def test_decisions_logged_and_counted(self, router, world, caplog):
+        before = LLM_ROUTE_DECISIONS.value("chat", FAST, "preferred")
+
+        with caplog.at_level(logging.INFO, logger="app.services.llm_router"):
+            _chat(router, world, node="test_route_log")
+
+        assert LLM_ROUTE_DECISIONS.value("chat", FAST, "preferred") - before == 1
+        assert f"LLM route chat/test_route_log: {FAST} (preferred)" in caplog.text
+
+    def test_unrouted_models_are_invoked_as_given(self, router):
+        llm = Mock()
+        llm.invoke.return_value = Mock(content="as given")
+
+        assert router.invoke("chat", llm, SHORT, "test_route").content == "as given"
+
+    def test_routing_can_be_disabled(self, world):
+        llm = SimulatedModel(world, CAPABLE)
+        with patch("app.services.llm_router.settings") as mock_settings, patch(
+            "app.services.llm_gateway.get_llm_gateway", return_value=LLMGateway({}, 1.0)
+        ):
+            mock_settings.LLM_ROUTING_ENABLED = False
+            assert route_invoke("chat", llm, SHORT, "test_route").content == CAPABLE
+
+
+class TestSimulation:
+    def test_slow_fast_model_is_avoided_then_retried(self, router, world):
+        # Healthy: short chat turns go to the fast model
+        for _ in range(30):
+            _chat(router, world)
+        assert {model for model, _ in world.calls} == {FAST}
+
+        # The fast model degrades well past the 3s chat budget
+        world.set_latency(FAST, 6.0)
+        world.calls.clear()
+        for _ in range(100):
+            _chat(router, world)
+        slow_calls = sum(1 for model, _ in world.calls if model == FAST)
+        latencies = sorted(latency for _, latency in world.calls)
+        assert slow_calls <= 10
+        assert latencies[49] < 3.0
+        # Only the occasional probe of the slow model and the capable model's
+        # tail go over budget, instead of every call
+        assert sum(1 for latency in latencies if latency > 3.0) <= 15
+
+        # Once it recovers and the slow observations have decayed, it is used again
+        world.set_latency(FAST, 0.6)
+        world.clock.now += 600
+        world.calls.clear()
+        for _ in range(20):
+            _chat(router, world)
+        assert sum(1 for model, _ in world.calls if model == FAST) >= 18
+
+    def test_rate_limited_model_falls_back_on_same_call(self, router, world):
+        before = LLM_ROUTE_DECISIONS.value("chat", CAPABLE, "fallback")
+        world.failing[FAST] = FakeRateLimitError(retry_after=20)
+
+        assert _chat(router, world) == CAPABLE
+        assert LLM_ROUTE_DECISIONS.value("chat", CAPABLE, "fallback") - before == 1
+
+        # Cooling down for the Retry-After: later calls skip it up front
+        world.failing.pop(FAST)
+        candidates, reason = router.plan("chat", 10, 0)
+        assert (candidates[0][0], reason) == (CAPABLE, "cooling")
+
+        world.clock.now += 25
+        assert _chat(router, world) == FAST
+
+    def test_last_candidate_error_propagates(self, router, world):
+        world.failing[FAST] = RuntimeError("fast down")
+        world.failing[CAPABLE] = RuntimeError("capable down")
+
+        with pytest.raises(RuntimeError, match="capable down"):
+            _chat(router, world)
+
+    def test_stream_falls_back_before_first_chunk(self, router, world):
+        world.failing[FAST] = FakeRateLimitError()
+
+        llm = SimulatedModel(world, CAPABLE)
+        chunks = list(router.stream("chat", llm, SHORT, "test_route"))
+
+        assert "".join(chunks) == f"{CAPABLE} done"
+
+    def test_briefing_route_has_its_own_latency_history(self, router, world):
+        world.set_latency(FAST, 6.0)
+        for _ in range(5):
+            router.invoke("briefing", SimulatedModel(world, CAPABLE), SHORT, "test_route")
+
+        # 6s is fine for a briefing call but not for chat
+        assert router.plan("briefing", 10, 0)[0][0][0] == FAST
+        assert router.plan("chat", 10, 0)[0][0][0] == FAST
+        for _ in range(5):
+            _chat(router, world)
+        assert router.plan("chat", 10, 0)[0][0][0] == CAPABLE
@@ -0,0 +1,126 @@
+import threading
+from unittest.mock import Mock, patch
+
+from app.core.metrics import (
+    BACKBOARD_RATE_LIMITED,
+    BACKBOARD_RETRIES,
+    LLM_CALLS,
+    LLM_TOKENS,
+    MetricsRegistry,
+    record_llm_response,
+    track_calls,
+)
+from app.services.backboard import BackboardService
+from app.services.llm_gateway import invoke_llm
+
+
+class TestCollectors:
+    def test_counter_merges_thread_shards(self):
+        registry = MetricsRegistry()
+        counter = registry.counter("test_events", "Events.", ("kind",))
+
+        def work():
+            for _ in range(1000):
+                counter.labels("a").inc()
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Each thread wrote its own shard; the scrape sums them
+        assert counter.value("a") == 4000
+        assert 'test_events_total{kind="a"} 4000' in registry.render()
+
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram("test_latency", "Latency.", buckets=(0.1, 1.0))
+
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+
+        text = registry.render()
+        assert 'test_latency_bucket{le="0.1"} 1' in text
+        assert 'test_latency_bucket{le="1"} 3' in text
+        assert 'test_latency_bucket{le="+Inf"} 4' in text
+        assert "test_latency_count 4" in text
+
+    def test_duplicate_registration_rejected(self):
+        registry = MetricsRegistry()
+        registry.counter("test_dup", "Dup.")
+
+        try:
+            registry.counter("test_dup", "Dup.")
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("duplicate metric name was accepted")
+
+    def test_track_calls_counts_errors(self):
+        registry = MetricsRegistry()
+        duration = registry.histogram("test_call_seconds", "Calls.", ("operation",))
+        calls = registry.counter("test_calls", "Calls.", ("operation", "status"))
+
+        @track_calls(duration, calls, "fetch")
+        def fetch(fail):
+            if fail:
+                raise RuntimeError("boom")
+            return "ok"
+
+        fetch(False)
+        try:
+            fetch(True)
+        except RuntimeError:
+            pass
+
+        assert calls.value("fetch", "ok") == 1
+        assert calls.value("fetch", "error") == 1
+        assert duration.merged()[("fetch",)][-1] == 2
+
+
+class TestInstrumentation:
+    def test_llm_tokens_recorded_per_node(self):
+        before = LLM_TOKENS.value("test_node", "completion")
+        llm = Mock()
+        llm.invoke.return_value = Mock(usage_metadata={"input_tokens": 12, "output_tokens": 30})
+
+        invoke_llm(llm, ["hi"], "test_node")
+
+        assert LLM_TOKENS.value("test_node", "completion") - before == 30
+        assert LLM_CALLS.value("test_node", "ok") >= 1
+
+    def test_mock_response_without_usage_is_ignored(self):
+        # Responses without usage metadata still count the call
+        record_llm_response("test_mock_node", Mock(), 0.0)
+        assert LLM_TOKENS.value("test_mock_node", "prompt") == 0
+
+    @patch("time.sleep")
+    @patch("requests.post")
+    def test_backboard_rate_limit_counted(self, mock_post, mock_sleep):
+        limited = Mock(status_code=429, headers={"Retry-After": "1"}, text="slow down")
+        ok = Mock(status_code=200)
+        ok.json.return_value = {"document_id": "doc_1"}
+        mock_post.side_effect = [limited, ok]
+        before_limited = BACKBOARD_RATE_LIMITED.value()
+        before_retries = BACKBOARD_RETRIES.value("rate_limited")
+
+        BackboardService(api_key="espr_test").add_document(
+            content="Test", metadata={"user_id": 1, "source": "test"}
+        )
+
+        assert BACKBOARD_RATE_LIMITED.value() - before_limited == 1
+        assert BACKBOARD_RETRIES.value("rate_limited") - before_retries == 1
+
+
+class TestMetricsEndpoint:
+    def test_metrics_endpoint_exposes_route_latency(self, client):
+        client.get("/")
+
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'route="/"' in response.text
+        assert "londoolink_process_resident_memory_bytes" in response.text
+        assert "# TYPE londoolink_llm_calls counter" in response.text
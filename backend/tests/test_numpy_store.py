@@ -0,0 +1,257 @@
+import math
+import os
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.rag.numpy_store import NumpyVectorStore
+from app.services.rag.pipeline import RAGPipeline
+from app.services.rag.vector_store import VectorStore, create_vector_store
+
+WORDS = ["invoice", "dinner", "flight", "contract", "meeting", "payment", "travel", "lunch"]
+
+
+def _vector(text):
+    # One axis per known word, so the ranking of each query is known
+    words = text.lower().split()
+    vector = [float(words.count(word)) for word in WORDS] + [0.1]
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector]
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        return _vector(text)
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [_vector(text) for text in texts]
+
+
+@pytest.fixture
+def embedder():
+    embedder = FakeEmbedder()
+    with (
+        patch("app.services.rag.numpy_store.embedding_manager", embedder),
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+    ):
+        yield embedder
+
+
+@pytest.fixture
+def open_store(mock_settings, embedder, tmp_path):
+    # Opens the store at tmp_path; called again it simulates a restart
+    def open_store(dtype="float32"):
+        with patch("app.services.rag.vector_store.settings", mock_settings):
+            return NumpyVectorStore(path=str(tmp_path), dtype=dtype)
+
+    return open_store
+
+
+@pytest.fixture
+def store(open_store):
+    return open_store()
+
+
+def _add(store, texts, user_id=1, **metadata):
+    return store.add_documents(
+        list(texts), [{"user_id": user_id, **metadata} for _ in texts]
+    )
+
+
+class TestNumpyVectorStore:
+    def test_ranks_by_cosine_similarity(self, store):
+        ids = _add(store, ["dinner on friday", "invoice invoice due", "invoice and payment"])
+
+        results = store.query_documents("invoice", n_results=2, filter_metadata={"user_id": 1})
+
+        assert [result["id"] for result in results] == [ids[1], ids[2]]
+        assert set(results[0]) == {"id", "content", "metadata", "distance"}
+        assert results[0]["content"] == "invoice invoice due"
+        assert results[0]["metadata"]["user_id"] == 1
+        assert "added_at" in results[0]["metadata"]
+        # Squared L2 distance between unit vectors: 2 - 2 * cosine
+        expected = 2 - 2 * float(np.dot(_vector("invoice"), _vector("invoice invoice due")))
+        assert results[0]["distance"] == pytest.approx(expected, abs=1e-5)
+
+    def test_where_filters_and_user_isolation(self, store):
+        _add(store, ["invoice from acme"], user_id=1, source="email")
+        _add(store, ["invoice reminder"], user_id=1, source="calendar")
+        _add(store, ["invoice for bob"], user_id=2, source="email")
+
+        def contents(where):
+            return sorted(r["content"] for r in store.query_documents("invoice", 10, where))
+
+        assert contents({"user_id": 1}) == ["invoice from acme", "invoice reminder"]
+        assert contents({"user_id": 2}) == ["invoice for bob"]
+        assert contents({"$and": [{"user_id": 1}, {"source": "email"}]}) == [
+            "invoice from acme"
+        ]
+        assert contents({"$and": [{"user_id": 1}, {"source": {"$ne": "email"}}]}) == [
+            "invoice reminder"
+        ]
+        assert contents({"source": {"$in": ["email"]}}) == ["invoice for bob", "invoice from acme"]
+        assert contents({"$or": [{"user_id": 2}, {"source": "calendar"}]}) == [
+            "invoice for bob",
+            "invoice reminder",
+        ]
+        assert contents({"user_id": 3}) == []
+
+    def test_query_many_returns_results_in_query_order(self, store, embedder):
+        _add(store, ["flight to kampala", "lunch with sam"])
+        embedder.calls = 0
+
+        results = store.query_many(["lunch", "flight"], 1, {"user_id": 1})
+
+        assert [r[0]["content"] for r in results] == ["lunch with sam", "flight to kampala"]
+        assert embedder.calls == 1
+
+    def test_upsert_and_delete(self, store):
+        _add(store, ["invoice draft"], source="email")
+        store.add_documents(["invoice final"], [{"user_id": 1, "source": "email"}], ids=["doc"])
+        store.add_documents(["invoice replaced"], [{"user_id": 1, "source": "chat"}], ids=["doc"])
+
+        results = store.query_documents("invoice", 10, {"user_id": 1})
+        assert sorted(r["content"] for r in results) == ["invoice draft", "invoice replaced"]
+        assert store.delete_documents({"source": "email"}) == 1
+        assert [r["content"] for r in store.get_all_documents()] == ["invoice replaced"]
+        assert store.get_stats()["total_documents"] == 1
+
+    def test_compacts_once_half_the_rows_are_dead(self, store):
+        _add(store, [f"meeting {i}" for i in range(6)], source="a")
+        _add(store, ["payment"], source="b")
+        index = store._index(1)
+
+        store.delete_documents({"$and": [{"user_id": 1}, {"source": "a"}]})
+
+        assert index.count == 1 and index.dead == 0
+        assert os.path.getsize(index._vectors_path) == index.matrix.nbytes
+        assert [r["content"] for r in store.query_documents("payment", 5, {"user_id": 1})] == [
+            "payment"
+        ]
+
+    def test_query_racing_a_compacting_delete(self, store):
+        _add(store, [f"meeting {i}" for i in range(6)], source="a")
+        ids = _add(store, ["payment"], source="b")
+        index = store._index(1)
+        search = index.search
+
+        def search_then_delete(*args):
+            # A delete on another thread gets the lock as soon as search lets go
+            found = search(*args)
+            store.delete_documents({"$and": [{"user_id": 1}, {"source": "a"}]})
+            return found
+
+        with patch.object(index, "search", search_then_delete):
+            results = store.query_documents("payment", 1, {"user_id": 1})
+
+        assert index.count == 1  # compacted: "payment" moved from row 6 to row 0
+        assert [(r["id"], r["content"]) for r in results] == [(ids[0], "payment")]
+
+    def test_deleting_a_users_documents_drops_their_index(self, store):
+        _add(store, ["invoice one", "invoice two"], user_id=1)
+        _add(store, ["invoice three"], user_id=2)
+
+        assert store.delete_documents({"user_id": 1}) == 2
+
+        assert not os.path.exists(store._directory(1))
+        assert store.query_documents("invoice", 5, {"user_id": 1}) == []
+        assert store.get_stats()["users"] == 1
+        _add(store, ["invoice again"], user_id=1)
+        assert len(store.query_documents("invoice", 5, {"user_id": 1})) == 1
+
+    def test_restart_memory_maps_the_index_without_reembedding(self, open_store, embedder):
+        store = open_store()
+        ids = _add(store, ["dinner tonight", "invoice overdue", "flight booked"])
+        _add(store, ["lunch cancelled"], source="chat")
+        store.delete_documents({"$and": [{"user_id": 1}, {"source": "chat"}]})
+        store.add_documents(["travel plans"], [{"user_id": 1}], ids=[ids[0]])
+        embedder.calls = 0
+
+        restarted = open_store()
+        index = restarted._index(1)
+
+        assert embedder.calls == 0
+        assert isinstance(index.matrix, np.memmap)
+        assert sorted(r["content"] for r in restarted.get_all_documents()) == [
+            "flight booked",
+            "invoice overdue",
+            "travel plans",
+        ]
+        assert restarted.query_documents("travel", 1, {"user_id": 1})[0]["id"] == ids[0]
+
+        _add(restarted, ["payment sent"])
+        assert restarted.query_documents("payment", 1, {"user_id": 1})[0]["content"] == (
+            "payment sent"
+        )
+        assert len(open_store().get_all_documents()) == 4
+
+    def test_torn_write_is_dropped_on_restart(self, open_store):
+        store = open_store()
+        _add(store, ["invoice kept"])
+        index = store._index(1)
+        with open(index._records_path, "a") as f:
+            f.write('{"id": "torn", "document": "inv')
+        with open(index._vectors_path, "ab") as f:
+            f.write(b"\0" * 7)
+
+        restarted = open_store()
+        _add(restarted, ["dinner added"])
+
+        assert sorted(r["content"] for r in open_store().get_all_documents()) == [
+            "dinner added",
+            "invoice kept",
+        ]
+
+    def test_float16_storage(self, open_store):
+        store = open_store(dtype="float16")
+        _add(store, ["invoice due", "dinner booked", "flight delayed"])
+
+        assert store._index(1).matrix.dtype == np.float16
+        assert store.query_documents("dinner", 1, {"user_id": 1})[0]["content"] == "dinner booked"
+        assert open_store().query_documents("flight", 1, {"user_id": 1})[0]["content"] == (
+            "flight delayed"
+        )
+
+    def test_hybrid_query(self, store, mock_settings):
+        _add(store, ["Missed call from 0772123456", "Missed call from 0701998877"])
+
+        with patch("app.services.rag.vector_store.settings", mock_settings):
+            results = store.hybrid_query("0772123456", 1, {"user_id": 1})
+
+        assert results[0]["content"] == "Missed call from 0772123456"
+        assert "score" in results[0]
+
+    def test_pipeline_on_numpy_backend(self, store):
+        pipeline = RAGPipeline()
+        pipeline.vector_store = store
+
+        pipeline.add_text("The invoice from ACME is due on Friday.", {"user_id": 7})
+
+        results = pipeline.query_texts("invoice", 3, {"user_id": 7})
+        assert results[0]["metadata"]["user_id"] == 7
+        assert pipeline.delete_documents({"user_id": 7}) == 1
+
+
+class TestBackendSelection:
+    def test_numpy_backend(self, mock_settings, tmp_path):
+        mock_settings.VECTOR_STORE_BACKEND = "numpy"
+        mock_settings.NUMPY_INDEX_PATH = str(tmp_path)
+        with (
+            patch("app.services.rag.vector_store.settings", mock_settings),
+            patch("app.services.rag.numpy_store.settings", mock_settings),
+        ):
+            store = create_vector_store()
+
+        assert isinstance(store, NumpyVectorStore)
+        assert store.path == str(tmp_path)
+
+    def test_chroma_is_the_default(self, mock_chromadb, mock_ollama_embeddings, mock_settings):
+        with patch("app.services.rag.vector_store.settings", mock_settings):
+            store = create_vector_store()
+
+        assert type(store) is VectorStore
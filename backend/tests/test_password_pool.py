@@ -0,0 +1,179 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import status
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from app.models.user import User
+from app.security.password import (
+    PasswordHashBusyError,
+    PasswordHashPool,
+    hash_password_async,
+    verify_and_update_password,
+    verify_password,
+    verify_password_async,
+)
+from app.services.step_up import StepUpService
+
+
+def _legacy_hash(password: str) -> str:
+    # Hash produced with cheaper Argon2 parameters than the configured ones
+    return PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8192),)).hash(password)
+
+
+class TestAsyncPasswordApi:
+    def test_hash_and_verify_roundtrip(self):
+        async def _run():
+            hashed = await hash_password_async("s3cret-password")
+            return (
+                hashed,
+                await verify_password_async("s3cret-password", hashed),
+                await verify_password_async("wrong-password", hashed),
+            )
+
+        hashed, ok, bad = asyncio.run(_run())
+
+        assert hashed.startswith("$argon2")
+        assert ok is True
+        assert bad is False
+        # Async hashes stay compatible with the sync API
+        assert verify_password("s3cret-password", hashed) is True
+
+    def test_verify_and_update_rehashes_on_parameter_change(self):
+        old_hash = _legacy_hash("rotate-me")
+
+        valid, updated = verify_and_update_password("rotate-me", old_hash)
+
+        assert valid is True
+        assert updated is not None and updated != old_hash
+        assert verify_and_update_password("rotate-me", updated) == (True, None)
+
+    def test_event_loop_stays_responsive_during_burst(self):
+        async def _run():
+            hashed = await hash_password_async("burst-password")
+            gaps = []
+            stop = asyncio.Event()
+
+            async def heartbeat():
+                last = time.perf_counter()
+                while not stop.is_set():
+                    await asyncio.sleep(0.005)
+                    now = time.perf_counter()
+                    gaps.append(now - last)
+                    last = now
+
+            beat = asyncio.create_task(heartbeat())
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(verify_password_async("burst-password", hashed) for _ in range(8))
+            )
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await beat
+            return max(gaps), elapsed
+
+        max_gap, elapsed = asyncio.run(_run())
+
+        assert max_gap < elapsed / 2
+
+
+class TestPasswordHashPool:
+    def test_rejects_when_queue_is_full(self):
+        release = threading.Event()
+        pool = PasswordHashPool(max_workers=1, max_pending=1)
+
+        async def _run():
+            blocker = asyncio.create_task(pool.run(release.wait))
+            await asyncio.sleep(0.05)  # let the worker pick up the blocking job
+            waiting = asyncio.create_task(pool.run(lambda: "queued"))
+            await asyncio.sleep(0)
+            with pytest.raises(PasswordHashBusyError):
+                await pool.run(lambda: "rejected")
+            stats = pool.stats()
+            release.set()
+            await blocker
+            assert await waiting == "queued"
+            return stats
+
+        try:
+            stats = asyncio.run(_run())
+        finally:
+            release.set()
+            pool.shutdown()
+
+        assert stats["in_flight"] == 1
+        assert stats["queued"] == 1
+        assert stats["rejected"] == 1
+        assert pool.stats()["completed"] == 2
+
+
+class TestLoginRehash:
+    def test_login_upgrades_legacy_hash(self, client, db_session):
+        legacy = _legacy_hash("legacy-password")
+        user = User(email="legacy@example.com", hashed_password=legacy, is_active=True)
+        db_session.add(user)
+        db_session.commit()
+
+        response = client.post(
+            "/api/v1/auth/login",
+            json={"email": "legacy@example.com", "password": "legacy-password"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        db_session.refresh(user)
+        assert user.hashed_password != legacy
+        assert verify_password("legacy-password", user.hashed_password) is True
+
+    def test_login_returns_503_when_pool_is_saturated(self, client, test_user):
+        with patch(
+            "app.api.endpoints.auth.verify_and_update_password_async",
+            side_effect=PasswordHashBusyError("full"),
+        ):
+            response = client.post(
+                "/api/v1/auth/login",
+                json={"email": test_user.email, "password": "testpassword123"},
+            )
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+    @pytest.mark.parametrize(
+        "path, body",
+        [
+            ("/api/v1/2fa/enable", {"password": "testpassword123"}),
+            ("/api/v1/2fa/disable", {"password": "testpassword123", "code": "123456"}),
+        ],
+    )
+    def test_two_factor_returns_503_when_pool_is_saturated(
+        self, client, auth_headers, path, body
+    ):
+        with patch(
+            "app.api.endpoints.two_factor.verify_password_async",
+            side_effect=PasswordHashBusyError("full"),
+        ):
+            response = client.post(path, json=body, headers=auth_headers)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
+
+    def test_step_up_returns_503_when_pool_is_saturated(self, client, auth_headers, test_user):
+        challenge = client.post("/api/v1/step-up/challenge", headers=auth_headers).json()
+        with (
+            patch.object(StepUpService, "_get_user", return_value=test_user),
+            patch(
+                "app.services.step_up.verify_password_async",
+                side_effect=PasswordHashBusyError("full"),
+            ),
+        ):
+            response = client.post(
+                "/api/v1/step-up/verify",
+                json={"challenge_id": challenge["challenge_id"], "credential": "testpassword123"},
+                headers=auth_headers,
+            )
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,161 @@
+from unittest.mock import Mock, patch
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from app.core.metrics import RESPONSE_CACHE, RESPONSE_CACHE_SAVED_SECONDS
+from app.services.langgraph.coordinator import LangGraphCoordinator
+from app.services.response_cache import ResponseCache, cached_response
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _llm(model="llama-3.1-8b-instant", temperature=0.1):
+    return Mock(model_name=model, temperature=temperature, provider="groq")
+
+
+def _cache(clock=None, path=":memory:", **kwargs):
+    kwargs.setdefault("max_entries", 100)
+    kwargs.setdefault("ttls", {"document": 600.0, "chat": 60.0})
+    return ResponseCache(path, clock=clock or FakeClock(), **kwargs)
+
+
+def _coordinator(*replies):
+    coordinator = LangGraphCoordinator()
+    coordinator._llm = GenericFakeChatModel(
+        messages=iter([AIMessage(content=reply) for reply in replies])
+    )
+    return coordinator
+
+
+class TestResponseCache:
+    def test_exact_hit_ignores_whitespace(self):
+        cache = _cache()
+        llm = _llm()
+        cache.put("document", "document_analysis", 1, llm, "Analyze:\n\nhello  world", "A", 1.5)
+
+        assert cache.get("document", "document_analysis", 1, llm, " Analyze: hello world") == "A"
+        assert cache.get("document", "document_analysis", 1, llm, "Analyze: hello") is None
+
+    def test_model_and_temperature_are_part_of_the_key(self):
+        cache = _cache()
+        cache.put("chat", "chat_email", 1, _llm(), "Hi", "A", 1.0)
+
+        capable = _llm(model="llama-3.3-70b-versatile")
+        assert cache.get("chat", "chat_email", 1, capable, "Hi") is None
+        assert cache.get("chat", "chat_email", 1, _llm(temperature=0.7), "Hi") is None
+        assert cache.get("chat", "chat_email", 1, _llm(), "Hi") == "A"
+
+    def test_entries_are_isolated_per_user(self):
+        cache = _cache()
+        cache.put("document", "document_analysis", 1, _llm(), "Same email", "for user 1", 1.0)
+
+        assert cache.get("document", "document_analysis", 2, _llm(), "Same email") is None
+        assert cache.clear(user_id=1) == 1
+        assert cache.get("document", "document_analysis", 1, _llm(), "Same email") is None
+
+    def test_entries_expire_after_kind_ttl(self):
+        clock = FakeClock()
+        cache = _cache(clock)
+        cache.put("chat", "chat_email", 1, _llm(), "Hi", "chat reply", 1.0)
+        cache.put("document", "document_analysis", 1, _llm(), "Doc", "analysis", 1.0)
+        before = RESPONSE_CACHE.value("chat", "expired")
+
+        clock.now += 120
+        assert cache.get("chat", "chat_email", 1, _llm(), "Hi") is None
+        assert cache.get("document", "document_analysis", 1, _llm(), "Doc") == "analysis"
+        assert RESPONSE_CACHE.value("chat", "expired") - before == 1
+        assert len(cache) == 1
+
+    def test_least_recently_used_entry_is_evicted(self):
+        clock = FakeClock()
+        cache = _cache(clock, max_entries=2)
+        for prompt in ("first", "second"):
+            cache.put("document", "document_analysis", 1, _llm(), prompt, prompt, 1.0)
+            clock.now += 1
+        assert cache.get("document", "document_analysis", 1, _llm(), "first") == "first"
+        clock.now += 1
+
+        cache.put("document", "document_analysis", 1, _llm(), "third", "third", 1.0)
+
+        assert len(cache) == 2
+        assert cache.get("document", "document_analysis", 1, _llm(), "second") is None
+        assert cache.get("document", "document_analysis", 1, _llm(), "first") == "first"
+
+    def test_survives_restart(self, tmp_path):
+        path = str(tmp_path / "responses.db")
+        _cache(path=path).put("document", "document_analysis", 1, _llm(), "Doc", "kept", 2.0)
+
+        assert _cache(path=path).get("document", "document_analysis", 1, _llm(), "Doc") == "kept"
+
+    def test_semantic_lookup_finds_near_duplicate_chat(self):
+        vectors = {
+            "What's on my calendar today?": [1.0, 0.0, 0.1],
+            "what is on my calendar today": [0.98, 0.0, 0.15],
+            "Draft a reply to Sarah": [0.0, 1.0, 0.0],
+        }
+        cache = _cache(semantic_threshold=0.95, embed=vectors.__getitem__)
+        message = "What's on my calendar today?"
+        cache.put(
+            "chat", "chat_calendar", 1, _llm(), f"prompt: {message}", "Standup at 9", 2.0, message
+        )
+        before = RESPONSE_CACHE.value("chat", "semantic_hit")
+
+        similar = "what is on my calendar today"
+        hit = cache.get("chat", "chat_calendar", 1, _llm(), f"prompt: {similar}", similar)
+        assert hit == "Standup at 9"
+        assert RESPONSE_CACHE.value("chat", "semantic_hit") - before == 1
+
+        other = "Draft a reply to Sarah"
+        assert cache.get("chat", "chat_calendar", 1, _llm(), f"prompt: {other}", other) is None
+        # Near duplicates are only matched for the same user and agent
+        assert cache.get("chat", "chat_calendar", 2, _llm(), f"prompt: {similar}", similar) is None
+        assert cache.get("chat", "chat_email", 1, _llm(), f"prompt: {similar}", similar) is None
+
+    def test_hits_count_saved_latency_and_errors_are_not_cached(self):
+        cache = _cache()
+        calls = []
+        saved_before = RESPONSE_CACHE_SAVED_SECONDS.value("document")
+
+        def failing():
+            raise RuntimeError("LLM down")
+
+        with patch("app.services.response_cache.get_response_cache", return_value=cache):
+            try:
+                cached_response("document", "document_analysis", 1, _llm(), "Doc", failing)
+            except RuntimeError:
+                pass
+            for _ in range(3):
+                cached_response(
+                    "document", "document_analysis", 1, _llm(), "Doc",
+                    lambda: calls.append(1) or "analysis",
+                )
+
+        assert len(calls) == 1
+        assert RESPONSE_CACHE_SAVED_SECONDS.value("document") > saved_before
+
+
+class TestCoordinatorCaching:
+    def test_identical_document_analyzed_once_per_user(self):
+        coordinator = _coordinator("First analysis", "Second analysis", "Third analysis")
+
+        first = coordinator.analyze_document("Meeting moved to 3pm", "email", user_id=1)
+        again = coordinator.analyze_document("Meeting moved to 3pm", "email", user_id=1)
+        other_user = coordinator.analyze_document("Meeting moved to 3pm", "email", user_id=2)
+
+        assert first["analysis"] == again["analysis"] == "First analysis"
+        assert other_user["analysis"] == "Second analysis"
+
+    def test_streamed_chat_served_from_cache(self):
+        coordinator = _coordinator("Standup is at 9.", "Something else")
+
+        assert coordinator.chat_with_calendar_agent(1, "When is standup?") == "Standup is at 9."
+        assert list(coordinator.stream_chat(1, "calendar", "When is standup?")) == [
+            "Standup is at 9."
+        ]
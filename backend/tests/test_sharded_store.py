@@ -0,0 +1,323 @@
+import math
+import os
+import re
+import threading
+import uuid
+import zlib
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.rag.sharded_store import ShardedVectorStore
+from app.services.rag.snapshots import CollectionJournal
+from app.services.rag.vector_store import VectorStore, create_vector_store
+
+DIMENSIONS = 32
+
+
+class CountingEmbedder:
+    # Bag-of-words vectors; counts the texts embedded
+    def __init__(self):
+        self.texts = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        vectors = []
+        for text in texts:
+            vector = [1e-3] * DIMENSIONS
+            for word in re.findall(r"[a-z]+", text.lower()):
+                vector[zlib.crc32(word.encode()) % DIMENSIONS] += 1.0
+            norm = math.sqrt(sum(x * x for x in vector))
+            vectors.append([x / norm for x in vector])
+        return vectors
+
+
+@pytest.fixture
+def client():
+    import chromadb
+
+    return chromadb.EphemeralClient()
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+@pytest.fixture
+def open_store(mock_settings, client, embedder):
+    chromadb = Mock()
+    chromadb.EphemeralClient.return_value = client
+    name = f"test_{uuid.uuid4().hex[:12]}"
+    with (
+        patch("app.services.rag.vector_store.chromadb", chromadb),
+        patch("app.services.rag.vector_store.settings", mock_settings),
+        patch("app.services.rag.sharded_store.settings", mock_settings),
+        patch("app.services.rag.snapshots.settings", mock_settings),
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+        patch("app.services.rag.sharded_store.embedding_manager", embedder),
+    ):
+
+        def open_store(sharding="user", **options):
+            return ShardedVectorStore(collection_name=name, sharding=sharding, **options)
+
+        yield open_store
+
+
+@pytest.fixture
+def journaled(mock_settings, tmp_path):
+    # Production: in-memory client, shards kept in their journals
+    mock_settings.ENVIRONMENT = "production"
+    mock_settings.CHROMA_SNAPSHOT_DIR = str(tmp_path)
+    return mock_settings
+
+
+def _collections(client, store):
+    return {
+        collection.name
+        for collection in client.list_collections()
+        if collection.name.startswith(store.collection_name)
+    }
+
+
+def _add(store, user_id, texts, source="email"):
+    metadatas = [{"source": source} for _ in texts]
+    if user_id is not None:
+        for metadata in metadatas:
+            metadata["user_id"] = user_id
+    return store.add_documents(list(texts), metadatas)
+
+
+class TestUserShards:
+    def test_each_user_gets_a_collection(self, open_store, client):
+        store = open_store()
+        _add(store, 1, ["invoice from acme", "dinner with sam"])
+        _add(store, 2, ["invoice from globex"])
+        _add(store, None, ["product announcement"])
+
+        assert _collections(client, store) == {
+            store.collection_name,
+            store._shard_name(1),
+            store._shard_name(2),
+        }
+        assert store.collection.count() == 1
+        assert store.get_stats()["total_documents"] == 4
+        results = store.query_documents("invoice", 5, {"user_id": 1})
+        assert [r["content"] for r in results] == ["invoice from acme", "dinner with sam"]
+
+    def test_user_clause_is_dropped_inside_the_shard(self, open_store):
+        store = open_store()
+        _add(store, 1, ["invoice from acme"])
+        _add(store, 1, ["invoice from globex"], source="calendar")
+
+        with store._shard(store._shard_name(1)) as shard:
+            collection = shard.collection
+            with patch.object(collection, "query", wraps=collection.query) as query:
+                results = store.query_documents(
+                    "invoice", 5, {"$and": [{"user_id": 1}, {"source": "calendar"}]}
+                )
+
+        assert [r["content"] for r in results] == ["invoice from globex"]
+        assert query.call_args.kwargs["where"] == {"source": "calendar"}
+        assert store._shard_filter({"user_id": 1}) is None
+
+    def test_unfiltered_queries_merge_every_shard(self, open_store):
+        store = open_store()
+        _add(store, 1, ["invoice from acme"])
+        _add(store, 2, ["invoice overdue"])
+        _add(store, None, ["lunch menu"])
+
+        results = store.query_documents("invoice overdue", 2)
+
+        assert [r["content"] for r in results] == ["invoice overdue", "invoice from acme"]
+        assert len(store.get_all_documents()) == 3
+        assert len(store.get_all_documents(limit=2)) == 2
+
+    def test_hybrid_query_fetches_lexical_matches(self, open_store, mock_settings):
+        mock_settings.RAG_HYBRID_CANDIDATES = 1
+        store = open_store()
+        _add(store, 1, ["acme invoice", "call 0772123456 about the invoice"])
+
+        results = store.hybrid_query("0772123456", 2, {"user_id": 1})
+
+        assert "call 0772123456 about the invoice" in [r["content"] for r in results]
+
+    def test_deleting_a_user_drops_their_collection(self, open_store, client):
+        store = open_store()
+        _add(store, 1, ["invoice from acme", "dinner with sam"])
+        _add(store, 2, ["invoice from globex"])
+        store.hybrid_query("invoice", 5, {"user_id": 1})  # builds their lexical shard
+
+        assert store.delete_documents({"user_id": 1}) == 2
+
+        assert store._shard_name(1) not in _collections(client, store)
+        assert 1 not in store.lexical._shards
+        assert store.query_documents("invoice", 5, {"user_id": 1}) == []
+        assert store.delete_documents({"user_id": 1}) == 0
+        assert len(store.query_documents("invoice", 5, {"user_id": 2})) == 1
+
+    def test_filtered_delete_within_shards(self, open_store):
+        store = open_store()
+        _add(store, 1, ["invoice from acme"])
+        _add(store, 1, ["dinner with sam"], source="calendar")
+        _add(store, 2, ["standup"], source="calendar")
+
+        assert store.delete_documents({"source": "calendar"}) == 2
+        assert [d["content"] for d in store.get_all_documents()] == ["invoice from acme"]
+
+    def test_non_numeric_ids_get_valid_names(self, open_store):
+        store = open_store()
+        _add(store, "alice@example.com", ["invoice from acme"])
+
+        name = store._shard_name("alice@example.com")
+        assert re.fullmatch(r"[A-Za-z0-9_]{3,63}", name)
+        assert len(store.query_documents("invoice", 5, {"user_id": "alice@example.com"})) == 1
+
+
+class TestBucketShards:
+    def test_users_share_buckets_and_stay_filtered(self, open_store, client):
+        store = open_store("bucket", buckets=2)
+        for user_id in range(6):
+            _add(store, user_id, [f"invoice for user {user_id}"])
+
+        assert len(_collections(client, store)) == 3  # the shared collection and 2 buckets
+        for user_id in range(6):
+            results = store.query_documents("invoice", 5, {"user_id": user_id})
+            assert [r["metadata"]["user_id"] for r in results] == [user_id]
+        assert store.delete_documents({"user_id": 3}) == 1
+        assert store.get_stats()["total_documents"] == 5
+
+
+class TestOpenShardLimit:
+    def test_closed_shards_are_restored_without_reembedding(
+        self, journaled, open_store, client, embedder
+    ):
+        store = open_store(max_open=2)
+        for user_id in range(1, 5):
+            _add(store, user_id, [f"invoice for user {user_id}", "dinner with sam"])
+
+        # Only the two most recent shards are in memory; the others are on disk
+        assert set(store._shards) == {store._shard_name(3), store._shard_name(4)}
+        assert _collections(client, store) == {store.collection_name, *store._shards}
+        assert store.get_stats()["closed_shards"] == 2
+
+        embedded = embedder.texts
+        results = store.query_documents("dinner", 5, {"user_id": 1})
+
+        assert embedder.texts == embedded + 1  # the query only
+        assert sorted(r["content"] for r in results) == ["dinner with sam", "invoice for user 1"]
+        assert store._shard_name(1) in store._shards
+        assert len(store._shards) == 2
+
+    def test_shards_in_use_are_not_closed(self, journaled, open_store):
+        store = open_store(max_open=1)
+        _add(store, 1, ["invoice from acme"])
+
+        with store._shard(store._shard_name(1)) as shard:
+            _add(store, 2, ["invoice from globex"])
+            _add(store, 3, ["invoice from initech"])
+            # The cap is kept by closing the other, idle shards
+            assert list(store._shards) == [store._shard_name(1)]
+            assert shard.collection.count() == 1
+            assert len(store.query_documents("invoice", 5, {"user_id": 2})) == 1
+
+    def test_restart_restores_only_what_is_queried(self, journaled, open_store, client):
+        store = open_store()
+        _add(store, 1, ["invoice from acme"])
+        _add(store, 2, ["invoice from globex"])
+        for journal in store.journals():
+            journal.close()
+        for name in _collections(client, store):
+            client.delete_collection(name)
+
+        restarted = open_store()
+
+        assert restarted._shards == {}
+        assert restarted.get_stats()["shards"] == 2
+        assert len(restarted.query_documents("invoice", 5, {"user_id": 2})) == 1
+        assert list(restarted._shards) == [restarted._shard_name(2)]
+
+    def test_restoring_a_shard_does_not_block_the_others(self, journaled, open_store):
+        store = open_store(max_open=2)
+        for user_id in (1, 2, 3):
+            _add(store, user_id, [f"invoice for user {user_id}"])  # closes user 1's shard
+        restore = CollectionJournal.restore
+        restoring, finish = threading.Event(), threading.Event()
+
+        def slow_restore(journal, collection):
+            restoring.set()
+            assert finish.wait(timeout=5)
+            return restore(journal, collection)
+
+        results = {}
+
+        def query(user_id):
+            found = store.query_documents("invoice", 5, {"user_id": user_id})
+            results.setdefault(user_id, []).append(found)
+
+        with patch.object(CollectionJournal, "restore", autospec=True) as mock_restore:
+            mock_restore.side_effect = slow_restore
+            first = threading.Thread(target=query, args=(1,))
+            second = threading.Thread(target=query, args=(1,))
+            first.start()
+            assert restoring.wait(timeout=5)
+            second.start()
+            query(3)  # while user 1's shard is still restoring
+            assert [len(found) for found in results[3]] == [1]
+            assert 1 not in results
+            finish.set()
+            first.join(timeout=5)
+            second.join(timeout=5)
+
+        assert mock_restore.call_count == 1  # the second caller waited for the first
+        assert [len(found) for found in results[1]] == [1, 1]
+
+    def test_dropping_a_closed_shard_does_not_restore_it(self, journaled, open_store, client):
+        store = open_store(max_open=1)
+        _add(store, 1, ["invoice from acme", "dinner with sam", "lunch"])
+        store.delete_documents({"$and": [{"user_id": 1}, {"source": "email"}]})
+        _add(store, 1, ["invoice from initech"])
+        _add(store, 2, ["invoice from globex"])  # closes user 1's shard
+
+        with patch.object(CollectionJournal, "restore") as restore:
+            assert store.delete_documents({"user_id": 1}) == 1
+
+        restore.assert_not_called()
+        assert not os.path.exists(os.path.join(journaled.CHROMA_SNAPSHOT_DIR, store._shard_name(1)))
+        assert store.query_documents("invoice", 5, {"user_id": 1}) == []
+
+
+class TestSplitSharedCollection:
+    def test_moves_user_documents_without_reembedding(self, open_store, embedder):
+        shared = VectorStore(collection_name=open_store().collection_name)
+        _add(shared, 1, ["invoice from acme", "dinner with sam"])
+        _add(shared, 2, ["invoice from globex"])
+        _add(shared, None, ["product announcement"])
+        before = shared.query_documents("invoice", 5, {"user_id": 1})
+
+        store = open_store()
+        embedded = embedder.texts
+        result = store.split_shared_collection(batch_size=2)
+
+        assert result == {"moved": 3, "kept": 1, "shards": 2}
+        assert embedder.texts == embedded
+        assert store.collection.count() == 1
+        after = store.query_documents("invoice", 5, {"user_id": 1})
+        assert [(r["id"], round(r["distance"], 5)) for r in after] == [
+            (r["id"], round(r["distance"], 5)) for r in before
+        ]
+        # Running it again changes nothing
+        assert store.split_shared_collection() == {"moved": 0, "kept": 1, "shards": 0}
+
+
+def test_selected_by_settings(open_store, mock_settings):
+    mock_settings.CHROMA_SHARDING = "user"
+
+    assert isinstance(create_vector_store(), ShardedVectorStore)
+
+    mock_settings.CHROMA_SHARDING = "tenant"
+    with pytest.raises(ValueError, match="CHROMA_SHARDING"):
+        create_vector_store()
@@ -0,0 +1,165 @@
+import asyncio
+import time
+from unittest.mock import Mock, patch
+
+from app.services.admission import AdmissionController
+from app.services.singleflight import SingleFlight
+
+
+async def _gather_calls(flight, key, func, count):
+    return await asyncio.gather(*(flight.do(key, func) for _ in range(count)))
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"summary": "ok"}
+
+        results = asyncio.run(_gather_calls(flight, ("user", 1), work, 10))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.in_flight() == 0
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work(key):
+            calls.append(key)
+            await asyncio.sleep(0.01)
+            return key
+
+        async def scenario():
+            return await asyncio.gather(
+                flight.do(1, lambda: work(1)), flight.do(2, lambda: work(2))
+            )
+
+        assert asyncio.run(scenario()) == [1, 2]
+        assert sorted(calls) == [1, 2]
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            return len(calls)
+
+        async def scenario():
+            return [await flight.do("key", work), await flight.do("key", work)]
+
+        assert asyncio.run(scenario()) == [1, 2]
+
+    def test_error_is_shared_by_all_callers(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("workflow failed")
+
+        async def scenario():
+            return await asyncio.gather(
+                *(flight.do("key", work) for _ in range(3)), return_exceptions=True
+            )
+
+        results = asyncio.run(scenario())
+
+        assert len(calls) == 1
+        assert all(isinstance(result, ValueError) for result in results)
+
+    def test_cancelled_caller_does_not_cancel_others(self):
+        flight = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        async def scenario():
+            first = asyncio.ensure_future(flight.do("key", work))
+            second = asyncio.ensure_future(flight.do("key", work))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            return await second
+
+        assert asyncio.run(scenario()) == "done"
+
+
+class TestBriefingCoalescing:
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_concurrent_requests_run_one_workflow(
+        self, mock_get_admission, mock_get_coordinator, test_user, db_session
+    ):
+        from app.api.endpoints.agent import get_daily_briefing
+
+        controller = AdmissionController("test", 2, 0, 1.0)
+        mock_get_admission.return_value = controller
+        coordinator = Mock()
+        coordinator.MODEL_CONFIGS = {
+            "small": {"max_tokens": 1, "temperature": 0.1},
+            "large": {"max_tokens": 2, "temperature": 0.3},
+        }
+
+        def slow_briefing(user_id, notify_urgent=True):
+            time.sleep(0.2)
+            return {"summary": f"briefing for {user_id}"}
+
+        coordinator.get_daily_briefing.side_effect = slow_briefing
+        mock_get_coordinator.return_value = coordinator
+
+        async def scenario():
+            # More requests than admission slots and no queue: without
+            # coalescing most of them would be shed with a 503
+            requests = [
+                get_daily_briefing(
+                    model_size="small", refresh=False, current_user=test_user, db=db_session
+                )
+                for _ in range(8)
+            ]
+            return await asyncio.gather(*requests)
+
+        responses = asyncio.run(scenario())
+
+        coordinator.get_daily_briefing.assert_called_once_with(test_user.id, notify_urgent=False)
+        coordinator.schedule_urgent_sms.assert_called_once()
+        assert all(response["briefing"]["summary"] == f"briefing for {test_user.id}" for response in responses)
+        assert controller.stats()["in_flight"] == 0
+
+    @patch("app.api.endpoints.agent.get_langgraph_coordinator")
+    @patch("app.api.endpoints.agent.get_briefing_admission")
+    def test_model_sizes_are_not_coalesced(
+        self, mock_get_admission, mock_get_coordinator, test_user, db_session
+    ):
+        from app.api.endpoints.agent import get_daily_briefing
+
+        mock_get_admission.return_value = AdmissionController("test", 2, 2, 1.0)
+        coordinator = Mock()
+        coordinator.MODEL_CONFIGS = {
+            "small": {"max_tokens": 1, "temperature": 0.1},
+            "large": {"max_tokens": 2, "temperature": 0.3},
+        }
+        coordinator.get_daily_briefing.side_effect = lambda *a, **k: time.sleep(0.05) or {}
+        mock_get_coordinator.return_value = coordinator
+
+        async def scenario():
+            return await asyncio.gather(
+                get_daily_briefing(
+                    model_size="small", refresh=False, current_user=test_user, db=db_session
+                ),
+                get_daily_briefing(
+                    model_size="large", refresh=False, current_user=test_user, db=db_session
+                ),
+            )
+
+        responses = asyncio.run(scenario())
+
+        assert coordinator.get_daily_briefing.call_count == 2
+        assert [response["model_size"] for response in responses] == ["small", "large"]
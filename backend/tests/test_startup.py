@@ -0,0 +1,17 @@
+from benchmarks.startup import HEAVY_MODULES, run_probe
+
+
+class TestColdStart:
+    def test_health_does_not_load_heavy_subsystems(self):
+        # Fresh interpreter: conftest has already imported everything here
+        probe = run_probe()
+
+        assert probe["status"] == 200
+        assert probe["loaded"] == []
+
+    def test_importtime_report_excludes_heavy_subsystems(self):
+        probe = run_probe(importtime=True)
+
+        imported = {name.split(".")[0] for _ms, _depth, name in probe["imports"]}
+        assert imported.isdisjoint(HEAVY_MODULES)
+        assert "fastapi" in imported
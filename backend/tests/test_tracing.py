@@ -0,0 +1,139 @@
+import asyncio
+import json
+import logging
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, text
+
+from app.core.tracing import (
+    end_trace,
+    get_current_trace,
+    instrument_engine,
+    span,
+    start_trace,
+    traced,
+)
+
+
+class TestSpans:
+    def test_spans_are_recorded_with_parent(self):
+        trace, token = start_trace(sampled=True)
+        try:
+            with span("rag.query_texts"):
+                with span("embedding.embed_query", model="llama3"):
+                    pass
+        finally:
+            end_trace(token)
+
+        names = [(s.name, s.parent) for s in trace.spans]
+        assert ("embedding.embed_query", "rag.query_texts") in names
+        assert ("rag.query_texts", None) in names
+        assert trace.spans[0].attributes["model"] == "llama3"
+
+    def test_unsampled_trace_records_nothing(self):
+        trace, token = start_trace(sampled=False)
+        try:
+            with span("chroma.query") as current:
+                assert current is None
+        finally:
+            end_trace(token)
+
+        assert trace.spans == []
+
+    def test_span_without_trace_is_noop(self):
+        assert get_current_trace() is None
+        with span("chroma.query") as current:
+            assert current is None
+
+    def test_error_is_recorded_on_span(self):
+        trace, token = start_trace(sampled=True)
+        try:
+            with span("backboard.call"):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        finally:
+            end_trace(token)
+
+        assert trace.spans[0].attributes["error"] == "RuntimeError"
+
+    def test_traced_decorator_sync_and_async(self):
+        @traced("vault.retrieve_token")
+        async def fetch():
+            return "token"
+
+        @traced("embedding.embed_documents")
+        def embed():
+            return [0.1]
+
+        trace, token = start_trace(sampled=True)
+        try:
+            assert asyncio.run(fetch()) == "token"
+            assert embed() == [0.1]
+        finally:
+            end_trace(token)
+
+        assert {s.name for s in trace.spans} == {
+            "vault.retrieve_token",
+            "embedding.embed_documents",
+        }
+
+    def test_sample_rate_zero_disables_breakdown(self):
+        with patch("app.core.tracing.settings") as mock_settings:
+            mock_settings.TRACE_SAMPLE_RATE = 0.0
+            trace, token = start_trace()
+            end_trace(token)
+
+        assert trace.sampled is False
+
+
+class TestServerTiming:
+    def test_stage_totals_skip_nested_same_stage(self):
+        trace, token = start_trace(sampled=True)
+        try:
+            with span("rag.query_texts"):
+                with span("rag.rerank"):
+                    pass
+            with span("db.query"):
+                pass
+            with span("db.query"):
+                pass
+        finally:
+            end_trace(token)
+        trace.finish()
+
+        totals = trace.stage_totals()
+        assert totals["rag"][0] == 1
+        assert totals["db"][0] == 2
+        header = trace.server_timing_header()
+        assert 'db;dur=' in header and 'desc="2x"' in header
+        assert header.endswith(f"total;dur={trace.duration * 1000:.1f}")
+
+    def test_db_queries_become_spans(self):
+        engine = create_engine("sqlite:///:memory:")
+        instrument_engine(engine)
+
+        trace, token = start_trace(sampled=True)
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        finally:
+            end_trace(token)
+
+        db_spans = [s for s in trace.spans if s.name == "db.query"]
+        assert len(db_spans) == 1
+        assert db_spans[0].attributes["statement"] == "SELECT"
+
+    def test_middleware_sets_header_and_logs_json(self, client, caplog):
+        with patch("app.core.tracing.settings") as mock_settings:
+            mock_settings.TRACE_SAMPLE_RATE = 1.0
+            with caplog.at_level(logging.INFO, logger="app.tracing"):
+                response = client.get("/")
+
+        assert response.status_code == 200
+        assert "total;dur=" in response.headers["Server-Timing"]
+
+        records = [json.loads(r.message) for r in caplog.records if r.name == "app.tracing"]
+        assert records[-1]["path"] == "/"
+        assert records[-1]["status"] == 200
+        assert "spans" in records[-1]
@@ -0,0 +1,165 @@
+import zlib
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.services.rag.compression import VectorCompressor
+from app.services.rag.numpy_store import NumpyVectorStore
+
+DIMENSIONS = 64
+BASIS = np.random.default_rng(0).standard_normal((8, DIMENSIONS)).astype(np.float32)
+
+
+def _corpus(rows, seed=1):
+    # Low-rank vectors plus noise, like real embeddings (far from isotropic)
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((rows, 8)).astype(np.float32) @ BASIS
+    vectors += 0.1 * rng.standard_normal((rows, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class CorpusEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [_corpus(1, seed=zlib.crc32(text.encode()))[0].tolist() for text in texts]
+
+
+class TestVectorCompressor:
+    # Random projection keeps less of the structure than PCA at the same width
+    @pytest.mark.parametrize(
+        "method, dimensions, candidates", [("pca", 16, 5), ("random", 32, 50)]
+    )
+    def test_codes_rank_like_the_full_vectors(self, method, dimensions, candidates):
+        corpus = _corpus(2000)
+        queries = _corpus(20, seed=2)
+        compressor = VectorCompressor(method, dimensions=dimensions)
+        compressor.train(corpus[:500])
+
+        codes = compressor.encode(corpus)
+        approximate = compressor.scores(codes, queries)
+        exact = corpus @ queries.T
+
+        assert codes.dtype == np.int8 and codes.shape == (2000, dimensions)
+        assert compressor.bytes_per_vector == dimensions
+        # The exact best match is among the best few by code for every query
+        for column in range(len(queries)):
+            best = int(np.argmax(exact[:, column]))
+            assert best in np.argsort(-approximate[:, column])[:candidates]
+
+    def test_save_and_load(self, tmp_path):
+        corpus = _corpus(300)
+        compressor = VectorCompressor("pca", dimensions=12)
+        compressor.train(corpus)
+        compressor.save(str(tmp_path / "compression.npz"))
+
+        loaded = VectorCompressor("random")
+        loaded.load(str(tmp_path / "compression.npz"))
+
+        assert loaded.method == "pca" and loaded.dimensions == 12
+        assert np.array_equal(loaded.encode(corpus), compressor.encode(corpus))
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            VectorCompressor("lsh")
+
+
+@pytest.fixture
+def embedder():
+    embedder = CorpusEmbedder()
+    with (
+        patch("app.services.rag.numpy_store.embedding_manager", embedder),
+        patch("app.services.rag.vector_store.embedding_manager", embedder),
+    ):
+        yield embedder
+
+
+@pytest.fixture
+def open_store(mock_settings, embedder, tmp_path):
+    mock_settings.NUMPY_INDEX_REDUCED_DIMENSIONS = 16
+    mock_settings.NUMPY_INDEX_COMPRESS_AFTER = 100
+    mock_settings.NUMPY_INDEX_RERANK_CANDIDATES = 40
+
+    def open_store(compression="pca", path=tmp_path):
+        with (
+            patch("app.services.rag.vector_store.settings", mock_settings),
+            patch("app.services.rag.numpy_store.settings", mock_settings),
+        ):
+            return NumpyVectorStore(path=str(path), compression=compression)
+
+    return open_store
+
+
+TEXTS = [f"chunk {i}" for i in range(300)]
+QUERIES = [f"question {i}" for i in range(10)]
+
+
+def _add(store, texts):
+    return store.add_documents(list(texts), [{"user_id": 1} for _ in texts])
+
+
+def _search(store):
+    return [
+        [(r["id"], round(r["distance"], 5)) for r in store.query_documents(q, 5, {"user_id": 1})]
+        for q in QUERIES
+    ]
+
+
+class TestCompressedIndex:
+    def test_search_matches_the_exact_index(self, open_store, tmp_path):
+        exact = open_store(compression="", path=tmp_path / "exact")
+        compressed = open_store(path=tmp_path / "compressed")
+        _add(exact, TEXTS)
+        _add(compressed, TEXTS[:50])
+
+        index = compressed._index(1)
+        assert index.codes is None  # below NUMPY_INDEX_COMPRESS_AFTER
+        _add(compressed, TEXTS[50:])
+
+        assert index.codes is not None and index.codes.dtype == np.int8
+        assert isinstance(index.matrix, np.memmap)
+        assert compressed.get_stats()["compressed_users"] == 1
+        # Reranked at full precision: same documents, same distances
+        assert _search(compressed) == _search(exact)
+
+    def test_restart_loads_codes_without_retraining(self, open_store):
+        store = open_store()
+        _add(store, TEXTS[:150])
+        expected = _search(store)
+        codes = store._index(1).codes[:150].copy()
+
+        restarted = open_store()
+        with patch.object(VectorCompressor, "train") as train:
+            index = restarted._index(1)
+            assert _search(restarted) == expected
+        train.assert_not_called()
+        assert np.array_equal(index.codes[:150], codes)
+
+        _add(restarted, TEXTS[150:])
+        assert len(open_store()._index(1).codes) == 300
+
+    def test_rows_added_without_compression_are_encoded_on_load(self, open_store):
+        _add(open_store(), TEXTS[:150])
+        _add(open_store(compression=""), TEXTS[150:])
+
+        index = open_store()._index(1)
+
+        assert index.count == 300 and len(index.codes) == 300
+        assert np.array_equal(index.codes[150:], index.compressor.encode(index.matrix[150:]))
+
+    def test_compaction_keeps_codes_aligned(self, open_store):
+        store = open_store()
+        ids = _add(store, TEXTS[:200])
+        index = store._index(1)
+
+        index.delete(ids[:150])
+
+        assert index.count == 50 and index.dead == 0
+        assert np.array_equal(index.codes[:50], index.compressor.encode(index.matrix))
+        assert np.array_equal(open_store()._index(1).codes, index.codes[:50])
@@ -0,0 +1,179 @@
+import os
+import uuid
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.rag.embeddings import ChromaEmbeddingFunction
+from app.services.rag.snapshots import CollectionJournal
+from app.services.rag.vector_store import VectorStore
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = 0
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in texts]
+
+
+@pytest.fixture
+def client():
+    import chromadb
+
+    return chromadb.EphemeralClient()
+
+
+def _collection(client, name, embedder):
+    # A fresh, empty collection: what a restarted process starts from
+    try:
+        client.delete_collection(name)
+    except Exception:
+        pass
+    return client.create_collection(name, embedding_function=ChromaEmbeddingFunction(embedder))
+
+
+def _contents(collection):
+    rows = collection.get(include=["documents", "embeddings", "metadatas"])
+    return {
+        doc_id: (document, [round(x, 4) for x in embedding], metadata)
+        for doc_id, document, embedding, metadata in zip(
+            rows["ids"], rows["documents"], rows["embeddings"], rows["metadatas"]
+        )
+    }
+
+
+def _add(journal, collection, embedder, ids):
+    documents = [f"document {doc_id}" for doc_id in ids]
+    metadatas = [{"user_id": 1, "n": i} for i, _ in enumerate(ids)]
+    embeddings = embedder.embed_documents(documents)
+    collection.add(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+    journal.log_add(ids, documents, metadatas, embeddings)
+
+
+class TestCollectionJournal:
+    def test_log_replay_restores_writes_without_embedding(self, client, tmp_path):
+        embedder = CountingEmbedder()
+        name = f"test_{uuid.uuid4().hex}"
+        journal = CollectionJournal(str(tmp_path))
+        collection = _collection(client, name, embedder)
+        journal.restore(collection)
+        _add(journal, collection, embedder, ["a", "b", "c"])
+        collection.delete(ids=["b"])
+        journal.log_delete(["b"])
+        before = _contents(collection)
+        journal.close()
+
+        restarted = CountingEmbedder()
+        collection = _collection(client, name, restarted)
+        stats = CollectionJournal(str(tmp_path)).restore(collection)
+
+        assert stats == {"snapshot_rows": 0, "replayed": 2}
+        assert _contents(collection) == before
+        assert restarted.calls == 0
+
+    def test_snapshot_covers_log_and_later_writes_are_replayed(self, client, tmp_path):
+        embedder = CountingEmbedder()
+        name = f"test_{uuid.uuid4().hex}"
+        journal = CollectionJournal(str(tmp_path))
+        collection = _collection(client, name, embedder)
+        journal.restore(collection)
+        _add(journal, collection, embedder, [f"s{i}" for i in range(7)])
+
+        assert journal.snapshot() == 7
+        _add(journal, collection, embedder, ["late"])
+        collection.delete(ids=["s0"])
+        journal.log_delete(["s0"])
+        before = _contents(collection)
+        journal.close()
+
+        # Only the segment written after the snapshot is left
+        assert len([n for n in os.listdir(tmp_path) if n.startswith("wal-")]) == 1
+
+        restarted = CountingEmbedder()
+        collection = _collection(client, name, restarted)
+        stats = CollectionJournal(str(tmp_path)).restore(collection)
+
+        assert stats == {"snapshot_rows": 7, "replayed": 2}
+        assert _contents(collection) == before
+        assert restarted.calls == 0
+
+    def test_incomplete_last_entry_is_ignored(self, client, tmp_path):
+        embedder = CountingEmbedder()
+        name = f"test_{uuid.uuid4().hex}"
+        journal = CollectionJournal(str(tmp_path))
+        collection = _collection(client, name, embedder)
+        journal.restore(collection)
+        _add(journal, collection, embedder, ["kept"])
+        journal.close()
+        with open(journal._wal_path, "a") as f:
+            f.write('{"op": "add", "ids": ["torn"')
+
+        collection = _collection(client, name, embedder)
+        CollectionJournal(str(tmp_path)).restore(collection)
+
+        assert collection.get()["ids"] == ["kept"]
+
+    def test_snapshot_taken_in_background_after_enough_writes(self, client, tmp_path):
+        embedder = CountingEmbedder()
+        journal = CollectionJournal(str(tmp_path), snapshot_every=3)
+        journal.restore(_collection(client, f"test_{uuid.uuid4().hex}", embedder))
+
+        for i in range(3):
+            _add(journal, journal.collection, embedder, [f"d{i}"])
+        journal._snapshot_thread.join(timeout=10)
+
+        with open(tmp_path / "snapshot" / "manifest.json") as f:
+            assert '"count": 3' in f.read()
+        assert journal._since_snapshot == 0
+
+
+class TestPersistentVectorStore:
+    @pytest.fixture
+    def production(self, mock_settings, client, tmp_path):
+        mock_settings.ENVIRONMENT = "production"
+        mock_settings.CHROMA_SNAPSHOT_DIR = str(tmp_path)
+        chromadb = Mock()
+        chromadb.EphemeralClient.return_value = client
+        with (
+            patch("app.services.rag.vector_store.chromadb", chromadb),
+            patch("app.services.rag.vector_store.settings", mock_settings),
+            patch("app.services.rag.snapshots.settings", mock_settings),
+        ):
+            yield mock_settings
+
+    def _start(self, client, name, embedder):
+        # One process start: an empty in-memory collection, then the restore
+        try:
+            client.delete_collection(name)
+        except Exception:
+            pass
+        with patch("app.services.rag.vector_store.embedding_manager", embedder):
+            return VectorStore(collection_name=name)
+
+    def test_restart_keeps_documents_without_reembedding(self, production, client):
+        name = f"test_{uuid.uuid4().hex}"
+        embedder = CountingEmbedder()
+        store = self._start(client, name, embedder)
+        with patch("app.services.rag.vector_store.embedding_manager", embedder):
+            ids = store.add_documents(
+                ["Invoice from ACME due Friday", "Dinner with Sam on Saturday"],
+                [{"source": "email", "user_id": 1}, {"source": "calendar", "user_id": 1}],
+            )
+            store.delete_documents({"source": "calendar"})
+        store.journal.close()
+
+        restarted = CountingEmbedder()
+        store = self._start(client, name, restarted)
+
+        assert restarted.calls == 0
+        assert store.collection.get()["ids"] == ids[:1]
+        restored = store.collection.get(ids=ids[:1], include=["embeddings"])["embeddings"][0]
+        assert list(restored) == embedder.embed_documents(["Invoice from ACME due Friday"])[0]
+
+    def test_development_uses_no_journal(self, mock_chromadb, mock_ollama_embeddings):
+        assert VectorStore().journal is None